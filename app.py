@@ -6,9 +6,10 @@ import uuid
 from flask import Flask, jsonify, request, Config as FlaskConfig, Response
 from sqlalchemy import create_engine, Engine
 from sqlalchemy.pool import QueuePool
-from src.core.monitoring import initialize_sentry, handle_error
+from src.core.monitoring import initialize_sentry, handle_error, get_error_reporting_stats
+from src.core.startup import StartupTimeline
 from config import config
-from src.extensions import db, migrate
+from src.extensions import db, init_migrate
 import os
 
 from src.models import load_models
@@ -24,40 +25,55 @@ def create_app() -> Flask:
     Returns:
         Flask: Configured Flask application instance
     """
-    print("Starting app creation...")
+    timeline = StartupTimeline()
     app = Flask(__name__)
+    app.extensions["startup_timeline"] = timeline
 
-    # Load environment-specific configuration
-    print("Loading config...")
-    env = os.getenv("FLASK_ENV", "production")
-    app.config.from_object(config[env])
-
-    print(f"Database URI: {app.config['SQLALCHEMY_DATABASE_URI']}")
+    # Load environment-specific configuration, reporting every missing or
+    # invalid variable at once
+    with timeline.phase("config"):
+        env = os.getenv("FLASK_ENV", "production")
+        config[env].validate_config()
+        app.config.from_object(config[env])
 
     # Initialize SQLAlchemy with the app
-    print("Initializing SQLAlchemy...")
-    db.init_app(app)
+    with timeline.phase("database"):
+        db.init_app(app)
 
     # Register models
-    print("Registering models...")
-    models = register_models()
-
-    # Initialize Flask-Migrate
-    print("Initializing Migrate...")
-    migrate.init_app(app, db)
+    with timeline.phase("models"):
+        models = register_models()
 
-    # Validate critical configuration
-    config[env].validate_config()
-    validate_configuration(app.config)
+    # Flask-Migrate imports Alembic, which only `flask db` needs
+    if os.environ.get("FLASK_RUN_FROM_CLI") == "true":
+        with timeline.phase("migrate"):
+            init_migrate(app)
 
     # Configure logging with rotation
-    setup_logging(app)
+    with timeline.phase("logging"):
+        setup_logging(app)
 
     # Initialize error tracking
-    initialize_sentry()
+    with timeline.phase("sentry"):
+        initialize_sentry()
+
+    # Compile email templates before gunicorn forks, so workers share them
+    with timeline.phase("email_templates"):
+        from src.services.email_templates import precompile_templates
+        precompile_templates()
 
     # Register all blueprints
-    register_blueprints(app)
+    with timeline.phase("blueprints"):
+        register_blueprints(app)
+
+    # Register CLI commands
+    with timeline.phase("commands"):
+        register_commands(app)
+
+    # Allow the IP allowlist to be reloaded without a restart
+    with timeline.phase("ip_allowlist"):
+        from src.api.validators.ip_validator import install_reload_signal_handler
+        install_reload_signal_handler()
 
     @app.route("/healthcheck")
     def healthcheck() -> tuple[Response, int]:
@@ -67,11 +83,17 @@ def create_app() -> Flask:
         Returns:
             tuple: JSON response and status code
         """
+        from src.utils.gender_api import get_cache_stats as get_gender_cache_stats
+        from src.services.orders import SKIPPED_PAYMENTS
         status = {
             "status": "healthy",
             "timestamp": datetime.now(UTC).isoformat(),
             "environment": app.config["FLASK_ENV"],
-            "debug_mode": app.debug
+            "debug_mode": app.debug,
+            "gender_cache": get_gender_cache_stats(),
+            "error_reporting": get_error_reporting_stats(),
+            "skipped_payments": dict(SKIPPED_PAYMENTS),
+            "startup": timeline.as_dict()
         }
 
         try:
@@ -84,6 +106,13 @@ def create_app() -> Flask:
             status["database"] = "error"
             status["status"] = "degraded"
 
+        try:
+            from src.services.email_outbox import EmailOutboxService
+            status["email_outbox"] = EmailOutboxService.get_metrics()
+        except Exception as e:
+            logger.error(f"Email outbox metrics failed: {str(e)}")
+            db.session.rollback()
+
         status_code = 200 if status["status"] == "healthy" else 503
         return jsonify(status), status_code
 
@@ -154,6 +183,8 @@ def create_app() -> Flask:
             app=app
         )
 
+    timeline.finish()
+    timeline.log()
     return app
 
 def setup_logging(app: Flask) -> logging.Logger:
@@ -205,30 +236,6 @@ def setup_database(config: FlaskConfig) -> Engine:
         }
     )
 
-def validate_configuration(config: FlaskConfig) -> None:
-    """
-    Validate application configuration.
-
-    Args:
-        config: Flask application configuration
-    Raises:
-        ValueError: If URL format is invalid or not HTTPS
-    """
-    url_configs = [
-        "CAMPFIRE_TECH_URL",
-        "CAMPFIRE_ALERT_URL",
-        "BOOKING_URL",
-        "TRACKING_BASE_URL"
-    ]
-
-    for config_key in url_configs:
-        url = config.get(config_key)
-        if url and not url.startswith("https://"):
-            raise ValueError(
-                f"Invalid URL format for {config_key}. "
-                f"Only HTTPS URLs are allowed"
-            )
-
 def generate_error_id() -> str:
     """
     Generate a unique error ID for tracking.
@@ -256,13 +263,25 @@ def register_blueprints(app: Flask) -> None:
         from src.services.giftcards import code_generator
         app.register_blueprint(code_generator, url_prefix="/api/v1/code-generator")
 
+        from src.api.endpoints.availability import availability_bp
+        app.register_blueprint(availability_bp, url_prefix="/api/v1/availability")
+
+        from src.api.endpoints.reports import reports_bp
+        app.register_blueprint(reports_bp, url_prefix="/api/v1/reports")
+
+        from src.api.endpoints.exports import exports_bp
+        app.register_blueprint(exports_bp, url_prefix="/api/v1/exports")
+
+        from src.api.endpoints.promo_codes import promo_codes_bp
+        app.register_blueprint(promo_codes_bp, url_prefix="/api/v1/promo-codes")
+
         # Webhook blueprints
         from src.api.webhooks.customers import customers_bp
-        # from src.api.webhooks.orders import orders_bp
+        from src.api.webhooks.orders import orders_bp
         from src.api.webhooks.campfire import campfire_webhook
 
         app.register_blueprint(customers_bp, url_prefix="/customers")
-        # app.register_blueprint(orders_bp, url_prefix="/api/v1/webhooks/orders")
+        app.register_blueprint(orders_bp, url_prefix="/api/v1/webhooks/orders")
         app.register_blueprint(campfire_webhook, url_prefix="/api/v1/webhooks/campfire")
 
         blueprint_logger.info("Successfully registered all blueprints")
@@ -273,6 +292,25 @@ def register_blueprints(app: Flask) -> None:
         handle_error(e, "Blueprint registration failed")
         raise
 
+def register_commands(app: Flask) -> None:
+    """
+    Register all `flask` CLI command groups.
+
+    Args:
+        app: Flask application instance
+    """
+    from src.cli import LazyGroup
+    from src.cli.startup import startup_profile
+    # Each group's module (and the services and SDKs behind it) is imported
+    # only when one of its commands runs
+    app.cli.add_command(LazyGroup("jobs", "src.cli.jobs:jobs_cli", help="Background webhook job queue."))
+    app.cli.add_command(LazyGroup("customers", "src.cli.customers:customers_cli", help="Customer maintenance commands."))
+    app.cli.add_command(LazyGroup("outbox", "src.cli.email_outbox:outbox_cli", help="Transactional email outbox."))
+    app.cli.add_command(LazyGroup("reminders", "src.cli.appointments:reminders_cli", help="Appointment reminder scheduler."))
+    app.cli.add_command(LazyGroup("square", "src.cli.square:square_cli", help="Square data imports and reconciliation."))
+    app.cli.add_command(LazyGroup("reports", "src.cli.reports:reports_cli", help="Daily sales rollups and reports."))
+    app.cli.add_command(startup_profile)
+
 def create_error_response(
         error_id: str,
         message: str,
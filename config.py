@@ -1,4 +1,6 @@
+import inspect
 import os
+from typing import Callable, Generic, List, Optional, TypeVar
 from dotenv import load_dotenv
 from urllib.parse import quote_plus
 
@@ -6,6 +8,78 @@ from urllib.parse import quote_plus
 if os.path.exists(".env"):
     load_dotenv()
 
+T = TypeVar("T")
+
+_UNSET = object()
+
+
+def parse_bool(value: str) -> bool:
+    return value.lower() in ("1", "true")
+
+
+class Setting(Generic[T]):
+    """
+    A configuration value read from an environment variable.
+
+    Nothing is read at import: the variable is read, cast and cached the
+    first time the setting is accessed (through the config class, or by
+    `app.config.from_object`). Settings without a default are required and
+    must be non-empty.
+
+    Args:
+        cast: Converts the raw string, e.g. int, float or parse_bool
+        default: Value used when the variable is unset
+        https: Require an https:// URL
+    """
+
+    def __init__(self, cast: Callable[[str], T] = str, default: Optional[T] = _UNSET, https: bool = False):
+        self.cast = cast
+        self.default = default
+        self.https = https
+        self.name = None
+        self._value = _UNSET
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, instance, owner) -> T:
+        if self._value is _UNSET:
+            self._value = self.load()
+        return self._value
+
+    def load(self) -> T:
+        raw = os.getenv(self.name)
+        if raw is None or (raw == "" and self.default is _UNSET):
+            if self.default is _UNSET:
+                raise ValueError(f"Missing required environment variable: {self.name}")
+            return self.default
+        if self.https and not raw.startswith("https://"):
+            raise ValueError(f"Invalid URL format for {self.name}. Only HTTPS URLs are allowed")
+        try:
+            return self.cast(raw)
+        except ValueError:
+            raise ValueError(f"Invalid value for {self.name}: expected {self.cast.__name__}, got {raw!r}")
+
+
+class DerivedSetting(Generic[T]):
+    """A setting computed from other settings on first access."""
+
+    def __init__(self, build: Callable[[type], T]):
+        self.build = build
+        self._value = _UNSET
+
+    def __get__(self, instance, owner) -> T:
+        if self._value is _UNSET:
+            self._value = self.build(owner)
+        return self._value
+
+
+def database_uri(cfg) -> str:
+    return (
+        f"postgresql://{cfg.DB_USER}:{quote_plus(cfg.DB_PASSWORD)}"
+        f"@{cfg.DB_HOST}:{cfg.DB_PORT}/{cfg.DB_NAME}"
+    )
+
 
 class Config:
     """Base configuration for the application."""
@@ -13,52 +87,32 @@ class Config:
     @classmethod
     def validate_config(cls) -> None:
         """
-        Validate that all required environment variables are set.
-        Raises ValueError if any required variables are missing.
+        Read every setting once and report all the problems together.
+        Raises ValueError if any variable is missing or invalid.
         """
-        required_vars = [
-            # Core application settings
-            "SECRET_KEY",
-            "DB_HOST",
-            "DB_NAME",
-            "DB_USER",
-            "DB_PASSWORD",
-
-            # API Keys
-            "SQUARE_ACCESS_TOKEN",
-            "CONVERTKIT_API_KEY",
-            "SENDLAYER_API_KEY",
-            "GENDER_API_KEY",
-
-            # Integration tokens
-            "CAMPFIRE_WEBHOOK_TOKEN",
-            "CAMPFIRE_ROOM_TOKEN",
-
-            # Monitoring
-            "SENTRY_DSN"
-        ]
-
-        missing_vars = [var for var in required_vars if not os.getenv(var)]
-        if missing_vars:
-            raise ValueError(
-                f"Missing required environment variables: {', '.join(missing_vars)}"
-            )
+        errors: List[str] = []
+        for name in dir(cls):
+            if isinstance(inspect.getattr_static(cls, name), Setting):
+                try:
+                    getattr(cls, name)
+                except ValueError as e:
+                    errors.append(str(e))
+        if errors:
+            raise ValueError("Invalid configuration:\n  " + "\n  ".join(errors))
 
     # --- Flask Settings ---
-    FLASK_ENV: str = os.getenv("FLASK_ENV", "production")
-    FLASK_DEBUG: bool = os.getenv("FLASK_DEBUG", "0").lower() in ("1", "true")
-    SECRET_KEY: str = os.environ["SECRET_KEY"]
+    FLASK_ENV = Setting(default="production")
+    FLASK_DEBUG = Setting(parse_bool, default=False)
+    SECRET_KEY = Setting()
 
     # --- Database Configuration ---
-    DB_HOST: str = os.environ["DB_HOST"]
-    DB_NAME: str = os.environ["DB_NAME"]
-    DB_USER: str = os.environ["DB_USER"]
-    DB_PASSWORD: str = quote_plus(os.environ["DB_PASSWORD"])
-    DB_PORT: str = os.getenv("DB_PORT", "5432")
-
-    SQLALCHEMY_DATABASE_URI: str = (
-        f"postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
-    )
+    DB_HOST = Setting()
+    DB_NAME = Setting()
+    DB_USER = Setting()
+    DB_PASSWORD = Setting()
+    DB_PORT = Setting(default="5432")
+
+    SQLALCHEMY_DATABASE_URI = DerivedSetting(database_uri)
     SQLALCHEMY_TRACK_MODIFICATIONS: bool = False
     SQLALCHEMY_ENGINE_OPTIONS = {
         "pool_size": 10,
@@ -76,84 +130,78 @@ class Config:
 
     # --- Third-Party API Integrations ---
     # Gender API
-    GENDER_API_KEY: str = os.environ["GENDER_API_KEY"]
+    GENDER_API_KEY = Setting()
 
     # Square API
-    SQUARE_ACCESS_TOKEN: str = os.environ["SQUARE_ACCESS_TOKEN"]
-    SQUARE_LOCATION_ID: str = os.environ["SQUARE_LOCATION_ID"]
-    SQUARE_NEW_CUSTOMER_SIGNATURE_KEY: str = os.environ["SQUARE_NEW_CUSTOMER_SIGNATURE_KEY"]
-    SQUARE_NEW_CUSTOMER_NOTIFICATION_URL: str = os.environ["SQUARE_NEW_CUSTOMER_NOTIFICATION_URL"]
+    SQUARE_ACCESS_TOKEN = Setting()
+    SQUARE_LOCATION_ID = Setting()
+    SQUARE_NEW_CUSTOMER_SIGNATURE_KEY = Setting()
+    SQUARE_NEW_CUSTOMER_NOTIFICATION_URL = Setting()
+    # Payment webhooks are refused while the key is unset
+    SQUARE_ORDER_SIGNATURE_KEY = Setting(default="")
+    SQUARE_ORDER_NOTIFICATION_URL = Setting(default="")
 
     # ConvertKit API
-    CONVERTKIT_API_KEY: str = os.environ["CONVERTKIT_API_KEY"]
-    CONVERTKIT_CHARLOTTE_FORM_ID: str = os.environ["CONVERTKIT_CHARLOTTE_FORM_ID"]
-    CONVERTKIT_MILLS_FORM_ID: str = os.environ["CONVERTKIT_MILLS_FORM_ID"]
+    CONVERTKIT_API_KEY = Setting()
+    CONVERTKIT_CHARLOTTE_FORM_ID = Setting()
+    CONVERTKIT_MILLS_FORM_ID = Setting()
 
     # Acuity Scheduling API
-    ACUITY_USER_ID: str = os.environ["ACUITY_USER_ID"]
-    ACUITY_API_KEY: str = os.environ["ACUITY_API_KEY"]
+    ACUITY_USER_ID = Setting()
+    ACUITY_API_KEY = Setting()
 
     # --- Logging and Monitoring ---
-    SENTRY_DSN: str = os.environ["SENTRY_DSN"]
+    SENTRY_DSN = Setting()
 
     # --- Email Settings ---
-    SENDLAYER_API_KEY: str = os.environ["SENDLAYER_API_KEY"]
-    DEFAULT_FROM_EMAIL: str = os.environ["DEFAULT_FROM_EMAIL"]
-    DEFAULT_REPLY_TO: str = os.environ["DEFAULT_REPLY_TO"]
+    SENDLAYER_API_KEY = Setting()
+    DEFAULT_FROM_EMAIL = Setting()
+    DEFAULT_REPLY_TO = Setting()
 
     # --- URLs ---
-    CAMPFIRE_STUDIO_URL: str = os.environ["CAMPFIRE_STUDIO_URL"]
-    CAMPFIRE_FINANCE_URL: str = os.environ["CAMPFIRE_FINANCE_URL"]
-    CAMPFIRE_TECH_URL: str = os.environ["CAMPFIRE_TECH_URL"]
-    CAMPFIRE_ALERT_URL: str = os.environ["CAMPFIRE_ALERT_URL"]
-    CAMPFIRE_BOT_URL: str = os.environ["CAMPFIRE_BOT_URL"]
-    BOOKING_URL: str = os.environ["BOOKING_URL"]
-    TRACKING_BASE_URL: str = os.environ["TRACKING_BASE_URL"]
-    NEWSLETTER_SIGNUP_URL: str = os.environ["NEWSLETTER_SIGNUP_URL"]
+    CAMPFIRE_STUDIO_URL = Setting()
+    CAMPFIRE_FINANCE_URL = Setting()
+    CAMPFIRE_TECH_URL = Setting(https=True)
+    CAMPFIRE_ALERT_URL = Setting(https=True)
+    CAMPFIRE_BOT_URL = Setting()
+    BOOKING_URL = Setting(https=True)
+    TRACKING_BASE_URL = Setting(https=True)
+    NEWSLETTER_SIGNUP_URL = Setting()
 
     # --- Campfire Tokens ---
-    CAMPFIRE_WEBHOOK_TOKEN: str = os.environ["CAMPFIRE_WEBHOOK_TOKEN"]
-    CAMPFIRE_ROOM_TOKEN: str = os.environ["CAMPFIRE_ROOM_TOKEN"]
+    CAMPFIRE_WEBHOOK_TOKEN = Setting()
+    CAMPFIRE_ROOM_TOKEN = Setting()
+
+    # --- Background Jobs ---
+    # Queue customer webhooks and return 202; run `flask jobs work` to process them
+    CUSTOMER_WEBHOOK_ASYNC = Setting(parse_bool, default=False)
+    # Same for order webhooks, so bursts of Square payments are absorbed by the queue
+    ORDER_WEBHOOK_ASYNC = Setting(parse_bool, default=False)
+    WEBHOOK_JOB_MAX_ATTEMPTS = Setting(int, default=8)
+    # Emails are written to the email_outbox table; run `flask outbox send` to deliver them
+    EMAIL_OUTBOX_MAX_ATTEMPTS = Setting(int, default=8)
+    SEND_WELCOME_EMAILS = Setting(parse_bool, default=False)
+    # Run `flask reminders run` to queue reminders this many hours before each appointment
+    APPOINTMENT_REMINDER_LEAD_HOURS = Setting(float, default=24.0)
 
     # --- Application-Specific ---
-    ROSEDALE_API_KEY: str = os.environ["ROSEDALE_API_KEY"]
-    LATEPOINT_IP_ADDRESS: str = os.environ["LATEPOINT_IP_ADDRESS"]
-    CAMPFIRE_IP_ADDRESS: str = os.environ["CAMPFIRE_IP_ADDRESS"]
+    ROSEDALE_API_KEY = Setting()
+    LATEPOINT_IP_ADDRESS = Setting()
+    CAMPFIRE_IP_ADDRESS = Setting()
 
 
 class DevelopmentConfig(Config):
     """Development-specific configuration."""
     FLASK_DEBUG = True
 
-    # Add development-specific settings here
-    @classmethod
-    def validate_config(cls) -> None:
-        super().validate_config()
-        # Add development-specific validation if needed
-
 
 class ProductionConfig(Config):
     """Production-specific configuration."""
     FLASK_DEBUG = False
 
-    @classmethod
-    def validate_config(cls) -> None:
-        super().validate_config()
-        # Add additional production-specific validation
-        prod_only_vars = [
-            "SENTRY_DSN",
-            "SQUARE_ACCESS_TOKEN",
-            "CAMPFIRE_WEBHOOK_TOKEN"
-        ]
-        missing_vars = [var for var in prod_only_vars if not os.getenv(var)]
-        if missing_vars:
-            raise ValueError(
-                f"Missing required production variables: {', '.join(missing_vars)}"
-            )
-
 
 # Map environments to configuration classes
 config = {
     "development": DevelopmentConfig,
     "production": ProductionConfig,
-}
\ No newline at end of file
+}
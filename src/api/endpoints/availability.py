@@ -0,0 +1,100 @@
+from datetime import datetime, UTC
+import logging
+import traceback
+from flask import Blueprint, jsonify, request
+from sqlalchemy import func
+from src.core.monitoring import handle_error
+from src.api.middleware.api_key import require_api_key
+from src.api.middleware.rate_limit import rate_limit_blueprint
+from src.models import Location
+from src.services.appointments import BUSINESS_TIMEZONE
+from src.services.availability import availability_engine
+
+logger = logging.getLogger(__name__)
+availability_bp = Blueprint('availability', __name__)
+
+rate_limit_blueprint(availability_bp, [(600, 3600)])
+require_api_key(availability_bp)
+
+
+MAX_SEARCH_DAYS = 31
+MAX_SLOTS = 100
+
+
+def find_location(args):
+    """Look up the location by `location_id` or case-insensitive `location` name"""
+    if args.get("location_id"):
+        return Location.query.get(args.get("location_id", type=int))
+    if args.get("location"):
+        return Location.query.filter(func.lower(Location.name) == args["location"].strip().lower()).first()
+    return None
+
+
+@availability_bp.route('/slots', methods=['GET'])
+def get_free_slots():
+    """
+    Find the earliest free slots at a location.
+
+    Query parameters:
+        location_id or location: Location ID or name
+        duration: Appointment length in minutes
+        from: First day to search, YYYY-MM-DD (defaults to today)
+        days: Number of days to search (default 7)
+        agent_id: Restrict to these agents (repeat or comma-separate)
+        limit: Maximum number of slots (default 10)
+    """
+    try:
+        location = find_location(request.args)
+        if not location:
+            return jsonify({"error": "Unknown or missing location"}), 400
+
+        duration = request.args.get("duration", type=int)
+        if not duration or duration <= 0:
+            return jsonify({"error": "Invalid duration. Must be a positive number of minutes"}), 400
+
+        days = request.args.get("days", default=7, type=int)
+        limit = request.args.get("limit", default=10, type=int)
+        if not 1 <= days <= MAX_SEARCH_DAYS:
+            return jsonify({"error": f"days must be between 1 and {MAX_SEARCH_DAYS}"}), 400
+        if not 1 <= limit <= MAX_SLOTS:
+            return jsonify({"error": f"limit must be between 1 and {MAX_SLOTS}"}), 400
+
+        if request.args.get("from"):
+            try:
+                start_date = datetime.strptime(request.args["from"], "%Y-%m-%d").date()
+            except ValueError:
+                return jsonify({"error": "Invalid from date format. Use YYYY-MM-DD"}), 400
+        else:
+            start_date = datetime.now(UTC).astimezone(BUSINESS_TIMEZONE).date()
+
+        agent_ids = None
+        if request.args.get("agent_id"):
+            try:
+                agent_ids = [
+                    int(agent_id)
+                    for value in request.args.getlist("agent_id")
+                    for agent_id in value.split(",") if agent_id.strip()
+                ]
+            except ValueError:
+                return jsonify({"error": "Invalid agent_id"}), 400
+
+        slots = availability_engine.find_slots(
+            location.id,
+            duration,
+            start_date,
+            days=days,
+            agent_ids=agent_ids,
+            limit=limit
+        )
+        return jsonify({
+            "location": {"id": location.id, "name": location.name},
+            "duration": duration,
+            "from": start_date.isoformat(),
+            "days": days,
+            "slots": slots
+        })
+    except Exception as e:
+        logger.error(f"Error searching free slots: {str(e)}")
+        logger.error(traceback.format_exc())
+        handle_error(e, "Error searching free slots")
+        return jsonify({"error": "Internal Server Error"}), 500
@@ -0,0 +1,89 @@
+from datetime import datetime, UTC
+import logging
+import traceback
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from src.core.monitoring import handle_error
+from src.api.middleware.api_key import require_api_key
+from src.api.middleware.rate_limit import rate_limit_blueprint
+from src.services.exports import (
+    EXPORT_COLUMNS, EXPORT_FORMATS, ExportService, export_columns, gzip_stream,
+)
+
+logger = logging.getLogger(__name__)
+exports_bp = Blueprint('exports', __name__)
+
+rate_limit_blueprint(exports_bp, [(60, 3600)])
+require_api_key(exports_bp)
+
+
+def parse_time(value):
+    """YYYY-MM-DD or an ISO 8601 timestamp; naive values are UTC"""
+    return datetime.fromisoformat(value)
+
+
+def logged(chunks, dataset):
+    """Report a failure part way through; the status line has already gone"""
+    try:
+        yield from chunks
+    except Exception as e:
+        logger.error(f"Error streaming {dataset} export: {str(e)}")
+        logger.error(traceback.format_exc())
+        handle_error(e, f"Error streaming {dataset} export")
+        # Re-raised so the server aborts the response and the client sees
+        # a truncated download rather than a complete-looking file
+        raise
+
+
+@exports_bp.route('/<dataset>', methods=['GET'])
+def export(dataset):
+    """
+    Stream customers, orders or transactions.
+
+    Query parameters:
+        format: 'csv' (default, with a header row) or 'ndjson'
+        since: Only rows created at or after this date/time (ISO 8601)
+        until: Only rows created before this date/time (ISO 8601)
+        after: Only rows after this ID (keyset paging: pass the last ID received)
+        limit: At most this many rows
+
+    Rows are in ID order. Send `Accept-Encoding: gzip` for a gzipped response.
+    """
+    if dataset not in EXPORT_COLUMNS:
+        return jsonify({"error": f"Unknown export. Use one of: {', '.join(EXPORT_COLUMNS)}"}), 404
+
+    export_format = request.args.get("format", "csv").lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({"error": f"Invalid format. Use one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+    try:
+        since = parse_time(request.args["since"]) if request.args.get("since") else None
+        until = parse_time(request.args["until"]) if request.args.get("until") else None
+    except ValueError:
+        return jsonify({"error": "Invalid since/until. Use YYYY-MM-DD or an ISO 8601 timestamp"}), 400
+
+    after = request.args.get("after")
+    if after is not None:
+        try:
+            after = export_columns(dataset)[0].type.python_type(after)
+        except ValueError:
+            return jsonify({"error": "Invalid after"}), 400
+
+    limit = request.args.get("limit", type=int)
+    if limit is not None and limit <= 0:
+        return jsonify({"error": "limit must be a positive number"}), 400
+
+    chunks = logged(
+        ExportService.stream(dataset, export_format, since=since, until=until, after=after, limit=limit),
+        dataset
+    )
+    headers = {
+        "Content-Disposition": f'attachment; filename="{dataset}-{datetime.now(UTC):%Y%m%d}.{export_format}"',
+        "Vary": "Accept-Encoding",
+        "Cache-Control": "no-store",
+    }
+    if "gzip" in request.accept_encodings:
+        chunks = gzip_stream(chunks)
+        headers["Content-Encoding"] = "gzip"
+
+    # stream_with_context keeps the app context (and db.engine) for the generator
+    return Response(stream_with_context(chunks), content_type=EXPORT_FORMATS[export_format], headers=headers)
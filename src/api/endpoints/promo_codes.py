@@ -0,0 +1,79 @@
+import logging
+import traceback
+from flask import Blueprint, jsonify, request
+from src.core.monitoring import handle_error
+from src.api.middleware.api_key import require_api_key
+from src.api.middleware.rate_limit import rate_limit_blueprint
+from src.services.promo_codes import PromoCodeService
+
+logger = logging.getLogger(__name__)
+promo_codes_bp = Blueprint('promo_codes', __name__)
+
+rate_limit_blueprint(promo_codes_bp, [(600, 3600)])
+require_api_key(promo_codes_bp)
+
+
+def promo_code_response(promo_code):
+    redeemed = promo_code.redeemed_at is not None
+    return {
+        "code": promo_code.code,
+        "code_type": promo_code.code_type,
+        "description": promo_code.description,
+        "details": promo_code.details,
+        "single_use": promo_code.single_use,
+        "redeemable": not (promo_code.single_use and redeemed),
+        "redeemed_at": promo_code.redeemed_at.isoformat() if redeemed else None,
+        "redeemed_by": promo_code.redeemed_by,
+        "redemption_count": promo_code.redemption_count,
+        "created_at": promo_code.created_at.isoformat(),
+    }
+
+
+@promo_codes_bp.route('/<code>', methods=['GET'])
+def validate_code(code):
+    """
+    Check a code without redeeming it.
+
+    Codes are matched ignoring case and surrounding spaces. Unknown codes
+    get a 404; a known code reports whether it can still be redeemed.
+    """
+    try:
+        promo_code = PromoCodeService.lookup(code)
+        if promo_code is None:
+            return jsonify({"error": "Unknown code", "valid": False}), 404
+        return jsonify({"valid": True, **promo_code_response(promo_code)})
+    except Exception as e:
+        logger.error(f"Error validating promo code: {str(e)}")
+        logger.error(traceback.format_exc())
+        handle_error(e, "Error validating promo code")
+        return jsonify({"error": "Internal Server Error"}), 500
+
+
+@promo_codes_bp.route('/<code>/redeem', methods=['POST'])
+def redeem_code(code):
+    """
+    Redeem a code.
+
+    JSON body (optional):
+        redeemed_by: Till, booking system or staff member
+
+    Responds 200 when redeemed, 404 for an unknown code and 409 for a
+    single-use code that has already been redeemed.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        redeemed_by = data.get("redeemed_by")
+        if redeemed_by is not None and (not isinstance(redeemed_by, str) or len(redeemed_by) > 100):
+            return jsonify({"error": "redeemed_by must be a string of at most 100 characters"}), 400
+
+        result = PromoCodeService.redeem(code, redeemed_by)
+        if result["status"] == "unknown":
+            return jsonify({"error": "Unknown code"}), 404
+        if result["status"] == "already_redeemed":
+            return jsonify({"error": "Code already redeemed", **promo_code_response(result["promo_code"])}), 409
+        return jsonify(promo_code_response(result["promo_code"]))
+    except Exception as e:
+        logger.error(f"Error redeeming promo code: {str(e)}")
+        logger.error(traceback.format_exc())
+        handle_error(e, "Error redeeming promo code")
+        return jsonify({"error": "Internal Server Error"}), 500
@@ -0,0 +1,42 @@
+from datetime import datetime, UTC
+import logging
+import traceback
+from flask import Blueprint, jsonify, request
+from src.core.monitoring import handle_error
+from src.api.middleware.api_key import require_api_key
+from src.api.middleware.rate_limit import rate_limit_blueprint
+from src.services.appointments import BUSINESS_TIMEZONE
+from src.services.sales_rollups import SalesRollupService
+
+logger = logging.getLogger(__name__)
+reports_bp = Blueprint('reports', __name__)
+
+rate_limit_blueprint(reports_bp, [(600, 3600)])
+require_api_key(reports_bp)
+
+
+@reports_bp.route('/daily', methods=['GET'])
+def get_daily_report():
+    """
+    A day's sales, read from the daily rollups.
+
+    Query parameters:
+        date: Business day, YYYY-MM-DD (defaults to today)
+
+    Amounts are in pence.
+    """
+    try:
+        if request.args.get("date"):
+            try:
+                day = datetime.strptime(request.args["date"], "%Y-%m-%d").date()
+            except ValueError:
+                return jsonify({"error": "Invalid date format. Use YYYY-MM-DD"}), 400
+        else:
+            day = datetime.now(UTC).astimezone(BUSINESS_TIMEZONE).date()
+
+        return jsonify(SalesRollupService.daily_report(day))
+    except Exception as e:
+        logger.error(f"Error building daily report: {str(e)}")
+        logger.error(traceback.format_exc())
+        handle_error(e, "Error building daily report")
+        return jsonify({"error": "Internal Server Error"}), 500
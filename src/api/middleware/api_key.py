@@ -0,0 +1,44 @@
+import hmac
+import logging
+import os
+import sentry_sdk
+from flask import jsonify, request
+from src.core.monitoring import handle_error
+
+logger = logging.getLogger(__name__)
+
+
+def check_api_key():
+    """
+    Check the request's X-API-KEY header against ROSEDALE_API_KEY.
+
+    Fails closed: every request is rejected while ROSEDALE_API_KEY is unset
+    or empty, rather than matching requests that send no key.
+
+    :return: A 401 (or 500) response tuple if the request is refused, otherwise None.
+    """
+    try:
+        expected = os.getenv("ROSEDALE_API_KEY")
+        if not expected:
+            logger.error("ROSEDALE_API_KEY is not set, refusing API request")
+            return jsonify({"error": "Unauthorized"}), 401
+
+        api_key = request.headers.get("X-API-KEY") or ""
+        if not hmac.compare_digest(api_key.encode(), expected.encode()):
+            logger.warning("Unauthorized API access attempt")
+            sentry_sdk.capture_message("Unauthorized API access attempt", level="warning")
+            return jsonify({"error": "Unauthorized"}), 401
+    except Exception as e:
+        logger.error(f"Authorization error: {str(e)}")
+        handle_error(e, "Authorization error")
+        return jsonify({"error": "Authorization error"}), 500
+    return None
+
+
+def require_api_key(blueprint):
+    """
+    Require the API key (see check_api_key) on every request handled by a blueprint.
+
+    :param blueprint: The Flask blueprint to protect.
+    """
+    blueprint.before_request(check_api_key)
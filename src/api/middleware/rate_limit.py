@@ -1,10 +1,30 @@
 from flask import jsonify
 from functools import wraps
-import time
 from src.api.middleware.validation_middleware import get_client_ip
+from src.core.rate_limiter import limiter
+
+
+def check_rate_limit(scope, limit, window):
+    """
+    Count the current request against a limit for the client's IP address.
+
+    :param scope: Name of the limit, so different endpoints don't share a budget.
+    :param limit: Maximum number of requests allowed.
+    :param window: Time window in seconds.
+    :return: A 429 response tuple if the limit is exceeded, otherwise None.
+    """
+    client_ip = get_client_ip()  # Use consistent IP extraction
+    allowed, retry_after = limiter.hit(f"{scope}:{client_ip}", limit, window)
+    if allowed:
+        return None
+
+    response = jsonify({
+        "error": "Rate limit exceeded. Try again later.",
+        "retry_after": f"{retry_after:.1f} seconds"
+    })
+    response.headers["Retry-After"] = str(max(int(retry_after + 0.999), 1))
+    return response, 429
 
-# A dictionary to store IP-based request data
-RATE_LIMIT_DATA = {}
 
 def rate_limit(limit, window):
     """
@@ -14,28 +34,28 @@ def rate_limit(limit, window):
     :param window: Time window in seconds.
     """
     def decorator(f):
+        scope = f"{f.__module__}.{f.__qualname__}"
+
         @wraps(f)
         def wrapped(*args, **kwargs):
-            client_ip = get_client_ip()  # Use consistent IP extraction
-            current_time = time.time()
-
-            # Initialize or clean up expired request logs for this IP
-            if client_ip not in RATE_LIMIT_DATA:
-                RATE_LIMIT_DATA[client_ip] = []
-            RATE_LIMIT_DATA[client_ip] = [
-                t for t in RATE_LIMIT_DATA[client_ip] if t > current_time - window
-            ]
-
-            # Check if the IP has exceeded the limit
-            if len(RATE_LIMIT_DATA[client_ip]) >= limit:
-                retry_after = window - (current_time - RATE_LIMIT_DATA[client_ip][0])
-                return jsonify({
-                    "error": "Rate limit exceeded. Try again later.",
-                    "retry_after": f"{retry_after:.1f} seconds"
-                }), 429
-
-            # Record the current request timestamp
-            RATE_LIMIT_DATA[client_ip].append(current_time)
+            limited = check_rate_limit(scope, limit, window)
+            if limited:
+                return limited
             return f(*args, **kwargs)
         return wrapped
-    return decorator
\ No newline at end of file
+    return decorator
+
+
+def rate_limit_blueprint(blueprint, limits):
+    """
+    Apply rate limits to every request handled by a blueprint.
+
+    :param blueprint: The Flask blueprint to protect.
+    :param limits: List of (limit, window) pairs, e.g. [(200, 86400), (50, 3600)].
+    """
+    @blueprint.before_request
+    def enforce_blueprint_rate_limits():
+        for limit, window in limits:
+            limited = check_rate_limit(f"{blueprint.name}:{limit}/{window}", limit, window)
+            if limited:
+                return limited
@@ -1,7 +1,10 @@
+import logging
 from functools import wraps
 from flask import request, jsonify, current_app
 from src.utils.signature_validation import is_valid_webhook_event_signature
 
+logger = logging.getLogger(__name__)
+
 def validate_square_customer_webhook(func):
     """
     Decorator to validate Square customer webhook requests.
@@ -29,4 +32,37 @@ def validate_square_customer_webhook(func):
         # Proceed to the main function if the signature is valid
         return func(*args, **kwargs)
 
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+def validate_square_order_webhook(func):
+    """
+    Decorator to validate Square payment webhook requests.
+
+    Square signs the notification URL followed by the raw body with
+    SQUARE_ORDER_SIGNATURE_KEY. Fails closed: every request is refused while
+    the key is unset or empty.
+    """
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        signature_key = current_app.config.get("SQUARE_ORDER_SIGNATURE_KEY")
+        if not signature_key:
+            logger.error("SQUARE_ORDER_SIGNATURE_KEY is not set, refusing Square payment webhook")
+            return jsonify({"error": "Invalid signature"}), 403
+
+        notification_url = current_app.config.get("SQUARE_ORDER_NOTIFICATION_URL") or request.url
+        is_valid = is_valid_webhook_event_signature(
+            body=notification_url + request.get_data(as_text=True),
+            square_signature=request.headers.get('x-square-hmacsha256-signature'),
+            signature_key=signature_key,
+        )
+        if not is_valid:
+            return jsonify({"error": "Invalid signature"}), 403
+
+        payload = request.get_json(silent=True) or {}
+        payment = ((payload.get("data") or {}).get("object") or {}).get("payment")
+        if not isinstance(payment, dict):
+            return jsonify({"error": "Missing data.object.payment"}), 400
+
+        return func(*args, **kwargs)
+
+    return wrapper
@@ -1,9 +1,200 @@
-from flask import jsonify
+import ipaddress
 import os
+import signal
+import socket
+import threading
+import time
 import logging
+from dotenv import load_dotenv
 
 logger = logging.getLogger(__name__)
 
+# Environment variables holding comma-separated IPs or CIDR ranges
+ALLOWLIST_ENV_VARS = [
+    'LATEPOINT_IP_ADDRESS',
+    'CAMPFIRE_IP_ADDRESS',
+    'SQUARE_IP_ADDRESS',
+    'WHITELIST_IP_ADDRESS',
+]
+
+# Square's published webhook source addresses
+SQUARE_WEBHOOK_IPS = [
+    '54.245.1.154',
+    '34.202.99.168',
+    '54.212.177.79',
+    '107.20.218.8',
+]
+
+# Optional file with one IP or CIDR per line; edits are picked up without a restart
+IP_ALLOWLIST_FILE = os.getenv('IP_ALLOWLIST_FILE')
+FILE_CHECK_INTERVAL = 5  # seconds
+
+
+_IPV4_MAPPED_PREFIX = b"\x00" * 10 + b"\xff\xff"
+
+
+def _parse_ip(client_ip):
+    """
+    Parse an IP string into (version, bit length, integer value), or None.
+
+    IPv4-mapped IPv6 addresses (::ffff:a.b.c.d) are treated as IPv4.
+    """
+    try:
+        return 4, 32, int.from_bytes(socket.inet_pton(socket.AF_INET, client_ip.strip()), "big")
+    except (OSError, AttributeError):
+        pass
+    try:
+        packed = socket.inet_pton(socket.AF_INET6, client_ip.strip())
+    except (OSError, AttributeError):
+        return None
+    if packed[:12] == _IPV4_MAPPED_PREFIX:
+        return 4, 32, int.from_bytes(packed[12:], "big")
+    return 6, 128, int.from_bytes(packed, "big")
+
+
+class IPAllowlist:
+    """
+    Allowlist of single IPs and CIDR ranges (IPv4 and IPv6).
+
+    Entries are compiled into one binary prefix trie per address family, so a
+    lookup walks at most 32 (IPv4) or 128 (IPv6) bits no matter how many
+    entries there are. Reloading builds a new trie and swaps it in atomically.
+    """
+
+    def __init__(self, entries=()):
+        self._tries = self._compile(entries)
+
+    @staticmethod
+    def _compile(entries):
+        # Node layout: [child for bit 0, child for bit 1, terminal flag]
+        tries = {4: [None, None, False], 6: [None, None, False]}
+        for entry in entries:
+            entry = entry.strip()
+            if not entry:
+                continue
+            try:
+                network = ipaddress.ip_network(entry, strict=False)
+            except ValueError:
+                logger.warning(f"Ignoring invalid allowlist entry: {entry}")
+                continue
+
+            node = tries[network.version]
+            bits = network.max_prefixlen
+            value = int(network.network_address)
+            for i in range(network.prefixlen):
+                bit = (value >> (bits - 1 - i)) & 1
+                if node[bit] is None:
+                    node[bit] = [None, None, False]
+                node = node[bit]
+            node[2] = True
+        return tries
+
+    def load(self, entries):
+        """Replace the allowlist contents."""
+        self._tries = self._compile(entries)
+
+    def is_allowed(self, client_ip):
+        """
+        Check whether an IP address falls within any allowlisted entry.
+
+        Args:
+            client_ip (str): The IP address to check.
+
+        Returns:
+            bool: True if the IP is allowed, False otherwise.
+        """
+        parsed = _parse_ip(client_ip)
+        if parsed is None:
+            return False
+        version, bits, value = parsed
+
+        node = self._tries[version]
+        for i in range(bits):
+            if node[2]:
+                return True
+            node = node[(value >> (bits - 1 - i)) & 1]
+            if node is None:
+                return False
+        return node[2]
+
+
+def load_allowlist_entries():
+    """
+    Collect allowlist entries from Square's defaults, the environment and
+    IP_ALLOWLIST_FILE (blank lines and '#' comments are ignored).
+
+    Returns:
+        list: IP and CIDR strings.
+    """
+    entries = list(SQUARE_WEBHOOK_IPS)
+    for var in ALLOWLIST_ENV_VARS:
+        entries += os.getenv(var, '').split(',')
+
+    if IP_ALLOWLIST_FILE:
+        try:
+            with open(IP_ALLOWLIST_FILE, 'r') as f:
+                entries += [line.split('#')[0].strip() for line in f]
+        except OSError as e:
+            logger.error(f"Could not read IP allowlist file {IP_ALLOWLIST_FILE}: {e}")
+
+    return entries
+
+
+# Compiled once at import, before gunicorn forks
+ip_allowlist = IPAllowlist(load_allowlist_entries())
+
+
+def _file_mtime():
+    try:
+        return os.stat(IP_ALLOWLIST_FILE).st_mtime
+    except (OSError, TypeError):
+        return None
+
+
+_reload_lock = threading.Lock()
+_file_state = {"checked_at": time.monotonic(), "mtime": _file_mtime()}
+
+
+def reload_allowlist(reload_env=False):
+    """
+    Rebuild the allowlist from its sources.
+
+    Args:
+        reload_env (bool): Re-read .env first, so edited values take effect.
+    """
+    with _reload_lock:
+        if reload_env and os.path.exists(".env"):
+            load_dotenv(override=True)
+        ip_allowlist.load(load_allowlist_entries())
+    logger.info("IP allowlist reloaded")
+
+
+def _reload_if_file_changed():
+    now = time.monotonic()
+    if now - _file_state["checked_at"] < FILE_CHECK_INTERVAL:
+        return
+    _file_state["checked_at"] = now
+
+    mtime = _file_mtime()
+    if mtime != _file_state["mtime"]:
+        _file_state["mtime"] = mtime
+        reload_allowlist()
+
+
+def install_reload_signal_handler():
+    """
+    Reload the allowlist (including .env) on SIGHUP.
+
+    Only effective in processes that keep their own signal handlers, such as
+    `flask run` or CLI workers; gunicorn workers should rely on
+    IP_ALLOWLIST_FILE, which is re-read whenever it changes.
+    """
+    try:
+        signal.signal(signal.SIGHUP, lambda signum, frame: reload_allowlist(reload_env=True))
+    except (ValueError, AttributeError):
+        # Not on the main thread, or no SIGHUP on this platform
+        logger.debug("SIGHUP allowlist reload not available in this process")
+
 
 def check_allowed_ip(client_ip):
     """
@@ -15,19 +206,12 @@ def check_allowed_ip(client_ip):
     Returns:
         bool: True if the IP is allowed, False otherwise.
     """
+    if IP_ALLOWLIST_FILE:
+        _reload_if_file_changed()
 
-    # Fetch IPs from all environment variables
-    allowed_ips = set(
-        os.getenv('LATEPOINT_IP_ADDRESS', '').split(',') +
-        os.getenv('CAMPFIRE_IP_ADDRESS', '').split(',') +
-        os.getenv('SQUARE_IP_ADDRESS', '').split(',') +
-        os.getenv('WHITELIST_IP_ADDRESS', '').split(',')
-    )
-
-    # Check if IP is allowed
-    if client_ip in allowed_ips:
-        return True, None
+    if ip_allowlist.is_allowed(client_ip):
+        return True
 
-    # Log unauthorized attempt and return error response
+    # Log unauthorized attempt
     logger.warning(f"Unauthorized access attempt from IP: {client_ip}")
-    return False, (jsonify({"error": "Unauthorized IP"}), 403)
\ No newline at end of file
+    return False
@@ -1,30 +1,20 @@
 from flask import Blueprint, request, jsonify
-from src.api.validators.ip_validator import check_allowed_ip
+from src.api.middleware.validation_middleware import validate_request_ip
 from src.core.monitoring import handle_error
-from src.core.integrations.campfire import send_room_message
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+from src.core.integrations.campfire import campfire_client
+from src.api.middleware.rate_limit import rate_limit
 import logging
 import traceback
-from src.services.chatbot import handle_command
+from src.services.chatbot import chatbot_dispatcher
 from flask import current_app
 
 logger = logging.getLogger(__name__)
 campfire_webhook = Blueprint('campfire_webhook', __name__)
 
-limiter = Limiter(
-    key_func=get_remote_address,
-    default_limits=["20 per minute"],
-    storage_uri="memory://"
-)
-
 @campfire_webhook.route('/<token>', methods=['POST'], strict_slashes=False)
-@limiter.limit("20 per minute")
+@validate_request_ip
+@rate_limit(limit=20, window=60)
 def chatbot(token):
-    is_allowed, response = check_allowed_ip(request)
-    if not is_allowed:
-        return response
-
     data = request.json
     room_id = data.get("room", {}).get("id")
     try:
@@ -42,27 +32,11 @@ def chatbot(token):
         if not content:
             return '', 204
 
-        result = handle_command(content)
-        if "error" in result:
-            send_room_message(room_id, f"❌ {result['error']}")
-        else:
-            if "message" in result:
-                send_room_message(room_id, result["message"])
-            elif "codes" in result:  # Bulk codes
-                codes_list = "\n".join(result["codes"])
-                message = f"""✅ Generated codes:
-{codes_list}
-
-Description: {result.get('description', 'Premium Gift Card')}"""
-                send_room_message(room_id, message)
-            elif "code" in result:  # Single code
-                code = result.get("code", "")
-                description = result.get("description", "")
-                message = f"""✅ Generated code:
-{code}
-
-Description: {description}"""
-                send_room_message(room_id, message)
+        # The command and the reply run on the chatbot's own threads, so
+        # Campfire gets its answer now however long the command takes
+        if not chatbot_dispatcher.submit(room_id, content):
+            logger.warning(f"Chatbot busy, turning away message for room {room_id}")
+            return jsonify({"error": "Busy, try again shortly"}), 503
 
         return '', 204
 
@@ -70,5 +44,5 @@ Description: {description}"""
         logger.error(f"Webhook error: {str(e)}")
         logger.error(traceback.format_exc())
         handle_error(e, "Campfire webhook error")
-        send_room_message(room_id, "Oops! Something went wrong. Please try again later.")
+        campfire_client.send_room(room_id, "Oops! Something went wrong. Please try again later.")
         return '', 500
\ No newline at end of file
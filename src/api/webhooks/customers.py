@@ -1,7 +1,8 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from src.services.customers import CustomerService
 from src.services.notification_service import NotificationService
+from src.services.webhook_jobs import WebhookJobService
 from src.core.monitoring import capture_errors
 from src.core.logger import log_webhook_request
 from src.utils.gender_api import get_gender
@@ -20,6 +21,86 @@ from src.utils.customer_data_processor import CustomerDataProcessor
 customers_bp = Blueprint("customers", __name__)
 
 
+def build_latepoint_customer_data(data):
+    """
+    Build customer data from a LatePoint form payload.
+
+    Args:
+        data (dict): The flattened LatePoint form payload.
+
+    Returns:
+        dict: Customer information ready for process_customer_request.
+    """
+    custom_fields = CustomerDataProcessor.parse_custom_fields(data)
+
+    customer_data = CustomerDataProcessor.extract_core_customer_data(data, source="latepoint")
+    customer_data["massage_preferences"] = CustomerDataProcessor.build_massage_preferences(custom_fields)
+    customer_data["gender"] = get_gender(data.get("first_name", ""))
+    return customer_data
+
+
+def build_square_customer_data(data):
+    """
+    Build customer data from the customer object of a Square event.
+
+    Args:
+        data (dict): The `data.object.customer` part of the Square payload.
+
+    Returns:
+        dict: Customer information ready for process_customer_request.
+    """
+    customer_data = CustomerDataProcessor.extract_core_customer_data(data, source="square")
+    customer_data["gender"] = get_gender(data.get("given_name", ""))
+    return customer_data
+
+
+CUSTOMER_DATA_BUILDERS = {
+    "latepoint": build_latepoint_customer_data,
+    "square": build_square_customer_data,
+}
+
+
+def process_customer_payload(data, platform):
+    """
+    Build customer data from a raw payload and create or update the customer.
+
+    Used by the background worker for payloads queued in async mode.
+
+    Args:
+        data (dict): Raw webhook payload for the platform.
+        platform (str): Platform name ('latepoint' or 'square').
+
+    Returns:
+        tuple: Response body (dict) and status code.
+    """
+    customer_data = CUSTOMER_DATA_BUILDERS[platform](data)
+    return apply_customer_request(customer_data, platform)
+
+
+def enqueue_customer_payload(data, platform):
+    """
+    Queue a validated payload for background processing.
+
+    Args:
+        data (dict): Raw webhook payload for the platform.
+        platform (str): Platform name ('latepoint' or 'square').
+
+    Returns:
+        tuple: JSON response and 202 status code.
+    """
+    job = WebhookJobService.enqueue(f"customer.{platform}", data)
+    return (
+        jsonify(
+            {
+                "message": "Customer webhook accepted",
+                "action": "queued",
+                "job_id": job.id,
+            }
+        ),
+        202,
+    )
+
+
 # Utility for handling customer creation and updates
 def process_customer_request(customer_data, platform):
     """
@@ -32,52 +113,57 @@ def process_customer_request(customer_data, platform):
     Returns:
         tuple: JSON response and status code.
     """
+    body, status_code = apply_customer_request(customer_data, platform)
+    return jsonify(body), status_code
+
+
+def apply_customer_request(customer_data, platform):
+    """
+    Create or update a customer without building an HTTP response.
+
+    Args:
+        customer_data (dict): Customer information.
+        platform (str): Platform name (e.g., 'LatePoint', 'Square').
+
+    Returns:
+        tuple: Response body (dict) and status code.
+    """
     try:
-        # Check if the customer already exists
-        existing_customer = CustomerService.get_customer_by_email(customer_data["email"])
-        fields_to_update = ["first_name", "last_name", "email", "phone_number", "payment_system_id"]
-        if existing_customer:
-            if platform == "latepoint":
-                fields_to_update = ["booking_system_id", "first_name", "last_name", "gender", "massage_preferences"]
-            elif platform == "square":
-                fields_to_update = ["payment_system_id", "phone_number", "address"]
-            updated_customer = CustomerService.update_customer(existing_customer.id, customer_data, fields_to_update)
+        customer_id, created = CustomerService.upsert_from_webhook(
+            customer_data,
+            platform,
+            send_welcome_email=current_app.config.get("SEND_WELCOME_EMAILS", False)
+        )
+        if not created:
             return (
-                jsonify(
-                    {
-                        "message": "Customer updated successfully",
-                        "action": "updated",
-                        "id": updated_customer.id,
-                    }
-                ),
+                {
+                    "message": "Customer updated successfully",
+                    "action": "updated",
+                    "id": customer_id,
+                },
                 200,
             )
 
-        # Create a new customer
-        new_customer = CustomerService.create_customer(customer_data)
-
         # Notify about the new customer
         message = (
-            f"🎉 New {platform} Customer: {new_customer.first_name} "
-            f"{new_customer.last_name} ({new_customer.email}) just signed up!"
+            f"🎉 New {platform} Customer: {customer_data['first_name']} "
+            f"{customer_data['last_name']} ({customer_data['email']}) just signed up!"
         )
         NotificationService.notify_campfire(message, "studio")
 
         return (
-            jsonify(
-                {
-                    "message": "Customer created successfully",
-                    "action": "created",
-                    "id": new_customer.id,
-                }
-            ),
+            {
+                "message": "Customer created successfully",
+                "action": "created",
+                "id": customer_id,
+            },
             200,
         )
 
     except IntegrityError:
-        return jsonify({"error": "Customer already exists"}), 409
+        return {"error": "Customer already exists"}, 409
     except SQLAlchemyError as db_error:
-        return jsonify({"error": f"Database error: {str(db_error)}"}), 500
+        return {"error": f"Database error: {str(db_error)}"}, 500
 
 
 @customers_bp.route("/latepoint/new", methods=["POST"])
@@ -88,11 +174,12 @@ def process_customer_request(customer_data, platform):
 @validate_latepoint_customer_webhook
 def handle_latepoint_customer_webhook():
     data = request.form.to_dict()
-    custom_fields = CustomerDataProcessor.parse_custom_fields(data.get("custom_fields"))
 
-    customer_data = CustomerDataProcessor.extract_core_customer_data(data, source="latepoint")
-    customer_data["massage_preferences"] = CustomerDataProcessor.build_massage_preferences(custom_fields)
-    customer_data["gender"] = get_gender(data.get("first_name", ""))
+    # Async mode: persist the validated payload and let a worker do the rest
+    if current_app.config.get("CUSTOMER_WEBHOOK_ASYNC"):
+        return enqueue_customer_payload(data, platform="latepoint")
+
+    customer_data = build_latepoint_customer_data(data)
 
     return process_customer_request(customer_data, platform="latepoint")
 
@@ -110,9 +197,12 @@ def handle_square_customer_webhook():
     # Parse the payload
     data = request.get_json()["data"]["object"]["customer"]
 
+    # Async mode: persist the validated payload and let a worker do the rest
+    if current_app.config.get("CUSTOMER_WEBHOOK_ASYNC"):
+        return enqueue_customer_payload(data, platform="square")
+
     # Build customer data
-    customer_data = CustomerDataProcessor.extract_core_customer_data(data, source="square")
-    customer_data["gender"] = get_gender(data.get("given_name", ""))
+    customer_data = build_square_customer_data(data)
 
     # Process the customer request
     return process_customer_request(customer_data, platform="square")
\ No newline at end of file
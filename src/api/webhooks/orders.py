@@ -0,0 +1,105 @@
+from flask import Blueprint, request, jsonify, current_app
+from sqlalchemy.exc import IntegrityError, SQLAlchemyError
+from src.services.orders import process_order_webhook
+from src.services.webhook_jobs import WebhookJobService
+from src.core.monitoring import capture_errors
+from src.core.logger import log_webhook_request
+from src.api.middleware.validation_middleware import validate_request_ip
+from src.api.middleware.rate_limit import rate_limit
+from src.api.middleware.webhook_validation.square.square_validation_decorators import (
+    validate_square_order_webhook,
+)
+
+
+# Define the blueprint
+orders_bp = Blueprint("orders", __name__)
+
+
+def apply_order_request(data, platform):
+    """
+    Create or update an order without building an HTTP response.
+
+    Args:
+        data (dict): Order payload for the platform.
+        platform (str): Platform name ('latepoint' or 'square').
+
+    Returns:
+        tuple: Response body (dict) and status code.
+    """
+    try:
+        order_id, created = process_order_webhook(data, platform)
+    except ValueError as e:
+        return {"error": str(e)}, 400
+    except IntegrityError:
+        return {"error": "Order conflicts with an existing order or customer"}, 409
+    except SQLAlchemyError as db_error:
+        return {"error": f"Database error: {str(db_error)}"}, 500
+
+    if order_id is None:
+        return {"message": "Payment skipped: no customer", "action": "skipped"}, 200
+
+    return (
+        {
+            "message": f"Order {'created' if created else 'updated'} successfully",
+            "action": "created" if created else "updated",
+            "id": order_id,
+        },
+        200,
+    )
+
+
+def process_order_request(data, platform):
+    """
+    Handle an order webhook, queueing it in async mode.
+
+    Args:
+        data (dict): Order payload for the platform.
+        platform (str): Platform name ('latepoint' or 'square').
+
+    Returns:
+        tuple: JSON response and status code.
+    """
+    # Async mode: persist the payload and let a worker do the rest
+    if current_app.config.get("ORDER_WEBHOOK_ASYNC"):
+        job = WebhookJobService.enqueue(f"order.{platform}", data)
+        return (
+            jsonify(
+                {
+                    "message": "Order webhook accepted",
+                    "action": "queued",
+                    "job_id": job.id,
+                }
+            ),
+            202,
+        )
+
+    body, status_code = apply_order_request(data, platform)
+    return jsonify(body), status_code
+
+
+@orders_bp.route("/latepoint", methods=["POST"])
+@capture_errors(extra_info="LatePoint Order Webhook Error")
+@validate_request_ip
+@rate_limit(limit=60, window=60)
+@log_webhook_request
+def handle_latepoint_order_webhook():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON order payload"}), 400
+
+    return process_order_request(data, platform="latepoint")
+
+
+@orders_bp.route("/square", methods=["POST"])
+@capture_errors(extra_info="Square Order Webhook Error")
+@validate_request_ip
+@rate_limit(limit=300, window=60)
+@log_webhook_request
+@validate_square_order_webhook
+def handle_square_order_webhook():
+    """
+    Handles payment.created and payment.updated events from Square.
+    """
+    data = request.get_json()["data"]["object"]["payment"]
+
+    return process_order_request(data, platform="square")
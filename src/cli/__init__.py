@@ -0,0 +1,34 @@
+from importlib import import_module
+import click
+
+
+class LazyGroup(click.Group):
+    """
+    A `flask` command group whose module is only imported when one of its
+    commands runs (or its help is shown).
+
+    Command modules pull in their services and SDKs (e.g. Square's), which
+    neither the web app nor the other commands need at start-up.
+
+    Args:
+        name: Group name, e.g. "square"
+        import_name: "module:attribute" of the real group
+        help: Short help for `flask --help`, which doesn't load the group
+    """
+
+    def __init__(self, name: str, import_name: str, help: str):
+        super().__init__(name, help=help)
+        self.import_name = import_name
+        self._group = None
+
+    def _load(self) -> click.Group:
+        if self._group is None:
+            module_name, attribute = self.import_name.split(":")
+            self._group = getattr(import_module(module_name), attribute)
+        return self._group
+
+    def list_commands(self, ctx):
+        return self._load().list_commands(ctx)
+
+    def get_command(self, ctx, cmd_name):
+        return self._load().get_command(ctx, cmd_name)
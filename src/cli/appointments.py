@@ -0,0 +1,83 @@
+import logging
+import signal
+import threading
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from src.extensions import db
+from src.services.appointments import AppointmentReminderService
+from src.utils.advisory_lock import AdvisoryLock
+
+logger = logging.getLogger(__name__)
+reminders_cli = AppGroup("reminders", help="Appointment reminder scheduler.")
+
+# Held by whichever scheduler process is currently queuing reminders
+REMINDER_LOCK_NAME = "rosedale.appointment_reminders"
+
+
+def scheduler_loop(app, stop_event, lead_hours, interval, chunk_size):
+    """
+    Queue due reminders every `interval` seconds until `stop_event` is set.
+
+    Any number of schedulers can run (several dynos, hosts or gunicorn
+    workers); a Postgres advisory lock makes exactly one of them the leader,
+    and the others take over within `interval` seconds if it goes away.
+    """
+    with app.app_context():
+        lock = AdvisoryLock(db.engine, REMINDER_LOCK_NAME)
+        try:
+            while not stop_event.is_set():
+                try:
+                    is_leader = lock.acquire()
+                except Exception as e:
+                    logger.error(f"Failed to acquire reminder scheduler lock: {str(e)}")
+                    is_leader = False
+
+                if is_leader:
+                    try:
+                        AppointmentReminderService.queue_due_reminders(lead_hours, chunk_size)
+                    except Exception as e:
+                        logger.error(f"Failed to queue appointment reminders: {str(e)}")
+                    db.session.remove()
+
+                stop_event.wait(interval)
+        finally:
+            lock.release()
+
+
+@reminders_cli.command("run")
+@click.option("--lead-hours", type=float, default=None, help="Hours before the appointment to send the reminder.")
+@click.option("--interval", type=float, default=60.0, show_default=True, help="Seconds between scans.")
+@click.option("--chunk-size", default=500, show_default=True, help="Appointments queued per transaction.")
+def run(lead_hours, interval, chunk_size):
+    """Run the reminder scheduler (one leader across all processes)."""
+    app = current_app._get_current_object()
+    lead_hours = lead_hours or app.config.get("APPOINTMENT_REMINDER_LEAD_HOURS", 24)
+    stop_event = threading.Event()
+
+    def shutdown(signum, frame):
+        logger.info("Shutdown requested, stopping reminder scheduler...")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    logger.info(f"Starting reminder scheduler ({lead_hours}h lead, every {interval}s)")
+    scheduler_loop(app, stop_event, lead_hours, interval, chunk_size)
+
+
+@reminders_cli.command("send-due")
+@click.option("--lead-hours", type=float, default=None, help="Hours before the appointment to send the reminder.")
+@click.option("--chunk-size", default=500, show_default=True, help="Appointments queued per transaction.")
+def send_due(lead_hours, chunk_size):
+    """Queue due reminders once, e.g. from cron."""
+    lead_hours = lead_hours or current_app.config.get("APPOINTMENT_REMINDER_LEAD_HOURS", 24)
+    lock = AdvisoryLock(db.engine, REMINDER_LOCK_NAME)
+    if not lock.acquire():
+        click.echo("Another reminder scheduler is running, skipping")
+        return
+    try:
+        count = AppointmentReminderService.queue_due_reminders(lead_hours, chunk_size)
+    finally:
+        lock.release()
+    click.echo(f"Queued {count} appointment reminder(s)")
@@ -0,0 +1,71 @@
+import time
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select, or_
+from src.extensions import db
+from src.models import Customer
+from src.services.customers import CustomerService
+from src.utils.gender_api import get_genders, get_cache_stats, normalize_name
+
+customers_cli = AppGroup("customers", help="Customer maintenance commands.")
+
+
+@customers_cli.command("backfill-gender")
+@click.option("--chunk-size", default=1000, show_default=True, help="Customers read and updated per batch.")
+@click.option("--concurrency", default=4, show_default=True, help="Concurrent gender-api.com requests.")
+@click.option("--after-id", default=0, show_default=True, help="Resume after this customer ID.")
+@click.option("--pause", default=0.0, show_default=True, help="Seconds to sleep between batches.")
+@click.option("--dry-run", is_flag=True, help="Resolve genders but don't write them.")
+def backfill_gender(chunk_size, concurrency, after_id, pause, dry_run):
+    """
+    Fill in gender for customers where it is missing or 'unknown'.
+
+    Customers are streamed in ID order with a server-side cursor; each batch
+    prints the last ID processed, which can be passed to --after-id to resume.
+    """
+    stmt = (
+        select(Customer.id, Customer.first_name, Customer.gender)
+        .where(
+            or_(Customer.gender.is_(None), Customer.gender == "unknown"),
+            Customer.id > after_id
+        )
+        .order_by(Customer.id)
+    )
+
+    started = time.monotonic()
+    scanned = updated = 0
+    last_id = after_id
+
+    # Read on a dedicated connection so batch commits don't close the cursor
+    with db.engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=chunk_size).execute(stmt)
+
+        for rows in result.partitions():
+            genders = get_genders([row.first_name for row in rows], concurrency=concurrency)
+
+            changes = []
+            for row in rows:
+                gender = genders.get(normalize_name(row.first_name), "unknown")
+                if gender != row.gender:
+                    changes.append((row.id, gender))
+
+            if changes and not dry_run:
+                updated += CustomerService.bulk_update_genders(changes)
+
+            scanned += len(rows)
+            last_id = rows[-1].id
+            elapsed = time.monotonic() - started
+            click.echo(
+                f"Scanned {scanned} customers, updated {updated} "
+                f"(last id {last_id}, {scanned / elapsed:.0f} rows/s)"
+            )
+
+            if pause:
+                time.sleep(pause)
+
+    elapsed = time.monotonic() - started
+    click.echo(
+        f"Done: scanned {scanned}, updated {updated}{' (dry run)' if dry_run else ''} "
+        f"in {elapsed:.1f}s; last id {last_id}"
+    )
+    click.echo(f"Gender lookups: {get_cache_stats()}")
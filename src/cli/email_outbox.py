@@ -0,0 +1,86 @@
+import json
+import logging
+import signal
+import threading
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from src.extensions import db
+from src.services.email_outbox import EmailOutboxService
+from src.services.email_service import get_email_service
+
+logger = logging.getLogger(__name__)
+outbox_cli = AppGroup("outbox", help="Transactional email outbox.")
+
+
+def send_loop(app, stop_event, batch_size, concurrency, poll_interval, drain):
+    """Claim and send outbox emails until `stop_event` is set (or the outbox is empty when draining)."""
+    with app.app_context():
+        email_service = get_email_service()
+        while not stop_event.is_set():
+            try:
+                emails = EmailOutboxService.claim_batch(batch_size)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Failed to claim outbox emails: {str(e)}")
+                emails = []
+
+            if emails:
+                started = time.perf_counter()
+                results = email_service.send_bulk(
+                    [EmailOutboxService.to_message(email) for email in emails],
+                    concurrency=concurrency
+                )
+                try:
+                    counts = EmailOutboxService.record_results(emails, results)
+                except Exception as e:
+                    # The claims expire after the lease and are retried
+                    db.session.rollback()
+                    logger.error(f"Failed to record outbox results: {str(e)}")
+                else:
+                    elapsed = time.perf_counter() - started
+                    logger.info(
+                        f"Outbox batch: {counts['sent']} sent, {counts['retried']} retried, "
+                        f"{counts['dead']} dead in {elapsed:.2f}s ({len(emails) / elapsed:.1f} emails/s)"
+                    )
+            elif drain:
+                break
+            else:
+                stop_event.wait(poll_interval)
+
+            db.session.remove()
+
+
+@outbox_cli.command("send")
+@click.option("--batch-size", default=50, show_default=True, help="Emails claimed per round trip.")
+@click.option("--concurrency", default=8, show_default=True, help="Parallel SendLayer requests.")
+@click.option("--poll-interval", default=1.0, show_default=True, help="Seconds to sleep when the outbox is empty.")
+@click.option("--drain", is_flag=True, help="Exit once the outbox is empty.")
+def send(batch_size, concurrency, poll_interval, drain):
+    """Send queued outbox emails."""
+    app = current_app._get_current_object()
+    stop_event = threading.Event()
+
+    def shutdown(signum, frame):
+        logger.info("Shutdown requested, finishing the current batch...")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    logger.info(f"Starting outbox sender (batch size {batch_size}, concurrency {concurrency})")
+    send_loop(app, stop_event, batch_size, concurrency, poll_interval, drain)
+
+
+@outbox_cli.command("requeue-dead")
+def requeue_dead():
+    """Move dead-lettered emails back into the outbox."""
+    count = EmailOutboxService.requeue_dead()
+    click.echo(f"Requeued {count} dead-lettered email(s)")
+
+
+@outbox_cli.command("stats")
+def stats():
+    """Print outbox depth, lag and throughput."""
+    click.echo(json.dumps(EmailOutboxService.get_metrics(), indent=2))
@@ -0,0 +1,147 @@
+import logging
+import signal
+import threading
+import traceback
+from functools import partial
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from src.extensions import db
+from src.services.webhook_jobs import WebhookJobService
+
+logger = logging.getLogger(__name__)
+jobs_cli = AppGroup("jobs", help="Background webhook job queue.")
+
+
+def run_customer_job(payload, platform):
+    """
+    Process a queued customer webhook payload.
+
+    Raises:
+        ValueError: If the payload was rejected (4xx), so it isn't retried.
+        RuntimeError: If the customer could not be created or updated (5xx).
+    """
+    from src.api.webhooks.customers import process_customer_payload
+
+    body, status_code = process_customer_payload(payload, platform)
+    error = body.get("error", f"HTTP {status_code}")
+    if 400 <= status_code < 500:
+        raise ValueError(error)
+    if status_code >= 300:
+        raise RuntimeError(error)
+    return body
+
+
+def run_order_job(payload, platform):
+    """
+    Process a queued order webhook payload.
+
+    Raises:
+        ValueError: If the payload can't be mapped to an order.
+    """
+    from src.services.orders import process_order_webhook
+
+    order_id, created = process_order_webhook(payload, platform)
+    if order_id is None:
+        return {"id": None, "action": "skipped"}
+    return {"id": order_id, "action": "created" if created else "updated"}
+
+
+JOB_HANDLERS = {
+    "customer.latepoint": partial(run_customer_job, platform="latepoint"),
+    "customer.square": partial(run_customer_job, platform="square"),
+    "order.latepoint": partial(run_order_job, platform="latepoint"),
+    "order.square": partial(run_order_job, platform="square"),
+}
+
+
+def run_job(job):
+    """
+    Run a claimed job and record its outcome.
+
+    Invalid or rejected payloads (ValueError) are dead-lettered immediately;
+    any other failure is retried with backoff until the job runs out of
+    attempts.
+    """
+    job_id, kind, payload = job.id, job.kind, job.payload
+
+    handler = JOB_HANDLERS.get(kind)
+    if handler is None:
+        WebhookJobService.fail(job_id, f"No handler registered for job kind: {kind}", permanent=True)
+        return
+
+    try:
+        result = handler(payload)
+    except ValueError as e:
+        db.session.rollback()
+        WebhookJobService.fail(job_id, f"Invalid payload: {str(e)}", permanent=True)
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Webhook job {job_id} ({kind}) failed: {str(e)}")
+        logger.debug(traceback.format_exc())
+        WebhookJobService.fail(job_id, str(e))
+    else:
+        WebhookJobService.complete(job_id, result)
+        logger.info(f"Webhook job {job_id} ({kind}) completed")
+
+
+def work_loop(app, stop_event, batch_size, poll_interval, drain):
+    """Claim and run jobs until `stop_event` is set (or the queue is empty when draining)."""
+    with app.app_context():
+        while not stop_event.is_set():
+            try:
+                jobs = WebhookJobService.claim_batch(batch_size)
+            except Exception as e:
+                db.session.rollback()
+                logger.error(f"Failed to claim webhook jobs: {str(e)}")
+                jobs = []
+
+            for job in jobs:
+                run_job(job)
+
+            if not jobs:
+                if drain:
+                    break
+                stop_event.wait(poll_interval)
+
+            db.session.remove()
+
+
+@jobs_cli.command("work")
+@click.option("--threads", default=1, show_default=True, help="Worker threads in this process.")
+@click.option("--batch-size", default=10, show_default=True, help="Jobs claimed per round trip.")
+@click.option("--poll-interval", default=1.0, show_default=True, help="Seconds to sleep when the queue is empty.")
+@click.option("--drain", is_flag=True, help="Exit once the queue is empty.")
+def work(threads, batch_size, poll_interval, drain):
+    """Process queued webhook jobs."""
+    app = current_app._get_current_object()
+    stop_event = threading.Event()
+
+    def shutdown(signum, frame):
+        logger.info("Shutdown requested, finishing in-flight jobs...")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+
+    logger.info(f"Starting {threads} webhook job worker thread(s)")
+    workers = [
+        threading.Thread(
+            target=work_loop,
+            args=(app, stop_event, batch_size, poll_interval, drain),
+            name=f"webhook-job-worker-{i}",
+        )
+        for i in range(threads)
+    ]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+@jobs_cli.command("requeue-dead")
+@click.option("--kind", default=None, help="Only requeue jobs of this kind.")
+def requeue_dead(kind):
+    """Move dead-lettered jobs back onto the queue."""
+    count = WebhookJobService.requeue_dead(kind)
+    click.echo(f"Requeued {count} dead-lettered job(s)")
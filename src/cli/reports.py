@@ -0,0 +1,37 @@
+import json
+from datetime import datetime, timedelta
+import click
+from flask.cli import AppGroup
+from src.services.appointments import BUSINESS_TIMEZONE
+from src.services.sales_rollups import SalesRollupService, REBUILD_CHUNK_DAYS
+
+reports_cli = AppGroup("reports", help="Daily sales rollups and reports.")
+
+
+@reports_cli.command("rebuild")
+@click.option("--days", default=3, show_default=True, help="Rebuild this many business days, ending today.")
+@click.option("--since", type=click.DateTime(formats=["%Y-%m-%d"]), help="First day to rebuild (overrides --days).")
+@click.option("--until", type=click.DateTime(formats=["%Y-%m-%d"]), help="Last day to rebuild. Defaults to today.")
+@click.option("--chunk-days", default=REBUILD_CHUNK_DAYS, show_default=True, help="Days rebuilt per transaction.")
+def rebuild(days, since, until, chunk_days):
+    """
+    Rebuild the daily sales rollups from orders and transactions.
+
+    The rollups are refreshed as orders are written; run this nightly (e.g.
+    from cron) as a correction pass, or with --since to rebuild history.
+    """
+    last = until.date() if until else datetime.now(BUSINESS_TIMEZONE).date()
+    first = since.date() if since else last - timedelta(days=days - 1)
+    if first > last:
+        raise click.BadParameter("--since must not be after --until")
+
+    result = SalesRollupService.rebuild(first, last, chunk_days=chunk_days)
+    click.echo(json.dumps(result, indent=2))
+
+
+@reports_cli.command("daily")
+@click.option("--date", "day", type=click.DateTime(formats=["%Y-%m-%d"]), help="Business day. Defaults to today.")
+def daily(day):
+    """Print a day's sales report from the rollups (amounts in pence)."""
+    day = day.date() if day else datetime.now(BUSINESS_TIMEZONE).date()
+    click.echo(json.dumps(SalesRollupService.daily_report(day), indent=2))
@@ -0,0 +1,124 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+import click
+
+# Run in a fresh interpreter, as this process has already imported the app
+PROFILE_SCRIPT = """
+import json, time
+start = time.perf_counter()
+from app import create_app
+imported = time.perf_counter()
+app = create_app()
+print(json.dumps({
+    "import_ms": (imported - start) * 1000,
+    "create_app": app.extensions["startup_timeline"].as_dict(),
+}))
+"""
+
+# e.g. "import time:       412 |       1838 |     sqlalchemy.orm.query"
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( +)(\S+)")
+
+
+def parse_import_times(stderr):
+    """
+    Parse `python -X importtime` output.
+
+    Returns:
+        list: One dict per module with its own and cumulative import time
+            in ms and the module that first imported it
+    """
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORT_TIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            entries.append((int(self_us), int(cumulative_us), (len(indent) - 1) // 2, module))
+
+    # Modules are listed after the modules they import, so walk backwards to
+    # find each one's importer
+    imports = []
+    importers = []
+    for self_us, cumulative_us, depth, module in reversed(entries):
+        del importers[depth:]
+        imports.append({
+            "module": module,
+            "self_ms": self_us / 1000,
+            "cumulative_ms": cumulative_us / 1000,
+            "imported_by": importers[-1] if importers else None,
+        })
+        importers.append(module)
+    return imports
+
+
+def package_totals(imports):
+    """Own import time summed per top-level package, slowest first."""
+    totals = defaultdict(float)
+    for entry in imports:
+        totals[entry["module"].split(".")[0]] += entry["self_ms"]
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+@click.command("startup-profile")
+@click.option("--top", default=15, show_default=True, help="Imports and packages to list.")
+@click.option("--cli", "as_cli", is_flag=True, help="Profile a `flask` command start-up rather than a web worker's.")
+@click.option("--json", "as_json", is_flag=True, help="Print the full profile as JSON.")
+def startup_profile(top, as_cli, as_json):
+    """
+    Time a cold start of the app, phase by phase and import by import.
+
+    Reports importing the app, each create_app phase, and the cost of every
+    module imported on the way (as `python -X importtime` does).
+
+    Runs create_app in a fresh interpreter with this environment. Timings
+    include importtime's own overhead, so compare profiles with each other
+    rather than with production boot logs.
+    """
+    env = dict(os.environ)
+    if not as_cli:
+        # Flask sets this for `flask` commands; gunicorn workers don't have it
+        env.pop("FLASK_RUN_FROM_CLI", None)
+
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROFILE_SCRIPT],
+        capture_output=True, text=True, env=env
+    )
+    if result.returncode != 0:
+        click.echo(result.stderr, err=True)
+        raise click.ClickException("App start-up failed")
+
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    imports = parse_import_times(result.stderr)
+    slowest = sorted(imports, key=lambda entry: entry["cumulative_ms"], reverse=True)[:top]
+    packages = package_totals(imports)
+
+    if as_json:
+        click.echo(json.dumps({
+            **timings,
+            "total_ms": round(timings["import_ms"] + timings["create_app"]["total_ms"], 1),
+            "module_count": len(imports),
+            "packages": [{"package": name, "ms": round(ms, 1)} for name, ms in packages],
+            "imports": imports,
+        }, indent=2))
+        return
+
+    create_app_ms = timings["create_app"]["total_ms"]
+    click.echo(f"Start-up: {timings['import_ms'] + create_app_ms:.1f}ms, {len(imports)} modules imported")
+    click.echo(f"  {'import app':<24}{timings['import_ms']:>9.1f}ms")
+    click.echo(f"  {'create_app':<24}{create_app_ms:>9.1f}ms")
+    for phase in timings["create_app"]["phases"]:
+        click.echo(f"    {phase['name']:<22}{phase['ms']:>9.1f}ms")
+
+    click.echo("\nSlowest imports (cumulative ms, self ms, module <- imported by):")
+    for entry in slowest:
+        click.echo(
+            f"  {entry['cumulative_ms']:>9.1f} {entry['self_ms']:>8.1f}  "
+            f"{entry['module']} <- {entry['imported_by'] or '(top level)'}"
+        )
+
+    click.echo("\nImport time by package (self ms):")
+    for name, ms in packages[:top]:
+        click.echo(f"  {ms:>9.1f}  {name}")
@@ -0,0 +1,212 @@
+import atexit
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+# Frames of the reporting machinery, skipped when locating an unraised error
+REPORTING_MODULES = ("error_reporter.py", "monitoring.py")
+
+
+def reporting_site():
+    """
+    (code, line number) of the innermost caller outside the reporting
+    modules, or None. Cheap enough for the reporting thread: it follows
+    frame links and keeps no frame (or its locals) alive.
+    """
+    frame = sys._getframe(1)
+    while frame is not None:
+        code = frame.f_code
+        if os.path.basename(code.co_filename) not in REPORTING_MODULES:
+            return code, frame.f_lineno
+        frame = frame.f_back
+    return None
+
+
+def fingerprint_error(error, fingerprint=None, site=None):
+    """
+    Identify an error by its type and the innermost frame that raised it.
+
+    Errors built only to be reported (never raised) have no traceback, so
+    they are located by `site`, the reporting_site() captured when they
+    were reported. An explicit `fingerprint` replaces the location-based
+    one, for callers whose reports shouldn't be grouped by where they're made.
+
+    Returns:
+        tuple: (fingerprint, location) where location is 'file:line in func'.
+    """
+    location = "unknown location"
+    tb = error.__traceback__
+    if tb is not None:
+        while tb.tb_next is not None:
+            tb = tb.tb_next
+        code, line = tb.tb_frame.f_code, tb.tb_lineno
+    elif site is not None:
+        code, line = site
+    else:
+        code = None
+    if code is not None:
+        location = f"{os.path.basename(code.co_filename)}:{line} in {code.co_name}"
+    if fingerprint is None:
+        fingerprint = f"{type(error).__module__}.{type(error).__qualname__}@{location}"
+    return fingerprint, location
+
+
+class ErrorDispatcher:
+    """
+    Background error alert dispatcher.
+
+    The request thread only enqueues onto a bounded queue. A daemon thread
+    then groups errors by fingerprint: the first occurrence is alerted right
+    away, later ones within `window` seconds are counted and reported as a
+    single "N more occurrences" summary when the window closes. Each channel
+    is capped at `max_per_minute` alerts; anything over the cap is dropped and
+    mentioned in the next alert that gets through.
+    """
+
+    def __init__(self, send, format_message, should_alert, window=60, max_per_minute=10, queue_size=1000):
+        self.send = send
+        self.format_message = format_message
+        self.should_alert = should_alert
+        self.window = window
+        self.max_per_minute = max_per_minute
+        self.stats = {"queued": 0, "dropped": 0, "sent": 0, "coalesced": 0, "rate_capped": 0}
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._groups = {}
+        self._buckets = {}
+        self._capped = {}
+        self._pid = None
+        self._start_lock = threading.Lock()
+
+    def submit(self, error, extra_info=None, channel="alert", fingerprint=None):
+        """
+        Queue an error for reporting without blocking.
+
+        `fingerprint`, if given, groups the error instead of its type and
+        location (see fingerprint_error).
+
+        Returns:
+            bool: False if the queue was full and the error was dropped.
+        """
+        self._ensure_started()
+        # Only an unraised error needs its reporter's stack, and only this
+        # thread has it; the location is worked out on the dispatcher thread
+        site = None if error.__traceback__ is not None else reporting_site()
+        try:
+            self._queue.put_nowait((error, extra_info, channel, time.monotonic(), fingerprint, site))
+        except queue.Full:
+            self.stats["dropped"] += 1
+            return False
+        self.stats["queued"] += 1
+        return True
+
+    def _ensure_started(self):
+        # Threads don't survive a fork, so each gunicorn worker starts its own
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name="error-dispatcher", daemon=True).start()
+            atexit.register(self.flush, timeout=2)
+
+    def _run(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=1)
+            except queue.Empty:
+                item = None
+
+            try:
+                if item is not None:
+                    self._process(*item)
+                self._flush_windows(time.monotonic())
+            except Exception as e:
+                logger.error(f"Error dispatcher failure: {str(e)}")
+            finally:
+                if item is not None:
+                    self._queue.task_done()
+
+    def _process(self, error, extra_info, channel, occurred_at, fingerprint, site):
+        message = self.format_message(error, extra_info)
+        logger.error(message)
+
+        if not self.should_alert(error):
+            return
+
+        fingerprint, location = fingerprint_error(error, fingerprint, site)
+        group = self._groups.get(fingerprint)
+        if group is not None and occurred_at - group["window_start"] < self.window:
+            group["count"] += 1
+            self.stats["coalesced"] += 1
+            return
+
+        self._groups[fingerprint] = {
+            "window_start": occurred_at,
+            "count": 0,
+            "channel": channel,
+            "label": f"{type(error).__name__} at {location}",
+        }
+        self._deliver(channel, message)
+
+    def _flush_windows(self, now):
+        for fingerprint, group in list(self._groups.items()):
+            if now - group["window_start"] < self.window:
+                continue
+            if group["count"]:
+                self._deliver(
+                    group["channel"],
+                    f"🔁 {group['count']} more occurrence(s) of {group['label']} "
+                    f"in the last {self.window} seconds"
+                )
+                # Keep coalescing while the error keeps firing
+                group["window_start"] = now
+                group["count"] = 0
+            else:
+                del self._groups[fingerprint]
+
+    def _take_token(self, channel, now):
+        tokens, updated_at = self._buckets.get(channel, (self.max_per_minute, now))
+        tokens = min(self.max_per_minute, tokens + (now - updated_at) * self.max_per_minute / 60)
+        if tokens < 1:
+            self._buckets[channel] = (tokens, now)
+            return False
+        self._buckets[channel] = (tokens - 1, now)
+        return True
+
+    def _deliver(self, channel, message):
+        if not self._take_token(channel, time.monotonic()):
+            self._capped[channel] = self._capped.get(channel, 0) + 1
+            self.stats["rate_capped"] += 1
+            return
+
+        capped = self._capped.pop(channel, 0)
+        if capped:
+            message += f"\n\n({capped} alert(s) suppressed by the rate cap)"
+
+        try:
+            self.send(channel, message)
+            self.stats["sent"] += 1
+        except Exception as e:
+            logger.error(f"Failed to send error to Campfire: {str(e)}")
+
+    def flush(self, timeout=None):
+        """
+        Wait until queued errors have been processed.
+
+        Returns:
+            bool: True if the queue drained within `timeout` seconds.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
@@ -1,6 +1,11 @@
 import os
+import re
+import threading
 import requests
 import logging
+from urllib.parse import urlsplit
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
@@ -13,6 +18,33 @@ CAMPFIRE_URLS = {
     "bot": os.getenv("CAMPFIRE_BOT_URL"),
 }
 
+CAMPFIRE_BASE_URL = os.getenv("CAMPFIRE_BASE_URL", "https://chat.rosedalemassage.co.uk")
+
+# (connect, read) timeouts in seconds
+CAMPFIRE_TIMEOUT = (
+    float(os.getenv("CAMPFIRE_CONNECT_TIMEOUT", "3.05")),
+    float(os.getenv("CAMPFIRE_READ_TIMEOUT", "10")),
+)
+CAMPFIRE_RETRIES = int(os.getenv("CAMPFIRE_RETRIES", "3"))
+
+# Seconds to collect messages for the same room into one post (0 disables)
+CAMPFIRE_BATCH_WINDOW = float(os.getenv("CAMPFIRE_BATCH_WINDOW", "0"))
+
+# Longer messages are split into several posts (see split_message and pack_sections)
+CAMPFIRE_MESSAGE_LIMIT = int(os.getenv("CAMPFIRE_MESSAGE_LIMIT", "2000"))
+
+# Positions just after a newline or <br>, where a long message may be split
+LINE_BREAK = re.compile(r"(?<=\n)|(?<=<br>)")
+
+class PostRetry(Retry):
+    """
+    Retries for posting a message, which isn't idempotent: a 502 or 504 may
+    come back after Campfire has posted it. Only a 429, or a 503 that says
+    when to come back (Retry-After), is known not to have been posted.
+    """
+    RETRY_AFTER_STATUS_CODES = frozenset({429, 503})
+
+
 def get_campfire_url(room_id: str) -> str:
     """
     Generate the URL for sending messages to a specific Campfire room.
@@ -20,32 +52,148 @@ def get_campfire_url(room_id: str) -> str:
     :param room_id: The ID of the Campfire room.
     :return: The full Campfire URL for the room.
     """
-    base_url = "https://chat.rosedalemassage.co.uk/rooms"
     room_token = os.getenv("CAMPFIRE_ROOM_TOKEN")
-    return f"{base_url}/{room_id}/{room_token}/messages"
+    return f"{CAMPFIRE_BASE_URL}/rooms/{room_id}/{room_token}/messages"
+
 
-def send_message(channel: str, message: str):
+def split_message(message: str, limit: int = CAMPFIRE_MESSAGE_LIMIT) -> list:
     """
-    Send a message to a specific Campfire channel.
+    Split a message into posts of at most `limit` characters.
 
-    :param channel: The Campfire channel (e.g., "studio").
-    :param message: The message to send.
-    :return: Tuple of HTTP status code and response text.
+    Splits fall between lines (newlines or <br>), so codes and report lines
+    stay whole; only a single line longer than `limit` is cut.
+
+    :param message: The message to split.
+    :param limit: Maximum characters per post.
+    :return: List of message parts, in order.
     """
-    try:
-        logger.debug(f"Preparing to send message to channel: {channel}")
-        url = CAMPFIRE_URLS.get(channel)
+    if len(message) <= limit:
+        return [message]
 
-        if not url:
-            raise ValueError(f"Unknown channel: {channel}. Available channels: {list(CAMPFIRE_URLS.keys())}")
+    parts, current = [], ""
+    for line in LINE_BREAK.split(message):
+        if len(current) + len(line) > limit:
+            parts.append(current)
+            current = ""
+        while len(line) > limit:
+            parts.append(line[:limit])
+            line = line[limit:]
+        current += line
+    parts.append(current)
+
+    trimmed = []
+    for part in parts:
+        part = part.strip()
+        while part.endswith("<br>"):
+            part = part[:-len("<br>")].rstrip()
+        if part:
+            trimmed.append(part)
+    return trimmed
 
-        headers = {
-            "Content-Type": "text/html",
-        }
-        encoded_message = message.encode("utf-8")
 
-        logger.info(f"Sending message to {channel} ({url}): {message}")
-        response = requests.post(url, data=encoded_message, headers=headers)
+
+def pack_sections(sections: list, limit: int = CAMPFIRE_MESSAGE_LIMIT, separator: str = "\n<br>\n") -> list:
+    """
+    Join self-contained sections of a message into as few posts as possible.
+
+    Sections (e.g. one <div> each) are never split between posts, so their
+    markup stays balanced; only a section longer than `limit` on its own is
+    split, with split_message.
+
+    :param sections: The sections, in order.
+    :param limit: Maximum characters per post.
+    :param separator: Put between sections in the same post.
+    :return: List of posts, in order.
+    """
+    posts, current = [], ""
+    for section in sections:
+        section = section.strip()
+        if current and len(current) + len(separator) + len(section) <= limit:
+            current += separator + section
+            continue
+        if current:
+            posts.append(current)
+        current = section
+        if len(section) > limit:
+            posts.extend(split_message(section, limit))
+            current = ""
+    if current:
+        posts.append(current)
+    return posts
+
+class CampfireClient:
+    """
+    Campfire HTTP client with one pooled keep-alive session per host.
+
+    Connection failures, 429s and 503s with Retry-After are retried with
+    exponential backoff (honouring Retry-After). Posts made with batch=True
+    are held for `batch_window` seconds and merged with any other messages
+    for the same room into a single post.
+    """
+
+    def __init__(self, timeout=CAMPFIRE_TIMEOUT, retries=CAMPFIRE_RETRIES, backoff_factor=0.5,
+                 batch_window=CAMPFIRE_BATCH_WINDOW, pool_size=10):
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.batch_window = batch_window
+        self.pool_size = pool_size
+
+        self._sessions = {}
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self._batches = {}
+
+    def _session(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            # Pooled sockets must not be shared with forked workers
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._sessions = {}
+                self._batches = {}
+
+            session = self._sessions.get(host)
+            if session is None:
+                retry = PostRetry(
+                    total=self.retries,
+                    connect=self.retries,
+                    # A read timeout may mean the message was posted; don't repeat it
+                    read=0,
+                    status=self.retries,
+                    # 503 is retried only with Retry-After (see PostRetry)
+                    status_forcelist=(429,),
+                    allowed_methods=frozenset({"POST"}),
+                    backoff_factor=self.backoff_factor,
+                    respect_retry_after_header=True,
+                    raise_on_status=False,
+                )
+                adapter = HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=self.pool_size,
+                    max_retries=retry,
+                )
+                session = requests.Session()
+                session.headers.update({"Content-Type": "text/html"})
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._sessions[host] = session
+            return session
+
+    def post(self, url: str, message: str, batch: bool = False):
+        """
+        Post a message to a Campfire messages URL.
+
+        :param url: Room or bot messages URL.
+        :param message: The message to send.
+        :param batch: Merge with other messages for this URL within the batch window.
+        :return: Tuple of HTTP status code and response text, or None if batched.
+        """
+        if batch and self.batch_window > 0:
+            self._add_to_batch(url, message)
+            return None
+
+        response = self._session(url).post(url, data=message.encode("utf-8"), timeout=self.timeout)
 
         logger.debug(f"Response Status Code: {response.status_code}")
         logger.debug(f"Response Text: {response.text or '<empty>'}")
@@ -54,6 +202,84 @@ def send_message(channel: str, message: str):
             return response.status_code, response.text or "Message sent successfully"
 
         raise Exception(f"Campfire error: HTTP {response.status_code}, Body: {response.text or '<no response body>'}")
+
+    def _add_to_batch(self, url, message):
+        with self._lock:
+            pending = self._batches.get(url)
+            if pending is not None:
+                pending.append(message)
+                return
+            self._batches[url] = [message]
+
+        timer = threading.Timer(self.batch_window, self.flush, args=(url,))
+        timer.daemon = True
+        timer.start()
+
+    def flush(self, url=None):
+        """
+        Send pending batched messages now.
+
+        :param url: Only flush this URL's batch; all batches if omitted.
+        """
+        with self._lock:
+            urls = [url] if url else list(self._batches)
+            batches = [(u, self._batches.pop(u)) for u in urls if u in self._batches]
+
+        for batch_url, messages in batches:
+            try:
+                self.post(batch_url, "\n\n".join(messages))
+                logger.info(f"Sent {len(messages)} batched Campfire message(s)")
+            except Exception as e:
+                logger.error(f"Error sending batched Campfire messages: {str(e)}")
+
+    def send(self, channel: str, message: str, batch: bool = False):
+        """
+        Send a message to a named Campfire channel.
+
+        :param channel: The Campfire channel (e.g., "studio").
+        :param message: The message to send.
+        :param batch: Allow merging with other messages to this channel.
+        :return: Tuple of HTTP status code and response text, or None if batched.
+        """
+        url = CAMPFIRE_URLS.get(channel)
+        if not url:
+            raise ValueError(f"Unknown channel: {channel}. Available channels: {list(CAMPFIRE_URLS.keys())}")
+
+        logger.info(f"Sending message to {channel}: {message}")
+        return self.post(url, message, batch=batch)
+
+    def send_room(self, room_id: str, message: str, user_name: str = None, batch: bool = False):
+        """
+        Send a message to a Campfire room by ID.
+
+        :param room_id: The ID of the Campfire room.
+        :param message: The message to send.
+        :param user_name: Optional username to mention in the message.
+        :param batch: Allow merging with other messages to this room.
+        :return: Tuple of HTTP status code and response text, or None if batched.
+        """
+        if user_name:
+            message = f"@{user_name} {message}"
+
+        logger.info(f"Sending message to room {room_id}: {message}")
+        return self.post(get_campfire_url(room_id), message, batch=batch)
+
+
+# Shared by notifications, error alerts and the chatbot
+campfire_client = CampfireClient()
+
+
+def send_message(channel: str, message: str, batch: bool = False):
+    """
+    Send a message to a specific Campfire channel.
+
+    :param channel: The Campfire channel (e.g., "studio").
+    :param message: The message to send.
+    :param batch: Allow merging with other messages to this channel.
+    :return: Tuple of HTTP status code and response text, or None if batched.
+    """
+    try:
+        return campfire_client.send(channel, message, batch=batch)
     except requests.exceptions.RequestException as e:
         logger.error(f"Error sending message to Campfire: {str(e)}")
         raise
@@ -71,26 +297,7 @@ def send_room_message(room_id: str, message: str, user_name: str = None):
     :return: Tuple of HTTP status code and response text.
     """
     try:
-        url = get_campfire_url(room_id)
-
-        if user_name:
-            message = f"@{user_name} {message}"
-
-        headers = {
-            "Content-Type": "text/html",
-        }
-        encoded_message = message.encode("utf-8")
-
-        logger.info(f"Sending message to room {room_id}: {message}")
-        response = requests.post(url, data=encoded_message, headers=headers)
-
-        logger.debug(f"Response Status Code: {response.status_code}")
-        logger.debug(f"Response Text: {response.text or '<empty>'}")
-
-        if 200 <= response.status_code < 300:
-            return response.status_code, response.text or "Message sent successfully"
-
-        raise Exception(f"Campfire error: HTTP {response.status_code}, Body: {response.text or '<no response body>'}")
+        return campfire_client.send_room(room_id, message, user_name=user_name)
     except Exception as e:
         logger.error(f"Error sending room message: {str(e)}")
-        raise
\ No newline at end of file
+        raise
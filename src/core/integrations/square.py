@@ -0,0 +1,181 @@
+import os
+import logging
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from square.client import Client
+
+logger = logging.getLogger(__name__)
+
+SQUARE_BASE_URL = os.getenv("SQUARE_BASE_URL", "https://connect.squareup.com")
+SQUARE_TIMEOUT = float(os.getenv("SQUARE_TIMEOUT", "30"))
+SQUARE_RETRIES = int(os.getenv("SQUARE_RETRIES", "3"))
+
+# Largest pages the search and list endpoints return
+MAX_CUSTOMER_PAGE_SIZE = 100
+MAX_ORDER_PAGE_SIZE = 500
+MAX_PAYMENT_PAGE_SIZE = 100
+
+
+class SquareAPIError(Exception):
+    """Raised when a Square API call returns errors."""
+    pass
+
+
+def get_square_client() -> "Client":
+    """
+    Create a Square API client.
+
+    Reads are retried on 429 and 5xx responses with exponential backoff;
+    search endpoints are POSTs but don't change anything, so POST is retried
+    too. The SDK is imported on first use, as it takes ~100ms to load.
+    """
+    from square.client import Client
+
+    return Client(
+        access_token=os.getenv("SQUARE_ACCESS_TOKEN"),
+        environment="custom",
+        custom_url=SQUARE_BASE_URL,
+        timeout=SQUARE_TIMEOUT,
+        max_retries=SQUARE_RETRIES,
+        retry_methods=["GET", "POST"],
+    )
+
+
+def check_response(result, action: str) -> Dict[str, Any]:
+    """Return the response body, raising SquareAPIError on errors"""
+    if result.is_error():
+        raise SquareAPIError(f"Square {action} failed: {result.errors}")
+    return result.body or {}
+
+
+def retrieve_order(client: "Client", order_id: str) -> Dict[str, Any]:
+    """Fetch one Square order object by ID"""
+    return check_response(client.orders.retrieve_order(order_id), f"order {order_id} lookup")["order"]
+
+
+def iter_customer_pages(
+    client: "Client",
+    updated_since: Optional[datetime] = None,
+    page_size: int = MAX_CUSTOMER_PAGE_SIZE
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Page through the Square customer directory with cursors.
+
+    Args:
+        client: Square client
+        updated_since: Only customers updated at or after this time
+        page_size: Customers per page (at most 100)
+
+    Yields:
+        Lists of Square customer objects
+    """
+    body = {
+        "limit": min(page_size, MAX_CUSTOMER_PAGE_SIZE),
+        "query": {"sort": {"field": "DEFAULT", "order": "ASC"}},
+    }
+    if updated_since:
+        body["query"]["filter"] = {"updated_at": {"start_at": updated_since.isoformat()}}
+
+    while True:
+        page = check_response(client.customers.search_customers(body=body), "customer search")
+        yield page.get("customers", [])
+
+        cursor = page.get("cursor")
+        if not cursor:
+            return
+        body["cursor"] = cursor
+
+
+def format_square_time(value: datetime) -> str:
+    """RFC 3339 timestamp as Square expects it"""
+    return value.isoformat().replace("+00:00", "Z")
+
+
+def parse_square_time(value: Optional[str]) -> Optional[datetime]:
+    """Parse an RFC 3339 timestamp from Square"""
+    return datetime.fromisoformat(value.replace("Z", "+00:00")) if value else None
+
+
+def iter_order_pages(
+    client: "Client",
+    location_ids: List[str],
+    start_at: datetime,
+    end_at: datetime,
+    page_size: int = MAX_ORDER_PAGE_SIZE
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Page through the orders created in [start_at, end_at) with cursors.
+
+    Args:
+        client: Square client
+        location_ids: Locations to search (Square allows up to 10)
+        start_at: Start of the created_at range
+        end_at: End of the created_at range (exclusive)
+        page_size: Orders per page (at most 500)
+
+    Yields:
+        Lists of Square order objects
+    """
+    body = {
+        "location_ids": location_ids,
+        "limit": min(page_size, MAX_ORDER_PAGE_SIZE),
+        "query": {
+            "filter": {
+                "date_time_filter": {
+                    "created_at": {"start_at": format_square_time(start_at), "end_at": format_square_time(end_at)}
+                }
+            },
+            "sort": {"sort_field": "CREATED_AT", "sort_order": "ASC"},
+        },
+    }
+
+    while True:
+        page = check_response(client.orders.search_orders(body=body), "order search")
+        yield page.get("orders", [])
+
+        cursor = page.get("cursor")
+        if not cursor:
+            return
+        body["cursor"] = cursor
+
+
+def iter_payment_pages(
+    client: "Client",
+    start_at: datetime,
+    end_at: datetime,
+    location_id: Optional[str] = None,
+    page_size: int = MAX_PAYMENT_PAGE_SIZE
+) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Page through the payments taken in [start_at, end_at) with cursors.
+
+    Args:
+        client: Square client
+        start_at: Start of the created_at range
+        end_at: End of the created_at range (exclusive)
+        location_id: Only payments taken at this location
+        page_size: Payments per page (at most 100)
+
+    Yields:
+        Lists of Square payment objects
+    """
+    cursor = None
+    while True:
+        page = check_response(
+            client.payments.list_payments(
+                begin_time=format_square_time(start_at),
+                end_time=format_square_time(end_at),
+                sort_order="ASC",
+                cursor=cursor,
+                location_id=location_id,
+                limit=min(page_size, MAX_PAYMENT_PAGE_SIZE),
+            ),
+            "payment list"
+        )
+        yield page.get("payments", [])
+
+        cursor = page.get("cursor")
+        if not cursor:
+            return
@@ -5,10 +5,14 @@ import sentry_sdk
 from sentry_sdk.integrations.flask import FlaskIntegration
 from functools import wraps
 from flask import request
-from src.core.integrations.campfire import send_message
+from src.core.error_reporter import ErrorDispatcher
+from src.core.integrations.campfire import campfire_client
 
 logger = logging.getLogger(__name__)
 
+# Errors of these types are also alerted to Campfire
+CRITICAL_ERRORS = (ValueError, KeyError, RuntimeError)
+
 
 def initialize_sentry():
     """Initialize Sentry for error monitoring."""
@@ -32,8 +36,9 @@ def format_error_message(error, extra_info=None):
     message += f"Error Type: {type(error).__name__}\n"
     message += f"Error Message: {str(error)}\n\n"
 
-    # Add stack trace (truncate if too long)
-    stack_trace = traceback.format_exc()
+    # Add stack trace (truncate if too long). Formatted from the exception
+    # itself, as this runs on the dispatcher thread outside the except block.
+    stack_trace = "".join(traceback.format_exception(error))
     if len(stack_trace) > 500:  # Truncate long traces
         stack_trace = stack_trace[:500] + "...(truncated)"
     message += f"Stack Trace:\n{stack_trace}"
@@ -41,28 +46,49 @@ def format_error_message(error, extra_info=None):
     return message
 
 
-def handle_error(error, extra_info=None):
+def send_alert(channel, message):
+    """Post an alert through the shared Campfire client, batched per room."""
+    return campfire_client.send(channel, message, batch=True)
+
+
+def is_critical(error):
+    """Whether an error should be alerted to Campfire."""
+    return isinstance(error, CRITICAL_ERRORS)
+
+
+# Formatting, local logging and Campfire delivery happen on a background
+# thread, with duplicates coalesced and alerts capped per channel
+error_dispatcher = ErrorDispatcher(
+    send=send_alert,
+    format_message=format_error_message,
+    should_alert=is_critical,
+    window=int(os.getenv("ERROR_ALERT_WINDOW", "60")),
+    max_per_minute=int(os.getenv("ERROR_ALERT_MAX_PER_MINUTE", "10")),
+    queue_size=int(os.getenv("ERROR_ALERT_QUEUE_SIZE", "1000")),
+)
+
+
+def get_error_reporting_stats():
+    """Counters for the error dispatcher (queued, dropped, sent, coalesced, rate_capped)."""
+    return dict(error_dispatcher.stats)
+
+
+def handle_error(error, extra_info=None, fingerprint=None):
     """
     Send error to both Sentry and Campfire.
     Only critical errors are sent to Campfire.
+
+    The caller only pays for Sentry's capture (which has its own background
+    transport) and an enqueue; repeated errors from the same place are
+    reported to Campfire once per window with an occurrence count. Pass a
+    `fingerprint` to group reports by something else, e.g. one per record.
     """
     try:
-        # Format the error message
-        message = format_error_message(error, extra_info)
-
-        # Log locally
-        logger.error(message)
-
         # Send to Sentry
         sentry_sdk.capture_exception(error)
 
-        # Notify Campfire only for critical errors
-        if isinstance(error, (ValueError, KeyError, RuntimeError)):
-            try:
-                status, response = send_message("alert", message)
-                logger.info(f"Error notification sent to Campfire. Status: {status}")
-            except Exception as e:
-                logger.error(f"Failed to send error to Campfire: {str(e)}")
+        if not error_dispatcher.submit(error, extra_info, fingerprint=fingerprint):
+            logger.warning(f"Error report queue full, dropped {type(error).__name__}: {str(error)}")
     except Exception as e:
         logger.error(f"Failed to handle error notification: {str(e)}")
 
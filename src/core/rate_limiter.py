@@ -0,0 +1,212 @@
+import hashlib
+import logging
+import mmap
+import multiprocessing
+import os
+import random
+import struct
+import threading
+import time
+from collections import OrderedDict
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql import func
+from src.extensions import db
+from src.models import RateLimitBucket
+
+logger = logging.getLogger(__name__)
+
+# 'memory' (per process), 'shared' (all gunicorn workers on this host, needs
+# --preload) or 'database' (all nodes, via the rate_limits table)
+RATE_LIMIT_STORAGE = os.getenv("RATE_LIMIT_STORAGE", "shared")
+
+
+def gcra(tat, now, interval, window):
+    """
+    Generic Cell Rate Algorithm step.
+
+    A client is allowed `window / interval` requests per `window`, with the
+    whole allowance usable as a burst. Only one number per client is kept:
+    its theoretical arrival time (TAT).
+
+    Args:
+        tat: Stored TAT for the client, or None if unseen
+        now: Current time in seconds
+        interval: Seconds per request (window / limit)
+        window: Window length in seconds
+
+    Returns:
+        tuple: (new_tat, retry_after). new_tat is None if the request is denied.
+    """
+    new_tat = max(tat or now, now) + interval
+    overshoot = new_tat - now - window
+    if overshoot > 0:
+        return None, overshoot
+    return new_tat, 0.0
+
+
+class MemoryStorage:
+    """
+    Per-process storage. Keys are kept in LRU order and the least recently
+    used ones are evicted once `max_keys` is reached.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._tats = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key, now, interval, window):
+        with self._lock:
+            new_tat, retry_after = gcra(self._tats.get(key), now, interval, window)
+            if new_tat is not None:
+                self._tats[key] = new_tat
+                self._tats.move_to_end(key)
+                while len(self._tats) > self.max_keys:
+                    self._tats.popitem(last=False)
+            return new_tat is not None, retry_after
+
+
+class SharedMemoryStorage:
+    """
+    Host-wide storage shared by forked workers.
+
+    A fixed-size open-addressing table of (key hash, TAT) slots lives in an
+    anonymous shared mmap, so it must be created before gunicorn forks
+    (i.e. with --preload). When every slot in a key's probe window is in use,
+    the slot with the oldest TAT (the most idle client) is reused.
+    """
+
+    SLOT = struct.Struct("=Qd")
+
+    def __init__(self, slots=16384, probe=8, lock_timeout=0.05):
+        self.slots = slots
+        self.probe = probe
+        self.lock_timeout = lock_timeout
+        self._buffer = mmap.mmap(-1, slots * self.SLOT.size)
+        self._lock = multiprocessing.Lock()
+
+    @staticmethod
+    def _hash(key):
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest()
+        # 0 marks an empty slot
+        return int.from_bytes(digest, "little") or 1
+
+    def hit(self, key, now, interval, window):
+        key_hash = self._hash(key)
+        start = key_hash % self.slots
+
+        # Fail open rather than stall requests if a worker died holding the lock
+        if not self._lock.acquire(timeout=self.lock_timeout):
+            logger.warning("Rate limiter lock timeout, allowing request")
+            return True, 0.0
+
+        try:
+            slot, tat = None, None
+            victim, victim_tat = None, float("inf")
+            for i in range(self.probe):
+                index = (start + i) % self.slots
+                stored_hash, stored_tat = self.SLOT.unpack_from(self._buffer, index * self.SLOT.size)
+                if stored_hash == key_hash:
+                    slot, tat = index, stored_tat
+                    break
+                # Empty slots have TAT 0, so they are always preferred
+                if stored_tat < victim_tat:
+                    victim, victim_tat = index, stored_tat
+
+            if slot is None:
+                slot = victim
+
+            new_tat, retry_after = gcra(tat, now, interval, window)
+            if new_tat is not None:
+                self.SLOT.pack_into(self._buffer, slot * self.SLOT.size, key_hash, new_tat)
+            return new_tat is not None, retry_after
+        finally:
+            self._lock.release()
+
+
+class DatabaseStorage:
+    """
+    Cluster-wide storage in the rate_limits table. Each check is a single
+    atomic INSERT ... ON CONFLICT DO UPDATE ... WHERE statement.
+    """
+
+    def __init__(self, cleanup_probability=0.001):
+        self.cleanup_probability = cleanup_probability
+
+    def hit(self, key, now, interval, window):
+        stmt = insert(RateLimitBucket).values(key=key, tat=now + interval)
+        next_tat = func.greatest(RateLimitBucket.tat, now) + interval
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RateLimitBucket.key],
+            set_={"tat": next_tat},
+            where=(next_tat - now <= window)
+        ).returning(RateLimitBucket.tat)
+
+        try:
+            with db.engine.begin() as conn:
+                if conn.execute(stmt).first() is not None:
+                    self._maybe_cleanup(conn, now)
+                    return True, 0.0
+
+                tat = conn.execute(
+                    select(RateLimitBucket.tat).where(RateLimitBucket.key == key)
+                ).scalar()
+                _, retry_after = gcra(tat, now, interval, window)
+                return False, retry_after
+        except SQLAlchemyError as e:
+            logger.warning(f"Rate limit storage unavailable, allowing request: {str(e)}")
+            return True, 0.0
+
+    def _maybe_cleanup(self, conn, now):
+        # Buckets whose TAT has passed carry no state; drop them now and then
+        if random.random() < self.cleanup_probability:
+            conn.execute(delete(RateLimitBucket).where(RateLimitBucket.tat < now))
+
+
+STORAGE_BACKENDS = {
+    "memory": MemoryStorage,
+    "shared": SharedMemoryStorage,
+    "database": DatabaseStorage,
+}
+
+
+class RateLimiter:
+    """Rate limiting engine: O(1) GCRA checks over a pluggable storage backend."""
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def hit(self, key, limit, window):
+        """
+        Record a request for `key` and decide whether it is allowed.
+
+        Args:
+            key: Limit scope and client identifier
+            limit: Maximum number of requests per window
+            window: Window length in seconds
+
+        Returns:
+            tuple: (allowed, retry_after_seconds)
+        """
+        return self.storage.hit(key, time.time(), window / limit, window)
+
+
+def create_limiter(backend=RATE_LIMIT_STORAGE):
+    """
+    Create a RateLimiter for the named storage backend.
+
+    Raises:
+        ValueError: If the backend name is unknown
+    """
+    if backend not in STORAGE_BACKENDS:
+        raise ValueError(
+            f"Unknown rate limit storage: {backend}. "
+            f"Available: {', '.join(STORAGE_BACKENDS)}"
+        )
+    return RateLimiter(STORAGE_BACKENDS[backend]())
+
+
+# Created at import so the shared backend exists before gunicorn forks
+limiter = create_limiter()
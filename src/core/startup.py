@@ -0,0 +1,54 @@
+import logging
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimeline:
+    """
+    How long each phase of `create_app` took.
+
+    Phases are recorded as they finish and logged together once logging is
+    configured, as one summary line with the timings also attached as
+    `startup_timeline` on the log record for structured handlers.
+    """
+
+    def __init__(self):
+        self.phases: List[Tuple[str, float]] = []
+        self._started = time.perf_counter()
+        self._finished = None
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases.append((name, (time.perf_counter() - start) * 1000))
+
+    def finish(self):
+        self._finished = time.perf_counter()
+
+    @property
+    def total_ms(self) -> float:
+        end = self._finished or time.perf_counter()
+        return (end - self._started) * 1000
+
+    def as_dict(self) -> Dict[str, Any]:
+        """
+        Returns:
+            dict: Total and per-phase milliseconds, phases in start-up order
+        """
+        return {
+            "total_ms": round(self.total_ms, 1),
+            "phases": [{"name": name, "ms": round(ms, 1)} for name, ms in self.phases],
+        }
+
+    def log(self):
+        phases = ", ".join(f"{name}={ms:.1f}ms" for name, ms in self.phases)
+        logger.info(
+            f"App created in {self.total_ms:.1f}ms ({phases})",
+            extra={"startup_timeline": self.as_dict()}
+        )
@@ -1,6 +1,13 @@
 # src/extensions.py
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 
 db = SQLAlchemy()
-migrate = Migrate()
\ No newline at end of file
+
+
+def init_migrate(app):
+    """
+    Set up Flask-Migrate for `flask db`. Imported here rather than at module
+    level, as it pulls in Alembic, which the web app never uses.
+    """
+    from flask_migrate import Migrate
+    return Migrate(app, db)
@@ -9,6 +9,16 @@ from .location import Location
 from .item import Item
 from .order_line_item import OrderLineItem
 from .transaction import Transaction
+from .webhook_job import WebhookJob
+from .gender_cache import GenderCache
+from .rate_limit import RateLimitBucket
+from .email_outbox import EmailOutbox
+from .sync_state import SyncState
+from .daily_sales_rollup import DailySalesRollup
+from .daily_order_rollup import DailyOrderRollup
+from .sales_rollup_entry import SalesRollupEntry
+from .order_rollup_entry import OrderRollupEntry
+from .promo_code import PromoCode
 
 def load_models():
     """Load and return all models"""
@@ -20,7 +30,17 @@ def load_models():
         'Location': Location,
         'Item': Item,
         'OrderLineItem': OrderLineItem,
-        'Transaction': Transaction
+        'Transaction': Transaction,
+        'WebhookJob': WebhookJob,
+        'GenderCache': GenderCache,
+        'RateLimitBucket': RateLimitBucket,
+        'EmailOutbox': EmailOutbox,
+        'SyncState': SyncState,
+        'DailySalesRollup': DailySalesRollup,
+        'DailyOrderRollup': DailyOrderRollup,
+        'SalesRollupEntry': SalesRollupEntry,
+        'OrderRollupEntry': OrderRollupEntry,
+        'PromoCode': PromoCode
     }
 
 __all__ = [
@@ -32,5 +52,15 @@ __all__ = [
     'Item',
     'OrderLineItem',
     'Transaction',
+    'WebhookJob',
+    'GenderCache',
+    'RateLimitBucket',
+    'EmailOutbox',
+    'SyncState',
+    'DailySalesRollup',
+    'DailyOrderRollup',
+    'SalesRollupEntry',
+    'OrderRollupEntry',
+    'PromoCode',
     'load_models'  # Added this line
 ]
\ No newline at end of file
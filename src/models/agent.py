@@ -50,14 +50,72 @@ class Agent(db.Model):
     @property
     def active_appointments(self):
         """Get all active (non-cancelled) appointments for this agent."""
-        return [apt for apt in self.appointments if apt.status != 'cancelled']
+        from src.models.appointment import Appointment
+        return (
+            Appointment.active()
+            .filter(Appointment.agent_id == self.id)
+            .order_by(Appointment.start_datetime)
+            .all()
+        )
 
     @property
     def upcoming_appointments(self):
         """Get all upcoming appointments for this agent."""
-        from datetime import datetime
-        return [
-            apt for apt in self.appointments
-            if apt.start_datetime > datetime.now(apt.start_datetime.tzinfo)
-            and apt.status != 'cancelled'
-        ]
\ No newline at end of file
+        from datetime import datetime, timezone
+        from src.models.appointment import Appointment
+        now = datetime.now(timezone.utc)
+        return (
+            Appointment.active()
+            .filter(
+                Appointment.agent_id == self.id,
+                Appointment.overlaps(now),
+                Appointment.start_datetime > now
+            )
+            .order_by(Appointment.start_datetime)
+            .all()
+        )
+
+    def get_appointments_for_date(self, date, tz=None):
+        """
+        Get all appointments for a specific date for this agent.
+
+        Args:
+            date: datetime.date object
+            tz: Timezone the date is in (defaults to UTC)
+        Returns:
+            list: List of appointments starting on the given date
+        """
+        from datetime import datetime, time, timedelta, timezone
+        from src.models.appointment import Appointment
+        day_start = datetime.combine(date, time.min, tzinfo=tz or timezone.utc)
+        day_end = day_start + timedelta(days=1)
+        return (
+            Appointment.active()
+            .filter(
+                Appointment.agent_id == self.id,
+                Appointment.overlaps(day_start, day_end),
+                Appointment.start_datetime >= day_start
+            )
+            .order_by(Appointment.start_datetime)
+            .all()
+        )
+
+    def is_available(self, start_datetime, duration_minutes):
+        """
+        Check if the agent is available for a given time slot.
+
+        Args:
+            start_datetime: datetime object for the start time
+            duration_minutes: int, duration of the appointment in minutes
+        Returns:
+            bool: True if the agent is available, False otherwise
+        """
+        from datetime import timedelta
+        from src.models.appointment import Appointment
+        end_datetime = start_datetime + timedelta(minutes=duration_minutes)
+
+        overlapping = Appointment.active().filter(
+            Appointment.agent_id == self.id,
+            Appointment.overlaps(start_datetime, end_datetime)
+        )
+        return not db.session.query(overlapping.exists()).scalar()
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, CheckConstraint
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, CheckConstraint, Index, event, text
+from sqlalchemy.exc import ProgrammingError
 from sqlalchemy.orm import relationship
 from src.extensions import db
-from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.dialects.postgresql import JSONB, ExcludeConstraint
 from sqlalchemy.sql import func
 
 class Appointment(db.Model):
@@ -51,6 +52,10 @@ class Appointment(db.Model):
         nullable=False,
         comment="Allowed values: 'not_paid', 'partially_paid', 'fully_paid', 'processing'"
     )
+    reminder_sent_at = Column(
+        DateTime(timezone=True),
+        comment="When the reminder was queued; NULL until then"
+    )
     created_at = Column(
         DateTime(timezone=True),
         nullable=False,
@@ -71,6 +76,33 @@ class Appointment(db.Model):
 
     # Constraints
     __table_args__ = (
+        # Upcoming appointments still owed a reminder; stays small however
+        # large the table grows, so the reminder scan never touches history
+        Index(
+            "idx_appointments_reminder_due",
+            start_datetime,
+            postgresql_where=(
+                reminder_sent_at.is_(None)
+                & status.in_(['approved', 'pending_approval'])
+            )
+        ),
+        # No two active appointments may overlap for the same location or
+        # agent. The GiST indexes behind these constraints also serve the
+        # availability queries below.
+        ExcludeConstraint(
+            (location_id, "="),
+            (func.tstzrange(start_datetime, end_datetime), "&&"),
+            name="excl_appointments_location_overlap",
+            using="gist",
+            where=status != 'cancelled'
+        ),
+        ExcludeConstraint(
+            (agent_id, "="),
+            (func.tstzrange(start_datetime, end_datetime), "&&"),
+            name="excl_appointments_agent_overlap",
+            using="gist",
+            where=status != 'cancelled'
+        ),
         CheckConstraint(duration > 0, name="check_positive_duration"),
         CheckConstraint(
             end_datetime > start_datetime,
@@ -99,4 +131,49 @@ class Appointment(db.Model):
             f"start={self.start_datetime}, "
             f"status={self.status}"
             f")>"
-        )
\ No newline at end of file
+        )
+
+    @classmethod
+    def active(cls):
+        """Query appointments that occupy their time slot (not cancelled)."""
+        return cls.query.filter(cls.status != 'cancelled')
+
+    @classmethod
+    def overlaps(cls, start_datetime, end_datetime=None):
+        """
+        Condition matching appointments that overlap [start_datetime, end_datetime).
+
+        Written against tstzrange(start_datetime, end_datetime) so it can use
+        the exclusion constraint indexes.
+
+        Args:
+            start_datetime: Start of the period
+            end_datetime: End of the period, or None for open-ended
+        """
+        return func.tstzrange(cls.start_datetime, cls.end_datetime).op("&&")(
+            func.tstzrange(start_datetime, end_datetime)
+        )
+
+
+# The exclusion constraints compare integer ids with "=" inside a GiST index
+@event.listens_for(Appointment.__table__, "before_create")
+def _create_btree_gist(target, connection, **kw):
+    """
+    Install btree_gist before the table's exclusion constraints need it.
+
+    btree_gist is a trusted extension, so the database owner (or any role with
+    CREATE on the database) can install it without being a superuser. Roles
+    without that privilege need it installed beforehand.
+    """
+    if connection.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'btree_gist'")).scalar():
+        return
+    try:
+        connection.execute(text("CREATE EXTENSION btree_gist"))
+    except ProgrammingError as e:
+        if getattr(e.orig, "pgcode", None) != "42501":  # insufficient_privilege
+            raise
+        raise RuntimeError(
+            f"The appointments table needs the btree_gist extension, and role "
+            f"{connection.engine.url.username!r} may not create it. Have the database owner "
+            f"or a superuser run CREATE EXTENSION btree_gist in {connection.engine.url.database!r}"
+        ) from e
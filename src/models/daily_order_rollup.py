@@ -0,0 +1,70 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, Index
+from src.extensions import db
+from sqlalchemy.sql import func
+
+
+class DailyOrderRollup(db.Model):
+    """
+    DailyOrderRollup model holding order and payment totals per business
+    day and source: the sum of the orders' OrderRollupEntry rows,
+    maintained by src.services.sales_rollups; never written by hand.
+    """
+    __tablename__ = "daily_order_rollups"
+
+    id = Column(Integer, primary_key=True)
+    day = Column(
+        Date,
+        nullable=False,
+        comment="Business day (BUSINESS_TIMEZONE)"
+    )
+    data_source = Column(
+        String(20),
+        nullable=False,
+        comment="orders.data_source"
+    )
+    orders = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        comment="Orders created this day, excluding cancelled ones"
+    )
+    cancelled_orders = Column(Integer, nullable=False, default=0)
+    order_total = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        comment="Total of the non-cancelled orders in pence"
+    )
+    payments = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        comment="COMPLETED transactions created this day"
+    )
+    payment_total = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        comment="Amount of the COMPLETED transactions in pence"
+    )
+    failed_payments = Column(Integer, nullable=False, default=0)
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now()
+    )
+
+    __table_args__ = (
+        # One row per key, which the incremental updates upsert on
+        Index("uq_daily_order_rollups_key", day, data_source, unique=True),
+    )
+
+    def __repr__(self):
+        return (
+            f"<DailyOrderRollup("
+            f"day={self.day}, "
+            f"source={self.data_source}, "
+            f"orders={self.orders}, "
+            f"payment_total={self.payment_total}"
+            f")>"
+        )
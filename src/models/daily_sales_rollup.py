@@ -0,0 +1,73 @@
+from sqlalchemy import Column, Integer, String, Date, DateTime, ForeignKey, Index
+from src.extensions import db
+from sqlalchemy.sql import func
+
+
+class DailySalesRollup(db.Model):
+    """
+    DailySalesRollup model holding line item sales per business day,
+    location, item type and source: the sum of the orders'
+    SalesRollupEntry rows, maintained by src.services.sales_rollups; never
+    written by hand. Order counts are in DailyOrderRollup, since one order
+    can span several of these rows.
+    """
+    __tablename__ = "daily_sales_rollups"
+
+    id = Column(Integer, primary_key=True)
+    day = Column(
+        Date,
+        nullable=False,
+        comment="Business day (BUSINESS_TIMEZONE) the orders were created on"
+    )
+    location_id = Column(
+        Integer,
+        ForeignKey("locations.id", ondelete="CASCADE"),
+        comment="Location of the booked appointment; NULL for items without one"
+    )
+    item_type = Column(
+        String(50),
+        nullable=False,
+        comment="items.type, or 'unitemised' for orders without line items"
+    )
+    data_source = Column(
+        String(20),
+        nullable=False,
+        comment="orders.data_source"
+    )
+    quantity = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        comment="Items sold; 0 for 'unitemised'"
+    )
+    gross_sales = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        comment="Sum of line item totals in pence"
+    )
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now()
+    )
+
+    __table_args__ = (
+        # One row per key, which the incremental updates upsert on
+        Index(
+            "uq_daily_sales_rollups_key",
+            day, func.coalesce(location_id, 0), item_type, data_source,
+            unique=True
+        ),
+    )
+
+    def __repr__(self):
+        return (
+            f"<DailySalesRollup("
+            f"day={self.day}, "
+            f"location_id={self.location_id}, "
+            f"item_type={self.item_type}, "
+            f"source={self.data_source}, "
+            f"gross_sales={self.gross_sales}"
+            f")>"
+        )
@@ -0,0 +1,118 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from src.extensions import db
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+
+class EmailOutbox(db.Model):
+    """
+    EmailOutbox model representing an email written in the same transaction
+    as the business change that caused it, waiting to be sent by the
+    background sender.
+    """
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True)
+    idempotency_key = Column(
+        String(255),
+        nullable=False,
+        unique=True,
+        comment="Identifies the email, e.g. 'welcome:42'; enqueuing the same key twice is a no-op"
+    )
+    to_email = Column(String(255), nullable=False)
+    subject = Column(String(255), nullable=False)
+    template = Column(
+        String(100),
+        comment="Email template name, rendered at send time with `context`"
+    )
+    context = Column(
+        JSONB,
+        comment="Template variables"
+    )
+    html_content = Column(
+        Text,
+        comment="Pre-rendered body, used when no template is given"
+    )
+    from_email = Column(String(255))
+    reply_to = Column(String(255))
+    status = Column(
+        String(20),
+        nullable=False,
+        default="pending",
+        server_default="pending",
+        comment="Allowed values: 'pending', 'sending', 'sent', 'dead'"
+    )
+    attempts = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        comment="Number of send attempts made"
+    )
+    max_attempts = Column(
+        Integer,
+        nullable=False,
+        default=8,
+        server_default="8",
+        comment="Attempts allowed before the email is moved to 'dead'"
+    )
+    available_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        comment="Earliest time the sender may pick this email up"
+    )
+    locked_at = Column(
+        DateTime(timezone=True),
+        comment="When the current sender claimed this email"
+    )
+    sent_at = Column(DateTime(timezone=True))
+    provider_message_id = Column(
+        String(255),
+        comment="SendLayer MessageID"
+    )
+    last_error = Column(Text)
+    created_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now()
+    )
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now()
+    )
+
+    # Indexes and Constraints
+    __table_args__ = (
+        # The sender only ever scans unsent rows, so keep the index small
+        Index(
+            'idx_email_outbox_claim',
+            status,
+            available_at,
+            postgresql_where=status.in_(['pending', 'sending'])
+        ),
+        # Metrics: recent throughput and the dead-letter count
+        Index('idx_email_outbox_sent_at', sent_at, postgresql_where=sent_at.isnot(None)),
+        Index('idx_email_outbox_dead', id, postgresql_where=status == 'dead'),
+        db.CheckConstraint(
+            status.in_(['pending', 'sending', 'sent', 'dead']),
+            name="check_email_outbox_status"
+        ),
+        db.CheckConstraint(
+            "template IS NOT NULL OR html_content IS NOT NULL",
+            name="check_email_outbox_has_body"
+        ),
+        db.CheckConstraint(attempts >= 0, name="check_email_outbox_attempts"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<EmailOutbox("
+            f"id={self.id}, "
+            f"to_email={self.to_email}, "
+            f"status={self.status}, "
+            f"attempts={self.attempts}"
+            f")>"
+        )
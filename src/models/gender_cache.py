@@ -0,0 +1,49 @@
+from sqlalchemy import Column, String, DateTime, Index
+from src.extensions import db
+from sqlalchemy.sql import func
+
+
+class GenderCache(db.Model):
+    """
+    GenderCache model storing gender-api.com answers per normalised first name.
+    """
+    __tablename__ = "gender_cache"
+
+    name = Column(
+        String(100),
+        primary_key=True,
+        comment="Normalised (trimmed, case-folded) first name"
+    )
+    gender = Column(
+        String(10),
+        nullable=False,
+        comment="Values: male, female, unknown"
+    )
+    expires_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        comment="Entry is treated as a miss after this time"
+    )
+    created_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now()
+    )
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now()
+    )
+
+    # Indexes and Constraints
+    __table_args__ = (
+        Index('idx_gender_cache_expires_at', expires_at),
+        db.CheckConstraint(
+            gender.in_(['male', 'female', 'unknown']),
+            name="check_gender_cache_gender"
+        ),
+    )
+
+    def __repr__(self):
+        return f"<GenderCache(name={self.name}, gender={self.gender}, expires_at={self.expires_at})>"
@@ -50,32 +50,55 @@ class Location(db.Model):
     @property
     def active_appointments(self):
         """Get all active (non-cancelled) appointments at this location."""
-        return [apt for apt in self.appointments if apt.status != 'cancelled']
+        from src.models.appointment import Appointment
+        return (
+            Appointment.active()
+            .filter(Appointment.location_id == self.id)
+            .order_by(Appointment.start_datetime)
+            .all()
+        )
 
     @property
     def upcoming_appointments(self):
         """Get all upcoming appointments at this location."""
-        from datetime import datetime
-        return [
-            apt for apt in self.appointments
-            if apt.start_datetime > datetime.now(apt.start_datetime.tzinfo)
-               and apt.status != 'cancelled'
-        ]
+        from datetime import datetime, timezone
+        from src.models.appointment import Appointment
+        now = datetime.now(timezone.utc)
+        return (
+            Appointment.active()
+            .filter(
+                Appointment.location_id == self.id,
+                Appointment.overlaps(now),
+                Appointment.start_datetime > now
+            )
+            .order_by(Appointment.start_datetime)
+            .all()
+        )
 
-    def get_appointments_for_date(self, date):
+    def get_appointments_for_date(self, date, tz=None):
         """
         Get all appointments for a specific date at this location.
 
         Args:
             date: datetime.date object
+            tz: Timezone the date is in (defaults to UTC)
         Returns:
-            list: List of appointments for the given date
+            list: List of appointments starting on the given date
         """
-        return [
-            apt for apt in self.appointments
-            if apt.start_datetime.date() == date
-               and apt.status != 'cancelled'
-        ]
+        from datetime import datetime, time, timedelta, timezone
+        from src.models.appointment import Appointment
+        day_start = datetime.combine(date, time.min, tzinfo=tz or timezone.utc)
+        day_end = day_start + timedelta(days=1)
+        return (
+            Appointment.active()
+            .filter(
+                Appointment.location_id == self.id,
+                Appointment.overlaps(day_start, day_end),
+                Appointment.start_datetime >= day_start
+            )
+            .order_by(Appointment.start_datetime)
+            .all()
+        )
 
     def is_available(self, start_datetime, duration_minutes):
         """
@@ -88,13 +111,11 @@ class Location(db.Model):
             bool: True if the location is available, False otherwise
         """
         from datetime import timedelta
+        from src.models.appointment import Appointment
         end_datetime = start_datetime + timedelta(minutes=duration_minutes)
 
-        # Get existing appointments that overlap with the requested time slot
-        overlapping = [
-            apt for apt in self.active_appointments
-            if (apt.start_datetime < end_datetime and
-                apt.end_datetime > start_datetime)
-        ]
-
-        return len(overlapping) == 0
\ No newline at end of file
+        overlapping = Appointment.active().filter(
+            Appointment.location_id == self.id,
+            Appointment.overlaps(start_datetime, end_datetime)
+        )
+        return not db.session.query(overlapping.exists()).scalar()
@@ -89,6 +89,8 @@ class Order(db.Model):
             'booking_system_order_id IS NOT NULL OR payment_system_order_id IS NOT NULL',
             name='check_order_id_presence'
         ),
+        # Day ranges scanned when the sales rollups are rebuilt
+        Index('idx_orders_created_at', 'created_at'),
     )
 
     def __repr__(self):
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, Integer, String, Date, Index
+from src.extensions import db
+
+
+class OrderRollupEntry(db.Model):
+    """
+    OrderRollupEntry model holding one order's share of a DailyOrderRollup
+    row: the order itself on the day it was created, and its payments on
+    the days they were taken. Written by src.services.sales_rollups only.
+    """
+    __tablename__ = "order_rollup_entries"
+
+    id = Column(Integer, primary_key=True)
+    # No foreign key: a deleted order's entries are still needed to take
+    # it out of the rollups
+    order_id = Column(Integer, nullable=False)
+    day = Column(Date, nullable=False)
+    data_source = Column(String(20), nullable=False)
+    orders = Column(Integer, nullable=False, default=0)
+    cancelled_orders = Column(Integer, nullable=False, default=0)
+    order_total = Column(Integer, nullable=False, default=0)
+    payments = Column(Integer, nullable=False, default=0)
+    payment_total = Column(Integer, nullable=False, default=0)
+    failed_payments = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("idx_order_rollup_entries_order_id", order_id),
+        Index("idx_order_rollup_entries_day", day),
+    )
+
+    def __repr__(self):
+        return (
+            f"<OrderRollupEntry("
+            f"order_id={self.order_id}, "
+            f"day={self.day}, "
+            f"orders={self.orders}, "
+            f"payment_total={self.payment_total}"
+            f")>"
+        )
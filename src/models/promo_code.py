@@ -0,0 +1,83 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Index
+from src.extensions import db
+from sqlalchemy.dialects.postgresql import JSONB, ExcludeConstraint
+from sqlalchemy.sql import func
+
+
+class PromoCode(db.Model):
+    """
+    PromoCode model recording a code issued by the code generator, so no
+    code is handed out twice and front desk and booking systems can check
+    and redeem it.
+    """
+    __tablename__ = "promo_codes"
+
+    id = Column(Integer, primary_key=True)
+    code = Column(
+        String(100),
+        nullable=False,
+        comment="The code, normalized (see normalize_code), e.g. 'GIFT-PREM-150-B7K2N8L4'"
+    )
+    code_type = Column(
+        String(30),
+        nullable=False,
+        comment="Allowed values: 'unlimited', 'school', 'referral', 'guest', 'gift_digital', 'gift_premium', "
+                "'personal_duration', 'personal_discount'"
+    )
+    description = Column(Text)
+    details = Column(
+        JSONB,
+        comment="Parameters the code was generated with, e.g. amount, duration, discount, first_name"
+    )
+    batch_id = Column(
+        String(36),
+        comment="Shared by the codes of one bulk request"
+    )
+    single_use = Column(
+        Boolean,
+        nullable=False,
+        default=True,
+        server_default="true",
+        comment="False for codes redeemed repeatedly (unlimited packages, school discounts)"
+    )
+    redeemed_at = Column(
+        DateTime(timezone=True),
+        comment="First redemption; a single-use code can't be redeemed once this is set"
+    )
+    redeemed_by = Column(
+        String(100),
+        comment="Till, booking system or staff member of the latest redemption"
+    )
+    redemption_count = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0"
+    )
+    created_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now()
+    )
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now()
+    )
+
+    __table_args__ = (
+        # Codes are only ever looked up by equality, so uniqueness is enforced
+        # through a hash index, which stores 4-byte hashes rather than the
+        # codes themselves. Hash indexes can't be UNIQUE, but an exclusion
+        # constraint with "=" is equivalent (and is an ON CONFLICT arbiter).
+        ExcludeConstraint(
+            (code, "="),
+            name="excl_promo_codes_code",
+            using="hash"
+        ),
+        Index("idx_promo_codes_batch_id", "batch_id", postgresql_where=batch_id.isnot(None)),
+    )
+
+    def __repr__(self):
+        return f"<PromoCode(code={self.code}, code_type={self.code_type})>"
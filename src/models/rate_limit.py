@@ -0,0 +1,29 @@
+from sqlalchemy import Column, String, Float, Index
+from src.extensions import db
+
+
+class RateLimitBucket(db.Model):
+    """
+    RateLimitBucket model holding GCRA state for the database rate-limit backend.
+    """
+    __tablename__ = "rate_limits"
+
+    key = Column(
+        String(255),
+        primary_key=True,
+        comment="Limit scope and client, e.g. 'customers.handle_square_customer_webhook:1.2.3.4'"
+    )
+    tat = Column(
+        Float,
+        nullable=False,
+        comment="Theoretical arrival time (Unix epoch seconds)"
+    )
+
+    # Indexes
+    __table_args__ = (
+        # Used to purge idle buckets
+        Index('idx_rate_limits_tat', tat),
+    )
+
+    def __repr__(self):
+        return f"<RateLimitBucket(key={self.key}, tat={self.tat})>"
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, Date, Index
+from src.extensions import db
+
+
+class SalesRollupEntry(db.Model):
+    """
+    SalesRollupEntry model holding one order's share of a DailySalesRollup
+    row. The rollups are the sum of these entries: when an order changes,
+    its entries are replaced and the difference is added to the rollups.
+    Written by src.services.sales_rollups only.
+    """
+    __tablename__ = "sales_rollup_entries"
+
+    id = Column(Integer, primary_key=True)
+    # No foreign key: a deleted order's entries are still needed to take
+    # it out of the rollups
+    order_id = Column(Integer, nullable=False)
+    day = Column(Date, nullable=False)
+    location_id = Column(Integer)
+    item_type = Column(String(50), nullable=False)
+    data_source = Column(String(20), nullable=False)
+    quantity = Column(Integer, nullable=False, default=0)
+    gross_sales = Column(Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        Index("idx_sales_rollup_entries_order_id", order_id),
+        Index("idx_sales_rollup_entries_day", day),
+    )
+
+    def __repr__(self):
+        return (
+            f"<SalesRollupEntry("
+            f"order_id={self.order_id}, "
+            f"day={self.day}, "
+            f"item_type={self.item_type}, "
+            f"gross_sales={self.gross_sales}"
+            f")>"
+        )
@@ -0,0 +1,41 @@
+from sqlalchemy import Column, String, DateTime
+from src.extensions import db
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+
+class SyncState(db.Model):
+    """
+    SyncState model recording how far an incremental import from an
+    external system has got.
+    """
+    __tablename__ = "sync_state"
+
+    name = Column(
+        String(100),
+        primary_key=True,
+        comment="Sync job name, e.g. 'square.customers'"
+    )
+    watermark = Column(
+        DateTime(timezone=True),
+        comment="Latest source updated_at imported; the next run starts here"
+    )
+    last_run_at = Column(DateTime(timezone=True))
+    last_result = Column(
+        JSONB,
+        comment="Counts from the last successful run"
+    )
+    created_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now()
+    )
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now()
+    )
+
+    def __repr__(self):
+        return f"<SyncState(name={self.name}, watermark={self.watermark}, last_run_at={self.last_run_at})>"
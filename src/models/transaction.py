@@ -77,6 +77,9 @@ class Transaction(db.Model):
             status.in_(['COMPLETED', 'FAILED', 'PENDING', 'CANCELLED']),
             name="check_transaction_status"
         ),
+        db.Index("idx_transactions_order_id", order_id),
+        # Day ranges scanned when the sales rollups are rebuilt
+        db.Index("idx_transactions_created_at", created_at),
     )
 
     def __repr__(self):
@@ -0,0 +1,99 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, Index
+from src.extensions import db
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.sql import func
+
+
+class WebhookJob(db.Model):
+    """
+    WebhookJob model representing a validated webhook payload waiting to be
+    processed by a background worker.
+    """
+    __tablename__ = "webhook_jobs"
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(
+        String(50),
+        nullable=False,
+        comment="Job handler key, e.g., 'customer.latepoint', 'order.square'"
+    )
+    payload = Column(
+        JSONB,
+        nullable=False,
+        comment="Raw webhook payload as received"
+    )
+    status = Column(
+        String(20),
+        nullable=False,
+        default="pending",
+        server_default="pending",
+        comment="Allowed values: 'pending', 'processing', 'done', 'dead'"
+    )
+    attempts = Column(
+        Integer,
+        nullable=False,
+        default=0,
+        server_default="0",
+        comment="Number of times a worker has claimed this job"
+    )
+    max_attempts = Column(
+        Integer,
+        nullable=False,
+        default=8,
+        server_default="8",
+        comment="Attempts allowed before the job is moved to 'dead'"
+    )
+    available_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        comment="Earliest time a worker may claim this job"
+    )
+    locked_at = Column(
+        DateTime(timezone=True),
+        comment="When the current worker claimed this job"
+    )
+    last_error = Column(Text)
+    result = Column(
+        JSONB,
+        comment="Handler result for completed jobs"
+    )
+    created_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now()
+    )
+    updated_at = Column(
+        DateTime(timezone=True),
+        nullable=False,
+        server_default=func.now(),
+        onupdate=func.now()
+    )
+
+    # Indexes and Constraints
+    __table_args__ = (
+        # Workers only ever scan claimable rows, so keep the index small
+        Index(
+            'idx_webhook_jobs_claim',
+            status,
+            available_at,
+            postgresql_where=status.in_(['pending', 'processing'])
+        ),
+        Index('idx_webhook_jobs_kind', kind),
+        db.CheckConstraint(
+            status.in_(['pending', 'processing', 'done', 'dead']),
+            name="check_webhook_job_status"
+        ),
+        db.CheckConstraint(attempts >= 0, name="check_non_negative_attempts"),
+        db.CheckConstraint(max_attempts > 0, name="check_positive_max_attempts"),
+    )
+
+    def __repr__(self):
+        return (
+            f"<WebhookJob("
+            f"id={self.id}, "
+            f"kind={self.kind}, "
+            f"status={self.status}, "
+            f"attempts={self.attempts}"
+            f")>"
+        )
@@ -0,0 +1,188 @@
+from datetime import datetime, timedelta, UTC
+from typing import Optional, Dict, Any, List
+from zoneinfo import ZoneInfo
+import logging
+import os
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import Session
+from src.models import Appointment, Customer, OrderLineItem, Item, Location
+from src.extensions import db
+from src.services.email_outbox import EmailOutboxService
+from src.services.email_templates import TEMPLATE_GLOBALS
+
+logger = logging.getLogger(__name__)
+
+# Appointment times are shown to customers in the studio's local time
+BUSINESS_TIMEZONE = ZoneInfo(os.getenv("BUSINESS_TIMEZONE", "Europe/London"))
+
+REMINDER_TEMPLATE = "reminders/appointment_reminder_customer.html"
+
+# Only these appointments get reminders; must match idx_appointments_reminder_due
+REMINDER_STATUSES = ("approved", "pending_approval")
+
+REMINDER_COLUMNS = (
+    Appointment.id,
+    Appointment.start_datetime,
+    Appointment.end_datetime,
+    Appointment.duration,
+    Customer.first_name.label("customer_first_name"),
+    Customer.email.label("customer_email"),
+    Item.name.label("service_name"),
+    Location.address.label("location_address"),
+    Location.phone.label("location_phone"),
+)
+
+
+def format_duration(minutes: int) -> str:
+    """Format a duration in minutes as e.g. '1 hour 30 minutes'"""
+    hours, minutes = divmod(minutes, 60)
+    parts = []
+    if hours:
+        parts.append(f"{hours} hour{'s' if hours != 1 else ''}")
+    if minutes or not hours:
+        parts.append(f"{minutes} minute{'s' if minutes != 1 else ''}")
+    return " ".join(parts)
+
+
+def build_reminder_email(appointment: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the outbox email reminding a customer of an appointment.
+
+    Args:
+        appointment: Row selected with REMINDER_COLUMNS
+
+    Returns:
+        Dict of EmailOutboxService.enqueue arguments
+    """
+    start = appointment["start_datetime"].astimezone(BUSINESS_TIMEZONE)
+    end = appointment["end_datetime"].astimezone(BUSINESS_TIMEZONE)
+    start_date = start.strftime("%A %-d %B %Y")
+
+    return {
+        # Includes the start time: rescheduling clears reminder_sent_at (see
+        # _rearm_rescheduled_reminders), and the new time gets its own email
+        "idempotency_key": f"reminder:{appointment['id']}:{int(start.timestamp())}",
+        "to_email": appointment["customer_email"],
+        "subject": f"Reminder: your {appointment['service_name']} on {start_date}",
+        "template": REMINDER_TEMPLATE,
+        "context": {
+            "customer_first_name": appointment["customer_first_name"],
+            "service_name": appointment["service_name"],
+            "start_date": start_date,
+            "start_time": start.strftime("%H:%M"),
+            "end_time": end.strftime("%H:%M"),
+            "booking_duration": format_duration(appointment["duration"]),
+            "manage_booking_url_customer": f"{TEMPLATE_GLOBALS['booking_url']}/customer-cabinet/",
+            "business_phone": appointment["location_phone"] or "",
+            "business_address": appointment["location_address"],
+            "business_logo_image": "",
+        },
+    }
+
+
+class AppointmentReminderService:
+    @staticmethod
+    def claim_due(now: datetime, lead: timedelta, limit: int) -> List[Dict[str, Any]]:
+        """
+        Select upcoming appointments that are owed a reminder.
+
+        The range condition on start_datetime, together with the
+        reminder_sent_at/status filter, is served by the partial index
+        idx_appointments_reminder_due, so the cost depends on the number of
+        appointments due rather than on the size of the table. Rows are
+        locked (SKIP LOCKED) until the caller commits.
+
+        Args:
+            now: Current time
+            lead: How far ahead of the start time reminders are sent
+            limit: Maximum number of appointments to return
+
+        Returns:
+            List of rows as dicts, earliest start first
+        """
+        stmt = (
+            select(*REMINDER_COLUMNS)
+            .join(Customer, Appointment.customer_id == Customer.id)
+            .join(OrderLineItem, Appointment.order_line_item_id == OrderLineItem.id)
+            .join(Item, OrderLineItem.item_id == Item.id)
+            .join(Location, Appointment.location_id == Location.id)
+            .where(
+                Appointment.start_datetime > now,
+                Appointment.start_datetime <= now + lead,
+                Appointment.reminder_sent_at.is_(None),
+                Appointment.status.in_(REMINDER_STATUSES),
+            )
+            .order_by(Appointment.start_datetime, Appointment.id)
+            .limit(limit)
+            .with_for_update(of=Appointment, skip_locked=True)
+        )
+        return [dict(row._mapping) for row in db.session.execute(stmt)]
+
+    @staticmethod
+    def queue_due_reminders(
+        lead_hours: float = 24,
+        chunk_size: int = 500,
+        now: Optional[datetime] = None
+    ) -> int:
+        """
+        Queue reminder emails for every appointment starting within the next
+        `lead_hours`, `chunk_size` appointments per transaction.
+
+        Each chunk's emails are added to the outbox and the appointments are
+        marked with reminder_sent_at in the same commit, so a reminder is
+        queued exactly once even if the scheduler crashes halfway. The mailer
+        (`flask outbox send`) renders and delivers them.
+
+        Args:
+            lead_hours: How far ahead of the start time reminders are sent
+            chunk_size: Appointments handled per transaction
+            now: Current time (defaults to now)
+
+        Returns:
+            int: Number of reminders queued
+        """
+        now = now or datetime.now(UTC)
+        lead = timedelta(hours=lead_hours)
+        queued = 0
+
+        while True:
+            appointments = AppointmentReminderService.claim_due(now, lead, chunk_size)
+            if not appointments:
+                break
+
+            try:
+                queued += EmailOutboxService.enqueue_many(
+                    [build_reminder_email(appointment) for appointment in appointments]
+                )
+                db.session.execute(
+                    update(Appointment)
+                    .where(Appointment.id.in_([appointment["id"] for appointment in appointments]))
+                    .values(reminder_sent_at=now)
+                    .execution_options(synchronize_session=False)
+                )
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+
+            if len(appointments) < chunk_size:
+                break
+
+        if queued:
+            logger.info(f"Queued {queued} appointment reminder(s)")
+        return queued
+
+
+# --- Appointment write hooks ------------------------------------------------
+
+@event.listens_for(Session, "before_flush")
+def _rearm_rescheduled_reminders(session, flush_context, instances):
+    # A rescheduled appointment is owed a reminder for its new time. The
+    # reminder's idempotency key includes the start time, so this queues a
+    # new email rather than matching the one already sent.
+    for obj in session.dirty:
+        if not isinstance(obj, Appointment) or obj.reminder_sent_at is None:
+            continue
+        attrs = inspect(obj).attrs
+        if attrs.start_datetime.history.has_changes() and not attrs.reminder_sent_at.history.has_changes():
+            obj.reminder_sent_at = None
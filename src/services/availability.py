@@ -0,0 +1,437 @@
+from datetime import date, datetime, time as dt_time, timedelta, UTC
+from typing import Optional, Dict, Any, List, Iterable, Tuple
+import json
+import logging
+import os
+import threading
+import time
+from sqlalchemy import event, inspect, select, text, or_
+from sqlalchemy.orm import Session
+from src.models import Appointment, Agent
+from src.extensions import db
+from src.services.appointments import BUSINESS_TIMEZONE
+from src.utils.notify import current_origin, listen
+
+logger = logging.getLogger(__name__)
+
+# Busy time is tracked per 5-minute slot: bit i of a day's bitmap covers
+# local time [i * 5, i * 5 + 5) minutes after midnight
+SLOT_MINUTES = 5
+SLOTS_PER_DAY = 24 * 60 // SLOT_MINUTES
+
+# Searches only offer starts on this grid
+SLOT_STEP_MINUTES = int(os.getenv("AVAILABILITY_STEP_MINUTES", "15"))
+STEP_MASK = sum(1 << i for i in range(0, SLOTS_PER_DAY, max(SLOT_STEP_MINUTES // SLOT_MINUTES, 1)))
+
+STUDIO_OPEN_TIME = os.getenv("STUDIO_OPEN_TIME", "09:00")
+STUDIO_CLOSE_TIME = os.getenv("STUDIO_CLOSE_TIME", "21:00")
+
+# Loaded days are reloaded after this long, in case an invalidation was missed
+AVAILABILITY_CACHE_TTL = float(os.getenv("AVAILABILITY_CACHE_TTL", "300"))
+
+# Postgres NOTIFY channel used to invalidate other processes' calendars
+NOTIFY_CHANNEL = "availability"
+# NOTIFY payloads must stay under 8000 bytes; larger changes invalidate everything
+MAX_NOTIFY_KEYS = 100
+
+
+def _minutes(value: str) -> int:
+    hours, minutes = value.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def slot_mask(first: int, last: int) -> int:
+    """Bitmap with slots first..last-1 set"""
+    if last <= first:
+        return 0
+    return ((1 << (last - first)) - 1) << first
+
+
+def free_run_starts(free: int, length: int) -> int:
+    """
+    Bitmap of slots where `length` consecutive free slots begin.
+
+    Bit i of the result is set when bits i..i+length-1 of `free` are all
+    set. Takes O(log length) big-int operations.
+    """
+    runs, covered = free, 1
+    while covered < length:
+        shift = min(covered, length - covered)
+        runs &= runs >> shift
+        covered += shift
+    return runs
+
+
+def iter_bits(bits: int) -> Iterable[int]:
+    """Yield the indexes of set bits, lowest first"""
+    while bits:
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+
+
+def local_day_bounds(day: date) -> Tuple[datetime, datetime]:
+    start = datetime.combine(day, dt_time.min, tzinfo=BUSINESS_TIMEZONE)
+    end = datetime.combine(day + timedelta(days=1), dt_time.min, tzinfo=BUSINESS_TIMEZONE)
+    return start, end
+
+
+def busy_slots(start_datetime: datetime, end_datetime: datetime) -> Dict[date, int]:
+    """
+    Split an appointment into per-day bitmaps of the slots it touches.
+
+    Partial slots count as busy, so the bitmaps never under-report.
+    """
+    start = start_datetime.astimezone(BUSINESS_TIMEZONE)
+    end = end_datetime.astimezone(BUSINESS_TIMEZONE)
+    result = {}
+    day = start.date()
+    while True:
+        day_start, day_end = local_day_bounds(day)
+        if day_start >= end:
+            break
+        first_minutes = max(start, day_start) - day_start
+        last_minutes = min(end, day_end) - day_start
+        first = int(first_minutes.total_seconds() // (SLOT_MINUTES * 60))
+        last = -int(-last_minutes.total_seconds() // (SLOT_MINUTES * 60))
+        result[day] = slot_mask(first, min(last, SLOTS_PER_DAY))
+        day += timedelta(days=1)
+    return result
+
+
+class AvailabilityEngine:
+    """
+    In-memory busy calendars for agents and locations.
+
+    Each resource ("agent", id) or ("location", id) keeps one integer bitmap
+    per local day, loaded lazily with a single range query for every missing
+    day of a search. New appointments are marked as they are committed;
+    cancellations, reschedules and deletes drop the affected days so they
+    reload. Other processes are told which days changed via Postgres
+    LISTEN/NOTIFY.
+    """
+
+    def __init__(self, ttl: float = AVAILABILITY_CACHE_TTL):
+        self.ttl = ttl
+        self.stats = {"searches": 0, "loads": 0, "days_loaded": 0, "invalidations": 0}
+        # (kind, id, day) -> (bitmap, loaded_at)
+        self._days = {}
+        # (kind, id, day) -> monotonic time of the last invalidation
+        self._invalidated = {}
+        self._invalidated_all = 0.0
+        self._last_prune = time.monotonic()
+        self._agents = None
+        self._lock = threading.Lock()
+        self._listener_pid = None
+
+    # --- Cache ------------------------------------------------------------
+
+    def _cached(self, key, now):
+        entry = self._days.get(key)
+        if entry and now - entry[1] < self.ttl:
+            return entry[0]
+        return None
+
+    def _load(self, resources: List[Tuple[str, int]], days: List[date]) -> Dict[tuple, int]:
+        """Return bitmaps for every resource and day, loading what is missing."""
+        now = time.monotonic()
+        bitmaps, missing_days, missing_ids = {}, set(), {"agent": set(), "location": set()}
+        with self._lock:
+            for kind, resource_id in resources:
+                for day in days:
+                    bits = self._cached((kind, resource_id, day), now)
+                    if bits is None:
+                        missing_days.add(day)
+                        missing_ids[kind].add(resource_id)
+                    else:
+                        bitmaps[(kind, resource_id, day)] = bits
+
+        if not missing_days:
+            return bitmaps
+
+        range_start = local_day_bounds(min(missing_days))[0]
+        range_end = local_day_bounds(max(missing_days))[1]
+        owners = []
+        if missing_ids["agent"]:
+            owners.append(Appointment.agent_id.in_(missing_ids["agent"]))
+        if missing_ids["location"]:
+            owners.append(Appointment.location_id.in_(missing_ids["location"]))
+        rows = db.session.execute(
+            select(
+                Appointment.agent_id,
+                Appointment.location_id,
+                Appointment.start_datetime,
+                Appointment.end_datetime
+            ).where(
+                Appointment.status != 'cancelled',
+                Appointment.overlaps(range_start, range_end),
+                or_(*owners)
+            )
+        ).all()
+
+        loaded = {
+            (kind, resource_id, day): 0
+            for kind, ids in missing_ids.items()
+            for resource_id in ids
+            for day in missing_days
+        }
+        for agent_id, location_id, start, end in rows:
+            for day, bits in busy_slots(start, end).items():
+                for key in (("agent", agent_id, day), ("location", location_id, day)):
+                    if key in loaded:
+                        loaded[key] |= bits
+
+        with self._lock:
+            for key, bits in loaded.items():
+                # Don't cache a day that changed while it was being read
+                if max(self._invalidated.get(key, 0), self._invalidated_all) < now:
+                    self._days[key] = (bits, now)
+            if now - self._last_prune > self.ttl:
+                self._prune(now)
+            self.stats["loads"] += 1
+            self.stats["days_loaded"] += len(loaded)
+
+        bitmaps.update((key, bits) for key, bits in loaded.items() if key[:2] in resources)
+        return bitmaps
+
+    def _prune(self, now):
+        # Called with the lock held
+        self._days = {key: entry for key, entry in self._days.items() if now - entry[1] < self.ttl}
+        self._invalidated = {key: at for key, at in self._invalidated.items() if now - at < self.ttl}
+        self._last_prune = now
+
+    def mark_busy(self, agent_id: int, location_id: int, start_datetime: datetime, end_datetime: datetime):
+        """Add a new appointment to the loaded days of its agent and location."""
+        now = time.monotonic()
+        with self._lock:
+            for day, bits in busy_slots(start_datetime, end_datetime).items():
+                for key in (("agent", agent_id, day), ("location", location_id, day)):
+                    entry = self._days.get(key)
+                    if entry:
+                        self._days[key] = (entry[0] | bits, entry[1])
+                    # A load already in flight may not include it
+                    self._invalidated[key] = now
+
+    def invalidate(self, keys: Optional[Iterable[tuple]] = None):
+        """
+        Forget loaded days so they are read again on the next search.
+
+        Args:
+            keys: (kind, id, day) tuples, or None to forget everything
+        """
+        now = time.monotonic()
+        with self._lock:
+            if keys is None:
+                self._days.clear()
+                self._invalidated.clear()
+                self._invalidated_all = now
+                self._agents = None
+            else:
+                for key in keys:
+                    self._days.pop(key, None)
+                    self._invalidated[key] = now
+            self.stats["invalidations"] += 1
+
+    def agents(self) -> Dict[int, str]:
+        """Agent ids and names, cached like the calendars."""
+        now = time.monotonic()
+        cached = self._agents
+        if cached and now - cached[1] < self.ttl:
+            return cached[0]
+        agents = dict(db.session.execute(select(Agent.id, Agent.full_name).order_by(Agent.id)).all())
+        self._agents = (agents, now)
+        return agents
+
+    # --- Search -----------------------------------------------------------
+
+    def find_slots(
+        self,
+        location_id: int,
+        duration: int,
+        start_date: date,
+        days: int = 7,
+        agent_ids: Optional[List[int]] = None,
+        limit: int = 10,
+        now: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the earliest free slots at a location.
+
+        A slot is free when neither the location nor the agent has an
+        appointment during it, and it lies within opening hours.
+
+        Args:
+            location_id: Location to search
+            duration: Appointment length in minutes
+            start_date: First local day to search
+            days: Number of days to search
+            agent_ids: Agents to consider (all agents if omitted)
+            limit: Maximum number of slots to return
+            now: Current time; earlier slots are skipped
+
+        Returns:
+            List of dicts with 'start', 'end', 'agent_id' and 'agent_name',
+            earliest first, one agent per start time
+        """
+        self._ensure_listener()
+        self.stats["searches"] += 1
+        now = now or datetime.now(UTC)
+        agents = self.agents()
+        agent_ids = [agent_id for agent_id in (agent_ids or agents) if agent_id in agents]
+        if not agent_ids or duration <= 0:
+            return []
+
+        search_days = [start_date + timedelta(days=offset) for offset in range(days)]
+        resources = [("location", location_id)] + [("agent", agent_id) for agent_id in agent_ids]
+        bitmaps = self._load(resources, search_days)
+
+        length = -(-duration // SLOT_MINUTES)
+        open_slot = _minutes(STUDIO_OPEN_TIME) // SLOT_MINUTES
+        close_slot = _minutes(STUDIO_CLOSE_TIME) // SLOT_MINUTES
+        local_now = now.astimezone(BUSINESS_TIMEZONE)
+
+        slots = []
+        for day in search_days:
+            first = open_slot
+            if day < local_now.date():
+                continue
+            if day == local_now.date():
+                minutes_now = local_now.hour * 60 + local_now.minute + (local_now.second > 0)
+                first = max(first, -(-minutes_now // SLOT_MINUTES))
+            location_free = slot_mask(first, close_slot) & ~bitmaps[("location", location_id, day)]
+            if not location_free:
+                continue
+
+            agent_starts = []
+            any_start = 0
+            for agent_id in agent_ids:
+                starts = free_run_starts(location_free & ~bitmaps[("agent", agent_id, day)], length) & STEP_MASK
+                if starts:
+                    agent_starts.append((agent_id, starts))
+                    any_start |= starts
+
+            day_start = local_day_bounds(day)[0]
+            for slot in iter_bits(any_start):
+                # First listed agent free at this start
+                agent_id = next(agent_id for agent_id, starts in agent_starts if starts >> slot & 1)
+                start = day_start + timedelta(minutes=slot * SLOT_MINUTES)
+                slots.append({
+                    "start": start.isoformat(),
+                    "end": (start + timedelta(minutes=duration)).isoformat(),
+                    "agent_id": agent_id,
+                    "agent_name": agents[agent_id],
+                })
+                if len(slots) >= limit:
+                    return slots
+        return slots
+
+    # --- Cross-process invalidation -----------------------------------------
+
+    def _ensure_listener(self):
+        # One listener per process; gunicorn forks after create_app
+        if self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            self._days.clear()
+        engine = db.engine
+        threading.Thread(target=self._listen, args=(engine,), daemon=True, name="availability-listener").start()
+
+    def _listen(self, engine):
+        # Anything could have changed while we weren't listening
+        listen(engine, NOTIFY_CHANNEL, self._handle_notification, on_listen=self.invalidate)
+
+    def _handle_notification(self, payload: str):
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed availability notification: {payload!r}")
+            return
+        if message.get("origin") == current_origin():
+            return
+        if message.get("all"):
+            self.invalidate()
+        else:
+            self.invalidate(
+                (kind, resource_id, date.fromisoformat(day))
+                for kind, resource_id, day in message.get("keys", [])
+            )
+
+
+availability_engine = AvailabilityEngine()
+
+
+# --- Appointment write hooks ------------------------------------------------
+
+def _appointment_changes(session):
+    """Collect (added, removed) busy intervals from a flush."""
+    added, removed = [], []
+    for obj in session.new:
+        if isinstance(obj, Appointment) and obj.status != 'cancelled':
+            added.append((obj.agent_id, obj.location_id, obj.start_datetime, obj.end_datetime))
+    for obj in session.deleted:
+        if isinstance(obj, Appointment):
+            removed.append((obj.agent_id, obj.location_id, obj.start_datetime, obj.end_datetime))
+    for obj in session.dirty:
+        if not isinstance(obj, Appointment) or not session.is_modified(obj):
+            continue
+        state = inspect(obj)
+        old = {}
+        for attr in ("agent_id", "location_id", "start_datetime", "end_datetime", "status"):
+            history = state.attrs[attr].history
+            old[attr] = history.deleted[0] if history.deleted else getattr(obj, attr)
+        if old["status"] != 'cancelled':
+            removed.append((old["agent_id"], old["location_id"], old["start_datetime"], old["end_datetime"]))
+        if obj.status != 'cancelled':
+            added.append((obj.agent_id, obj.location_id, obj.start_datetime, obj.end_datetime))
+    return added, removed
+
+
+def _day_keys(intervals):
+    keys = set()
+    for agent_id, location_id, start, end in intervals:
+        for day in busy_slots(start, end):
+            keys.add(("agent", agent_id, day))
+            keys.add(("location", location_id, day))
+    return keys
+
+
+@event.listens_for(Session, "after_flush")
+def _notify_appointment_changes(session, flush_context):
+    # Attribute history still holds the pre-flush values here
+    added, removed = _appointment_changes(session)
+    if not added and not removed:
+        return
+
+    keys = _day_keys(added + removed)
+    if len(keys) > MAX_NOTIFY_KEYS:
+        message = {"origin": current_origin(), "all": True}
+    else:
+        message = {"origin": current_origin(), "keys": [[kind, resource_id, day.isoformat()] for kind, resource_id, day in keys]}
+    # Delivered to listeners only if this transaction commits
+    session.connection().execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": NOTIFY_CHANNEL, "payload": json.dumps(message)}
+    )
+
+    pending = session.info.setdefault("availability_changes", {"added": [], "removed": []})
+    pending["added"].extend(added)
+    pending["removed"].extend(removed)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_appointment_changes(session):
+    pending = session.info.pop("availability_changes", None)
+    if not pending:
+        return
+    if pending["removed"]:
+        availability_engine.invalidate(_day_keys(pending["removed"]))
+    for agent_id, location_id, start, end in pending["added"]:
+        availability_engine.mark_busy(agent_id, location_id, start, end)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_appointment_changes(session):
+    session.info.pop("availability_changes", None)
@@ -1,205 +1,360 @@
-import requests
 import logging
+import os
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, UTC
 from flask import current_app
+from src.core.integrations.campfire import campfire_client, pack_sections, split_message
+from src.core.monitoring import handle_error
+from src.services.appointments import BUSINESS_TIMEZONE
+from src.services.code_generator import CodeGeneratorService
+from src.services.sales_rollups import SalesRollupService
 
 logger = logging.getLogger(__name__)
 
+# Most codes the 'bulk' command will post to a room
+CHAT_MAX_BULK_CODES = 50
+
+# Threads per process running chatbot commands and posting their replies
+CHATBOT_WORKERS = int(os.getenv("CHATBOT_WORKERS", "2"))
+# Messages accepted but not yet answered, across all rooms; beyond this the
+# webhook turns messages away rather than queueing without bound
+CHATBOT_MAX_PENDING = int(os.getenv("CHATBOT_MAX_PENDING", "100"))
+
+ERROR_REPLY = "Oops! Something went wrong. Please try again later."
+
 class CommandHandler:
     def handle_help(self, params):
-        return self.get_help_message()
+        return {"message": self.get_help_message()}
 
     def get_help_message(self):
-        return """
-            <div style="line-height: 1.5;">
+        """
+        The help text as a list of self-contained sections (one <div> each),
+        so a long reply is split between sections (see pack_sections).
+        """
+        return [
+            """<div style="line-height: 1.5;">
                 <p>📋 <strong>Available Commands:</strong></p>
-                <br>
-
-                <div>
-                    <strong>1️⃣ Unlimited Package Codes</strong><br>
-                    <strong>Usage:</strong> unlimited duration=[60/90/110] first_name=[NAME] last_name=[NAME] expiration=[YYYY-MM-DD]<br>
-                    <strong>Example:</strong> unlimited duration=90 first_name=Rebecca last_name=Smith expiration=2024-12-31<br>
-                    <em>Generates:</em> UL-90-REBECCA-ABCD12<br>
-                    <em>Description:</em> Unlimited-90-Rebecca Smith-31 Dec 2024
-                </div>
-                <br>
-
-                <div>
-                    <strong>2️⃣ School Group Discount Codes</strong><br>
-                    <strong>Usage:</strong> school discount=[1-100]<br>
-                    <strong>Example:</strong> school discount=20<br>
-                    <em>Generates:</em> SCHL-20-ABCD12
-                </div>
-                <br><br>
-
-                <div>
-                    <strong>3️⃣ Referral Discount Codes</strong><br>
-                    <strong>Usage:</strong> referral first_name=[NAME] discount=[1-100]<br>
-                    <strong>Example:</strong> referral first_name=Jane discount=50<br>
-                    <em>Generates:</em> REF-50-JANE-ABCD12
-                </div>
-                <br>
-
-                <div>
-                    <strong>4️⃣ Free Guest Pass Codes</strong><br>
-                    <strong>Usage:</strong> guest duration=[60/90/110] first_name=[NAME]<br>
-                    <strong>Example:</strong> guest duration=60 first_name=Bob<br>
-                    <em>Generates:</em> FREE-60-BOB-ABCD12
-                </div>
-                <br>
-
-                <div>
-                    <strong>5️⃣ Gift Card Codes</strong><br>
-                    <strong>Usage:</strong> gift amount=[VALUE] type=[DIGITAL/PREMIUM] first_name=[NAME]<br>
-                    <strong>Examples:</strong><br>
-                    With name: gift amount=100 type=DIGITAL first_name=Alice<br>
-                    <em>Generates:</em> GIFT-DGTL-100-ALICE-K7M2P9X4<br>
-                    Without name: gift amount=150 type=PREMIUM<br>
-                    <em>Generates:</em> GIFT-PREM-150-B7K2N8L4
-                </div>
-                <br>
-
-                <div>
-                    <strong>6️⃣ Bulk Premium Gift Cards</strong><br>
-                    <strong>Usage:</strong> bulk amount=[VALUE] quantity=[1-50]<br>
-                    <strong>Example:</strong> bulk amount=50 quantity=2<br>
-                    <em>Generates multiple codes like:</em><br>
-                    GIFT-PREM-50-B7K2N8L4<br>
-                    GIFT-PREM-50-X9Y4M7P2
-                </div>
-                <br>
-
-                <div>
-                    <strong>7️⃣ Personal Massage Codes</strong><br>
-                    <strong>Usage:</strong><br>
-                    Duration-based: personal duration=[60/90/110] first_name=[NAME]<br>
-                    Discount-based: personal discount=[1-100] first_name=[NAME]<br>
-                    <strong>Examples:</strong><br>
-                    Duration: personal duration=90 first_name=Carol<br>
-                    <em>Generates:</em> PERS-90-CAROL-ABCD12<br>
-                    Discount: personal discount=25 first_name=Emily<br>
-                    <em>Generates:</em> PERS-25-EMILY-ABCD12
-                </div>
-                <br>
-
-                <div>
-                    <strong>8️⃣ Daily Report</strong><br>
-                    <strong>Usage:</strong> Get sales and other statistics<br>
-                    <strong>Example:</strong> report
-                </div>
-                <br>
-
-                <div>
-                    <strong>9️⃣ Help</strong><br>
-                    <strong>Usage:</strong> Show this help message<br>
-                    <strong>Example:</strong> help
-                </div>
-                <br>
-
-                <div>
-                    <em>Note: All codes are automatically converted to uppercase. Gift cards use 8-character unique endings, all others use 6 characters.</em>
-                </div>
-                <br>
-
-                <div>
-                    Further information is at <a href="https://github.com/tivadarorosz/rosedale/blob/main/src/api/code_generator/README.md">GitHub Documentation</a>
-                </div>
-            </div>
-            """
+            </div>""",
+            """<div style="line-height: 1.5;">
+                <strong>1️⃣ Unlimited Package Codes</strong><br>
+                <strong>Usage:</strong> unlimited duration=[60/90/110] first_name=[NAME] last_name=[NAME] expiration=[YYYY-MM-DD]<br>
+                <strong>Example:</strong> unlimited duration=90 first_name=Rebecca last_name=Smith expiration=2024-12-31<br>
+                <em>Generates:</em> UL-90-REBECCA-ABCD12<br>
+                <em>Description:</em> Unlimited-90-Rebecca Smith-31 Dec 2024
+            </div>""",
+            """<div style="line-height: 1.5;">
+                <strong>2️⃣ School Group Discount Codes</strong><br>
+                <strong>Usage:</strong> school discount=[1-100]<br>
+                <strong>Example:</strong> school discount=20<br>
+                <em>Generates:</em> SCHL-20-ABCD12
+            </div>""",
+            """<div style="line-height: 1.5;">
+                <strong>3️⃣ Referral Discount Codes</strong><br>
+                <strong>Usage:</strong> referral first_name=[NAME] discount=[1-100]<br>
+                <strong>Example:</strong> referral first_name=Jane discount=50<br>
+                <em>Generates:</em> REF-50-JANE-ABCD12
+            </div>""",
+            """<div style="line-height: 1.5;">
+                <strong>4️⃣ Free Guest Pass Codes</strong><br>
+                <strong>Usage:</strong> guest duration=[60/90/110] first_name=[NAME]<br>
+                <strong>Example:</strong> guest duration=60 first_name=Bob<br>
+                <em>Generates:</em> FREE-60-BOB-ABCD12
+            </div>""",
+            """<div style="line-height: 1.5;">
+                <strong>5️⃣ Gift Card Codes</strong><br>
+                <strong>Usage:</strong> gift amount=[VALUE] type=[DIGITAL/PREMIUM] first_name=[NAME]<br>
+                <strong>Examples:</strong><br>
+                With name: gift amount=100 type=DIGITAL first_name=Alice<br>
+                <em>Generates:</em> GIFT-DGTL-100-ALICE-K7M2P9X4<br>
+                Without name: gift amount=150 type=PREMIUM<br>
+                <em>Generates:</em> GIFT-PREM-150-B7K2N8L4
+            </div>""",
+            """<div style="line-height: 1.5;">
+                <strong>6️⃣ Bulk Premium Gift Cards</strong><br>
+                <strong>Usage:</strong> bulk amount=[VALUE] quantity=[1-50]<br>
+                <strong>Example:</strong> bulk amount=50 quantity=2<br>
+                <em>Generates multiple codes like:</em><br>
+                GIFT-PREM-50-B7K2N8L4<br>
+                GIFT-PREM-50-X9Y4M7P2
+            </div>""",
+            """<div style="line-height: 1.5;">
+                <strong>7️⃣ Personal Massage Codes</strong><br>
+                <strong>Usage:</strong><br>
+                Duration-based: personal duration=[60/90/110] first_name=[NAME]<br>
+                Discount-based: personal discount=[1-100] first_name=[NAME]<br>
+                <strong>Examples:</strong><br>
+                Duration: personal duration=90 first_name=Carol<br>
+                <em>Generates:</em> PERS-90-CAROL-ABCD12<br>
+                Discount: personal discount=25 first_name=Emily<br>
+                <em>Generates:</em> PERS-25-EMILY-ABCD12
+            </div>""",
+            """<div style="line-height: 1.5;">
+                <strong>8️⃣ Daily Report</strong><br>
+                <strong>Usage:</strong> report date=[YYYY-MM-DD/today/yesterday]<br>
+                <strong>Example:</strong> report date=yesterday<br>
+                <em>Shows:</em> Orders, payments and sales by item type, location and source (defaults to today)
+            </div>""",
+            """<div style="line-height: 1.5;">
+                <strong>9️⃣ Help</strong><br>
+                <strong>Usage:</strong> Show this help message<br>
+                <strong>Example:</strong> help
+            </div>""",
+            """<div style="line-height: 1.5;">
+                <em>Note: All codes are automatically converted to uppercase. Gift cards use 8-character unique endings, all others use 6 characters.</em>
+            </div>""",
+            """<div style="line-height: 1.5;">
+                Further information is at <a href="https://github.com/tivadarorosz/rosedale/blob/main/src/api/code_generator/README.md">GitHub Documentation</a>
+            </div>""",
+        ]
 
     def handle_report(self, params):
-        report_message = "Report functionality coming soon"
-        return {"message": report_message}
-
-    def handle_code(self, params):
-        command = "code"
-        result = self.generate_code(command, params)
-        return result
-
-    def get_code_type(self, code):
-        if code.startswith("UL-"):
-            return "unlimited"
-        elif code.startswith("SCHL-"):
-            return "school"
-        elif code.startswith("REF-"):
-            return "referral"
-        elif code.startswith("FREE-"):
-            return "guest"
-        elif code.startswith("GIFT-DGTL-"):
-            return "gift_digital"
-        elif code.startswith("GIFT-PREM-"):
-            return "gift_premium"
-        elif code.startswith("PERS-"):
-            parts = code.split("-")
-            if len(parts) > 1 and parts[1] in ["60", "90", "110"]:
-                return "personal_duration"
-            return "personal_discount"
-        return "unknown"
-
-    def parse_code_request(self, content):
-        parts = content.split()
-        command = parts[0].lower() if parts else ""
-        params = {}
-
-        for part in parts[1:]:
-            if "=" in part:
-                key, value = part.split("=")
-                params[key.lower()] = value
-
-        return command, params
-
-    def generate_code(self, command, params):
-        base_url = current_app.config.get('CODE_GENERATOR_URL')
-        api_key = current_app.config.get('ROSEDALE_API_KEY')
-
-        endpoint_map = {
-            "code": "/generate",
-            # ... other endpoints
-        }
-
-        if command not in endpoint_map:
-            logger.warning(f"Invalid code generation command: {command}")
-            return None
-
-        endpoint = f"{base_url}{endpoint_map[command]}"
-        headers = {"X-API-KEY": api_key}
+        today = datetime.now(UTC).astimezone(BUSINESS_TIMEZONE).date()
+        value = params.get("date", "today").lower()
+        if value == "today":
+            day = today
+        elif value == "yesterday":
+            day = today - timedelta(days=1)
+        else:
+            try:
+                day = datetime.strptime(value, "%Y-%m-%d").date()
+            except ValueError:
+                return {"error": "Invalid date. Use date=YYYY-MM-DD, date=today or date=yesterday"}
+
+        # Read from the daily rollups, so this is quick however long the history
+        report = SalesRollupService.daily_report(day)
+        return {"message": self.format_report(report, day)}
+
+    def format_report(self, report, day):
+        def pounds(pence):
+            return f"£{pence / 100:,.2f}"
+
+        lines = [
+            f"📊 <strong>Daily Report: {day.strftime('%a %d %b %Y')}</strong>",
+            f"Orders: {report['orders']} ({pounds(report['order_total'])})",
+            f"Payments: {report['payments']} ({pounds(report['payment_total'])})",
+        ]
+        if report["cancelled_orders"] or report["failed_payments"]:
+            lines.append(f"Cancelled orders: {report['cancelled_orders']}, failed payments: {report['failed_payments']}")
 
+        if report["by_item_type"]:
+            lines += ["", "<strong>By item type</strong>"]
+            lines += [
+                f"{item_type}: {str(totals['quantity']) + ' sold, ' if totals['quantity'] else ''}{pounds(totals['gross_sales'])}"
+                for item_type, totals in report["by_item_type"].items()
+            ]
+        if report["by_location"]:
+            lines += ["", "<strong>By location</strong>"]
+            lines += [
+                f"{location['location'] or 'No location'}: {pounds(location['gross_sales'])}"
+                for location in report["by_location"]
+            ]
+        if report["by_source"]:
+            lines += ["", "<strong>By source</strong>"]
+            lines += [
+                f"{source}: {totals['orders']} orders, {pounds(totals['payment_total'])} paid"
+                for source, totals in report["by_source"].items()
+            ]
+        if not report["orders"] and not report["payments"]:
+            lines += ["", "<em>No sales recorded for this day.</em>"]
+
+        return "<br>".join(lines)
+
+    def generate(self, generator, *args):
         try:
-            response = requests.get(endpoint, params=params, headers=headers)
-            if response.ok:
-                return response.json()
-            else:
-                error_message = response.json().get("error", "Failed to generate code")
-                logger.warning(f"API request failed: {response.status_code} - {error_message}")
-                return {"error": error_message}
-        except requests.RequestException as e:
-            logger.error(f"Request failed: {str(e)}")
-            return {"error": "Failed to connect to code generator service"}
+            return generator(*args)
+        except ValueError as e:
+            return {"error": str(e)}
+
+    def handle_unlimited(self, params):
+        return self.generate(
+            CodeGeneratorService.unlimited,
+            params.get("duration"), params.get("first_name"), params.get("last_name"), params.get("expiration")
+        )
+
+    def handle_school(self, params):
+        return self.generate(CodeGeneratorService.school, params.get("discount"))
+
+    def handle_referral(self, params):
+        return self.generate(CodeGeneratorService.referral, params.get("first_name"), params.get("discount"))
+
+    def handle_guest(self, params):
+        return self.generate(CodeGeneratorService.guest, params.get("first_name"), params.get("duration"))
+
+    def handle_gift(self, params):
+        return self.generate(
+            CodeGeneratorService.gift_card, params.get("amount"), params.get("type"), params.get("first_name")
+        )
+
+    def handle_bulk(self, params):
+        # Larger batches are for the API; a chat message can't usefully hold them
+        quantity = params.get("quantity")
+        if quantity and quantity.isdigit() and int(quantity) > CHAT_MAX_BULK_CODES:
+            return {"error": f"Invalid quantity. Must be between 1 and {CHAT_MAX_BULK_CODES}"}
+        return self.generate(CodeGeneratorService.bulk_gift_cards, params.get("amount"), quantity)
+
+    def handle_personal(self, params):
+        return self.generate(
+            CodeGeneratorService.personal, params.get("first_name"), params.get("duration"), params.get("discount")
+        )
 
     def handle_customer(self, params):
         # Implement customer-related command handling logic here
         return {"message": "Customer command handled"}
 
-def handle_command(content):
+def parse_command(content):
+    """Split 'command key=value ...' into the command and its parameters"""
     parts = content.split()
     command = parts[0].lower() if parts else ""
     params = {}
 
     for part in parts[1:]:
         if "=" in part:
-            key, value = part.split("=")
+            key, value = part.split("=", 1)
             params[key.lower()] = value
 
-    command_handler = CommandHandler()
-    if command in COMMAND_HANDLERS:
-        return getattr(command_handler, COMMAND_HANDLERS[command])(params)
-    else:
-        logger.warning(f"Unknown command: {command}")
-        return {"error": f"Unknown command: {command}"}
+    return command, params
+
+# Handlers keep no per-message state, so one instance serves every message
+command_handler = CommandHandler()
 
 COMMAND_HANDLERS = {
-    "help": "handle_help",
-    "report": "handle_report",
-    "code": "handle_code",
-    "customer": "handle_customer",
+    "help": command_handler.handle_help,
+    "report": command_handler.handle_report,
+    "unlimited": command_handler.handle_unlimited,
+    "school": command_handler.handle_school,
+    "referral": command_handler.handle_referral,
+    "guest": command_handler.handle_guest,
+    "gift": command_handler.handle_gift,
+    "bulk": command_handler.handle_bulk,
+    "personal": command_handler.handle_personal,
+    "customer": command_handler.handle_customer,
     # Add more commands and their handlers here
-}
\ No newline at end of file
+}
+
+def handle_command(content):
+    command, params = parse_command(content)
+    handler = COMMAND_HANDLERS.get(command)
+    if handler is None:
+        logger.warning(f"Unknown command: {command}")
+        return {"error": f"Unknown command: {command}"}
+    return handler(params)
+
+
+def format_reply(result):
+    """
+    The room message for a command result (a string, or a list of sections
+    for pack_sections), or None if there is nothing to say
+    """
+    if "error" in result:
+        return f"❌ {result['error']}"
+    if "message" in result:
+        return result["message"]
+    if "codes" in result:  # Bulk codes
+        codes_list = "\n".join(result["codes"])
+        return f"""✅ Generated codes:
+{codes_list}
+
+Description: {result.get('description', 'Premium Gift Card')}"""
+    if "code" in result:  # Single code
+        return f"""✅ Generated code:
+{result['code']}
+
+Description: {result.get('description', '')}"""
+    return None
+
+
+class ChatbotDispatcher:
+    """
+    Runs chatbot commands and posts their replies off the webhook request.
+
+    Messages are queued per room and run on a small shared thread pool.
+    A room has at most one message in flight, so its replies come back in
+    the order the messages arrived; after each message the room goes to
+    the back of the pool's queue, so a busy room can't starve the others.
+    """
+
+    def __init__(self, workers: int = CHATBOT_WORKERS, max_pending: int = CHATBOT_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.stats = {"accepted": 0, "rejected": 0, "replied": 0, "failed": 0}
+        self._lock = threading.Lock()
+        # room_id -> messages waiting; a room is present while it has a task scheduled
+        self._rooms = {}
+        self._pending = 0
+        self._executor = None
+        self._pid = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def submit(self, room_id, content: str) -> bool:
+        """
+        Queue a message for its room.
+
+        Returns:
+            False if too many messages are already waiting
+        """
+        app = current_app._get_current_object()
+        with self._lock:
+            # Threads don't survive a fork; gunicorn forks after create_app
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="chatbot")
+                self._rooms = {}
+                self._pending = 0
+            if self._pending >= self.max_pending:
+                self.stats["rejected"] += 1
+                return False
+            self._pending += 1
+            self.stats["accepted"] += 1
+            queue = self._rooms.get(room_id)
+            if queue is not None:
+                queue.append(content)
+                return True
+            self._rooms[room_id] = deque([content])
+            self._executor.submit(self._run_next, app, room_id)
+        return True
+
+    def _run_next(self, app, room_id):
+        with self._lock:
+            content = self._rooms[room_id][0]
+        try:
+            with app.app_context():
+                self._reply(room_id, content)
+        finally:
+            with self._lock:
+                queue = self._rooms[room_id]
+                queue.popleft()
+                self._pending -= 1
+                if queue:
+                    self._executor.submit(self._run_next, app, room_id)
+                else:
+                    del self._rooms[room_id]
+
+    def _reply(self, room_id, content: str):
+        try:
+            message = format_reply(handle_command(content))
+        except Exception as e:
+            logger.error(f"Chatbot command error: {str(e)}")
+            logger.error(traceback.format_exc())
+            handle_error(e, "Campfire chatbot command error")
+            message = ERROR_REPLY
+
+        if message is None:
+            return
+        try:
+            parts = pack_sections(message) if isinstance(message, list) else split_message(message)
+            for part in parts:
+                campfire_client.send_room(room_id, part)
+            self.stats["replied"] += 1
+        except Exception as e:
+            self.stats["failed"] += 1
+            logger.error(f"Error replying to room {room_id}: {str(e)}")
+            handle_error(e, "Campfire chatbot reply error")
+
+
+chatbot_dispatcher = ChatbotDispatcher()
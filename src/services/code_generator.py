@@ -0,0 +1,221 @@
+from datetime import datetime
+from typing import Any, Dict, Optional
+import logging
+from src.services.promo_codes import MAX_BULK_CODES, PromoCodeService
+
+logger = logging.getLogger(__name__)
+
+DURATIONS = ('60', '90', '110')
+
+
+def generate_description(code_type, result):
+    if code_type == "unlimited":
+        duration = result.get("duration")
+        first_name = result.get("first_name")
+        last_name = result.get("last_name")
+        expiration = result.get("expiration")
+        if expiration:
+            return f"Unlimited-{duration}-{first_name} {last_name}-{expiration}"
+        else:
+            return f"Unlimited-{duration}-{first_name} {last_name}"
+    elif code_type == "school":
+        discount = result.get("discount")
+        return f"School Group Discount - {discount}% off"
+    elif code_type == "referral":
+        first_name = result.get("first_name")
+        discount = result.get("discount")
+        return f"Friend & Family Referral - {first_name} gets {discount}% off"
+    elif code_type == "guest":
+        duration = result.get("duration")
+        first_name = result.get("first_name")
+        return f"Free Session Guest Pass - {duration} minutes for {first_name}"
+    elif code_type == "gift_digital":
+        amount = result.get("amount")
+        first_name = result.get("first_name")
+        return f"Digital Gift Card - {first_name} gets £{amount}"
+    elif code_type == "gift_premium":
+        amount = result.get("amount")
+        return f"Premium Gift Card - £{amount}"
+    elif code_type == "personal_duration":
+        duration = result.get("duration")
+        first_name = result.get("first_name")
+        return f"Personal Duration Package - {duration} minutes for {first_name}"
+    elif code_type == "personal_discount":
+        discount = result.get("discount")
+        first_name = result.get("first_name")
+        return f"Personal Discount Code - {first_name} gets {discount}% off"
+    else:
+        return "Unknown Code Type"
+
+
+def validate_duration(duration):
+    return duration in DURATIONS
+
+
+def validate_discount(discount, discount_type="fixed"):
+    try:
+        discount_value = int(discount)
+        if discount_type in ["variable", "school"]:
+            return 1 <= discount_value <= 100
+        return discount in ['20', '50']  # fixed type
+    except (ValueError, TypeError):
+        return False
+
+
+def issue_code(prefix, code_type, details, suffix_length=8):
+    """Generate and record one code; returns the code and its description"""
+    description = generate_description(code_type, details)
+    code = PromoCodeService.issue(
+        prefix, code_type, suffix_length=suffix_length, description=description, details=details
+    )[0]
+    return code, description
+
+
+class CodeGeneratorService:
+    """
+    Promo code generation, shared by the code generator API and the
+    Campfire chatbot.
+
+    Parameters are the strings the API and chat commands receive. Invalid
+    ones raise ValueError with a message fit to show the caller.
+    """
+
+    @staticmethod
+    def unlimited(
+        duration: Optional[str],
+        first_name: Optional[str],
+        last_name: Optional[str],
+        expiration: Optional[str] = None
+    ) -> Dict[str, Any]:
+        if not duration or not validate_duration(duration):
+            raise ValueError("Invalid duration. Must be 60, 90, or 110")
+        if not first_name:
+            raise ValueError("Missing first_name parameter")
+        if not last_name:
+            raise ValueError("Missing last_name parameter")
+
+        formatted_date = None
+        if expiration:
+            try:
+                formatted_date = datetime.strptime(expiration, "%Y-%m-%d").strftime("%d %b %Y")
+            except ValueError:
+                raise ValueError("Invalid expiration date format. Use YYYY-MM-DD")
+
+        code, description = issue_code(f"UL-{duration}-{first_name.upper()}", "unlimited", {
+            "duration": duration, "first_name": first_name, "last_name": last_name, "expiration": expiration
+        }, suffix_length=6)
+        logger.info(f"Generated unlimited code for {first_name} {last_name}")
+        return {
+            "code": code,
+            "duration": duration,
+            "first_name": first_name,
+            "last_name": last_name,
+            "expiration": formatted_date,
+            "description": description
+        }
+
+    @staticmethod
+    def school(discount: Optional[str]) -> Dict[str, Any]:
+        if not discount or not validate_discount(discount, "school"):
+            raise ValueError("Invalid discount. Must be between 1 and 100")
+
+        code, description = issue_code(f"SCHL-{discount}", "school", {"discount": discount}, suffix_length=6)
+        logger.info(f"Generated school code with discount {discount}")
+        return {"code": code, "discount": discount, "description": description}
+
+    @staticmethod
+    def referral(first_name: Optional[str], discount: Optional[str]) -> Dict[str, Any]:
+        if not first_name:
+            raise ValueError("Missing first_name parameter")
+        if not discount or not validate_discount(discount, "variable"):
+            raise ValueError("Invalid discount. Must be between 1 and 100")
+
+        code, description = issue_code(
+            f"REF-{discount}-{first_name.upper()}", "referral",
+            {"first_name": first_name, "discount": discount}, suffix_length=6
+        )
+        logger.info(f"Generated referral code for {first_name}")
+        return {"code": code, "first_name": first_name, "discount": discount, "description": description}
+
+    @staticmethod
+    def guest(first_name: Optional[str], duration: Optional[str]) -> Dict[str, Any]:
+        if not first_name:
+            raise ValueError("Missing first_name parameter")
+        if not duration or not validate_duration(duration):
+            raise ValueError("Invalid duration. Must be 60, 90, or 110")
+
+        code, description = issue_code(
+            f"FREE-{duration}-{first_name.upper()}", "guest",
+            {"first_name": first_name, "duration": duration}, suffix_length=6
+        )
+        logger.info(f"Generated guest pass code for {first_name}")
+        return {"code": code, "first_name": first_name, "duration": duration, "description": description}
+
+    @staticmethod
+    def gift_card(amount: Optional[str], card_type: Optional[str], first_name: Optional[str] = None) -> Dict[str, Any]:
+        if not amount:
+            raise ValueError("Missing amount parameter")
+        if not card_type or card_type.upper() not in ['DIGITAL', 'PREMIUM']:
+            raise ValueError("Invalid card type. Must be DIGITAL or PREMIUM")
+
+        type_code = 'DGTL' if card_type.upper() == 'DIGITAL' else 'PREM'
+        prefix = f"GIFT-{type_code}-{amount}"
+        if first_name:
+            prefix = f"{prefix}-{first_name.upper()}"
+
+        code, description = issue_code(
+            prefix, f"gift_{card_type.lower()}", {"amount": amount, "first_name": first_name}
+        )
+        logger.info(f"Generated gift card code: {code}")
+
+        result = {"code": code, "amount": amount, "description": description}
+        if first_name:
+            result["first_name"] = first_name
+        return result
+
+    @staticmethod
+    def bulk_gift_cards(amount: Optional[str], quantity: Optional[str]) -> Dict[str, Any]:
+        if not amount or not amount.isdigit() or int(amount) <= 0:
+            raise ValueError("Invalid amount. Must be a whole number of pounds")
+        if not quantity or not str(quantity).isdigit() or not 1 <= int(quantity) <= MAX_BULK_CODES:
+            raise ValueError(f"Invalid quantity. Must be between 1 and {MAX_BULK_CODES}")
+        quantity = int(quantity)
+
+        details = {"amount": amount}
+        description = generate_description("gift_premium", details)
+        batch = PromoCodeService.issue_batch(
+            f"GIFT-PREM-{amount}", "gift_premium", quantity, description=description, details=details
+        )
+        logger.info(f"Generated {quantity} premium gift card codes of {amount}")
+        return {
+            "codes": batch["codes"],
+            "amount": amount,
+            "quantity": quantity,
+            "batch_id": batch["batch_id"],
+            "description": description
+        }
+
+    @staticmethod
+    def personal(
+        first_name: Optional[str],
+        duration: Optional[str] = None,
+        discount: Optional[str] = None
+    ) -> Dict[str, Any]:
+        if not first_name:
+            raise ValueError("Missing first_name parameter")
+        if bool(duration) == bool(discount):
+            raise ValueError("Give either duration (60, 90 or 110) or discount (1-100)")
+        if duration and not validate_duration(duration):
+            raise ValueError("Invalid duration. Must be 60, 90, or 110")
+        # A discount that reads as a duration would parse back as one
+        if discount and (not validate_discount(discount, "variable") or validate_duration(discount)):
+            raise ValueError("Invalid discount. Must be between 1 and 100 (other than 60 and 90)")
+
+        code_type = "personal_duration" if duration else "personal_discount"
+        details = {"first_name": first_name, "duration": duration} if duration else \
+            {"first_name": first_name, "discount": discount}
+        code, description = issue_code(
+            f"PERS-{duration or discount}-{first_name.upper()}", code_type, details, suffix_length=6
+        )
+        logger.info(f"Generated personal code for {first_name}")
+        return {"code": code, **details, "description": description}
@@ -1,14 +1,25 @@
+from sqlalchemy import update, values, column, literal_column, Integer, String
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql import func
 from sqlalchemy.exc import IntegrityError, SQLAlchemyError
 from sqlalchemy.orm.exc import NoResultFound
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, Tuple
 import logging
 from functools import wraps
 from src.models import Customer
 from src.core.monitoring import handle_error
 from src.extensions import db
+from src.services.email_outbox import EmailOutboxService
+from src.services.email_service import build_welcome_email
 
 logger = logging.getLogger(__name__)
 
+# Fields each platform may overwrite on a customer that already exists
+WEBHOOK_UPDATE_FIELDS = {
+    "latepoint": ["booking_system_id", "first_name", "last_name", "gender", "massage_preferences"],
+    "square": ["payment_system_id", "phone_number", "address"],
+}
+
 
 def handle_exceptions(f):
     @wraps(f)
@@ -84,12 +95,14 @@ class CustomerService:
 
     @staticmethod
     @handle_exceptions
-    def create_customer(data: Dict[str, Any]) -> Customer:
+    def create_customer(data: Dict[str, Any], send_welcome_email: bool = False) -> Customer:
         """
         Creates a new Customer object based on the provided data dictionary.
 
         Args:
             data: A dictionary of attributes for the new Customer.
+            send_welcome_email: Queue a welcome email in the email outbox, in the
+                same transaction as the new customer.
 
         Returns:
             The newly created Customer object.
@@ -101,6 +114,12 @@ class CustomerService:
         # Add the new customer to the session and commit
         db.session.add(customer)
         try:
+            if send_welcome_email and customer.email:
+                db.session.flush()
+                EmailOutboxService.enqueue(
+                    idempotency_key=f"welcome:{customer.id}",
+                    **build_welcome_email(customer.email, customer.first_name or "there")
+                )
             db.session.commit()
         except IntegrityError as e:
             db.session.rollback()
@@ -139,6 +158,84 @@ class CustomerService:
             # If the customer does not exist, return None
             return None
 
+    @staticmethod
+    @handle_exceptions
+    def upsert_from_webhook(
+        data: Dict[str, Any],
+        platform: str,
+        send_welcome_email: bool = False
+    ) -> Tuple[int, bool]:
+        """
+        Create a customer, or update the existing customer with the same email,
+        in a single INSERT ... ON CONFLICT (email) DO UPDATE ... RETURNING.
+
+        Only the platform's fields (WEBHOOK_UPDATE_FIELDS) are overwritten on
+        an existing customer. Concurrent webhooks for the same email cannot
+        race into an IntegrityError, since Postgres resolves the conflict.
+
+        Args:
+            data: Customer attributes built from the webhook payload
+            platform: 'latepoint' or 'square'
+            send_welcome_email: Queue a welcome email if the customer is new,
+                in the same transaction
+
+        Returns:
+            Tuple of the customer ID and True if the customer was created
+        """
+        update_fields = [field for field in WEBHOOK_UPDATE_FIELDS[platform] if field in data]
+
+        stmt = insert(Customer).values(**data)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Customer.email],
+            set_={
+                **{field: stmt.excluded[field] for field in update_fields},
+                "updated_at": func.now(),
+            }
+        ).returning(
+            Customer.id,
+            # xmax is only 0 on a freshly inserted row version
+            (literal_column("xmax") == 0).label("inserted")
+        )
+
+        customer_id, inserted = db.session.execute(stmt).one()
+        if inserted and send_welcome_email:
+            EmailOutboxService.enqueue(
+                idempotency_key=f"welcome:{customer_id}",
+                **build_welcome_email(data["email"], data.get("first_name") or "there")
+            )
+        db.session.commit()
+        return customer_id, inserted
+
+    @staticmethod
+    @handle_exceptions
+    def bulk_update_genders(genders: List[Tuple[int, str]]) -> int:
+        """
+        Set the gender of many customers with a single UPDATE ... FROM (VALUES ...).
+
+        Args:
+            genders: (customer_id, gender) pairs
+
+        Returns:
+            int: Number of rows updated
+        """
+        if not genders:
+            return 0
+
+        new_genders = values(
+            column("id", Integer),
+            column("gender", String),
+            name="new_genders"
+        ).data(genders)
+
+        result = db.session.execute(
+            update(Customer)
+            .where(Customer.id == new_genders.c.id)
+            .values(gender=new_genders.c.gender)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        return result.rowcount
+
     @staticmethod
     @handle_exceptions
     def delete_customer(customer_id: int) -> bool:
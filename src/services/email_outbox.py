@@ -0,0 +1,325 @@
+from datetime import datetime, timedelta, UTC
+from typing import Optional, Dict, Any, List
+import logging
+from sqlalchemy import select, update, and_, or_, bindparam
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.sql import func
+from flask import current_app
+from src.models import EmailOutbox
+from src.core.monitoring import handle_error
+from src.extensions import db
+from src.services.webhook_jobs import compute_backoff
+
+logger = logging.getLogger(__name__)
+
+# An email stuck in 'sending' for longer than this is assumed to belong to a
+# crashed sender and becomes claimable again
+DEFAULT_LEASE_SECONDS = 300
+
+# Window for the throughput and delivery lag metrics
+METRICS_WINDOW_SECONDS = 300
+
+CLAIM_COLUMNS = (
+    EmailOutbox.id,
+    EmailOutbox.idempotency_key,
+    EmailOutbox.to_email,
+    EmailOutbox.subject,
+    EmailOutbox.template,
+    EmailOutbox.context,
+    EmailOutbox.html_content,
+    EmailOutbox.from_email,
+    EmailOutbox.reply_to,
+    EmailOutbox.attempts,
+    EmailOutbox.max_attempts,
+)
+
+
+class EmailOutboxService:
+    @staticmethod
+    def enqueue(
+        to_email: str,
+        subject: str,
+        idempotency_key: str,
+        template: Optional[str] = None,
+        context: Optional[Dict[str, Any]] = None,
+        html_content: Optional[str] = None,
+        from_email: Optional[str] = None,
+        reply_to: Optional[str] = None
+    ) -> bool:
+        """
+        Add an email to the outbox as part of the current transaction.
+
+        Nothing is committed here: the email is only sent if the caller's
+        business change commits, and is dropped if it rolls back.
+
+        Args:
+            to_email: Recipient address
+            subject: Email subject
+            idempotency_key: Unique key for this email, e.g. 'welcome:42'
+            template: Template name, rendered at send time with `context`
+            context: JSON-serialisable template variables
+            html_content: Pre-rendered body, if no template is used
+            from_email: Optional sender address
+            reply_to: Optional reply-to address
+
+        Returns:
+            False if an email with this idempotency key already exists
+        """
+        if not template and html_content is None:
+            raise ValueError("Either template or html_content is required")
+
+        stmt = insert(EmailOutbox).values(
+            idempotency_key=idempotency_key,
+            to_email=to_email,
+            subject=subject,
+            template=template,
+            context=context,
+            html_content=html_content,
+            from_email=from_email,
+            reply_to=reply_to,
+            max_attempts=current_app.config.get("EMAIL_OUTBOX_MAX_ATTEMPTS", 8)
+        ).on_conflict_do_nothing(index_elements=[EmailOutbox.idempotency_key])
+
+        created = db.session.execute(stmt).rowcount == 1
+        if not created:
+            logger.info(f"Email {idempotency_key} already in outbox, skipping")
+        return created
+
+    @staticmethod
+    def enqueue_many(emails: List[Dict[str, Any]]) -> int:
+        """
+        Add several emails to the outbox with one multi-row INSERT, as part of
+        the current transaction. Nothing is committed here.
+
+        Args:
+            emails: Dicts with the keyword arguments accepted by enqueue
+
+        Returns:
+            int: Number of emails added (existing idempotency keys are skipped)
+        """
+        if not emails:
+            return 0
+
+        max_attempts = current_app.config.get("EMAIL_OUTBOX_MAX_ATTEMPTS", 8)
+        rows = []
+        for email in emails:
+            if not email.get("template") and email.get("html_content") is None:
+                raise ValueError("Either template or html_content is required")
+            rows.append({
+                "idempotency_key": email["idempotency_key"],
+                "to_email": email["to_email"],
+                "subject": email["subject"],
+                "template": email.get("template"),
+                "context": email.get("context"),
+                "html_content": email.get("html_content"),
+                "from_email": email.get("from_email"),
+                "reply_to": email.get("reply_to"),
+                "max_attempts": max_attempts,
+            })
+
+        stmt = (
+            insert(EmailOutbox)
+            .values(rows)
+            .on_conflict_do_nothing(index_elements=[EmailOutbox.idempotency_key])
+            .returning(EmailOutbox.id)
+        )
+        created = len(db.session.execute(stmt).all())
+        if created < len(rows):
+            logger.info(f"{len(rows) - created} of {len(rows)} emails already in outbox, skipped")
+        return created
+
+    @staticmethod
+    def claim_batch(limit: int = 50, lease_seconds: int = DEFAULT_LEASE_SECONDS) -> List[Dict[str, Any]]:
+        """
+        Claim up to `limit` sendable emails for this sender.
+
+        A single UPDATE ... WHERE id IN (SELECT ... FOR UPDATE SKIP LOCKED)
+        RETURNING marks the rows as 'sending' and returns them, so concurrent
+        senders never block on, or double-claim, the same email.
+
+        Args:
+            limit: Maximum number of emails to claim
+            lease_seconds: Age after which a 'sending' email is reclaimed
+
+        Returns:
+            List of claimed emails as dicts (attempts already incremented)
+        """
+        now = datetime.now(UTC)
+        stale_before = now - timedelta(seconds=lease_seconds)
+
+        claimable = (
+            select(EmailOutbox.id)
+            .where(
+                or_(
+                    and_(EmailOutbox.status == "pending", EmailOutbox.available_at <= now),
+                    and_(EmailOutbox.status == "sending", EmailOutbox.locked_at < stale_before),
+                )
+            )
+            .order_by(EmailOutbox.available_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .scalar_subquery()
+        )
+        stmt = (
+            update(EmailOutbox)
+            .where(EmailOutbox.id.in_(claimable))
+            .values(status="sending", locked_at=now, attempts=EmailOutbox.attempts + 1)
+            .returning(*CLAIM_COLUMNS)
+            .execution_options(synchronize_session=False)
+        )
+        emails = [dict(row._mapping) for row in db.session.execute(stmt)]
+        db.session.commit()
+        return emails
+
+    @staticmethod
+    def to_message(email: Dict[str, Any]) -> Dict[str, Any]:
+        """Convert a claimed outbox row into an EmailService.send_message message"""
+        return {
+            "to_email": email["to_email"],
+            "subject": email["subject"],
+            "template": email["template"],
+            "context": email["context"],
+            "html_content": email["html_content"],
+            "from_email": email["from_email"],
+            "reply_to": email["reply_to"],
+            "idempotency_key": email["idempotency_key"],
+        }
+
+    @staticmethod
+    def record_results(emails: List[Dict[str, Any]], results: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        Store the outcome of a sent batch.
+
+        Sent emails are marked 'sent'. Failures are retried with exponential
+        backoff, or dead-lettered when they are not retryable or out of
+        attempts. Updates only apply while the row is still held by this
+        claim (same attempt number), so a sender whose lease expired can't
+        overwrite a newer attempt.
+
+        Args:
+            emails: Claimed emails, as returned by claim_batch
+            results: send_message results, in the same order
+
+        Returns:
+            Dict with the number of emails 'sent', 'retried' and 'dead'
+        """
+        now = datetime.now(UTC)
+        table = EmailOutbox.__table__
+        sent, retried, dead = [], [], []
+
+        for email, result in zip(emails, results):
+            params = {"b_id": email["id"], "b_attempts": email["attempts"]}
+            if result["status"] == "sent":
+                message_id = (result.get("response") or {}).get("MessageID")
+                sent.append({**params, "b_message_id": message_id})
+            elif not result.get("retryable", True) or email["attempts"] >= email["max_attempts"]:
+                dead.append({**params, "b_error": result.get("error")})
+            else:
+                delay = compute_backoff(email["attempts"])
+                retried.append({
+                    **params,
+                    "b_error": result.get("error"),
+                    "b_available_at": now + timedelta(seconds=delay),
+                })
+
+        held = and_(
+            table.c.id == bindparam("b_id"),
+            table.c.status == "sending",
+            table.c.attempts == bindparam("b_attempts"),
+        )
+        if sent:
+            db.session.execute(
+                table.update().where(held).values(
+                    status="sent",
+                    sent_at=now,
+                    provider_message_id=bindparam("b_message_id"),
+                    locked_at=None,
+                    last_error=None,
+                ),
+                sent
+            )
+        if retried:
+            db.session.execute(
+                table.update().where(held).values(
+                    status="pending",
+                    available_at=bindparam("b_available_at"),
+                    last_error=bindparam("b_error"),
+                    locked_at=None,
+                ),
+                retried
+            )
+        if dead:
+            db.session.execute(
+                table.update().where(held).values(
+                    status="dead",
+                    last_error=bindparam("b_error"),
+                    locked_at=None,
+                ),
+                dead
+            )
+        db.session.commit()
+
+        for params in dead:
+            logger.error(f"Outbox email {params['b_id']} moved to dead-letter: {params['b_error']}")
+            handle_error(
+                RuntimeError(f"Outbox email {params['b_id']} failed: {params['b_error']}"),
+                "Email moved to dead-letter",
+                fingerprint=f"email_outbox.dead:{params['b_id']}"
+            )
+        for params in retried:
+            logger.warning(f"Outbox email {params['b_id']} failed, retrying at {params['b_available_at']:%H:%M:%S}: {params['b_error']}")
+
+        return {"sent": len(sent), "retried": len(retried), "dead": len(dead)}
+
+    @staticmethod
+    def requeue_dead() -> int:
+        """
+        Move dead-lettered emails back to the outbox with a fresh attempt budget.
+
+        Returns:
+            int: Number of emails requeued
+        """
+        result = db.session.execute(
+            update(EmailOutbox)
+            .where(EmailOutbox.status == "dead")
+            .values(status="pending", attempts=0, available_at=datetime.now(UTC), last_error=None)
+        )
+        db.session.commit()
+        return result.rowcount
+
+    @staticmethod
+    def get_metrics() -> Dict[str, Any]:
+        """
+        Queue depth, lag and throughput of the outbox.
+
+        Returns:
+            Dict with counts of 'pending', 'sending' and 'dead' emails,
+            'oldest_pending_seconds' (queue lag), and over the last
+            METRICS_WINDOW_SECONDS: 'sent', 'sent_per_minute' and
+            'mean_delivery_seconds' (enqueue to send)
+        """
+        window_start = func.now() - timedelta(seconds=METRICS_WINDOW_SECONDS)
+        recently_sent = EmailOutbox.sent_at >= window_start
+        unsent = EmailOutbox.status.in_(["pending", "sending"])
+
+        row = db.session.execute(
+            select(
+                func.count().filter(EmailOutbox.status == "pending"),
+                func.count().filter(EmailOutbox.status == "sending"),
+                func.count().filter(EmailOutbox.status == "dead"),
+                func.extract("epoch", func.now() - func.min(EmailOutbox.created_at).filter(unsent)),
+                func.count().filter(recently_sent),
+                func.extract("epoch", func.avg(EmailOutbox.sent_at - EmailOutbox.created_at).filter(recently_sent)),
+            ).where(or_(unsent, EmailOutbox.status == "dead", recently_sent))
+        ).one()
+
+        pending, sending, dead, oldest, sent, mean_delivery = row
+        return {
+            "pending": pending,
+            "sending": sending,
+            "dead": dead,
+            "oldest_pending_seconds": round(float(oldest), 1) if oldest is not None else 0.0,
+            "sent": sent,
+            "sent_per_minute": round(sent * 60 / METRICS_WINDOW_SECONDS, 1),
+            "mean_delivery_seconds": round(float(mean_delivery), 2) if mean_delivery is not None else None,
+        }
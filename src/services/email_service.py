@@ -1,38 +1,137 @@
+import ipaddress
 import logging
 import os
+import threading
 import time
-from typing import Optional, Dict, Any
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Optional, Dict, Any, Iterable, List, Tuple
 
-import dns.resolver
 import requests
-from jinja2 import Environment, FileSystemLoader
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
 from src.core.monitoring import handle_error
+from src.services.email_templates import get_template_env, render_email
+from src.utils.dns_cache import DNSCache, resolve_a_records
+from src.utils.metrics import LatencyRecorder
 
 logger = logging.getLogger(__name__)
 
+SENDLAYER_API_URL = os.getenv("SENDLAYER_API_URL", "https://api.sendlayer.com/v1/emails")
+
+# Set to 0 to use the system resolver instead of the cached DNS override
+EMAIL_DNS_OVERRIDE = os.getenv("EMAIL_DNS_OVERRIDE", "1").lower() in ("1", "true")
+
+# Parallel SendLayer requests per send_bulk call (keep within the session pool size)
+EMAIL_BULK_CONCURRENCY = int(os.getenv("EMAIL_BULK_CONCURRENCY", "8"))
+
+# How many times a throttled (429) send is retried before giving up
+EMAIL_THROTTLE_RETRIES = int(os.getenv("EMAIL_THROTTLE_RETRIES", "5"))
+
+
+def _retry_after_seconds(response: requests.Response, attempt: int) -> float:
+	"""Seconds to wait after a 429, from Retry-After (seconds or HTTP date) or exponential backoff"""
+	retry_after = response.headers.get("Retry-After")
+	if retry_after:
+		try:
+			return max(float(retry_after), 0.0)
+		except ValueError:
+			try:
+				return max((parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds(), 0.0)
+			except (TypeError, ValueError):
+				pass
+	return min(2 ** (attempt - 1), 30)
+
+
+class _ThrottleGate:
+	"""Shared pause point: once SendLayer throttles one request, every sender waits"""
+	def __init__(self):
+		self._until = 0.0
+		self._lock = threading.Lock()
+
+	def wait(self):
+		delay = self._until - time.monotonic()
+		if delay > 0:
+			time.sleep(delay)
+
+	def pause(self, seconds: float):
+		with self._lock:
+			self._until = max(self._until, time.monotonic() + seconds)
+
+
+def _is_ip_address(hostname: str) -> bool:
+	try:
+		ipaddress.ip_address(hostname)
+		return True
+	except ValueError:
+		return False
+
+
+class SendRetry(Retry):
+	"""Retries for sending an email, which isn't idempotent: after a 408 or 5xx, or a
+	read timeout, SendLayer may already have accepted it. Only a 503 that says when to
+	come back (Retry-After) is known not to have been; the outbox retries the rest.
+	429s are handled by EmailService, so concurrent senders back off together."""
+	RETRY_AFTER_STATUS_CODES = frozenset({503})
+
+
+class HostnameAdapter(HTTPAdapter):
+	"""Adapter for requests sent to a resolved IP that keeps TLS (SNI and certificate checks) on the original hostname"""
+	def __init__(self, hostname: str, **kwargs):
+		self.hostname = hostname
+		super().__init__(**kwargs)
+
+	def init_poolmanager(self, *args, **kwargs):
+		kwargs["server_hostname"] = self.hostname
+		kwargs["assert_hostname"] = self.hostname
+		super().init_poolmanager(*args, **kwargs)
+
+
 class DNSEnforcedSession(requests.Session):
-	"""Custom session class with enhanced DNS resolution for Kubernetes environments"""
-	def __init__(self, *args, **kwargs):
+	"""Custom session class with enhanced DNS resolution for Kubernetes environments.
+
+	Lookups go through a TTL-respecting DNSCache, and connections to the
+	resolved address are pooled per hostname, so keep-alive survives across
+	requests for as long as the address stays the same.
+	"""
+	def __init__(self, dns_override: bool = True, dns_cache: Optional[DNSCache] = None, pool_maxsize: int = 10):
 		super().__init__()
-		self.resolver = self._configure_dns()
+		self.dns_cache = None
+		if dns_override:
+			resolver = self._configure_dns()
+			if dns_cache:
+				self.dns_cache = dns_cache
+			elif resolver:
+				self.dns_cache = DNSCache(lambda hostname: resolve_a_records(resolver, hostname))
+		self.dns_timings = LatencyRecorder()
+		self.pool_maxsize = pool_maxsize
+		self._host_adapters = {}
+		self._local = threading.local()
 		
-		# Configure retry strategy
-		retry_strategy = Retry(
+		# Configure retry strategy: connection failures, and 503s with Retry-After (see SendRetry)
+		self.retry_strategy = SendRetry(
 			total=3,  # total number of retries
+			connect=3,
+			# A read timeout may mean the email was accepted; don't send it again
+			read=0,
+			status=3,
+			status_forcelist=(),
+			allowed_methods=frozenset({"POST"}),
 			backoff_factor=1,  # wait 1, 2, 4 seconds between retries
-			status_forcelist=[408, 429, 500, 502, 503, 504],
-			allowed_methods=["HEAD", "GET", "PUT", "DELETE", "OPTIONS", "TRACE", "POST"]
+			respect_retry_after_header=True,
+			# Hand the last response back, so the caller decides whether it's retryable
+			raise_on_status=False,
 		)
-		adapter = HTTPAdapter(max_retries=retry_strategy)
+		adapter = HTTPAdapter(max_retries=self.retry_strategy, pool_maxsize=pool_maxsize)
 		self.mount("https://", adapter)
 
 	@staticmethod
 	def _configure_dns():
 		"""Configure DNS resolver with Kubernetes settings"""
 		try:
+			# Imported here so app start-up doesn't pay for it
+			import dns.resolver
 			resolver = dns.resolver.Resolver()
 			
 			# Get DNS settings from resolv.conf
@@ -59,35 +158,80 @@ class DNSEnforcedSession(requests.Session):
 			logger.error(f"Error configuring DNS resolver: {e}")
 			return None
 
+	def get_adapter(self, url):
+		"""Route requests rewritten to an IP through that hostname's pooled adapter"""
+		hostname = getattr(self._local, "hostname", None)
+		if hostname and url.startswith("https://"):
+			adapter = self._host_adapters.get(hostname)
+			if adapter is None:
+				adapter = self._host_adapters.setdefault(
+					hostname,
+					HostnameAdapter(hostname, max_retries=self.retry_strategy, pool_maxsize=self.pool_maxsize)
+				)
+			return adapter
+		return super().get_adapter(url)
+
 	def send(self, request, **kwargs):
 		"""Override send to implement custom DNS resolution"""
+		self._local.hostname = None
 		try:
 			url_parts = requests.utils.urlparse(request.url)
-			if url_parts.hostname and self.resolver:
-				try:
-					# Try DNS resolution
-					answers = self.resolver.resolve(url_parts.hostname, 'A')
-					ip = answers[0].address
-					logger.info(f"Resolved {url_parts.hostname} to {ip}")
-					
+			if url_parts.hostname and self.dns_cache and not _is_ip_address(url_parts.hostname):
+				started = time.perf_counter()
+				ip = self.dns_cache.resolve(url_parts.hostname)
+				self.dns_timings.record((time.perf_counter() - started) * 1000)
+
+				if ip:
 					# Replace hostname with IP in URL
-					new_url = request.url.replace(url_parts.hostname, ip)
-					request.url = new_url
+					netloc = ip if url_parts.port is None else f"{ip}:{url_parts.port}"
+					request.url = url_parts._replace(netloc=netloc).geturl()
 					
 					# Preserve original hostname in headers
-					request.headers['Host'] = url_parts.hostname
-				except Exception as e:
-					logger.warning(f"DNS resolution failed for {url_parts.hostname}: {e}")
-					# Continue with original URL if resolution fails
+					request.headers['Host'] = url_parts.netloc
+					self._local.hostname = url_parts.hostname
+				# Continue with original URL if resolution fails
 		except Exception as e:
 			logger.error(f"Error in custom DNS resolution: {e}")
 		
 		return super().send(request, **kwargs)
 
+	def close(self):
+		for adapter in self._host_adapters.values():
+			adapter.close()
+		super().close()
+
+def build_welcome_email(to_email: str, name: str, newsletter_subscribed: bool = False) -> Dict[str, Any]:
+	"""
+	Build the welcome email for a new customer as a send_message / outbox message
+
+	Args:
+		to_email: Customer's email address
+		name: Customer's name
+		newsletter_subscribed: Boolean indicating if already subscribed
+	"""
+	return {
+		"to_email": to_email,
+		"subject": "Welcome to Rosedale Massage",
+		"template": "welcome_customer",
+		"context": {
+			"name": name,
+			"newsletter_subscribed": newsletter_subscribed,
+			"newsletter_signup_url": f"{os.getenv('NEWSLETTER_SIGNUP_URL', 'https://rosedalemassage.co.uk/newsletter')}?email={to_email}",
+			"booking_url": os.getenv("BOOKING_URL", "https://booking.rosedalemassage.co.uk")
+		},
+		"reply_to": "hello@rosedalemassage.co.uk"
+	}
+
+
 class EmailService:
-	"""Email service using SendLayer with enhanced DNS resolution and templates"""
+	"""Email service using SendLayer with enhanced DNS resolution and templates.
+
+	Use get_email_service() rather than constructing it directly: the
+	instance is shared per worker so its connection pool and DNS cache
+	survive across sends.
+	"""
 	
-	def __init__(self):
+	def __init__(self, dns_override: bool = EMAIL_DNS_OVERRIDE):
 		self.api_key = os.getenv("SENDLAYER_API_KEY")
 		if not self.api_key:
 			raise ValueError("SENDLAYER_API_KEY environment variable is not set")
@@ -100,14 +244,12 @@ class EmailService:
 		self.booking_url = os.getenv("BOOKING_URL", "https://booking.rosedalemassage.co.uk")
 		self.tracking_base_url = os.getenv("TRACKING_BASE_URL", "https://www.royalmail.com/track-your-item#/tracking/")
 		
-		self.session = DNSEnforcedSession()
+		self.session = DNSEnforcedSession(dns_override=dns_override)
+		self.send_timings = LatencyRecorder()
+		self._throttle = _ThrottleGate()
 		
-		# Initialize Jinja2 environment for templates
-		template_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates', 'email')
-		self.jinja_env = Environment(
-			loader=FileSystemLoader(template_dir),
-			autoescape=True
-		)
+		# Shared, precompiled template environment (see precompile_templates)
+		self.jinja_env = get_template_env()
 		
 		# Configure session headers
 		self.session.headers.update({
@@ -116,26 +258,80 @@ class EmailService:
 			"User-Agent": "RosedaleMassage/1.0"
 		})
 
-	def _render_template(self, template_name: str, context: Dict[str, Any]) -> str:
-		"""Render an HTML template with the given context"""
+	def _render_template(self, template_name: str, context: Dict[str, Any], subject: str = "") -> str:
+		"""Render an HTML template with the given context inside the base layout"""
 		try:
-			# Load the template
-			template = self.jinja_env.get_template(f"{template_name}.html")
-			
-			# Add any global context values
-			context.update({
-				"booking_url": self.booking_url,
-				"support_email": self.default_reply_to,
-				"website_url": "https://www.rosedalemassage.co.uk"
-			})
-			
-			# Render the template
-			return template.render(**context)
+			return render_email(template_name, context, subject=subject)
 		except Exception as e:
 			error_context = f"Failed to render template: {template_name}"
 			handle_error(e, error_context)
 			raise
 			
+	def _build_payload(
+		self,
+		to_email: str,
+		subject: str,
+		html_content: str,
+		from_email: Optional[str] = None,
+		reply_to: Optional[str] = None,
+		cc: Optional[list] = None,
+		bcc: Optional[list] = None,
+		track_opens: bool = True,
+		track_clicks: bool = True
+	) -> Dict[str, Any]:
+		data = {
+			"from": from_email or self.default_from_email,
+			"reply_to": reply_to or self.default_reply_to,  # Always include reply-to
+			"to": to_email,
+			"subject": subject,
+			"html": html_content,
+			"track_opens": track_opens,
+			"track_clicks": track_clicks
+		}
+		
+		if cc:
+			data["cc"] = cc
+		if bcc:
+			data["bcc"] = bcc
+		return data
+
+	def _post_email(self, data: Dict[str, Any], idempotency_key: Optional[str] = None) -> Tuple[requests.Response, int]:
+		"""POST one email to SendLayer, retrying throttled (429) requests after Retry-After.
+
+		Args:
+			data: SendLayer email payload
+			idempotency_key: Sent as an Idempotency-Key header, so a provider that
+				honours it can drop a resend of the same email
+
+		Returns:
+			Tuple of (final response, number of attempts)
+		"""
+		attempt = 0
+		while True:
+			attempt += 1
+			self._throttle.wait()
+			
+			start_time = time.perf_counter()
+			try:
+				response = self.session.post(
+					SENDLAYER_API_URL,
+					json=data,
+					headers={"Idempotency-Key": idempotency_key} if idempotency_key else None,
+					timeout=30
+				)
+			finally:
+				duration = time.perf_counter() - start_time
+				self.send_timings.record(duration * 1000)
+			
+			logger.info(f"SendLayer API call took {duration:.2f} seconds")
+			
+			if response.status_code != 429 or attempt > EMAIL_THROTTLE_RETRIES:
+				return response, attempt
+			
+			delay = _retry_after_seconds(response, attempt)
+			logger.warning(f"SendLayer throttled sending to {data['to']}, pausing sends for {delay:.1f}s")
+			self._throttle.pause(delay)
+
 	def send_email(
 		self,
 		to_email: str,
@@ -150,30 +346,12 @@ class EmailService:
 	) -> Dict[str, Any]:
 		"""Send an email using SendLayer"""
 		try:
-			url = "https://api.sendlayer.com/v1/emails"
-			
-			data = {
-				"from": from_email or self.default_from_email,
-				"reply_to": reply_to or self.default_reply_to,  # Always include reply-to
-				"to": to_email,
-				"subject": subject,
-				"html": html_content,
-				"track_opens": track_opens,
-				"track_clicks": track_clicks
-			}
-			
-			if cc:
-				data["cc"] = cc
-			if bcc:
-				data["bcc"] = bcc
+			data = self._build_payload(
+				to_email, subject, html_content, from_email, reply_to, cc, bcc, track_opens, track_clicks
+			)
 	
-			start_time = time.time()
 			logger.info(f"Attempting to send email to {to_email}")
-			
-			response = self.session.post(url, json=data, timeout=30)
-			duration = time.time() - start_time
-			
-			logger.info(f"SendLayer API call took {duration:.2f} seconds")
+			response, _ = self._post_email(data)
 			
 			if response.status_code == 200:
 				logger.info(f"Successfully sent email to {to_email}")
@@ -191,8 +369,115 @@ class EmailService:
 			error_context = f"Unexpected error sending email to {to_email}"
 			handle_error(e, error_context)
 			raise
-		finally:
-			self.session.close()
+
+	def send_message(self, message: Dict[str, Any]) -> Dict[str, Any]:
+		"""
+		Render and send one email without raising or alerting; used by send_bulk
+		and the email outbox, which handle failures themselves.
+
+		Args:
+			message: Dict with `to_email`, `subject` and either `html_content` or
+				`template` plus `context`; optionally `from_email`, `reply_to`,
+				`cc`, `bcc`, `track_opens`, `track_clicks` and `idempotency_key`
+
+		Returns:
+			Dict with `to_email`, `status` ('sent' or 'failed'), `attempts`, and
+			`response` or `error`. Failed results carry `retryable`, which is False
+			for errors a retry can't fix (bad template, 4xx other than 429).
+		"""
+		to_email = message.get("to_email")
+		result = {"to_email": to_email, "status": "failed", "attempts": 0}
+		try:
+			html_content = message.get("html_content")
+			if html_content is None:
+				html_content = render_email(message["template"], message.get("context") or {}, subject=message["subject"])
+		except Exception as e:
+			result["error"] = f"Failed to render template: {type(e).__name__}: {str(e)}"
+			result["retryable"] = False
+			logger.error(f"Email to {to_email} failed: {result['error']}")
+			return result
+		
+		try:
+			data = self._build_payload(
+				to_email=to_email,
+				subject=message["subject"],
+				html_content=html_content,
+				from_email=message.get("from_email"),
+				reply_to=message.get("reply_to"),
+				cc=message.get("cc"),
+				bcc=message.get("bcc"),
+				track_opens=message.get("track_opens", True),
+				track_clicks=message.get("track_clicks", True)
+			)
+			response, result["attempts"] = self._post_email(data, message.get("idempotency_key"))
+			
+			if response.status_code == 200:
+				result["status"] = "sent"
+				result["response"] = response.json()
+			else:
+				result["error"] = f"HTTP {response.status_code}: {response.text[:200]}"
+				result["retryable"] = response.status_code == 429 or response.status_code >= 500
+		except Exception as e:
+			result["error"] = f"{type(e).__name__}: {str(e)}"
+			result["retryable"] = True
+		
+		if result["status"] == "failed":
+			logger.error(f"Email to {to_email} failed: {result['error']}")
+		return result
+
+	def send_bulk(
+		self,
+		messages: Iterable[Dict[str, Any]],
+		concurrency: int = EMAIL_BULK_CONCURRENCY
+	) -> List[Dict[str, Any]]:
+		"""
+		Send many emails concurrently over the pooled session.
+
+		At most `concurrency` requests are in flight, and messages are only
+		rendered as a sender picks them up, so `messages` may be a generator.
+		A 429 from SendLayer pauses every sender for its Retry-After.
+
+		Args:
+			messages: Message dicts as accepted by send_message
+			concurrency: Maximum number of parallel sends
+
+		Returns:
+			One send_message result per message, in input order
+		"""
+		results = {}
+		source = enumerate(messages)
+		source_lock = threading.Lock()
+		
+		def worker():
+			while True:
+				with source_lock:
+					try:
+						index, message = next(source)
+					except StopIteration:
+						return
+				results[index] = self.send_message(message)
+		
+		started = time.perf_counter()
+		threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, concurrency))]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+		
+		ordered = [results[index] for index in sorted(results)]
+		sent = sum(1 for result in ordered if result["status"] == "sent")
+		logger.info(
+			f"Bulk send finished: {sent}/{len(ordered)} sent in {time.perf_counter() - started:.2f} seconds"
+		)
+		return ordered
+
+	def get_stats(self) -> Dict[str, Any]:
+		"""Send and DNS latency (count, mean, p50, p99 in ms) plus DNS cache counters"""
+		return {
+			"send": self.send_timings.summary(),
+			"dns": self.session.dns_timings.summary(),
+			"dns_cache": dict(self.session.dns_cache.stats) if self.session.dns_cache else None
+		}
 
 	def send_gift_card_email(
 		self,
@@ -243,7 +528,7 @@ class EmailService:
 			raise ValueError(f"Invalid template type. Must be one of: {', '.join(allowed_templates.keys())}")
 		
 		template_config = allowed_templates[template_type]
-		html_content = self._render_template(template_type, context)
+		html_content = self._render_template(template_type, context, template_config['subject'])
 		
 		return self.send_email(
 			to_email=to_email,
@@ -271,26 +556,20 @@ class EmailService:
 			from_email: Optional sender email
 			reply_to: Optional reply-to address
 		"""
-		context = {
-			"name": name,
-			"newsletter_subscribed": newsletter_subscribed,
-			"newsletter_signup_url": f"{os.getenv('NEWSLETTER_SIGNUP_URL', 'https://rosedalemassage.co.uk/newsletter')}?email={to_email}",
-			"booking_url": self.booking_url
-		}
-	
-		html_content = self._render_template('welcome_customer', context)
+		message = build_welcome_email(to_email, name, newsletter_subscribed)
+		html_content = self._render_template(message["template"], message["context"], message["subject"])
 		
 		return self.send_email(
 			to_email=to_email,
-			subject="Welcome to Rosedale Massage",
+			subject=message["subject"],
 			html_content=html_content,
 			from_email=from_email,
-			reply_to=reply_to or "hello@rosedalemassage.co.uk"
+			reply_to=reply_to or message["reply_to"]
 		)
 	
 	# Example usage:
 	"""
-	email_service = EmailService()
+	email_service = get_email_service()
 	
 	try:
 		result = email_service.send_welcome_email(
@@ -302,4 +581,21 @@ class EmailService:
 	
 	except Exception as e:
 		print(f"Failed to send welcome email: {str(e)}")
-	"""
\ No newline at end of file
+	"""
+
+
+_email_service = None
+_email_service_pid = None
+_email_service_lock = threading.Lock()
+
+
+def get_email_service() -> EmailService:
+	"""Return this worker's shared EmailService, creating it on first use"""
+	global _email_service, _email_service_pid
+	# Pooled connections must not be shared with forked workers
+	if _email_service is None or _email_service_pid != os.getpid():
+		with _email_service_lock:
+			if _email_service is None or _email_service_pid != os.getpid():
+				_email_service = EmailService()
+				_email_service_pid = os.getpid()
+	return _email_service
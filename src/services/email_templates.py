@@ -0,0 +1,158 @@
+import logging
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from markupsafe import Markup
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates', 'email')
+LAYOUT_TEMPLATE = "base.html"
+
+# Compiled template bytecode, shared by every process on the host
+EMAIL_TEMPLATE_CACHE_DIR = os.getenv(
+    "EMAIL_TEMPLATE_CACHE_DIR",
+    os.path.join(tempfile.gettempdir(), "rosedale-email-templates")
+)
+
+# Re-check template files for changes on each render (development only)
+EMAIL_TEMPLATE_AUTO_RELOAD = os.getenv("FLASK_ENV", "production") == "development"
+
+# Values every email can use, set once instead of merged into each context
+TEMPLATE_GLOBALS = {
+    "booking_url": os.getenv("BOOKING_URL", "https://booking.rosedalemassage.co.uk"),
+    "support_email": os.getenv("DEFAULT_REPLY_TO", "bookings@rosedalemassage.co.uk"),
+    "website_url": "https://www.rosedalemassage.co.uk",
+}
+
+_env = None
+_env_lock = threading.Lock()
+_fragments = {}
+_template_paths = {}
+
+
+def static_fragment(name: str) -> Markup:
+    """
+    Render a template that depends only on globals (styles, footer) once per
+    process and reuse the output.
+    """
+    fragment = _fragments.get(name)
+    if fragment is None:
+        fragment = Markup(get_template_env().get_template(name).render())
+        if not EMAIL_TEMPLATE_AUTO_RELOAD:
+            _fragments[name] = fragment
+    return fragment
+
+
+def create_template_env(bytecode_cache_dir: Optional[str] = EMAIL_TEMPLATE_CACHE_DIR) -> Environment:
+    """
+    Create a Jinja environment for the email templates.
+
+    Args:
+        bytecode_cache_dir: Directory for compiled bytecode, or None to disable
+
+    Returns:
+        Configured Environment
+    """
+    bytecode_cache = None
+    if bytecode_cache_dir:
+        try:
+            os.makedirs(bytecode_cache_dir, exist_ok=True)
+            bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+        except OSError as e:
+            logger.warning(f"Email template bytecode cache disabled: {e}")
+
+    env = Environment(
+        loader=FileSystemLoader(TEMPLATE_DIR),
+        autoescape=True,
+        bytecode_cache=bytecode_cache,
+        auto_reload=EMAIL_TEMPLATE_AUTO_RELOAD,
+        # Keep every compiled template; there are only a handful
+        cache_size=-1
+    )
+    env.globals.update(TEMPLATE_GLOBALS)
+    env.globals["static_fragment"] = static_fragment
+    return env
+
+
+def get_template_env() -> Environment:
+    """Return the shared email template environment"""
+    global _env
+    if _env is None:
+        with _env_lock:
+            if _env is None:
+                _env = create_template_env()
+    return _env
+
+
+def resolve_template_name(template_name: str) -> str:
+    """
+    Map a template name to its path under src/templates/email.
+
+    Accepts full paths ('customers/welcome_customer.html') as well as bare
+    names ('welcome_customer'), which are looked up across the subfolders.
+    """
+    if template_name.endswith(".html"):
+        return template_name
+    if not _template_paths:
+        _index_templates(get_template_env())
+    return _template_paths.get(template_name, f"{template_name}.html")
+
+
+def _index_templates(env: Environment):
+    for path in env.list_templates(extensions=["html"]):
+        name = os.path.splitext(os.path.basename(path))[0]
+        # First match wins; bare names are only a convenience
+        _template_paths.setdefault(name, path)
+
+
+def precompile_templates() -> int:
+    """
+    Compile every email template into the shared environment.
+
+    Call before gunicorn forks (create_app runs under --preload) so workers
+    inherit the compiled templates instead of each parsing them on first use.
+
+    Returns:
+        Number of templates compiled
+    """
+    started = time.perf_counter()
+    env = get_template_env()
+    _index_templates(env)
+
+    count = 0
+    for path in env.list_templates(extensions=["html"]):
+        env.get_template(path)
+        count += 1
+    for path in env.list_templates(extensions=["html"]):
+        if path.startswith("partials/"):
+            static_fragment(path)
+
+    logger.info(f"Compiled {count} email templates in {(time.perf_counter() - started) * 1000:.1f}ms")
+    return count
+
+
+def render_email(template_name: str, context: Dict[str, Any], subject: str = "", header: str = "Rosedale Massage") -> str:
+    """
+    Render an email body template inside the base.html layout.
+
+    Args:
+        template_name: Template path or bare name (see resolve_template_name)
+        context: Template variables for the body
+        subject: Document title
+        header: Heading shown in the layout header
+
+    Returns:
+        Complete HTML document
+    """
+    env = get_template_env()
+    body = env.get_template(resolve_template_name(template_name)).render(context)
+    return env.get_template(LAYOUT_TEMPLATE).render(
+        subject=subject,
+        header=header,
+        content=Markup(body)
+    )
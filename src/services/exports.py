@@ -0,0 +1,179 @@
+from datetime import datetime, UTC
+from typing import Any, Callable, Iterable, Iterator, List, Optional
+import csv
+import io
+import logging
+import zlib
+from sqlalchemy import Text, cast, func, literal_column, select
+from src.models import Customer, Order, Transaction
+from src.extensions import db
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched from the server-side cursor, and encoded, per chunk
+EXPORT_CHUNK_ROWS = 2000
+
+# zlib level for gzip responses; on export rows 1 is about twice as fast as
+# the default 6 for much the same ratio (~10x)
+EXPORT_GZIP_LEVEL = 1
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+# Columns exported per dataset, in order; rows are keyed on the first one
+EXPORT_COLUMNS = {
+    "customers": (Customer, (
+        "id", "first_name", "last_name", "email", "phone_number", "gender", "birthdate",
+        "address", "signup_source", "booking_system_id", "payment_system_id", "created_at", "updated_at",
+    )),
+    "orders": (Order, (
+        "id", "confirmation_code", "customer_id", "data_source", "booking_system_order_id",
+        "payment_system_order_id", "order_status", "fulfillment_status", "payment_status",
+        "subtotal", "total", "created_at", "updated_at",
+    )),
+    "transactions": (Transaction, (
+        "id", "order_id", "amount", "payment_method", "status", "card_brand", "last_4",
+        "exp_month", "exp_year", "receipt_url", "created_at", "updated_at",
+    )),
+}
+
+
+def export_columns(dataset: str) -> List:
+    model, names = EXPORT_COLUMNS[dataset]
+    return [getattr(model, name) for name in names]
+
+
+def encoded_columns(rows, export_format: str) -> List:
+    """
+    The select list over the `rows` subquery, encoded by Postgres: text for
+    CSV, one compact JSON object per row for NDJSON. The driver then hands
+    over plain strings, with no datetime, Decimal or dict built and
+    formatted again per value.
+    """
+    if export_format == "ndjson":
+        return [cast(func.row_to_json(literal_column(rows.name)), Text)]
+    # JSONB casts to its JSON text, numerics keep their exact digits
+    return [cast(column, Text) for column in rows.c]
+
+
+def build_export_query(
+    dataset: str,
+    export_format: str = "csv",
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after: Optional[Any] = None,
+    limit: Optional[int] = None
+):
+    """
+    Rows created in [since, until), after the key `after`, in key order.
+
+    `after` is a keyset cursor: pass the key (first column) of the last row
+    received to continue from there, however far into the table it is.
+    """
+    columns = export_columns(dataset)
+    key, created_at = columns[0], columns[0].table.c.created_at
+    stmt = select(*columns)
+    if since is not None:
+        stmt = stmt.where(created_at >= column_time(created_at, since))
+    if until is not None:
+        stmt = stmt.where(created_at < column_time(created_at, until))
+    if after is not None:
+        stmt = stmt.where(key > after)
+    # Postgres flattens the subquery, so this is still an index scan on the key
+    rows = stmt.subquery("r")
+    stmt = select(*encoded_columns(rows, export_format)).select_from(rows).order_by(rows.c[key.key])
+    if limit is not None:
+        stmt = stmt.limit(limit)
+    return stmt
+
+
+def column_time(column, value: datetime) -> datetime:
+    """Match a filter value to the column (customers' timestamps are naive UTC)"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=UTC)
+    return value if column.type.timezone else value.astimezone(UTC).replace(tzinfo=None)
+
+
+def encode_csv() -> Callable[[Iterable], bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def encode(rows):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        return buffer.getvalue().encode("utf-8")
+
+    return encode
+
+
+def encode_ndjson() -> Callable[[Iterable], bytes]:
+    def encode(rows):
+        return "".join([row[0] + "\n" for row in rows]).encode("utf-8")
+
+    return encode
+
+
+ENCODERS = {"csv": encode_csv, "ndjson": encode_ndjson}
+
+
+def gzip_stream(chunks: Iterable[bytes], level: int = EXPORT_GZIP_LEVEL) -> Iterator[bytes]:
+    """Compress a byte stream into one gzip member as it goes"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+class ExportService:
+    @staticmethod
+    def stream(
+        dataset: str,
+        export_format: str = "csv",
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        after: Optional[Any] = None,
+        limit: Optional[int] = None,
+        chunk_rows: int = EXPORT_CHUNK_ROWS
+    ) -> Iterator[bytes]:
+        """
+        Stream a dataset as CSV (with a header row) or NDJSON.
+
+        Postgres formats each row (see encoded_columns), and rows come from a
+        server-side cursor `chunk_rows` at a time; each chunk is encoded and
+        yielded before the next is fetched, so memory stays flat however
+        many rows there are. The cursor lives on its own connection, returned
+        to the pool when the generator finishes or is closed (e.g. the client
+        disconnects).
+
+        Args:
+            dataset: 'customers', 'orders' or 'transactions'
+            export_format: 'csv' or 'ndjson'
+            since: Only rows created at or after this time
+            until: Only rows created before this time
+            after: Only rows with a key after this one (keyset paging)
+            limit: At most this many rows
+            chunk_rows: Rows per fetch and per yielded chunk
+
+        Yields:
+            Encoded chunks (bytes)
+        """
+        encode = ENCODERS[export_format]()
+        stmt = build_export_query(dataset, export_format, since, until, after, limit)
+
+        if export_format == "csv":
+            yield encode([[column.key for column in export_columns(dataset)]])
+
+        rows = 0
+        with db.engine.connect() as connection:
+            # yield_per streams from a named (server-side) cursor
+            result = connection.execution_options(yield_per=chunk_rows).execute(stmt)
+            for partition in result.partitions():
+                rows += len(partition)
+                yield encode(partition)
+
+        logger.info(f"Exported {rows} {dataset} as {export_format}")
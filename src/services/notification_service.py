@@ -1,6 +1,6 @@
 from flask import current_app
 import logging
-from src.core.integrations.campfire import send_message
+from src.core.integrations.campfire import campfire_client
 from typing import Optional
 
 logger = logging.getLogger(__name__)
@@ -17,13 +17,18 @@ class NotificationService:
             channel: Campfire channel (studio, alert, tech, etc.)
 
         Returns:
-            Tuple of (status, response) if sent, None if in development
+            Tuple of (status, response) if sent, None if in development or
+            held for batching (see CAMPFIRE_BATCH_WINDOW)
         """
         try:
             if current_app.config["FLASK_ENV"] == "development":
                 return None
 
-            status, response = send_message(channel, message)
+            result = campfire_client.send(channel, message, batch=True)
+            if result is None:
+                return None
+
+            status, response = result
             logger.info(f"Campfire Response: Status {status}, Body: {response}")
             return status, response
 
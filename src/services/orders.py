@@ -1,10 +1,17 @@
-from typing import Optional, Dict, Any, Tuple
+from collections import Counter
+from typing import Optional, Dict, Any, List, Tuple
+from sqlalchemy import select, literal_column
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import func
 import logging
 from datetime import datetime
-from src.models import Order, Customer
+from decimal import Decimal, InvalidOperation
+from src.models import Order, Customer, Item, OrderLineItem, Transaction
+from src.core.integrations.square import get_square_client, retrieve_order
 from src.core.monitoring import handle_error
 from src.extensions import db
+from src.services.sales_rollups import mark_orders_changed
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +24,7 @@ def create_order(order_data: Dict[str, Any]) -> Tuple[Optional[int], Optional[st
         order_data (Dict[str, Any]): Dictionary containing order information
             Required fields:
             - customer_id (int)
-            - source (str): 'square', 'latepoint', 'admin', or 'acuity'
+            - data_source (str): 'square', 'latepoint', 'admin', or 'acuity'
             - payment_status (str)
             - subtotal (float)
             - total (float)
@@ -30,10 +37,10 @@ def create_order(order_data: Dict[str, Any]) -> Tuple[Optional[int], Optional[st
     Example:
         order_data = {
             "customer_id": 123,
-            "source": "latepoint",
+            "data_source": "latepoint",
             "confirmation_code": "LP-123456",
-            "latepoint_order_id": 789,
-            "status": "open",
+            "booking_system_order_id": 789,
+            "order_status": "open",
             "payment_status": "not_paid",
             "subtotal": 80.00,
             "total": 80.00
@@ -42,14 +49,14 @@ def create_order(order_data: Dict[str, Any]) -> Tuple[Optional[int], Optional[st
     """
     try:
         # Validate required fields
-        required_fields = ['customer_id', 'source', 'payment_status', 'subtotal', 'total']
+        required_fields = ['customer_id', 'data_source', 'payment_status', 'subtotal', 'total']
         missing_fields = [field for field in required_fields if field not in order_data]
         if missing_fields:
             return None, f"Missing required fields: {', '.join(missing_fields)}"
 
         # Validate source
         valid_sources = {'square', 'latepoint', 'admin', 'acuity'}
-        if order_data['source'] not in valid_sources:
+        if order_data['data_source'] not in valid_sources:
             return None, f"Invalid source. Must be one of: {', '.join(valid_sources)}"
 
         # Validate amounts
@@ -64,10 +71,10 @@ def create_order(order_data: Dict[str, Any]) -> Tuple[Optional[int], Optional[st
         new_order = Order(
             confirmation_code=order_data.get('confirmation_code'),
             customer_id=order_data['customer_id'],
-            source=order_data['source'],
-            latepoint_order_id=order_data.get('latepoint_order_id'),
-            square_order_id=order_data.get('square_order_id'),
-            status=order_data.get('status', 'open'),
+            data_source=order_data['data_source'],
+            booking_system_order_id=order_data.get('booking_system_order_id'),
+            payment_system_order_id=order_data.get('payment_system_order_id'),
+            order_status=order_data.get('order_status', 'open'),
             fulfillment_status=order_data.get('fulfillment_status', 'not_fulfilled'),
             payment_status=order_data['payment_status'],
             subtotal=order_data['subtotal'],
@@ -112,7 +119,7 @@ def update_order(order_id: int, update_data: Dict[str, Any]) -> Tuple[bool, Opti
 
     Example:
         update_data = {
-            "status": "completed",
+            "order_status": "completed",
             "payment_status": "fully_paid",
             "fulfillment_status": "fulfilled"
         }
@@ -124,12 +131,12 @@ def update_order(order_id: int, update_data: Dict[str, Any]) -> Tuple[bool, Opti
             return False, "Order not found"
 
         # Protected fields that cannot be updated
-        protected_fields = {'id', 'created_at', 'customer_id', 'source'}
+        protected_fields = {'id', 'created_at', 'customer_id', 'data_source'}
 
         # Validate status updates
-        if 'status' in update_data:
+        if 'order_status' in update_data:
             valid_statuses = {'open', 'cancelled', 'completed'}
-            if update_data['status'] not in valid_statuses:
+            if update_data['order_status'] not in valid_statuses:
                 return False, f"Invalid status. Must be one of: {', '.join(valid_statuses)}"
 
         if 'payment_status' in update_data:
@@ -182,7 +189,7 @@ def get_order_by_confirmation_code(confirmation_code: str, source: str) -> Optio
     try:
         return Order.query.filter_by(
             confirmation_code=confirmation_code,
-            source=source
+            data_source=source
         ).first()
     except Exception as e:
         logger.error(f"Error retrieving order with confirmation code {confirmation_code}: {str(e)}")
@@ -208,7 +215,7 @@ def update_order_status(
     Returns:
         tuple[bool, Optional[str]]: Success flag and error message if any
     """
-    update_data = {'status': status}
+    update_data = {'order_status': status}
     if payment_status:
         update_data['payment_status'] = payment_status
     if fulfillment_status:
@@ -216,108 +223,438 @@ def update_order_status(
 
     return update_order(order_id, update_data)
 
-def process_order_webhook(data, source):
+
+
+# Column each platform's order ID is stored in (the order's natural key)
+ORDER_NATURAL_KEYS = {
+    "latepoint": "booking_system_order_id",
+    "square": "payment_system_order_id",
+}
+
+# Column each platform's customer ID is stored in
+CUSTOMER_NATURAL_KEYS = {
+    "latepoint": "booking_system_id",
+    "square": "payment_system_id",
+}
+
+# Fields a webhook may overwrite on an order that already exists
+ORDER_UPDATE_FIELDS = [
+    "confirmation_code", "order_status", "fulfillment_status", "payment_status", "subtotal", "total",
+]
+
+# Fields a webhook may overwrite on a transaction that already exists
+TRANSACTION_UPDATE_FIELDS = ["amount", "status"]
+
+# Order status from an order's state (Orders API) and, for payments without an order, from the payment's status
+SQUARE_ORDER_STATES = {"COMPLETED": "completed", "CANCELED": "cancelled"}
+SQUARE_ORDER_STATUSES = {"COMPLETED": "completed", "CANCELED": "cancelled", "FAILED": "cancelled"}
+SQUARE_PAYMENT_STATUSES = {"COMPLETED": "fully_paid", "CANCELED": "not_paid", "FAILED": "not_paid"}
+SQUARE_TRANSACTION_STATUSES = {"COMPLETED": "COMPLETED", "CANCELED": "CANCELLED", "FAILED": "FAILED"}
+LATEPOINT_TRANSACTION_STATUSES = {"succeeded": "COMPLETED", "failed": "FAILED", "refunded": "CANCELLED"}
+
+
+def map_latepoint_order(data):
     """
-    Processes webhook data to create or update an order.
+    Map a LatePoint order payload.
 
-    Args:
-        data (dict): Webhook payload.
-        source (str): Source of the webhook ('latepoint' or 'square').
+    Line items come from `items` (each with the LatePoint `service_id`,
+    `quantity` and `price`) and payments from `transactions`.
 
     Returns:
-        Order: The created or updated Order object.
+        tuple: Order fields, customer fields, line items and transactions.
+
+    Raises:
+        ValueError: If the order or its customer can't be identified.
     """
-    # Map fields based on the source
-    if source == "latepoint":
-        order_data = {
-            "confirmation_code": data.get("confirmation_code"),
-            "customer_id": get_customer_id(data, "latepoint"),
-            "source": source,
-            "latepoint_order_id": int(data.get("id", 0)),
-            "status": data.get("status", "open"),
-            "fulfillment_status": data.get("fulfillment_status", "not_fulfilled"),
-            "payment_status": data.get("payment_status", "not_paid"),
-            "subtotal": parse_amount(data.get("subtotal", "0")),
-            "total": parse_amount(data.get("total", "0")),
-        }
-    elif source == "square":
-        order_data = {
-            "confirmation_code": data.get("receipt_number", ""),
-            "customer_id": get_customer_id({"id": data.get("customer_id")}, "square"),
-            "source": source,
-            "square_order_id": data.get("id"),
-            "status": data["status"].lower(),
-            "fulfillment_status": "fulfilled" if data["status"] == "COMPLETED" else "not_fulfilled",
-            "payment_status": "fully_paid" if data["status"] == "COMPLETED" else "processing",
-            "subtotal": data["amount_money"]["amount"] / 100.0,
-            "total": data["approved_money"]["amount"] / 100.0,
+    customer = data.get("customer") or {}
+    if not data.get("id") or not customer.get("id"):
+        raise ValueError("LatePoint order payload needs an order id and a customer id")
+
+    order_data = {
+        "booking_system_order_id": int(data["id"]),
+        "confirmation_code": data.get("confirmation_code") or None,
+        "order_status": data.get("status", "open"),
+        "fulfillment_status": data.get("fulfillment_status", "not_fulfilled"),
+        "payment_status": data.get("payment_status", "not_paid"),
+        "subtotal": parse_amount(data.get("subtotal", "0")),
+        "total": parse_amount(data.get("total", "0")),
+    }
+    customer_data = {
+        "booking_system_id": int(customer["id"]),
+        "first_name": customer.get("first_name"),
+        "last_name": customer.get("last_name"),
+        "email": customer.get("email"),
+        "phone_number": customer.get("phone") or None,
+        "signup_source": "latepoint",
+    }
+    line_items = []
+    for item in data.get("items", []):
+        quantity = int(item.get("quantity", 1))
+        price = to_cents(item.get("price", "0"))
+        line_items.append({
+            "external_id": str(item["service_id"]),
+            "quantity": quantity,
+            "price": price,
+            "total": to_cents(item["total"]) if item.get("total") else price * quantity,
+        })
+    transactions = [
+        {
+            "id": str(transaction.get("token") or transaction["id"]),
+            "amount": to_cents(transaction["amount"]),
+            "payment_method": transaction.get("payment_method") or transaction.get("processor") or "unknown",
+            "status": LATEPOINT_TRANSACTION_STATUSES.get(transaction.get("status"), "PENDING"),
         }
+        for transaction in data.get("transactions", [])
+    ]
+    return order_data, customer_data, line_items, transactions
 
-    # Check if the order exists
-    existing_order = Order.query.filter_by(
-        confirmation_code=order_data["confirmation_code"], source=source
-    ).first()
 
-    if existing_order:
-        # Update existing order
-        for key, value in order_data.items():
-            setattr(existing_order, key, value)
-        db.session.commit()
-        return existing_order
+def money(value: Optional[Dict[str, Any]]) -> int:
+    return (value or {}).get("amount") or 0
+
+
+def map_order_object(order: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Map a Square order object (Orders API) to order fields.
+
+    Both the payment webhook and `flask square reconcile` map Square orders
+    with this, so they agree on every field reconciliation compares.
+    Payment status comes from the amount still due: nothing due is fully
+    paid, part due is partially paid.
+    """
+    total = money(order.get("total_money"))
+    due = money(order.get("net_amount_due_money"))
+    status = SQUARE_ORDER_STATES.get(order.get("state"), "open")
+    if status == "cancelled":
+        payment_status = "not_paid"
+    elif due <= 0:
+        payment_status = "fully_paid"
+    elif due < total:
+        payment_status = "partially_paid"
     else:
-        # Create new order
-        new_order = Order(**order_data)
-        db.session.add(new_order)
-        db.session.commit()
-        return new_order
+        payment_status = "not_paid"
+
+    return {
+        "payment_system_order_id": order["id"],
+        "confirmation_code": None,
+        "order_status": status,
+        "fulfillment_status": "fulfilled" if status == "completed" else "not_fulfilled",
+        "payment_status": payment_status,
+        "subtotal": Decimal(total - money(order.get("total_tax_money"))) / 100,
+        "total": Decimal(total) / 100,
+    }
+
+
+def map_order_line_items(order: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Line items of a Square order object; custom amounts (no catalog item) are left out"""
+    return [
+        {
+            "external_id": item["catalog_object_id"],
+            "quantity": int(item.get("quantity", "1")),
+            "price": money(item.get("base_price_money")),
+            "total": money(item.get("total_money")),
+        }
+        for item in order.get("line_items", [])
+        if item.get("catalog_object_id")
+    ]
 
-def get_customer_id(data, source):
+
+def map_square_payment(data):
     """
-    Retrieves or creates a customer ID.
+    Map a Square payment object on its own, without its order.
+
+    The order fields are what the payment alone can tell: subtotal and total
+    are this one payment's amount and approved amount, and the statuses are
+    the payment's. That is only the order's true state for an order paid in
+    one tender without tax or tip, so it is only stored for payments that
+    have no order (see map_square_order).
+
+    Returns:
+        tuple: Order fields, customer fields and the payment's transaction.
+
+    Raises:
+        ValueError: If the payment has no ID or amount.
+    """
+    if not data.get("id") or not (data.get("amount_money") or {}).get("amount"):
+        raise ValueError("Square payment payload needs an id and amount_money")
+
+    status = data.get("status", "PENDING")
+    amount = data["amount_money"]["amount"]
+    approved = (data.get("approved_money") or data["amount_money"])["amount"]
+    card = (data.get("card_details") or {}).get("card") or {}
+    billing = data.get("billing_address") or {}
+
+    order_data = {
+        "payment_system_order_id": data.get("order_id") or data["id"],
+        "confirmation_code": data.get("receipt_number") or None,
+        "order_status": SQUARE_ORDER_STATUSES.get(status, "open"),
+        "fulfillment_status": "fulfilled" if status == "COMPLETED" else "not_fulfilled",
+        "payment_status": SQUARE_PAYMENT_STATUSES.get(status, "processing"),
+        "subtotal": Decimal(amount) / 100,
+        "total": Decimal(approved) / 100,
+    }
+    customer_data = {
+        "payment_system_id": data.get("customer_id"),
+        "first_name": billing.get("first_name"),
+        "last_name": billing.get("last_name"),
+        "email": data.get("buyer_email_address"),
+        "signup_source": "square",
+    }
+    transaction = {
+        "id": data["id"],
+        "amount": amount,
+        "payment_method": data.get("source_type", "CARD"),
+        "status": SQUARE_TRANSACTION_STATUSES.get(status, "PENDING"),
+        "card_brand": card.get("card_brand"),
+        "last_4": card.get("last_4"),
+        "exp_month": card.get("exp_month"),
+        "exp_year": card.get("exp_year"),
+        "receipt_url": data.get("receipt_url"),
+    }
+    return order_data, customer_data, transaction
+
+
+def fetch_square_order(order_id: str) -> Dict[str, Any]:
+    """Fetch an order from the Square Orders API"""
+    return retrieve_order(get_square_client(), order_id)
+
+
+def map_square_order(data):
+    """
+    Map a Square payment webhook to its order.
+
+    A payment doesn't carry its order's totals, tax or state, so the order
+    it names (`order_id`) is fetched from the Orders API and mapped with
+    map_order_object, as `flask square reconcile` does; reconciliation
+    then finds webhook-written orders unchanged. Line items come from the
+    order too. A payment without an order is its own order, with the
+    payment's amount as subtotal and total (see map_square_payment).
+
+    Returns:
+        tuple: Order fields, customer fields, line items and transactions.
+
+    Raises:
+        ValueError: If the payment has no ID or amount.
+        SquareAPIError: If the order can't be fetched (worth retrying).
+    """
+    order_data, customer_data, transaction = map_square_payment(data)
+    line_items = []
+    if data.get("order_id"):
+        order = fetch_square_order(data["order_id"])
+        order_data = {**map_order_object(order), "confirmation_code": order_data["confirmation_code"]}
+        line_items = map_order_line_items(order)
+        customer_data["payment_system_id"] = customer_data["payment_system_id"] or order.get("customer_id")
+    return order_data, customer_data, line_items, [transaction]
+
+
+ORDER_PAYLOAD_MAPPERS = {
+    "latepoint": map_latepoint_order,
+    "square": map_square_order,
+}
+
+
+def resolve_customer_id(customer_data, source):
+    """
+    Find the order's customer by platform ID, creating it if needed.
+
+    Unknown customers are upserted on email, so a customer that signed up on
+    the other platform gets this platform's ID instead of a duplicate. Does
+    not commit.
 
     Args:
-        data (dict): Customer information from the webhook payload.
-        source (str): Source of the customer data ('latepoint' or 'square').
+        customer_data (dict): Customer fields from the order payload.
+        source (str): 'latepoint' or 'square'.
 
     Returns:
         int: The customer ID.
+
+    Raises:
+        ValueError: If the customer is unknown and the payload lacks the
+            name and email needed to create it.
+    """
+    key = CUSTOMER_NATURAL_KEYS[source]
+    if customer_data.get(key):
+        customer_id = db.session.execute(
+            select(Customer.id).where(getattr(Customer, key) == customer_data[key])
+        ).scalar()
+        if customer_id:
+            return customer_id
+
+    missing_fields = [field for field in ("first_name", "last_name", "email") if not customer_data.get(field)]
+    if missing_fields:
+        raise ValueError(
+            f"Unknown {source} customer {customer_data.get(key)}; "
+            f"cannot create it without: {', '.join(missing_fields)}"
+        )
+
+    stmt = insert(Customer).values(**customer_data)
+    update_fields = {key: stmt.excluded[key]} if customer_data.get(key) else {}
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Customer.email],
+        set_={**update_fields, "updated_at": func.now()}
+    ).returning(Customer.id)
+    return db.session.execute(stmt).scalar_one()
+
+
+def resolve_item_ids(external_ids):
+    """
+    Look up item IDs by external ID in one query.
+
+    Raises:
+        ValueError: If any item is unknown.
+    """
+    if not external_ids:
+        return {}
+    item_ids = dict(db.session.execute(
+        select(Item.external_id, Item.id).where(Item.external_id.in_(external_ids))
+    ).all())
+    unknown = sorted(set(external_ids) - item_ids.keys())
+    if unknown:
+        raise ValueError(f"Unknown items: {', '.join(unknown)}")
+    return item_ids
+
+
+def build_order_upsert(source):
+    """INSERT ... ON CONFLICT DO UPDATE on the platform's order ID, returning (id, inserted)"""
+    stmt = insert(Order.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=[ORDER_NATURAL_KEYS[source]],
+        set_={
+            **{field: stmt.excluded[field] for field in ORDER_UPDATE_FIELDS},
+            # Square only sends the receipt number on some events
+            "confirmation_code": func.coalesce(stmt.excluded.confirmation_code, Order.confirmation_code),
+            "updated_at": func.now(),
+        }
+    ).returning(
+        Order.id,
+        # xmax is only 0 on a freshly inserted row version
+        (literal_column("xmax") == 0).label("inserted")
+    )
+
+
+def build_transaction_upsert():
+    """
+    INSERT ... ON CONFLICT DO UPDATE for transactions, never moving one to
+    another order. RETURNING is what lets SQLAlchemy batch a list of rows
+    into multi-row INSERTs; without it each row is its own round trip.
+    """
+    stmt = insert(Transaction.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=[Transaction.id],
+        set_={
+            **{field: stmt.excluded[field] for field in TRANSACTION_UPDATE_FIELDS},
+            "updated_at": func.now(),
+        },
+        where=Transaction.order_id == stmt.excluded.order_id
+    ).returning(Transaction.id)
+
+
+# Built once rather than per webhook (each .excluded builds a new alias of the
+# table). Rows are passed as parameters; a list of rows is sent as one
+# multi-row INSERT.
+ORDER_UPSERTS = {source: build_order_upsert(source) for source in ORDER_NATURAL_KEYS}
+TRANSACTION_UPSERT = build_transaction_upsert()
+LINE_ITEM_INSERT = OrderLineItem.__table__.insert()
+
+# Square payments process_order_webhook skipped, by reason
+SKIPPED_PAYMENTS = Counter()
+
+# Every transaction row has the same keys, so a list of them is one batch
+TRANSACTION_DEFAULTS = {
+    "card_brand": None, "last_4": None, "exp_month": None, "exp_year": None, "receipt_url": None,
+}
+
+
+def process_order_webhook(data, source):
     """
-    if source == "latepoint":
-        existing_customer = Customer.query.filter_by(latepoint_id=data["customer"]["id"]).first()
-        if not existing_customer:
-            new_customer = Customer(
-                latepoint_id=data["customer"]["id"],
-                first_name=data["customer"]["first_name"],
-                last_name=data["customer"]["last_name"],
-                email=data["customer"]["email"],
-                phone=data["customer"].get("phone"),
-                source="latepoint",
-            )
-            db.session.add(new_customer)
-            db.session.commit()
-            return new_customer.id
-        return existing_customer.id
-
-    elif source == "square":
-        existing_customer = Customer.query.filter_by(square_id=data["id"]).first()
-        if not existing_customer:
-            new_customer = Customer(
-                square_id=data["id"],
-                source="square",
-            )
-            db.session.add(new_customer)
-            db.session.commit()
-            return new_customer.id
-        return existing_customer.id
+    Create or update an order from a webhook, in a single transaction.
+
+    The customer is resolved (or created), the order is upserted on its
+    platform order ID with INSERT ... ON CONFLICT DO UPDATE, and its line
+    items and transactions are bulk-inserted (one multi-row INSERT each), then
+    everything, including the refreshed daily sales rollups, is committed
+    together. Redelivered webhooks update the order and its transactions;
+    line items are only written when the order is created, since
+    appointments reference them.
+
+    Args:
+        data (dict): Webhook payload (a LatePoint order or a Square payment).
+        source (str): Source of the webhook ('latepoint' or 'square').
+
+    Square payments that name no customer (walk-in card payments often
+    don't) are skipped and counted in SKIPPED_PAYMENTS: there is no one to
+    attach the order to, and rejecting them would only make Square
+    redeliver them for a day.
+
+    Returns:
+        tuple: The order ID and True if the order was created, or
+            (None, False) if the payment was skipped.
+
+    Raises:
+        ValueError: If the payload can't be mapped to an order.
+    """
+    order_data, customer_data, line_items, transactions = ORDER_PAYLOAD_MAPPERS[source](data)
+
+    if source == "square" and not customer_data.get("payment_system_id") and not customer_data.get("email"):
+        SKIPPED_PAYMENTS["no_customer"] += 1
+        logger.info(f"Skipped Square payment {transactions[0]['id']}: no customer")
+        return None, False
+
+    try:
+        customer_id = resolve_customer_id(customer_data, source)
+        item_ids = resolve_item_ids({item["external_id"] for item in line_items})
+
+        order_id, created = db.session.execute(
+            ORDER_UPSERTS[source],
+            {"customer_id": customer_id, "data_source": source, **order_data}
+        ).one()
+        mark_orders_changed([order_id])
+
+        if created and line_items:
+            db.session.execute(LINE_ITEM_INSERT, [
+                {
+                    "order_id": order_id,
+                    "item_id": item_ids[item["external_id"]],
+                    "quantity": item["quantity"],
+                    "price": item["price"],
+                    "total": item["total"],
+                }
+                for item in line_items
+            ])
+
+        # A payload may repeat a transaction; ON CONFLICT can't touch a row twice
+        transactions = {transaction["id"]: transaction for transaction in transactions}
+        if transactions:
+            db.session.execute(TRANSACTION_UPSERT, [
+                {**TRANSACTION_DEFAULTS, **transaction, "order_id": order_id}
+                for transaction in transactions.values()
+            ])
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    logger.info(f"{'Created' if created else 'Updated'} {source} order {order_id}")
+    return order_id, created
+
 
 def parse_amount(amount_str):
     """
-    Converts a string amount (e.g., '£80') into a float.
+    Converts an amount (e.g., '£80' or 80) into a Decimal.
 
     Args:
         amount_str (str): The amount string.
 
     Returns:
-        float: Parsed amount.
+        Decimal: Parsed amount.
     """
-    return float(amount_str.replace("£", "").strip())
\ No newline at end of file
+    try:
+        return Decimal(str(amount_str).replace("£", "").replace(",", "").strip() or "0")
+    except InvalidOperation:
+        raise ValueError(f"Invalid amount: {amount_str}")
+
+
+def to_cents(amount_str):
+    """Converts an amount (e.g., '£80.50') into integer pence."""
+    return int((parse_amount(amount_str) * 100).to_integral_value())
@@ -0,0 +1,445 @@
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+import json
+import logging
+import os
+import secrets
+import string
+import threading
+import time
+import uuid
+from sqlalchemy import Boolean, String, Text, bindparam, func, select, text, update
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, insert
+from src.models import PromoCode
+from src.extensions import db
+from src.utils.bloom_filter import BloomFilter
+from src.utils.notify import current_origin, listen
+
+logger = logging.getLogger(__name__)
+
+CODE_ALPHABET = string.ascii_uppercase + string.digits
+
+# Most codes one bulk request may issue (e.g. a corporate gift card order)
+MAX_BULK_CODES = int(os.getenv("MAX_BULK_CODES", "5000"))
+
+# Rounds of regenerating collided codes before giving up; with 6+ random
+# characters per code a second round is already rare
+MAX_ISSUE_ATTEMPTS = 5
+
+# Codes that stay valid after redemption; every other type is single-use
+REUSABLE_CODE_TYPES = {"unlimited", "school"}
+
+# False positive rate of the per-process filter of issued codes
+PROMO_CODE_FILTER_ERROR_RATE = float(os.getenv("PROMO_CODE_FILTER_ERROR_RATE", "0.001"))
+# The filter is sized for at least this many codes (and twice those issued)
+PROMO_CODE_FILTER_MIN_CAPACITY = 100_000
+# For this long after another process announces new codes, codes the filter
+# hasn't seen yet go to the database instead of being rejected
+PROMO_CODE_FILTER_GRACE_SECONDS = float(os.getenv("PROMO_CODE_FILTER_GRACE_SECONDS", "5"))
+
+# Postgres NOTIFY channel telling other processes which codes were issued
+NOTIFY_CHANNEL = "promo_codes"
+
+# Built once (Postgres INSERT ... ON CONFLICT isn't compile-cached). The
+# codes go as one array parameter and are unnested into rows, so a batch of
+# any size is a single statement with a handful of parameters. RETURNING
+# gives back only the codes actually inserted, so collisions are simply
+# missing from the result. (No conflict target: the arbiter is the hash
+# exclusion constraint on code.)
+CODE_RESERVE = (
+    insert(PromoCode.__table__)
+    .from_select(
+        ["code", "code_type", "description", "details", "batch_id", "single_use"],
+        select(
+            func.unnest(bindparam("b_codes", type_=ARRAY(String))),
+            bindparam("b_code_type", type_=String),
+            bindparam("b_description", type_=Text),
+            bindparam("b_details", type_=JSONB),
+            bindparam("b_batch_id", type_=String),
+            bindparam("b_single_use", type_=Boolean),
+        )
+    )
+    .on_conflict_do_nothing()
+    .returning(PromoCode.id, PromoCode.code)
+)
+
+# Single-use codes are claimed by the first redemption only; the row lock
+# taken by the UPDATE makes a concurrent second redemption re-check
+# redeemed_at and match nothing
+CODE_REDEEM = (
+    update(PromoCode)
+    .where(PromoCode.code == bindparam("b_code"))
+    .where(PromoCode.redeemed_at.is_(None) | ~PromoCode.single_use)
+    .values(
+        redeemed_at=func.coalesce(PromoCode.redeemed_at, func.now()),
+        redeemed_by=bindparam("b_redeemed_by"),
+        redemption_count=PromoCode.redemption_count + 1,
+        updated_at=func.now(),
+    )
+    .returning(PromoCode)
+)
+
+
+class CodeFormat(NamedTuple):
+    code_type: str
+    fields: tuple
+    has_name: Optional[bool]
+    suffix_length: int
+
+
+# Leading part of a code -> its format (see GIFT_CARD.md). The name, when
+# there is one, comes after the fields and may itself contain hyphens.
+CODE_FORMATS = {
+    "UL": CodeFormat("unlimited", ("duration",), True, 6),
+    "SCHL": CodeFormat("school", ("discount",), False, 6),
+    "REF": CodeFormat("referral", ("discount",), True, 6),
+    "FREE": CodeFormat("guest", ("duration",), True, 6),
+    "PERS": CodeFormat("personal", ("value",), True, 6),
+    "GIFT": CodeFormat("gift", ("card_type", "amount"), None, 8),
+}
+GIFT_CARD_TYPES = {"DGTL": "gift_digital", "PREM": "gift_premium"}
+PERSONAL_DURATIONS = {"60", "90", "110"}
+
+
+class ParsedCode(NamedTuple):
+    code_type: str
+    prefix: str
+    suffix: str
+
+
+def normalize_code(code: str) -> str:
+    """Codes are stored and compared stripped and uppercase"""
+    return code.strip().upper()
+
+
+@lru_cache(maxsize=4096)
+def parse_code(code: str) -> Optional[ParsedCode]:
+    """
+    Split a normalized code into its type, prefix and random suffix.
+
+    Returns None if the code isn't in any issued format, so malformed
+    input is rejected without touching the database.
+    """
+    parts = code.split("-")
+    code_format = CODE_FORMATS.get(parts[0])
+    if code_format is None or len(parts) < 2 + len(code_format.fields):
+        return None
+
+    suffix = parts[-1]
+    if len(suffix) != code_format.suffix_length or not all(c in CODE_ALPHABET for c in suffix):
+        return None
+    # has_name None: the name is optional
+    name = parts[1 + len(code_format.fields):-1]
+    if (code_format.has_name and not name) or (code_format.has_name is False and name):
+        return None
+
+    code_type = code_format.code_type
+    value = parts[1]
+    if code_type == "gift":
+        code_type = GIFT_CARD_TYPES.get(value)
+        if code_type is None:
+            return None
+    elif code_type == "personal":
+        code_type = "personal_duration" if value in PERSONAL_DURATIONS else "personal_discount"
+
+    return ParsedCode(code_type, code[:-len(suffix) - 1], suffix)
+
+
+def generate_code(prefix: str, suffix_length: int = 8) -> str:
+    """`prefix` plus a random suffix of uppercase letters and digits, from a CSPRNG"""
+    return f"{prefix}-{''.join(secrets.choice(CODE_ALPHABET) for _ in range(suffix_length))}"
+
+
+class PromoCodeFilter:
+    """
+    Per-process Bloom filter of every issued code.
+
+    A code the filter has never seen is certainly not real, so forged or
+    mistyped codes are turned away without a database query. The filter
+    is loaded on first use by a listener thread: it LISTENs first, then
+    loads, so codes issued by other processes in the meantime arrive as
+    notifications and none are missed. Until it is loaded (or while the
+    listener is reconnecting) every well-formed code goes to the database.
+
+    Codes issued by another process reach the filter a little after they
+    are committed: the NOTIFY has to arrive and the codes be read back.
+    Misses within `grace` seconds of a notification arriving go to the
+    database, which covers the read. The delivery itself (normally a few
+    milliseconds after the commit) is not covered: a code looked up in
+    another worker before its notification arrives is reported unknown.
+    """
+
+    def __init__(self, error_rate: float = PROMO_CODE_FILTER_ERROR_RATE, grace: float = PROMO_CODE_FILTER_GRACE_SECONDS):
+        self.error_rate = error_rate
+        self.grace = grace
+        self.stats = {"checks": 0, "rejected": 0, "loads": 0, "grace_checks": 0}
+        # Monotonic time the last notification from another process arrived
+        self._notified_at = None
+        self._filter = None
+        # Codes added while a load is running, replayed into the new filter
+        self._pending = None
+        # Bumped whenever notifications may have been missed; a load started
+        # before that is thrown away
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._listener_pid = None
+        self._engine = None
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+
+    def might_contain(self, code: str) -> bool:
+        """False only if `code` was certainly never issued"""
+        self._ensure_listener()
+        bloom = self._filter
+        self.stats["checks"] += 1
+        if bloom is None or code in bloom:
+            return True
+        notified_at = self._notified_at
+        if notified_at is not None and time.monotonic() - notified_at < self.grace:
+            # May have been issued elsewhere and not be added yet
+            self.stats["grace_checks"] += 1
+            return True
+        self.stats["rejected"] += 1
+        return False
+
+    def add(self, codes: Iterable[str]):
+        codes = list(codes)
+        with self._lock:
+            if self._pending is not None:
+                self._pending.extend(codes)
+            bloom = self._filter
+            if bloom is None:
+                return
+            for code in codes:
+                bloom.add(code)
+            if len(bloom) > bloom.capacity and self._pending is None:
+                # Past capacity the false positive rate climbs; load a bigger one
+                self._pending = []
+                threading.Thread(target=self._load, args=(self._engine, self._generation), daemon=True).start()
+
+    def _load(self, engine, generation: int):
+        """Build a filter of every code in the table and swap it in"""
+        try:
+            with engine.connect() as connection:
+                count = connection.execute(select(func.count()).select_from(PromoCode)).scalar()
+                bloom = BloomFilter(max(2 * count, PROMO_CODE_FILTER_MIN_CAPACITY), self.error_rate)
+                result = connection.execution_options(yield_per=10000).execute(select(PromoCode.code))
+                for partition in result.partitions():
+                    for (code,) in partition:
+                        bloom.add(code)
+            with self._lock:
+                if generation != self._generation:
+                    return
+                for code in self._pending:
+                    bloom.add(code)
+                self._filter = bloom
+                self.stats["loads"] += 1
+            logger.info(f"Loaded {len(bloom)} promo codes into the filter")
+        finally:
+            with self._lock:
+                if generation == self._generation:
+                    self._pending = None
+
+    def _reset(self) -> int:
+        """Drop the filter (checks go to the database) and start a new generation"""
+        with self._lock:
+            self._generation += 1
+            self._filter = None
+            self._pending = []
+            return self._generation
+
+    def _ensure_listener(self):
+        # One listener per process; gunicorn forks after create_app
+        if self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            self._filter = None
+            self._engine = db.engine
+        threading.Thread(target=self._listen, args=(self._engine,), daemon=True, name="promo-code-listener").start()
+
+    def _listen(self, engine):
+        # Listening first, so nothing issued during the load is missed
+        listen(
+            engine,
+            NOTIFY_CHANNEL,
+            lambda payload: self._handle_notification(engine, payload),
+            on_listen=lambda: self._load(engine, self._reset()),
+            on_disconnect=self._reset
+        )
+
+    def _handle_notification(self, engine, payload: str):
+        try:
+            message = json.loads(payload)
+            first_id, last_id = message["ids"]
+        except (ValueError, KeyError, TypeError):
+            logger.warning(f"Ignoring malformed promo code notification: {payload!r}")
+            return
+        if message.get("origin") == current_origin():
+            return
+        self._notified_at = time.monotonic()
+        with engine.connect() as connection:
+            codes = connection.execute(
+                select(PromoCode.code).where(PromoCode.id.between(first_id, last_id))
+            ).scalars().all()
+        self.add(codes)
+
+
+promo_code_filter = PromoCodeFilter()
+
+
+class PromoCodeService:
+    @staticmethod
+    def issue(
+        prefix: str,
+        code_type: str,
+        quantity: int = 1,
+        suffix_length: int = 8,
+        description: Optional[str] = None,
+        details: Optional[Dict[str, Any]] = None,
+        batch_id: Optional[str] = None
+    ) -> List[str]:
+        """
+        Generate and record `quantity` new codes sharing `prefix`.
+
+        The whole batch is reserved with one INSERT ... ON CONFLICT DO
+        NOTHING RETURNING; any code that already exists isn't returned, and
+        only those are regenerated and tried again. The codes are committed
+        before they are returned, so a code handed out is always on record.
+
+        Args:
+            prefix: Code prefix, e.g. 'GIFT-PREM-150'
+            code_type: Code type, e.g. 'gift_premium'
+            quantity: Number of codes
+            suffix_length: Random characters after the prefix
+            description: Human-readable description stored with the codes
+            details: Parameters the codes were generated with
+            batch_id: Groups the codes of one bulk request
+
+        Returns:
+            The issued codes
+
+        Raises:
+            RuntimeError: If unique codes can't be found (the prefix's code
+                space is nearly used up)
+        """
+        prefix = normalize_code(prefix)
+        params = {
+            "b_code_type": code_type,
+            "b_description": description,
+            "b_details": details,
+            "b_batch_id": batch_id,
+            "b_single_use": code_type not in REUSABLE_CODE_TYPES,
+        }
+        ids, issued = [], []
+        try:
+            for attempt in range(1, MAX_ISSUE_ATTEMPTS + 1):
+                wanted = quantity - len(issued)
+                # A set, so a code drawn twice in one batch counts as a collision
+                candidates = {generate_code(prefix, suffix_length) for _ in range(wanted)}
+                reserved = db.session.execute(CODE_RESERVE, {**params, "b_codes": list(candidates)}).all()
+                ids.extend(reserved_id for reserved_id, _ in reserved)
+                issued.extend(code for _, code in reserved)
+                if len(issued) == quantity:
+                    break
+                logger.warning(
+                    f"{wanted - len(reserved)} of {wanted} {prefix} codes collided (attempt {attempt}), regenerating"
+                )
+            else:
+                raise RuntimeError(
+                    f"Could not issue {quantity} unique {prefix} codes in {MAX_ISSUE_ATTEMPTS} attempts"
+                )
+
+            # Delivered to other processes' filters only if this commits
+            db.session.execute(
+                text("SELECT pg_notify(:channel, :payload)"),
+                {"channel": NOTIFY_CHANNEL, "payload": json.dumps({"origin": current_origin(), "ids": [min(ids), max(ids)]})}
+            )
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        promo_code_filter.add(issued)
+        return issued
+
+    @staticmethod
+    def issue_batch(
+        prefix: str,
+        code_type: str,
+        quantity: int,
+        suffix_length: int = 8,
+        description: Optional[str] = None,
+        details: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Issue a bulk batch of codes under a new batch ID.
+
+        Returns:
+            dict: 'batch_id' and 'codes'
+        """
+        batch_id = str(uuid.uuid4())
+        codes = PromoCodeService.issue(
+            prefix, code_type, quantity, suffix_length,
+            description=description, details=details, batch_id=batch_id
+        )
+        logger.info(f"Issued {len(codes)} {code_type} codes in batch {batch_id}")
+        return {"batch_id": batch_id, "codes": codes}
+
+    @staticmethod
+    def lookup(code: str) -> Optional[PromoCode]:
+        """
+        The issued code matching `code` (in any case), or None.
+
+        Codes in no issued format, or unknown to this process's filter, are
+        answered without a query.
+        """
+        code = normalize_code(code)
+        if parse_code(code) is None or not promo_code_filter.might_contain(code):
+            return None
+        return db.session.execute(select(PromoCode).where(PromoCode.code == code)).scalar_one_or_none()
+
+    @staticmethod
+    def redeem(code: str, redeemed_by: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Redeem a code, atomically.
+
+        A single-use code is claimed by one UPDATE ... WHERE redeemed_at IS
+        NULL RETURNING, so of two tills redeeming the same gift card at
+        once exactly one succeeds. Reusable codes (unlimited packages,
+        school discounts) just count the redemption.
+
+        Args:
+            code: The code, in any case
+            redeemed_by: Till, booking system or staff member
+
+        Returns:
+            dict: 'status' ('redeemed', 'already_redeemed' or 'unknown') and,
+            unless unknown, 'promo_code'
+        """
+        code = normalize_code(code)
+        if parse_code(code) is None or not promo_code_filter.might_contain(code):
+            return {"status": "unknown"}
+
+        try:
+            promo_code = db.session.execute(
+                CODE_REDEEM, {"b_code": code, "b_redeemed_by": redeemed_by}
+            ).scalar_one_or_none()
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        if promo_code is not None:
+            logger.info(f"Redeemed {promo_code.code_type} code {code}")
+            return {"status": "redeemed", "promo_code": promo_code}
+
+        promo_code = db.session.execute(select(PromoCode).where(PromoCode.code == code)).scalar_one_or_none()
+        if promo_code is None:
+            return {"status": "unknown"}
+        logger.info(f"Rejected redemption of already redeemed code {code}")
+        return {"status": "already_redeemed", "promo_code": promo_code}
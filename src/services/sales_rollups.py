@@ -0,0 +1,393 @@
+from datetime import date, datetime, time, timedelta
+from itertools import chain
+from typing import Any, Dict, Iterable, Tuple
+import logging
+import time as timer
+from sqlalchemy import event, inspect, select, text
+from sqlalchemy.orm import Session
+from src.models import (
+    Appointment, DailyOrderRollup, DailySalesRollup, Location, Order, OrderLineItem, OrderRollupEntry,
+    SalesRollupEntry, Transaction,
+)
+from src.extensions import db
+from src.services.appointments import BUSINESS_TIMEZONE
+
+logger = logging.getLogger(__name__)
+
+# Days rebuilt per transaction by `flask reports rebuild`
+REBUILD_CHUNK_DAYS = 31
+
+PENDING_KEY = "sales_rollup_changes"
+
+# Each order's share of the rollups. {orders} and {transactions} select the
+# rows: a range of days (BY_DAYS) or a set of orders (BY_ORDERS).
+SALES_ENTRIES_SQL = """
+SELECT o.id, (o.created_at AT TIME ZONE :tz)::date, a.location_id, i.type, o.data_source, sum(li.quantity), sum(li.total)
+FROM orders o
+JOIN order_line_items li ON li.order_id = o.id
+JOIN items i ON i.id = li.item_id
+LEFT JOIN appointments a ON a.order_line_item_id = li.id AND a.status <> 'cancelled'
+WHERE {orders} AND o.order_status <> 'cancelled'
+GROUP BY 1, 2, 3, 4, 5
+UNION ALL
+-- Orders we have no line items for (e.g. Square payments without an itemised order)
+SELECT o.id, (o.created_at AT TIME ZONE :tz)::date, NULL, 'unitemised', o.data_source, 0, round(o.total * 100)
+FROM orders o
+WHERE {orders} AND o.order_status <> 'cancelled'
+  AND NOT EXISTS (SELECT 1 FROM order_line_items li WHERE li.order_id = o.id)
+"""
+
+# The order on the day it was placed, and its payments on the days they were taken
+ORDER_ENTRIES_SQL = """
+SELECT o.id, (o.created_at AT TIME ZONE :tz)::date, o.data_source,
+       (o.order_status <> 'cancelled')::int, (o.order_status = 'cancelled')::int,
+       CASE WHEN o.order_status <> 'cancelled' THEN round(o.total * 100) ELSE 0 END, 0, 0, 0
+FROM orders o
+WHERE {orders}
+UNION ALL
+SELECT o.id, (t.created_at AT TIME ZONE :tz)::date, o.data_source, 0, 0, 0,
+       count(*) FILTER (WHERE t.status = 'COMPLETED'),
+       coalesce(sum(t.amount) FILTER (WHERE t.status = 'COMPLETED'), 0),
+       count(*) FILTER (WHERE t.status = 'FAILED')
+FROM transactions t
+JOIN orders o ON o.id = t.order_id
+WHERE {transactions}
+GROUP BY 1, 2, 3
+"""
+
+BY_DAYS = {
+    "orders": "o.created_at >= :start AND o.created_at < :end",
+    "transactions": "t.created_at >= :start AND t.created_at < :end",
+}
+BY_ORDERS = {
+    "orders": "o.id = ANY(:order_ids)",
+    "transactions": "t.order_id = ANY(:order_ids)",
+}
+
+
+class Rollup:
+    """
+    A rollup table and the entries it sums, with the statements that keep
+    them in step.
+
+    Args:
+        table: Rollup table
+        entries: Entry table, with the rollup's key and value columns plus order_id
+        keys: Key columns
+        conflict: ON CONFLICT target matching the table's unique key
+        values: Summed columns
+        entries_sql: Query selecting (order_id, *keys, *values)
+    """
+
+    def __init__(self, table, entries, keys, conflict, values, entries_sql):
+        self.table = table
+        self.entries = entries
+        columns = ", ".join(keys + values)
+        key_list = ", ".join(keys)
+        sums = ", ".join(f"sum({value})" for value in values)
+        non_zero = " OR ".join(f"sum({value}) <> 0" for value in values)
+
+        # Rebuild a range of days from the source rows
+        self.insert_entries_sql = text(f"""
+            INSERT INTO {entries.name} (order_id, {columns})
+            {entries_sql.format(**BY_DAYS)}
+        """)
+        self.insert_rollups_sql = text(f"""
+            INSERT INTO {table.name} ({columns})
+            SELECT {key_list}, {sums}
+            FROM {entries.name}
+            WHERE day BETWEEN :first AND :last
+            GROUP BY {key_list}
+            HAVING {non_zero}
+        """)
+
+        # Replace some orders' entries and add the difference to the
+        # rollups. Keys whose total doesn't change aren't written, so they
+        # aren't locked; the rest are upserted in key order.
+        negated = ", ".join(keys + [f"-{value} AS {value}" for value in values])
+        self.apply_sql = text(f"""
+            WITH old AS (
+                DELETE FROM {entries.name} WHERE order_id = ANY(:order_ids)
+                RETURNING {negated}
+            ),
+            new AS (
+                INSERT INTO {entries.name} (order_id, {columns})
+                {entries_sql.format(**BY_ORDERS)}
+                RETURNING {columns}
+            )
+            INSERT INTO {table.name} AS r ({columns})
+            SELECT {key_list}, {sums}
+            FROM (SELECT * FROM old UNION ALL SELECT * FROM new) AS delta
+            GROUP BY {key_list}
+            HAVING {non_zero}
+            ORDER BY {key_list}
+            ON CONFLICT ({conflict}) DO UPDATE
+            SET {", ".join(f"{value} = r.{value} + excluded.{value}" for value in values)}, updated_at = now()
+            RETURNING r.id, {" AND ".join(f"r.{value} = 0" for value in values)} AS empty
+        """)
+
+
+SALES_ROLLUP = Rollup(
+    DailySalesRollup.__table__,
+    SalesRollupEntry.__table__,
+    keys=["day", "location_id", "item_type", "data_source"],
+    conflict="day, (coalesce(location_id, 0)), item_type, data_source",
+    values=["quantity", "gross_sales"],
+    entries_sql=SALES_ENTRIES_SQL,
+)
+
+ORDER_ROLLUP = Rollup(
+    DailyOrderRollup.__table__,
+    OrderRollupEntry.__table__,
+    keys=["day", "data_source"],
+    conflict="day, data_source",
+    values=["orders", "cancelled_orders", "order_total", "payments", "payment_total", "failed_payments"],
+    entries_sql=ORDER_ENTRIES_SQL,
+)
+
+ROLLUPS = (SALES_ROLLUP, ORDER_ROLLUP)
+
+# Orders whose rollups cover these line items (through their appointments)
+LINE_ITEM_ORDERS_SQL = text("SELECT order_id FROM order_line_items WHERE id = ANY(:line_item_ids)")
+
+# Taken before an order's entries are replaced, so concurrent writers of the
+# same order take turns and the later one sees the earlier one's entries
+LOCK_ORDERS_SQL = text("SELECT id FROM orders WHERE id = ANY(:order_ids) ORDER BY id FOR UPDATE")
+
+# Taken by the rebuild, which replaces every entry of its days: waits for
+# writers that have already applied their changes and holds back new ones
+LOCK_ENTRIES_SQL = text(
+    f"LOCK TABLE {SalesRollupEntry.__tablename__}, {OrderRollupEntry.__tablename__} IN EXCLUSIVE MODE"
+)
+
+
+def day_range_bounds(first: date, last: date) -> Tuple[datetime, datetime]:
+    """UTC-aware bounds of the business days first..last (inclusive)"""
+    start = datetime.combine(first, time.min, tzinfo=BUSINESS_TIMEZONE)
+    end = datetime.combine(last + timedelta(days=1), time.min, tzinfo=BUSINESS_TIMEZONE)
+    return start, end
+
+
+class SalesRollupService:
+    @staticmethod
+    def refresh_orders(order_ids: Iterable[int], session=None) -> None:
+        """
+        Bring the rollups up to date with these orders, in the caller's
+        transaction. Does not commit.
+
+        Each order's entries are recomputed and the difference from its
+        previous ones is added to the rollup rows, so the work is
+        proportional to the orders written rather than to the day, and
+        writers of different orders only wait for each other on the
+        rollup rows they both change.
+        """
+        order_ids = sorted(set(order_ids))
+        if not order_ids:
+            return
+        connection = (session or db.session).connection()
+        params = {"tz": BUSINESS_TIMEZONE.key, "order_ids": order_ids}
+        connection.execute(LOCK_ORDERS_SQL, params)
+        for rollup in ROLLUPS:
+            emptied = [row.id for row in connection.execute(rollup.apply_sql, params) if row.empty]
+            if emptied:
+                connection.execute(rollup.table.delete().where(rollup.table.c.id.in_(emptied)))
+
+    @staticmethod
+    def refresh_range(first: date, last: date, session=None) -> None:
+        """
+        Rebuild the entries and rollup rows of the business days
+        first..last from orders and transactions, in the caller's
+        transaction. Does not commit.
+
+        Incremental writes wait until the caller commits.
+        """
+        connection = (session or db.session).connection()
+        connection.execute(LOCK_ENTRIES_SQL)
+
+        start, end = day_range_bounds(first, last)
+        params = {"tz": BUSINESS_TIMEZONE.key, "start": start, "end": end, "first": first, "last": last}
+        for rollup in ROLLUPS:
+            for table in (rollup.entries, rollup.table):
+                connection.execute(table.delete().where(table.c.day.between(first, last)))
+            connection.execute(rollup.insert_entries_sql, params)
+            connection.execute(rollup.insert_rollups_sql, params)
+
+    @staticmethod
+    def changed_orders(order_ids, line_item_ids, session=None) -> set:
+        """Orders whose rollup entries cover these orders or line items"""
+        order_ids = set(order_ids)
+        if line_item_ids:
+            session = session or db.session
+            order_ids.update(session.connection().execute(
+                LINE_ITEM_ORDERS_SQL, {"line_item_ids": list(line_item_ids)}
+            ).scalars())
+        return order_ids
+
+    @staticmethod
+    def rebuild(first: date, last: date, chunk_days: int = REBUILD_CHUNK_DAYS) -> Dict[str, Any]:
+        """
+        Rebuild the rollups of the business days first..last from scratch,
+        committing every `chunk_days` days.
+
+        The incremental refresh keeps the rollups current; this is the
+        nightly correction for writes it can't see (bulk SQL, deletes of
+        rows that weren't loaded, timezone changes). Run it with the full
+        history once, to create the entries of orders written before
+        they existed.
+
+        Args:
+            first: First business day
+            last: Last business day (inclusive)
+            chunk_days: Days rebuilt per transaction
+
+        Returns:
+            Dict with 'days' rebuilt and 'seconds'
+        """
+        started = timer.perf_counter()
+        day = first
+        while day <= last:
+            chunk_last = min(day + timedelta(days=chunk_days - 1), last)
+            try:
+                SalesRollupService.refresh_range(day, chunk_last)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            day = chunk_last + timedelta(days=1)
+
+        result = {
+            "days": (last - first).days + 1,
+            "seconds": round(timer.perf_counter() - started, 2),
+        }
+        logger.info(f"Rebuilt sales rollups {first.isoformat()} - {last.isoformat()}: {result}")
+        return result
+
+    @staticmethod
+    def daily_report(day: date) -> Dict[str, Any]:
+        """
+        A day's sales, read from the rollups only (a handful of indexed rows
+        however long the order history is). Amounts are in pence.
+
+        Args:
+            day: Business day
+
+        Returns:
+            Dict with the day's totals and breakdowns 'by_source',
+            'by_item_type' and 'by_location'
+        """
+        report = {
+            "date": day.isoformat(),
+            "orders": 0,
+            "cancelled_orders": 0,
+            "order_total": 0,
+            "payments": 0,
+            "payment_total": 0,
+            "failed_payments": 0,
+            "by_source": {},
+            "by_item_type": {},
+            "by_location": [],
+        }
+        updated_at = []
+
+        for row in db.session.scalars(
+            select(DailyOrderRollup).where(DailyOrderRollup.day == day).order_by(DailyOrderRollup.data_source)
+        ):
+            source = {
+                field: getattr(row, field)
+                for field in ("orders", "cancelled_orders", "order_total", "payments", "payment_total", "failed_payments")
+            }
+            for field, value in source.items():
+                report[field] += value
+            report["by_source"][row.data_source] = source
+            updated_at.append(row.updated_at)
+
+        locations = {}
+        for row, location_name in db.session.execute(
+            select(DailySalesRollup, Location.name)
+            .outerjoin(Location, Location.id == DailySalesRollup.location_id)
+            .where(DailySalesRollup.day == day)
+            .order_by(DailySalesRollup.item_type, DailySalesRollup.location_id)
+        ):
+            item_type = report["by_item_type"].setdefault(row.item_type, {"quantity": 0, "gross_sales": 0})
+            item_type["quantity"] += row.quantity
+            item_type["gross_sales"] += row.gross_sales
+            location = locations.setdefault(row.location_id, {
+                "location_id": row.location_id,
+                "location": location_name,
+                "quantity": 0,
+                "gross_sales": 0,
+            })
+            location["quantity"] += row.quantity
+            location["gross_sales"] += row.gross_sales
+            updated_at.append(row.updated_at)
+
+        report["by_location"] = sorted(locations.values(), key=lambda location: -location["gross_sales"])
+        report["updated_at"] = max(updated_at).isoformat() if updated_at else None
+        return report
+
+
+def mark_orders_changed(order_ids: Iterable[int], session=None) -> None:
+    """
+    Refresh the rollups of these orders' days when the session commits.
+    ORM writes are picked up automatically; Core INSERT/UPDATE statements
+    (the order upserts) call this instead.
+    """
+    order_ids = {order_id for order_id in order_ids if order_id is not None}
+    if order_ids:
+        _pending(session or db.session)["order_ids"].update(order_ids)
+
+
+# --- Order write hooks ------------------------------------------------------
+
+def _pending(session):
+    return session.info.setdefault(PENDING_KEY, {"order_ids": set(), "line_item_ids": set()})
+
+
+def _rollup_changes(session) -> Tuple[set, set]:
+    """Collect (order IDs, line item IDs) touched by a flush."""
+    order_ids, line_item_ids = set(), set()
+    written = chain(session.new, (obj for obj in session.dirty if session.is_modified(obj)))
+    for obj in written:
+        if isinstance(obj, Order):
+            order_ids.add(obj.id)
+        elif isinstance(obj, (OrderLineItem, Transaction)):
+            order_ids.add(obj.order_id)
+        elif isinstance(obj, Appointment):
+            line_item_ids.add(obj.order_line_item_id)
+    for obj in session.deleted:
+        # Only loaded values are read, nothing is fetched. A deleted order's
+        # entries outlive it, so it's taken out of the rollups like any other.
+        loaded = inspect(obj).dict
+        if isinstance(obj, Order):
+            order_ids.add(loaded.get("id"))
+        elif isinstance(obj, (OrderLineItem, Transaction)):
+            order_ids.add(loaded.get("order_id"))
+        elif isinstance(obj, Appointment):
+            line_item_ids.add(loaded.get("order_line_item_id"))
+    return order_ids - {None}, line_item_ids - {None}
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_rollup_changes(session, flush_context):
+    order_ids, line_item_ids = _rollup_changes(session)
+    if order_ids or line_item_ids:
+        pending = _pending(session)
+        pending["order_ids"].update(order_ids)
+        pending["line_item_ids"].update(line_item_ids)
+
+
+@event.listens_for(Session, "before_commit")
+def _refresh_rollups(session):
+    # Flush now so the hook above sees everything this commit will write
+    session.flush()
+    pending = session.info.pop(PENDING_KEY, None)
+    if not pending:
+        return
+    # In the same transaction as the writes: both commit or neither does
+    order_ids = SalesRollupService.changed_orders(pending["order_ids"], pending["line_item_ids"], session)
+    SalesRollupService.refresh_orders(order_ids, session)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rollup_changes(session):
+    session.info.pop(PENDING_KEY, None)
@@ -0,0 +1,286 @@
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, UTC
+from typing import Any, Dict, Iterator, List, Tuple
+import logging
+import time
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from src.models import Customer, Item, Order, OrderLineItem, SyncState, Transaction
+from src.core.integrations.square import get_square_client, iter_order_pages, iter_payment_pages, parse_square_time
+from src.extensions import db
+from src.services.orders import (
+    ORDER_UPSERTS, TRANSACTION_UPSERT, TRANSACTION_DEFAULTS, LINE_ITEM_INSERT,
+    map_order_line_items, map_order_object, map_square_payment, money,
+)
+from src.services.sales_rollups import mark_orders_changed
+
+logger = logging.getLogger(__name__)
+
+RECONCILIATION_SYNC_NAME = "square.reconciliation"
+
+# Fields compared between Square and our rows; anything else is left alone
+ORDER_FINGERPRINT_FIELDS = ("order_status", "fulfillment_status", "payment_status", "subtotal", "total")
+TRANSACTION_FINGERPRINT_FIELDS = ("amount", "status")
+
+
+def fingerprint(row, fields) -> int:
+    """Hash of the compared fields (Decimal('60') and Decimal('60.00') hash alike)"""
+    return hash(tuple(row[field] for field in fields))
+
+
+def iter_windows(since: datetime, until: datetime, chunk: timedelta) -> Iterator[Tuple[datetime, datetime]]:
+    start = since
+    while start < until:
+        end = min(start + chunk, until)
+        yield start, end
+        start = end
+
+
+def fetch_window(start: datetime, end: datetime, location_ids: List[str]) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Fetch the orders and payments created in one window. Runs on a worker
+    thread, so it only talks to Square, never to the database.
+    """
+    client = get_square_client()
+    orders = [order for page in iter_order_pages(client, location_ids, start, end) for order in page]
+    location_id = location_ids[0] if len(location_ids) == 1 else None
+    payments = [payment for page in iter_payment_pages(client, start, end, location_id) for payment in page]
+    return orders, payments
+
+
+class SquareReconciliationService:
+    @staticmethod
+    def fetch_order_fingerprints(keys) -> Dict[str, int]:
+        """Fingerprints of our Square orders with these Square order IDs"""
+        if not keys:
+            return {}
+        columns = [getattr(Order, field) for field in ORDER_FINGERPRINT_FIELDS]
+        rows = db.session.execute(
+            select(Order.payment_system_order_id, *columns).where(Order.payment_system_order_id.in_(keys))
+        ).mappings()
+        return {row["payment_system_order_id"]: fingerprint(row, ORDER_FINGERPRINT_FIELDS) for row in rows}
+
+    @staticmethod
+    def fetch_transaction_fingerprints(ids) -> Dict[str, int]:
+        """Fingerprints of our transactions with these Square payment IDs"""
+        if not ids:
+            return {}
+        columns = [getattr(Transaction, field) for field in TRANSACTION_FINGERPRINT_FIELDS]
+        rows = db.session.execute(select(Transaction.id, *columns).where(Transaction.id.in_(ids))).mappings()
+        return {row["id"]: fingerprint(row, TRANSACTION_FINGERPRINT_FIELDS) for row in rows}
+
+    @staticmethod
+    def apply_window(orders: List[Dict], payments: List[Dict], counts: Counter) -> None:
+        """
+        Diff one window of Square orders and payments against our rows and
+        write only what is missing or changed. Inserted rows keep Square's
+        created_at. Does not commit; the commit refreshes the sales rollups
+        of the days written.
+        """
+        # Square's side, keyed by Square order ID and payment ID
+        theirs = {order["id"]: order for order in orders}
+        order_rows = {key: map_order_object(order) for key, order in theirs.items()}
+        transactions = {}
+        for payment in payments:
+            if not payment.get("order_id") or not money(payment.get("amount_money")):
+                counts["payments_skipped"] += 1
+                continue
+            payment_order, _, transaction = map_square_payment(payment)
+            # Backfilled payments keep Square's timestamp, so they roll up on the day they were taken
+            transaction["created_at"] = parse_square_time(payment.get("created_at")) or datetime.now(UTC)
+            transactions[payment["id"]] = (payment["order_id"], transaction)
+            if payment["order_id"] in order_rows and payment_order["confirmation_code"]:
+                order_rows[payment["order_id"]]["confirmation_code"] = payment_order["confirmation_code"]
+
+        # Our side, as hashed key sets
+        ours = SquareReconciliationService.fetch_order_fingerprints(list(order_rows))
+        missing_orders = order_rows.keys() - ours.keys()
+        changed_orders = {
+            key for key in order_rows.keys() & ours.keys()
+            if fingerprint(order_rows[key], ORDER_FINGERPRINT_FIELDS) != ours[key]
+        }
+        counts["orders_fetched"] += len(order_rows)
+        counts["orders_unchanged"] += len(order_rows) - len(missing_orders) - len(changed_orders)
+
+        # Orders need a customer; Square orders name one by Square ID
+        to_write = missing_orders | changed_orders
+        customer_ids = dict(db.session.execute(
+            select(Customer.payment_system_id, Customer.id).where(
+                Customer.payment_system_id.in_({theirs[key].get("customer_id") for key in to_write} - {None})
+            )
+        ).all()) if to_write else {}
+        rows = []
+        for key in to_write:
+            customer_id = customer_ids.get(theirs[key].get("customer_id"))
+            if customer_id is None:
+                counts["orders_unknown_customer"] += 1
+                missing_orders.discard(key)
+                continue
+            counts["orders_missing" if key in missing_orders else "orders_changed"] += 1
+            rows.append({
+                "customer_id": customer_id,
+                "data_source": "square",
+                # Only used when the order is inserted; the upsert never changes created_at
+                "created_at": parse_square_time(theirs[key].get("created_at")) or datetime.now(UTC),
+                **order_rows[key],
+            })
+        if rows:
+            written = db.session.execute(ORDER_UPSERTS["square"], rows).all()
+            mark_orders_changed(row.id for row in written)
+
+        ours_transactions = SquareReconciliationService.fetch_transaction_fingerprints(list(transactions))
+        changed_transactions = {
+            payment_id for payment_id, (_, transaction) in transactions.items()
+            if ours_transactions.get(payment_id) != fingerprint(transaction, TRANSACTION_FINGERPRINT_FIELDS)
+        }
+        counts["payments_fetched"] += len(transactions)
+        counts["transactions_unchanged"] += len(transactions) - len(changed_transactions)
+
+        # Our IDs for the new orders and for the orders of changed payments
+        order_keys = missing_orders | {transactions[payment_id][0] for payment_id in changed_transactions}
+        order_ids = dict(db.session.execute(
+            select(Order.payment_system_order_id, Order.id).where(Order.payment_system_order_id.in_(order_keys))
+        ).all()) if order_keys else {}
+
+        if missing_orders:
+            SquareReconciliationService.insert_line_items(
+                {order_ids[key]: map_order_line_items(theirs[key]) for key in missing_orders if key in order_ids},
+                counts
+            )
+
+        transaction_rows = []
+        for payment_id in changed_transactions:
+            order_key, transaction = transactions[payment_id]
+            if order_key not in order_ids:
+                counts["payments_unknown_order"] += 1
+                continue
+            counts["transactions_changed" if payment_id in ours_transactions else "transactions_missing"] += 1
+            transaction_rows.append({**TRANSACTION_DEFAULTS, **transaction, "order_id": order_ids[order_key]})
+        if transaction_rows:
+            db.session.execute(TRANSACTION_UPSERT, transaction_rows)
+            mark_orders_changed(row["order_id"] for row in transaction_rows)
+
+    @staticmethod
+    def insert_line_items(line_items: Dict[int, List[Dict[str, Any]]], counts: Counter) -> None:
+        """Insert line items for new orders that don't have any yet (a webhook may have won the race)"""
+        if not line_items:
+            return
+        with_items = set(db.session.scalars(
+            select(OrderLineItem.order_id).where(OrderLineItem.order_id.in_(line_items)).distinct()
+        ))
+        external_ids = {item["external_id"] for items in line_items.values() for item in items}
+        item_ids = dict(db.session.execute(
+            select(Item.external_id, Item.id).where(Item.external_id.in_(external_ids))
+        ).all()) if external_ids else {}
+
+        rows = []
+        for order_id, items in line_items.items():
+            if order_id in with_items:
+                continue
+            for item in items:
+                if item["external_id"] not in item_ids:
+                    counts["line_items_unknown_item"] += 1
+                    continue
+                rows.append({
+                    "order_id": order_id,
+                    "item_id": item_ids[item["external_id"]],
+                    "quantity": item["quantity"],
+                    "price": item["price"],
+                    "total": item["total"],
+                })
+        if rows:
+            db.session.execute(LINE_ITEM_INSERT, rows)
+            counts["line_items_inserted"] += len(rows)
+
+    @staticmethod
+    def reconcile(
+        since: datetime,
+        until: datetime,
+        location_ids: List[str],
+        chunk: timedelta = timedelta(days=7),
+        workers: int = 4,
+        dry_run: bool = False
+    ) -> Dict[str, Any]:
+        """
+        Backfill Square orders and payments our webhooks missed.
+
+        The range is split into `chunk`-sized windows. Worker threads fetch
+        each window's orders and payments with cursor paging, and the calling
+        thread applies the windows in date order. Each window is diffed
+        against our rows by hashed key sets and committed on its own.
+        Payments come after their orders, so they find an order that is
+        already written.
+
+        Args:
+            since: Start of the range (orders and payments created at or after)
+            until: End of the range (exclusive)
+            location_ids: Square locations to search
+            chunk: Window size
+            workers: Windows fetched concurrently
+            dry_run: Count the differences without writing them
+
+        Returns:
+            Dict of counts plus 'windows' and 'seconds'
+        """
+        started = time.perf_counter()
+        counts = Counter()
+        windows = iter_windows(since, until, chunk)
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="square-reconcile") as pool:
+            # Keep a bounded number of windows in flight so memory stays flat
+            in_flight = deque()
+
+            def submit_next():
+                window = next(windows, None)
+                if window:
+                    in_flight.append((window, pool.submit(fetch_window, *window, location_ids)))
+
+            for _ in range(workers * 2):
+                submit_next()
+
+            while in_flight:
+                (start, end), future = in_flight.popleft()
+                orders, payments = future.result()
+                submit_next()
+                try:
+                    SquareReconciliationService.apply_window(orders, payments, counts)
+                    # A dry run keeps one transaction, so later windows still
+                    # see the orders of earlier ones, and rolls it back at the end
+                    if not dry_run:
+                        db.session.commit()
+                except Exception:
+                    db.session.rollback()
+                    for _, pending in in_flight:
+                        pending.cancel()
+                    raise
+                counts["windows"] += 1
+                logger.debug(f"Reconciled Square window {start.isoformat()} - {end.isoformat()}")
+
+        result = dict(sorted(counts.items()))
+        if dry_run:
+            db.session.rollback()
+        else:
+            db.session.execute(
+                insert(SyncState)
+                .values(name=RECONCILIATION_SYNC_NAME, watermark=until, last_run_at=datetime.now(UTC), last_result=result)
+                .on_conflict_do_update(
+                    index_elements=[SyncState.name],
+                    set_={
+                        "watermark": until,
+                        "last_run_at": datetime.now(UTC),
+                        "last_result": result,
+                        "updated_at": datetime.now(UTC),
+                    }
+                )
+            )
+            db.session.commit()
+
+        result["seconds"] = round(time.perf_counter() - started, 2)
+        if counts["orders_unknown_customer"]:
+            logger.warning(
+                f"{counts['orders_unknown_customer']} Square order(s) skipped for unknown customers; "
+                f"run 'flask square sync-customers' first"
+            )
+        logger.info(f"Square reconciliation {since.isoformat()} - {until.isoformat()}: {result}")
+        return result
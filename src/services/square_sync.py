@@ -0,0 +1,201 @@
+from datetime import datetime, UTC
+from typing import Optional, Dict, Any, List, Tuple
+import csv
+import io
+import json
+import logging
+import time
+from sqlalchemy import text
+from sqlalchemy.dialects.postgresql import insert
+from src.models import Customer, SyncState
+from src.core.integrations.square import get_square_client, iter_customer_pages, MAX_CUSTOMER_PAGE_SIZE
+from src.extensions import db
+from src.services.customers import WEBHOOK_UPDATE_FIELDS
+from src.utils.customer_data_processor import CustomerDataProcessor
+from src.utils.prefetch import prefetch
+
+logger = logging.getLogger(__name__)
+
+CUSTOMER_SYNC_NAME = "square.customers"
+
+STAGING_TABLE = "square_customer_staging"
+STAGING_COLUMNS = (
+    "payment_system_id", "first_name", "last_name", "email",
+    "phone_number", "address", "square_updated_at",
+)
+
+# Square allows longer values than our columns do; such customers are skipped
+COLUMN_LENGTHS = {
+    name: Customer.__table__.c[name].type.length
+    for name in ("first_name", "last_name", "email", "phone_number")
+}
+
+UPSERT_SQL = f"""
+WITH incoming AS (
+    -- Square allows several customers with one email; keep the latest
+    SELECT DISTINCT ON (email) *
+    FROM {STAGING_TABLE}
+    ORDER BY email, square_updated_at DESC
+),
+upserted AS (
+    INSERT INTO customers (first_name, last_name, email, payment_system_id, signup_source, phone_number, address)
+    SELECT i.first_name, i.last_name, i.email, i.payment_system_id, 'square', i.phone_number, i.address
+    FROM incoming i
+    WHERE NOT EXISTS (
+        SELECT 1 FROM customers c
+        WHERE c.payment_system_id = i.payment_system_id AND c.email <> i.email
+    )
+    ON CONFLICT (email) DO UPDATE SET
+        {{set_clause}},
+        updated_at = now()
+    WHERE ({{current}}) IS DISTINCT FROM ({{incoming}})
+    RETURNING xmax = 0 AS inserted
+)
+SELECT
+    count(*) FILTER (WHERE inserted),
+    count(*) FILTER (WHERE NOT inserted),
+    (SELECT count(*) FROM incoming),
+    (SELECT count(*) FROM incoming i WHERE EXISTS (
+        SELECT 1 FROM customers c
+        WHERE c.payment_system_id = i.payment_system_id AND c.email <> i.email
+    ))
+FROM upserted
+"""
+
+
+def build_upsert_sql() -> str:
+    """Upsert from staging, updating the same fields as the Square webhook"""
+    fields = WEBHOOK_UPDATE_FIELDS["square"]
+    return UPSERT_SQL.format(
+        set_clause=",\n        ".join(f"{field} = EXCLUDED.{field}" for field in fields),
+        current=", ".join(f"customers.{field}" for field in fields),
+        incoming=", ".join(f"EXCLUDED.{field}" for field in fields),
+    )
+
+
+def to_staging_row(customer: Dict[str, Any]) -> Optional[Tuple]:
+    """
+    Map a Square customer to a staging row, or None if it can't be imported
+    (missing name or email, or values too long for our columns).
+    """
+    try:
+        data = CustomerDataProcessor.extract_core_customer_data(customer, source="square")
+    except ValueError:
+        return None
+    for name, length in COLUMN_LENGTHS.items():
+        if data.get(name) and len(data[name]) > length:
+            return None
+    return (
+        data["payment_system_id"],
+        data["first_name"],
+        data["last_name"],
+        data["email"],
+        data["phone_number"],
+        json.dumps(data["address"]) if data["address"] else None,
+        customer.get("updated_at"),
+    )
+
+
+class SquareCustomerSyncService:
+    @staticmethod
+    def copy_to_staging(cursor, rows: List[Tuple]):
+        """Load rows into the staging table with COPY ... FROM STDIN"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for row in rows:
+            # Empty unquoted CSV fields are NULL
+            writer.writerow(["" if value is None else value for value in row])
+        buffer.seek(0)
+        cursor.copy_expert(
+            f"COPY {STAGING_TABLE} ({', '.join(STAGING_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buffer
+        )
+
+    @staticmethod
+    def sync_customers(
+        full: bool = False,
+        page_size: int = MAX_CUSTOMER_PAGE_SIZE,
+        prefetch_pages: int = 2,
+        client=None
+    ) -> Dict[str, Any]:
+        """
+        Import the Square customer directory.
+
+        Pages are fetched with cursors on a background thread (up to
+        `prefetch_pages` ahead) while earlier pages are COPYed into a
+        temporary staging table. One set-based INSERT ... ON CONFLICT (email)
+        DO UPDATE then merges everything into customers, and the watermark
+        is advanced, in the same transaction. A failed run changes nothing
+        and the next one starts from the same watermark.
+
+        Args:
+            full: Ignore the watermark and fetch every customer
+            page_size: Customers per API page (at most 100)
+            prefetch_pages: Pages to download ahead of the writer
+            client: Square client (created from the environment if omitted)
+
+        Returns:
+            Dict of counts: 'fetched', 'skipped', 'staged', 'inserted',
+            'updated', 'unchanged', 'conflicts', plus 'pages', 'seconds' and
+            the new 'watermark'
+        """
+        started = time.perf_counter()
+        client = client or get_square_client()
+        state = db.session.get(SyncState, CUSTOMER_SYNC_NAME)
+        updated_since = None if full or state is None else state.watermark
+        logger.info(f"Syncing Square customers {'updated since ' + str(updated_since) if updated_since else '(full)'}")
+
+        connection = db.session.connection()
+        connection.execute(text(
+            f"CREATE TEMP TABLE {STAGING_TABLE} ("
+            "payment_system_id text, first_name text, last_name text, email text, "
+            "phone_number text, address jsonb, square_updated_at timestamptz"
+            ") ON COMMIT DROP"
+        ))
+        cursor = connection.connection.driver_connection.cursor()
+
+        counts = {"pages": 0, "fetched": 0, "skipped": 0}
+        try:
+            for customers in prefetch(iter_customer_pages(client, updated_since, page_size), depth=prefetch_pages):
+                rows = [row for row in map(to_staging_row, customers) if row is not None]
+                if rows:
+                    SquareCustomerSyncService.copy_to_staging(cursor, rows)
+                counts["pages"] += 1
+                counts["fetched"] += len(customers)
+                counts["skipped"] += len(customers) - len(rows)
+        finally:
+            cursor.close()
+
+        inserted, updated, staged, conflicts = connection.execute(text(build_upsert_sql())).one()
+        watermark = connection.execute(text(f"SELECT max(square_updated_at) FROM {STAGING_TABLE}")).scalar()
+        watermark = max(filter(None, (watermark, updated_since)), default=None)
+
+        counts.update({
+            "staged": staged,
+            "inserted": inserted,
+            "updated": updated,
+            "unchanged": staged - inserted - updated - conflicts,
+            "conflicts": conflicts,
+            "watermark": watermark.isoformat() if watermark else None,
+        })
+
+        db.session.execute(
+            insert(SyncState)
+            .values(name=CUSTOMER_SYNC_NAME, watermark=watermark, last_run_at=datetime.now(UTC), last_result=counts)
+            .on_conflict_do_update(
+                index_elements=[SyncState.name],
+                set_={
+                    "watermark": watermark,
+                    "last_run_at": datetime.now(UTC),
+                    "last_result": counts,
+                    "updated_at": datetime.now(UTC),
+                }
+            )
+        )
+        db.session.commit()
+
+        counts["seconds"] = round(time.perf_counter() - started, 2)
+        if conflicts:
+            logger.warning(f"{conflicts} Square customer(s) skipped: their Square ID belongs to a customer with another email")
+        logger.info(f"Square customer sync: {counts}")
+        return counts
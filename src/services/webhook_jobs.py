@@ -0,0 +1,175 @@
+from datetime import datetime, timedelta, UTC
+from typing import Optional, Dict, Any, List
+import logging
+import random
+from sqlalchemy import select, update, and_, or_
+from flask import current_app
+from src.models import WebhookJob
+from src.core.monitoring import handle_error
+from src.extensions import db
+
+logger = logging.getLogger(__name__)
+
+# Retry backoff: 5s, 10s, 20s, ... capped at 30 minutes, with jitter
+BACKOFF_BASE_SECONDS = 5
+BACKOFF_MAX_SECONDS = 1800
+
+# A job stuck in 'processing' for longer than this is assumed to belong to a
+# crashed worker and becomes claimable again
+DEFAULT_LEASE_SECONDS = 300
+
+
+def compute_backoff(attempts: int) -> float:
+    """
+    Compute the delay before a failed job may be retried.
+
+    Args:
+        attempts: Number of attempts made so far (>= 1)
+
+    Returns:
+        float: Delay in seconds
+    """
+    delay = min(BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)), BACKOFF_MAX_SECONDS)
+    return delay * random.uniform(0.5, 1.0)
+
+
+class WebhookJobService:
+    @staticmethod
+    def enqueue(kind: str, payload: Dict[str, Any]) -> WebhookJob:
+        """
+        Store a validated webhook payload for background processing.
+
+        Args:
+            kind: Job handler key (e.g. 'customer.latepoint')
+            payload: Raw webhook payload
+
+        Returns:
+            The persisted WebhookJob
+        """
+        job = WebhookJob(
+            kind=kind,
+            payload=payload,
+            max_attempts=current_app.config.get("WEBHOOK_JOB_MAX_ATTEMPTS", 8)
+        )
+        db.session.add(job)
+        db.session.commit()
+        logger.info(f"Queued webhook job {job.id} ({kind})")
+        return job
+
+    @staticmethod
+    def claim_batch(limit: int = 10, lease_seconds: int = DEFAULT_LEASE_SECONDS) -> List[WebhookJob]:
+        """
+        Claim up to `limit` runnable jobs for this worker.
+
+        Rows are locked with FOR UPDATE SKIP LOCKED so concurrent workers never
+        block on, or double-claim, the same job.
+
+        Args:
+            limit: Maximum number of jobs to claim
+            lease_seconds: Age after which a 'processing' job is reclaimed
+
+        Returns:
+            List of claimed jobs, already marked as 'processing'
+        """
+        now = datetime.now(UTC)
+        stale_before = now - timedelta(seconds=lease_seconds)
+
+        stmt = (
+            select(WebhookJob)
+            .where(
+                or_(
+                    and_(WebhookJob.status == "pending", WebhookJob.available_at <= now),
+                    and_(WebhookJob.status == "processing", WebhookJob.locked_at < stale_before),
+                )
+            )
+            .order_by(WebhookJob.available_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        jobs = db.session.execute(stmt).scalars().all()
+
+        for job in jobs:
+            job.status = "processing"
+            job.locked_at = now
+            job.attempts += 1
+        db.session.commit()
+
+        return jobs
+
+    @staticmethod
+    def complete(job_id: int, result: Optional[Dict[str, Any]] = None) -> None:
+        """
+        Mark a job as successfully processed.
+
+        Args:
+            job_id: ID of the job
+            result: Optional handler result to keep for auditing
+        """
+        db.session.execute(
+            update(WebhookJob)
+            .where(WebhookJob.id == job_id)
+            .values(status="done", result=result, locked_at=None, last_error=None)
+        )
+        db.session.commit()
+
+    @staticmethod
+    def fail(job_id: int, error: str, permanent: bool = False) -> Optional[WebhookJob]:
+        """
+        Record a failed attempt and schedule a retry, or dead-letter the job.
+
+        Args:
+            job_id: ID of the job
+            error: Error description to store on the job
+            permanent: Skip remaining retries (e.g. for invalid payloads)
+
+        Returns:
+            The updated WebhookJob, or None if it no longer exists
+        """
+        job = db.session.get(WebhookJob, job_id)
+        if not job:
+            return None
+
+        job.last_error = error
+        job.locked_at = None
+
+        if permanent or job.attempts >= job.max_attempts:
+            job.status = "dead"
+            db.session.commit()
+            logger.error(f"Webhook job {job_id} ({job.kind}) moved to dead-letter after {job.attempts} attempt(s): {error}")
+            # One alert per dead job; they'd otherwise all group as this line
+            handle_error(
+                RuntimeError(f"Webhook job {job_id} ({job.kind}) failed: {error}"),
+                "Webhook job moved to dead-letter",
+                fingerprint=f"webhook_job.dead:{job_id}"
+            )
+            return job
+
+        delay = compute_backoff(job.attempts)
+        job.status = "pending"
+        job.available_at = datetime.now(UTC) + timedelta(seconds=delay)
+        db.session.commit()
+        logger.warning(f"Webhook job {job_id} ({job.kind}) failed, retrying in {delay:.0f}s: {error}")
+        return job
+
+    @staticmethod
+    def requeue_dead(kind: Optional[str] = None) -> int:
+        """
+        Move dead-lettered jobs back to the queue with a fresh attempt budget.
+
+        Args:
+            kind: Only requeue jobs of this kind, if given
+
+        Returns:
+            int: Number of jobs requeued
+        """
+        stmt = (
+            update(WebhookJob)
+            .where(WebhookJob.status == "dead")
+            .values(status="pending", attempts=0, available_at=datetime.now(UTC), last_error=None)
+        )
+        if kind:
+            stmt = stmt.where(WebhookJob.kind == kind)
+
+        result = db.session.execute(stmt)
+        db.session.commit()
+        return result.rowcount
@@ -0,0 +1,101 @@
+import logging
+import zlib
+
+from sqlalchemy import func, select, text
+
+logger = logging.getLogger(__name__)
+
+
+def advisory_lock_key(name: str) -> int:
+    """Map a lock name to a stable Postgres advisory lock key."""
+    return zlib.crc32(name.encode("utf-8"))
+
+
+class AdvisoryLock:
+    """
+    Session-level Postgres advisory lock used to elect a single leader among
+    processes and hosts sharing the database.
+
+    The lock lives on a dedicated connection that is kept checked out while it
+    is held. If the process dies or the connection drops, Postgres releases the
+    lock and another candidate takes over on its next attempt.
+    """
+
+    def __init__(self, engine, name: str):
+        self.engine = engine
+        self.name = name
+        self.key = advisory_lock_key(name)
+        self._connection = None
+
+    @property
+    def held(self) -> bool:
+        return self._connection is not None
+
+    def acquire(self) -> bool:
+        """
+        Try to take the lock without waiting.
+
+        Returns:
+            True if this process holds the lock
+        """
+        if self._connection is not None:
+            return self.check()
+
+        connection = self.engine.connect()
+        try:
+            acquired = connection.execute(select(func.pg_try_advisory_lock(self.key))).scalar()
+            # Session-level locks survive commit; end the implicit transaction
+            # so the connection doesn't sit idle in one
+            connection.commit()
+        except Exception:
+            connection.close()
+            raise
+
+        if not acquired:
+            connection.close()
+            return False
+
+        self._connection = connection
+        logger.info(f"Acquired advisory lock '{self.name}'")
+        return True
+
+    def check(self) -> bool:
+        """
+        Confirm the lock's connection is still alive.
+
+        Returns:
+            False (and forgets the lock) if the connection was lost
+        """
+        if self._connection is None:
+            return False
+        try:
+            self._connection.execute(text("SELECT 1"))
+            self._connection.commit()
+            return True
+        except Exception as e:
+            logger.warning(f"Lost advisory lock '{self.name}': {str(e)}")
+            self._discard()
+            return False
+
+    def release(self):
+        """Release the lock if held."""
+        if self._connection is None:
+            return
+        try:
+            self._connection.execute(select(func.pg_advisory_unlock(self.key)))
+            self._connection.commit()
+            logger.info(f"Released advisory lock '{self.name}'")
+        except Exception as e:
+            logger.warning(f"Failed to release advisory lock '{self.name}': {str(e)}")
+        finally:
+            self._discard()
+
+    def _discard(self):
+        connection, self._connection = self._connection, None
+        try:
+            # Closing returns the connection to the pool; pooled connections
+            # keep session state, so invalidate it to be sure the lock is gone
+            connection.invalidate()
+            connection.close()
+        except Exception:
+            pass
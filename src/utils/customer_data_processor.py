@@ -5,15 +5,18 @@ logger = logging.getLogger(__name__)
 
 class CustomerDataProcessor:
     @staticmethod
-    def parse_custom_fields(custom_fields_json):
+    def parse_custom_fields(form_data):
         """
-        Safely parse the custom_fields JSON string into a dictionary.
+        Safely collect the custom_fields[...] form entries into a dictionary.
+
+        Args:
+            form_data (dict): The flattened LatePoint form payload.
         """
         try:
-            if custom_fields_json:
+            if form_data:
                 return {
                     key.replace("custom_fields[", "").replace("]", ""): value
-                    for key, value in request.form.items()
+                    for key, value in form_data.items()
                     if key.startswith("custom_fields[")
                 }
         except (ValueError, TypeError):
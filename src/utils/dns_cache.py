@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+def resolve_a_records(resolver, hostname):
+    """
+    Look up A records for a hostname.
+
+    Returns:
+        tuple: (list of IP addresses, TTL in seconds)
+    """
+    answers = resolver.resolve(hostname, 'A')
+    return [answer.address for answer in answers], answers.rrset.ttl
+
+
+class DNSCache:
+    """
+    DNS cache that honours record TTLs.
+
+    Answers are served from memory until they expire. Once `refresh_ahead` of
+    the TTL has passed, a lookup still returns the cached address but starts
+    a background refresh, so callers rarely wait on DNS. If a lookup fails,
+    the last good address is used until a refresh succeeds.
+    """
+
+    def __init__(self, resolve_func, min_ttl=30, max_ttl=3600, refresh_ahead=0.8):
+        self.resolve_func = resolve_func
+        self.min_ttl = min_ttl
+        self.max_ttl = max_ttl
+        self.refresh_ahead = refresh_ahead
+        self.stats = {"hits": 0, "misses": 0, "refreshes": 0, "stale": 0, "failures": 0}
+
+        # hostname -> (addresses, fetched_at, ttl)
+        self._entries = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+
+    def _lookup(self, hostname):
+        addresses, ttl = self.resolve_func(hostname)
+        if not addresses:
+            raise LookupError(f"No addresses for {hostname}")
+        ttl = min(max(ttl, self.min_ttl), self.max_ttl)
+        with self._lock:
+            self._entries[hostname] = (addresses, time.monotonic(), ttl)
+        return addresses
+
+    def _refresh(self, hostname):
+        try:
+            self._lookup(hostname)
+            self.stats["refreshes"] += 1
+        except Exception as e:
+            self.stats["failures"] += 1
+            logger.warning(f"Background DNS refresh failed for {hostname}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(hostname)
+
+    def resolve(self, hostname):
+        """
+        Return an IP address for `hostname`, or None if it can't be resolved.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(hostname)
+
+        if entry:
+            addresses, fetched_at, ttl = entry
+            age = now - fetched_at
+            if age < ttl:
+                self.stats["hits"] += 1
+                if age >= ttl * self.refresh_ahead:
+                    with self._lock:
+                        start_refresh = hostname not in self._refreshing
+                        self._refreshing.add(hostname)
+                    if start_refresh:
+                        threading.Thread(target=self._refresh, args=(hostname,), daemon=True).start()
+                return addresses[0]
+
+        self.stats["misses"] += 1
+        try:
+            return self._lookup(hostname)[0]
+        except Exception as e:
+            self.stats["failures"] += 1
+            if entry:
+                self.stats["stale"] += 1
+                logger.warning(f"DNS resolution failed for {hostname}, using last good address: {e}")
+                # Keep serving it for a while; the refresh-ahead retries in the background
+                with self._lock:
+                    self._entries[hostname] = (entry[0], time.monotonic(), self.min_ttl)
+                return entry[0][0]
+            logger.warning(f"DNS resolution failed for {hostname}: {e}")
+            return None
@@ -1,27 +1,287 @@
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, UTC
 import requests
 import logging
+from flask import has_app_context
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.sql import func
 from src.core.monitoring import handle_error
+from src.extensions import db
+from src.models import GenderCache
+from src.utils.cache import TTLCache, SingleFlight
 
 logger = logging.getLogger(__name__)
 
+# Point at tools/stubs/gender_api.py to run without network access
+GENDER_API_URL = os.getenv("GENDER_API_URL", "https://gender-api.com").rstrip("/")
+GENDER_API_TIMEOUT = (3.05, 5)  # (connect, read) seconds
+MAX_NAMES_PER_REQUEST = 100  # gender-api.com limit for multi-name queries
+
+# Names rarely change gender; "unknown" answers are re-checked sooner
+KNOWN_TTL = timedelta(days=int(os.getenv("GENDER_CACHE_TTL_DAYS", "180")))
+UNKNOWN_TTL = timedelta(days=int(os.getenv("GENDER_CACHE_UNKNOWN_TTL_DAYS", "7")))
+
+# Tier 1: per-worker LRU. Tier 2: the shared gender_cache table.
+_local_cache = TTLCache(maxsize=4096, ttl=KNOWN_TTL.total_seconds())
+_in_flight = SingleFlight()
+_session = requests.Session()
+
+_stats = {
+	"local_hits": 0,
+	"db_hits": 0,
+	"api_calls": 0,
+	"api_errors": 0,
+	"coalesced": 0,
+}
+_stats_lock = threading.Lock()
+
+
+def _count(stat):
+	with _stats_lock:
+		_stats[stat] += 1
+
+
+def get_cache_stats():
+	"""
+	Return hit/miss counters for this worker's gender lookups.
+
+	Returns:
+		dict: Counter values plus the current local cache size.
+	"""
+	with _stats_lock:
+		stats = dict(_stats)
+	stats["local_size"] = len(_local_cache)
+	return stats
+
+
+def normalize_name(first_name):
+	"""Normalise a first name into its cache key (trimmed, single-spaced, case-folded)."""
+	return " ".join((first_name or "").split()).casefold()
+
+
 def get_gender(first_name):
+	"""
+	Resolve the gender for a first name, using the local and database caches
+	before calling gender-api.com. Concurrent lookups for the same name share
+	one outbound request.
+
+	Args:
+		first_name (str): The customer's first name.
+
+	Returns:
+		str: 'male', 'female' or 'unknown'.
+	"""
+	name = normalize_name(first_name)
+	if not name:
+		return "unknown"
+
+	gender = _local_cache.get(name)
+	if gender is not None:
+		_count("local_hits")
+		return gender
+
+	gender, shared = _in_flight.do(name, _resolve_gender, name)
+	if shared:
+		_count("coalesced")
+	return gender
+
+
+def get_genders(first_names, concurrency=4):
+	"""
+	Resolve many first names at once, for bulk jobs.
+
+	Names are de-duplicated and checked against both caches first; the
+	remainder is sent to gender-api.com in multi-name batches, with at most
+	`concurrency` requests in flight.
+
+	Args:
+		first_names (iterable): First names to resolve.
+		concurrency (int): Maximum concurrent API requests.
+
+	Returns:
+		dict: Normalised name -> 'male', 'female' or 'unknown'.
+	"""
+	results = {}
+	pending = set()
+	for first_name in first_names:
+		name = normalize_name(first_name)
+		if not name or name in results or name in pending:
+			continue
+		gender = _local_cache.get(name)
+		if gender is not None:
+			_count("local_hits")
+			results[name] = gender
+		else:
+			pending.add(name)
+
+	if not pending:
+		return results
+
+	now = datetime.now(UTC)
+	for name, gender, expires_at in _load_cached_many(pending):
+		_count("db_hits")
+		_local_cache.set(name, gender, ttl=(expires_at - now).total_seconds())
+		results[name] = gender
+		pending.discard(name)
+
+	if pending:
+		names = sorted(pending)
+		batches = [names[i:i + MAX_NAMES_PER_REQUEST] for i in range(0, len(names), MAX_NAMES_PER_REQUEST)]
+		entries = []
+		with ThreadPoolExecutor(max_workers=concurrency) as executor:
+			for fetched in executor.map(fetch_genders, batches):
+				for name, gender in fetched.items():
+					ttl = UNKNOWN_TTL if gender == "unknown" else KNOWN_TTL
+					_local_cache.set(name, gender, ttl=ttl.total_seconds())
+					entries.append({"name": name, "gender": gender, "expires_at": now + ttl})
+					results[name] = gender
+		_store_cached_many(entries)
+
+	# Anything left failed transiently and is not cached
+	for name in pending:
+		results.setdefault(name, "unknown")
+	return results
+
+
+def _resolve_gender(name):
+	now = datetime.now(UTC)
+
+	cached = _load_cached(name)
+	if cached:
+		gender, expires_at = cached
+		_count("db_hits")
+		_local_cache.set(name, gender, ttl=(expires_at - now).total_seconds())
+		return gender
+
+	gender = fetch_gender(name)
+	if gender is None:
+		# Transient failure: don't cache, the next webhook will try again
+		return "unknown"
+
+	ttl = UNKNOWN_TTL if gender == "unknown" else KNOWN_TTL
+	_local_cache.set(name, gender, ttl=ttl.total_seconds())
+	_store_cached(name, gender, now + ttl)
+	return gender
+
+
+def fetch_gender(name):
+	"""
+	Look up a single name on gender-api.com.
+
+	Returns:
+		str: 'male', 'female' or 'unknown', or None if the lookup failed.
+	"""
 	try:
 		api_key = os.getenv("GENDER_API_KEY")
 		if not api_key:
 			raise ValueError("GENDER_API_KEY environment variable is not set")
 
-		url = f"https://gender-api.com/get?name={first_name}&key={api_key}"
-		response = requests.get(url)
+		_count("api_calls")
+		response = _session.get(
+			f"{GENDER_API_URL}/get",
+			params={"name": name, "key": api_key},
+			timeout=GENDER_API_TIMEOUT
+		)
 		response.raise_for_status()
-		gender_data = response.json()
-		gender = gender_data["gender"]
-		return gender
+		gender = response.json().get("gender")
+		return gender if gender in ("male", "female") else "unknown"
 	except requests.exceptions.RequestException as e:
+		_count("api_errors")
 		logger.error(f"Error getting gender from API: {str(e)}")
-		handle_error(e, f"Gender API error for name: {first_name}")
-		return "unknown"
+		handle_error(e, f"Gender API error for name: {name}")
+		return None
 	except Exception as e:
+		_count("api_errors")
 		logger.error(f"Unexpected error getting gender from API: {str(e)}")
-		handle_error(e, f"Unexpected gender API error for name: {first_name}")
-		return "unknown"
\ No newline at end of file
+		handle_error(e, f"Unexpected gender API error for name: {name}")
+		return None
+
+
+def fetch_genders(names):
+	"""
+	Look up a batch of normalised names with one multi-name request.
+
+	Returns:
+		dict: Name -> 'male', 'female' or 'unknown'; empty if the lookup failed.
+			Names the response has no entry for are left out, so they aren't cached.
+	"""
+	try:
+		api_key = os.getenv("GENDER_API_KEY")
+		if not api_key:
+			raise ValueError("GENDER_API_KEY environment variable is not set")
+
+		_count("api_calls")
+		response = _session.get(
+			f"{GENDER_API_URL}/get",
+			params={"name": ";".join(names), "key": api_key},
+			timeout=GENDER_API_TIMEOUT
+		)
+		response.raise_for_status()
+		data = response.json()
+		# A single name comes back unwrapped
+		entries = data.get("result", [data])
+		# Match entries by the name they echo back, not by position
+		requested = set(names)
+		genders = {}
+		for entry in entries:
+			name = normalize_name(entry.get("name"))
+			if name in requested:
+				gender = entry.get("gender")
+				genders[name] = gender if gender in ("male", "female") else "unknown"
+		return genders
+	except Exception as e:
+		_count("api_errors")
+		logger.error(f"Error getting genders for {len(names)} names from API: {str(e)}")
+		handle_error(e, f"Gender API batch error ({len(names)} names)")
+		return {}
+
+
+def _load_cached(name):
+	if not has_app_context():
+		return None
+	try:
+		with db.engine.connect() as conn:
+			return conn.execute(
+				select(GenderCache.gender, GenderCache.expires_at)
+				.where(GenderCache.name == name, GenderCache.expires_at > func.now())
+			).first()
+	except SQLAlchemyError as e:
+		logger.warning(f"Gender cache lookup failed for {name}: {str(e)}")
+		return None
+
+
+def _load_cached_many(names):
+	if not has_app_context() or not names:
+		return []
+	try:
+		with db.engine.connect() as conn:
+			return conn.execute(
+				select(GenderCache.name, GenderCache.gender, GenderCache.expires_at)
+				.where(GenderCache.name.in_(list(names)), GenderCache.expires_at > func.now())
+			).all()
+	except SQLAlchemyError as e:
+		logger.warning(f"Gender cache lookup failed for {len(names)} names: {str(e)}")
+		return []
+
+
+def _store_cached(name, gender, expires_at):
+	_store_cached_many([{"name": name, "gender": gender, "expires_at": expires_at}])
+
+
+def _store_cached_many(entries):
+	if not has_app_context() or not entries:
+		return
+	stmt = insert(GenderCache).values(entries)
+	stmt = stmt.on_conflict_do_update(
+		index_elements=[GenderCache.name],
+		set_={"gender": stmt.excluded.gender, "expires_at": stmt.excluded.expires_at, "updated_at": func.now()}
+	)
+	try:
+		with db.engine.begin() as conn:
+			conn.execute(stmt)
+	except SQLAlchemyError as e:
+		logger.warning(f"Failed to store {len(entries)} gender cache entries: {str(e)}")
@@ -0,0 +1,35 @@
+import threading
+from collections import deque
+
+
+class LatencyRecorder:
+    """
+    Keeps the most recent `maxlen` timings (in milliseconds) and summarises
+    them as count, mean, p50 and p99.
+    """
+
+    def __init__(self, maxlen=1000):
+        self._samples = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, milliseconds):
+        with self._lock:
+            self._samples.append(milliseconds)
+            self.count += 1
+
+    def summary(self):
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return {"count": self.count, "mean_ms": None, "p50_ms": None, "p99_ms": None}
+
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, int(p * len(samples)))], 2)
+
+        return {
+            "count": self.count,
+            "mean_ms": round(sum(samples) / len(samples), 2),
+            "p50_ms": percentile(0.50),
+            "p99_ms": percentile(0.99),
+        }
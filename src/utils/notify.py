@@ -0,0 +1,74 @@
+import logging
+import os
+import select
+import socket
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+HOSTNAME = socket.gethostname()
+
+# Seconds between attempts to re-establish a dropped LISTEN connection
+RECONNECT_DELAY = 5
+
+
+def current_origin() -> str:
+    """
+    Identifies this process in NOTIFY payloads. Read per call, not at
+    import: gunicorn --preload forks the workers after importing the app.
+    """
+    return f"{HOSTNAME}:{os.getpid()}"
+
+
+def listen(
+    engine,
+    channel: str,
+    on_notification: Callable[[str], None],
+    on_listen: Optional[Callable[[], None]] = None,
+    on_disconnect: Optional[Callable[[], None]] = None
+):
+    """
+    LISTEN on a Postgres channel and hand each payload to `on_notification`.
+
+    Runs forever on a dedicated connection, so call it from a daemon
+    thread. When the connection drops it reconnects after RECONNECT_DELAY
+    seconds. Notifications sent while it wasn't listening are lost, so
+    `on_listen` runs after every LISTEN (including the first) to catch up,
+    e.g. by reloading whatever the notifications keep fresh.
+
+    Args:
+        engine: SQLAlchemy engine to take the connection from
+        channel: Channel name (not quoted, so a plain identifier)
+        on_notification: Called with each payload string
+        on_listen: Called once listening, before any payload is handled
+        on_disconnect: Called after the connection is lost
+    """
+    while True:
+        connection = None
+        try:
+            connection = engine.raw_connection()
+            dbapi_connection = connection.driver_connection
+            dbapi_connection.autocommit = True
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {channel}")
+            if on_listen:
+                on_listen()
+            logger.info(f"Listening on '{channel}'")
+            while True:
+                if select.select([dbapi_connection], [], [], 60) == ([], [], []):
+                    continue
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    on_notification(dbapi_connection.notifies.pop(0).payload)
+        except Exception as e:
+            logger.warning(f"Listener on '{channel}' disconnected: {str(e)}")
+            if on_disconnect:
+                on_disconnect()
+        finally:
+            if connection is not None:
+                try:
+                    connection.invalidate()
+                except Exception:
+                    pass
+        time.sleep(RECONNECT_DELAY)
@@ -0,0 +1,45 @@
+import queue
+import threading
+
+_DONE = object()
+
+
+def prefetch(iterable, depth=1):
+    """
+    Iterate over `iterable` on a background thread, keeping up to `depth`
+    items ready ahead of the consumer.
+
+    Useful for paged API reads: the next page downloads while the current
+    one is being written. Exceptions from the producer are re-raised in the
+    consumer. Closing the generator early stops the producer.
+    """
+    items = queue.Queue(maxsize=max(depth, 1))
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                while not stop.is_set():
+                    try:
+                        items.put((item, None), timeout=0.1)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+            items.put((_DONE, None))
+        except BaseException as e:
+            items.put((_DONE, e))
+
+    producer = threading.Thread(target=produce, daemon=True, name="prefetch")
+    producer.start()
+    try:
+        while True:
+            item, error = items.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
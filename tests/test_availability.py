@@ -0,0 +1,67 @@
+import random
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from src.services.appointments import BUSINESS_TIMEZONE
+from src.services.availability import SLOTS_PER_DAY, busy_slots, free_run_starts, iter_bits, slot_mask
+
+
+def brute_force_run_starts(free, length):
+    return sum(
+        1 << i
+        for i in range(free.bit_length())
+        if all(free >> j & 1 for j in range(i, i + length))
+    )
+
+
+def test_slot_mask():
+    assert slot_mask(2, 5) == 0b11100
+    assert slot_mask(0, 1) == 1
+    assert slot_mask(5, 5) == 0
+    assert slot_mask(5, 2) == 0
+
+
+@pytest.mark.parametrize("length", [1, 2, 3, 4, 5, 7, 8, 18, 22])
+def test_free_run_starts_matches_brute_force(length):
+    rng = random.Random(length)
+    for _ in range(50):
+        # Long free stretches broken by a few busy slots
+        free = slot_mask(0, SLOTS_PER_DAY)
+        for _ in range(rng.randrange(10)):
+            first = rng.randrange(SLOTS_PER_DAY)
+            free &= ~slot_mask(first, first + rng.randrange(1, 12))
+        assert free_run_starts(free, length) == brute_force_run_starts(free, length)
+
+
+def test_free_run_starts_edges():
+    assert free_run_starts(0, 3) == 0
+    assert free_run_starts(0b111, 3) == 0b1
+    assert free_run_starts(0b111, 4) == 0
+    assert free_run_starts(0b1101110, 3) == 0b10
+    # A run ending at the top bit still counts
+    assert free_run_starts(slot_mask(280, SLOTS_PER_DAY), 8) == slot_mask(280, SLOTS_PER_DAY - 7)
+
+
+def test_iter_bits():
+    assert list(iter_bits(0)) == []
+    assert list(iter_bits(0b1010010)) == [1, 4, 6]
+    assert list(iter_bits(1 << 287)) == [287]
+
+
+def test_busy_slots_rounds_partial_slots_out():
+    start = datetime(2026, 11, 2, 10, 2, tzinfo=BUSINESS_TIMEZONE)
+    busy = busy_slots(start, start + timedelta(minutes=60))
+
+    # 10:00 to 11:05 local, in 5-minute slots
+    assert busy == {date(2026, 11, 2): slot_mask(120, 133)}
+
+
+def test_busy_slots_splits_at_local_midnight():
+    start = datetime(2026, 11, 2, 23, 30, tzinfo=BUSINESS_TIMEZONE)
+    busy = busy_slots(start, start + timedelta(minutes=60))
+
+    assert busy == {
+        date(2026, 11, 2): slot_mask(SLOTS_PER_DAY - 6, SLOTS_PER_DAY),
+        date(2026, 11, 3): slot_mask(0, 6),
+    }
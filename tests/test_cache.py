@@ -0,0 +1,88 @@
+import threading
+
+from src.utils import cache
+from src.utils.cache import SingleFlight, TTLCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_ttl_cache_expires_entries(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "monotonic", clock)
+    ttl_cache = TTLCache(maxsize=10, ttl=60)
+
+    ttl_cache.set("long", 1)
+    ttl_cache.set("short", 2, ttl=5)
+    clock.now += 10
+
+    assert ttl_cache.get("long") == 1
+    assert ttl_cache.get("short") is None
+    assert ttl_cache.get("short", "missing") == "missing"
+    clock.now += 60
+    assert ttl_cache.get("long") is None
+    assert len(ttl_cache) == 0
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    ttl_cache = TTLCache(maxsize=2, ttl=60)
+
+    ttl_cache.set("a", 1)
+    ttl_cache.set("b", 2)
+    ttl_cache.get("a")
+    ttl_cache.set("c", 3)
+
+    assert ttl_cache.get("b") is None
+    assert (ttl_cache.get("a"), ttl_cache.get("c")) == (1, 3)
+    assert ttl_cache.pop("a") == 1
+    assert len(ttl_cache) == 1
+
+
+def test_single_flight_shares_one_call():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def slow(key):
+        calls.append(key)
+        started.set()
+        release.wait(5)
+        return key.upper()
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(flight.do("k", slow, "k")))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("k", slow, "k"))) for _ in range(3)]
+    for follower in followers:
+        follower.start()
+    # Followers are blocked on the leader's call
+    followers[0].join(0.1)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert calls == ["k"]
+    assert sorted(results) == [("K", False), ("K", True), ("K", True), ("K", True)]
+    # Nothing in flight any more: the next call runs again
+    assert flight.do("k", str.upper, "again") == ("AGAIN", False)
+
+
+def test_single_flight_shares_errors():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError("boom")
+
+    try:
+        flight.do("k", fail)
+    except RuntimeError as e:
+        assert str(e) == "boom"
+    else:
+        raise AssertionError("expected RuntimeError")
+    assert flight.do("k", lambda: 1) == (1, False)
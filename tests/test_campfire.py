@@ -0,0 +1,60 @@
+import pytest
+
+from src.core.integrations.campfire import CAMPFIRE_MESSAGE_LIMIT, pack_sections, split_message
+from src.services.chatbot import CommandHandler
+
+
+def test_short_message_is_one_post():
+    assert split_message("hello", limit=10) == ["hello"]
+
+
+def test_split_message_splits_between_lines():
+    lines = [f"GIFT-PREM-50-{n:08d}" for n in range(10)]
+    message = "\n".join(lines)
+
+    parts = split_message(message, limit=60)
+
+    assert all(len(part) <= 60 for part in parts)
+    assert [line for part in parts for line in part.split("\n")] == lines
+
+
+def test_split_message_splits_after_br_and_trims_it():
+    message = "first line<br>second line<br>third line<br>"
+
+    assert split_message(message, limit=30) == ["first line<br>second line", "third line"]
+
+
+def test_split_message_cuts_only_lines_over_the_limit():
+    message = "short\n" + "x" * 25 + "\nend"
+
+    assert split_message(message, limit=10) == ["short", "x" * 10, "x" * 10, "x" * 5 + "\nend"]
+
+
+def test_pack_sections_keeps_sections_whole():
+    sections = ["<div>a</div>", "<div>bb</div>", "<div>ccc</div>"]
+
+    assert pack_sections(sections, limit=30, separator="|") == ["<div>a</div>|<div>bb</div>", "<div>ccc</div>"]
+    assert pack_sections(sections, limit=1000, separator="|") == ["<div>a</div>|<div>bb</div>|<div>ccc</div>"]
+
+
+def test_pack_sections_splits_only_oversized_sections():
+    sections = ["<div>a</div>", "<div>" + "line<br>" * 5 + "</div>", "<div>b</div>"]
+
+    posts = pack_sections(sections, limit=25, separator="|")
+
+    assert posts[0] == "<div>a</div>"
+    assert posts[-1] == "<div>b</div>"
+    assert all(len(post) <= 25 for post in posts)
+
+
+@pytest.mark.parametrize("limit", [CAMPFIRE_MESSAGE_LIMIT, 700, 1000, 10000])
+def test_help_posts_have_balanced_markup(limit):
+    sections = CommandHandler().get_help_message()
+    assert max(len(section) for section in sections) <= limit
+
+    posts = pack_sections(sections, limit=limit)
+
+    assert all(len(post) <= limit for post in posts)
+    for post in posts:
+        assert post.count("<div") == post.count("</div>")
+    assert "9️⃣ Help" in "".join(posts)
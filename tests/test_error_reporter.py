@@ -0,0 +1,116 @@
+from src.core import error_reporter
+from src.core.error_reporter import ErrorDispatcher, fingerprint_error
+
+
+def raise_error():
+    raise ValueError("bad")
+
+
+def report_dead_job(dispatcher, job_id):
+    # Like the dead-letter alerts: built to be reported, never raised
+    dispatcher.submit(RuntimeError(f"job {job_id} failed"))
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_dispatcher(monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(error_reporter.time, "monotonic", clock)
+    sent = []
+    dispatcher = ErrorDispatcher(
+        send=lambda channel, message: sent.append((channel, message)),
+        format_message=lambda error, extra_info: str(error),
+        should_alert=lambda error: True,
+        **kwargs
+    )
+    # Processed inline rather than on the dispatcher thread
+    dispatcher._ensure_started = lambda: None
+
+    def drain():
+        while not dispatcher._queue.empty():
+            dispatcher._process(*dispatcher._queue.get_nowait())
+
+    return dispatcher, clock, sent, drain
+
+
+def test_fingerprint_of_a_raised_error_is_where_it_was_raised():
+    try:
+        raise_error()
+    except ValueError as e:
+        fingerprint, location = fingerprint_error(e)
+
+    assert location.startswith("test_error_reporter.py:") and location.endswith(" in raise_error")
+    assert fingerprint == f"builtins.ValueError@{location}"
+
+
+def test_fingerprint_of_an_unraised_error():
+    assert fingerprint_error(RuntimeError()) == ("builtins.RuntimeError@unknown location", "unknown location")
+    assert fingerprint_error(RuntimeError(), "job:1") == ("job:1", "unknown location")
+
+
+def test_unraised_errors_are_located_by_their_reporter(monkeypatch):
+    dispatcher, _, _, _ = make_dispatcher(monkeypatch)
+
+    report_dead_job(dispatcher, 1)
+    dispatcher.submit(RuntimeError("elsewhere"))
+    first, second = [fingerprint_error(error, fingerprint, site)[1] for error, *_, fingerprint, site in dispatcher._queue.queue]
+
+    assert first.startswith("test_error_reporter.py:") and first.endswith(" in report_dead_job")
+    assert second.endswith(" in test_unraised_errors_are_located_by_their_reporter")
+
+
+def test_repeats_are_coalesced_into_one_summary(monkeypatch):
+    dispatcher, clock, sent, drain = make_dispatcher(monkeypatch, window=60)
+
+    for job_id in range(3):
+        report_dead_job(dispatcher, job_id)
+    dispatcher.submit(RuntimeError("elsewhere"))
+    drain()
+    assert [message for _, message in sent] == ["job 0 failed", "elsewhere"]
+    assert dispatcher.stats["coalesced"] == 2
+
+    clock.now += 61
+    dispatcher._flush_windows(clock.now)
+    assert "2 more occurrence(s) of RuntimeError at test_error_reporter.py:" in sent[-1][1]
+    assert len(sent) == 3
+
+
+def test_explicit_fingerprints_are_not_coalesced(monkeypatch):
+    dispatcher, _, sent, drain = make_dispatcher(monkeypatch)
+
+    for job_id in range(3):
+        dispatcher.submit(RuntimeError(f"job {job_id} failed"), fingerprint=f"job:{job_id}")
+    drain()
+
+    assert len(sent) == 3
+
+
+def test_alerts_are_capped_per_channel(monkeypatch):
+    dispatcher, clock, sent, drain = make_dispatcher(monkeypatch, max_per_minute=2)
+
+    for job_id in range(5):
+        dispatcher.submit(RuntimeError(f"job {job_id}"), fingerprint=f"job:{job_id}")
+    dispatcher.submit(RuntimeError("other channel"), channel="tech")
+    drain()
+    assert [message for _, message in sent] == ["job 0", "job 1", "other channel"]
+    assert dispatcher.stats["rate_capped"] == 3
+
+    # Tokens refill at max_per_minute; the next alert mentions what was dropped
+    clock.now += 30
+    dispatcher.submit(RuntimeError("job 5"), fingerprint="job:5")
+    drain()
+    assert sent[-1] == ("alert", "job 5\n\n(3 alert(s) suppressed by the rate cap)")
+
+
+def test_full_queue_drops_errors(monkeypatch):
+    dispatcher, _, _, _ = make_dispatcher(monkeypatch, queue_size=1)
+
+    assert dispatcher.submit(RuntimeError("one")) is True
+    assert dispatcher.submit(RuntimeError("two")) is False
+    assert dispatcher.stats["dropped"] == 1
@@ -0,0 +1,57 @@
+import pytest
+
+from src.utils import gender_api
+from tools.stubs.base import start_stub_server
+from tools.stubs.gender_api import GenderApiHandler, lookup
+
+
+class ShuffledGenderApiHandler(GenderApiHandler):
+    """Answers batches in reverse order and leaves the last name out"""
+
+    def send_json(self, payload, status=200, headers=None):
+        if "result" in payload:
+            payload = {"result": list(reversed(payload["result"]))[1:]}
+        return super().send_json(payload, status, headers)
+
+
+@pytest.fixture
+def gender_stub(monkeypatch):
+    servers = []
+
+    def start(handler=GenderApiHandler):
+        server, url = start_stub_server(handler)
+        servers.append(server)
+        monkeypatch.setattr(gender_api, "GENDER_API_URL", url)
+        return server
+
+    monkeypatch.setenv("GENDER_API_KEY", "test")
+    monkeypatch.setattr(gender_api, "_local_cache", gender_api.TTLCache(maxsize=100, ttl=60))
+    yield start
+    for server in servers:
+        server.shutdown()
+
+
+def test_get_genders_batches_and_caches(gender_stub):
+    server = gender_stub()
+
+    genders = gender_api.get_genders([" Sarah", "JAMES", "sarah", "Zork", ""])
+
+    assert genders == {"sarah": "female", "james": "male", "zork": "unknown"}
+    assert server.request_count == 1
+    # Answered from the local cache the second time
+    assert gender_api.get_genders(["james", "Zork"]) == {"james": "male", "zork": "unknown"}
+    assert gender_api.get_gender("Sarah") == "female"
+    assert server.request_count == 1
+
+
+def test_get_genders_matches_entries_by_name(gender_stub):
+    gender_stub(ShuffledGenderApiHandler)
+    names = ["bob", "emma", "tom", "sarah", "zork"]
+
+    fetched = gender_api.fetch_genders(names)
+
+    assert fetched == {name: lookup(name)["gender"] for name in names[:-1]}
+    genders = gender_api.get_genders(names)
+    assert genders == {"bob": "male", "emma": "female", "tom": "male", "sarah": "female", "zork": "unknown"}
+    # The missing name isn't cached, so it's asked for again
+    assert gender_api._local_cache.get("zork") is None
@@ -0,0 +1,51 @@
+import pytest
+
+from src.api.validators.ip_validator import IPAllowlist
+
+ALLOWLIST = IPAllowlist([
+    "203.0.113.7",
+    "198.51.100.0/24",
+    "10.0.0.0/8",
+    "2001:db8::/32",
+    "2001:db8:ffff::1",
+    " ",
+    "not-an-ip",
+])
+
+
+@pytest.mark.parametrize("ip, allowed", [
+    ("203.0.113.7", True),
+    ("203.0.113.8", False),
+    ("198.51.100.0", True),
+    ("198.51.100.255", True),
+    ("198.51.101.1", False),
+    ("10.255.0.1", True),
+    ("11.0.0.1", False),
+    (" 10.1.2.3 ", True),
+    ("::ffff:198.51.100.9", True),
+    ("2001:db8:1234::1", True),
+    ("2001:db9::1", False),
+    ("::1", False),
+    ("", False),
+    ("not-an-ip", False),
+    (None, False),
+])
+def test_is_allowed(ip, allowed):
+    assert ALLOWLIST.is_allowed(ip) is allowed
+
+
+def test_empty_allowlist_allows_nothing():
+    assert IPAllowlist().is_allowed("203.0.113.7") is False
+
+
+def test_zero_length_prefix_allows_the_whole_family():
+    allowlist = IPAllowlist(["0.0.0.0/0"])
+    assert allowlist.is_allowed("192.0.2.1") is True
+    assert allowlist.is_allowed("2001:db8::1") is False
+
+
+def test_load_replaces_the_entries():
+    allowlist = IPAllowlist(["192.0.2.1"])
+    allowlist.load(["192.0.2.2"])
+    assert allowlist.is_allowed("192.0.2.1") is False
+    assert allowlist.is_allowed("192.0.2.2") is True
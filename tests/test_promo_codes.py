@@ -0,0 +1,177 @@
+import json
+import os
+
+import pytest
+
+from src.services import promo_codes
+from src.services.promo_codes import ParsedCode, PromoCodeFilter, parse_code
+from src.utils.bloom_filter import BloomFilter
+
+ISSUED = [f"GIFT-PREM-150-{n:08d}" for n in range(1000)]
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(len(ISSUED), 0.01)
+    for code in ISSUED:
+        bloom.add(code)
+
+    assert len(bloom) == len(ISSUED)
+    assert all(code in bloom for code in ISSUED)
+
+
+def test_bloom_filter_false_positive_rate():
+    bloom = BloomFilter(len(ISSUED), 0.01)
+    for code in ISSUED:
+        bloom.add(code)
+
+    false_positives = sum(f"GIFT-DGTL-150-{n:08d}" in bloom for n in range(10000))
+    # Expected about 100
+    assert false_positives < 200
+
+
+def test_bloom_filter_sizing():
+    bloom = BloomFilter(100_000, 0.001)
+
+    # About 14.4 bits and 10 hashes per item for 0.1%
+    assert 14 * 100_000 < bloom.size < 15 * 100_000
+    assert bloom.hash_count == 10
+    assert BloomFilter(0).capacity == 1
+
+
+@pytest.mark.parametrize("code, expected", [
+    ("UL-60-AL-ABC123", ParsedCode("unlimited", "UL-60-AL", "ABC123")),
+    ("UL-60-MARY-JANE-ABC123", ParsedCode("unlimited", "UL-60-MARY-JANE", "ABC123")),
+    ("SCHL-20-ABC123", ParsedCode("school", "SCHL-20", "ABC123")),
+    ("REF-20-AL-ABC123", ParsedCode("referral", "REF-20-AL", "ABC123")),
+    ("FREE-60-AL-ABC123", ParsedCode("guest", "FREE-60-AL", "ABC123")),
+    ("PERS-90-AL-ABC123", ParsedCode("personal_duration", "PERS-90-AL", "ABC123")),
+    ("PERS-25-AL-ABC123", ParsedCode("personal_discount", "PERS-25-AL", "ABC123")),
+    ("GIFT-PREM-150-B7K2N8L4", ParsedCode("gift_premium", "GIFT-PREM-150", "B7K2N8L4")),
+    ("GIFT-DGTL-150-REBECCA-K7M2P9X4", ParsedCode("gift_digital", "GIFT-DGTL-150-REBECCA", "K7M2P9X4")),
+])
+def test_parse_code(code, expected):
+    assert parse_code(code) == expected
+
+
+@pytest.mark.parametrize("code", [
+    "",
+    "NONSENSE",
+    "UL-ABC123",
+    # Name required
+    "UL-60-ABC123",
+    # Name not allowed
+    "SCHL-20-AL-ABC123",
+    "GIFT-XX-150-B7K2N8L4",
+    # Wrong suffix length or characters
+    "UL-60-AL-ABC12",
+    "GIFT-PREM-150-B7K2N8L",
+    "UL-60-AL-abc123",
+    "UL-60-AL-ABC12!",
+])
+def test_parse_code_rejects_malformed_codes(code):
+    assert parse_code(code) is None
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeEngine:
+    """Answers the listener's read-back of notified codes"""
+
+    def __init__(self, codes):
+        self.codes = codes
+
+    def connect(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, statement):
+        return self
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.codes
+
+
+@pytest.fixture
+def code_filter(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(promo_codes.time, "monotonic", clock)
+    code_filter = PromoCodeFilter(grace=5.0)
+    # Loaded, and the listener counted as started
+    code_filter._listener_pid = os.getpid()
+    code_filter._filter = BloomFilter(1000)
+    code_filter.add(ISSUED[:10])
+    return code_filter, clock
+
+
+def notify(code_filter, codes, origin="other-host:1"):
+    payload = json.dumps({"origin": origin, "ids": [1, len(codes)]})
+    code_filter._handle_notification(FakeEngine(codes), payload)
+
+
+def test_filter_rejects_codes_it_has_not_seen(code_filter):
+    code_filter, _ = code_filter
+
+    assert code_filter.might_contain(ISSUED[0])
+    assert not code_filter.might_contain(ISSUED[500])
+    assert code_filter.stats["rejected"] == 1
+
+
+def test_filter_sends_everything_to_the_database_until_loaded(code_filter):
+    code_filter, _ = code_filter
+    code_filter._reset()
+
+    assert code_filter.might_contain(ISSUED[500])
+
+
+def test_filter_adds_codes_from_other_processes(code_filter):
+    code_filter, clock = code_filter
+    notify(code_filter, ISSUED[10:20])
+    clock.now += 60
+
+    assert code_filter.might_contain(ISSUED[15])
+    assert not code_filter.might_contain(ISSUED[500])
+
+
+def test_filter_sends_misses_to_the_database_just_after_a_notification(code_filter):
+    code_filter, clock = code_filter
+    notify(code_filter, ISSUED[10:20])
+
+    # Issued elsewhere, its notification still being read back
+    clock.now += 4.9
+    assert code_filter.might_contain(ISSUED[500])
+    assert code_filter.stats["grace_checks"] == 1
+
+    clock.now += 0.2
+    assert not code_filter.might_contain(ISSUED[500])
+
+
+def test_filter_window_before_the_notification_arrives(code_filter):
+    # A code committed elsewhere whose NOTIFY hasn't arrived yet is reported
+    # unknown: this is the window documented on PromoCodeFilter
+    code_filter, _ = code_filter
+
+    assert not code_filter.might_contain(ISSUED[500])
+    notify(code_filter, ISSUED[500:501])
+    assert code_filter.might_contain(ISSUED[500])
+
+
+def test_filter_ignores_its_own_notifications(code_filter):
+    code_filter, _ = code_filter
+    notify(code_filter, ISSUED[10:20], origin=promo_codes.current_origin())
+
+    assert code_filter._notified_at is None
+    assert not code_filter.might_contain(ISSUED[15])
@@ -0,0 +1,63 @@
+import pytest
+
+from src.core.rate_limiter import MemoryStorage, RateLimiter, SharedMemoryStorage, create_limiter, gcra
+
+
+def test_gcra_allows_a_burst_then_spaces_requests():
+    # 3 requests per 30 seconds: one every 10 seconds, all 3 usable at once
+    tat = None
+    for _ in range(3):
+        tat, retry_after = gcra(tat, 100.0, 10.0, 30.0)
+        assert tat is not None and retry_after == 0.0
+    assert tat == 130.0
+
+    assert gcra(tat, 100.0, 10.0, 30.0) == (None, 10.0)
+    assert gcra(tat, 104.0, 10.0, 30.0) == (None, 6.0)
+    assert gcra(tat, 110.0, 10.0, 30.0) == (140.0, 0.0)
+
+
+def test_gcra_forgets_idle_clients():
+    assert gcra(50.0, 1000.0, 10.0, 30.0) == (1010.0, 0.0)
+
+
+@pytest.mark.parametrize("storage", [MemoryStorage, SharedMemoryStorage])
+def test_storage_limits_each_key(storage):
+    storage = storage()
+    results = [storage.hit("a", 100.0, 10.0, 30.0)[0] for _ in range(4)]
+
+    assert results == [True, True, True, False]
+    assert storage.hit("b", 100.0, 10.0, 30.0) == (True, 0.0)
+    assert storage.hit("a", 110.0, 10.0, 30.0) == (True, 0.0)
+
+
+def test_memory_storage_evicts_least_recently_used_keys():
+    storage = MemoryStorage(max_keys=2)
+    for key in ("a", "b", "c"):
+        storage.hit(key, 100.0, 10.0, 10.0)
+
+    # "a" was evicted, so its spent allowance is forgotten
+    assert storage.hit("a", 100.0, 10.0, 10.0)[0] is True
+    assert storage.hit("c", 100.0, 10.0, 10.0)[0] is False
+
+
+def test_shared_storage_reuses_the_most_idle_slot_when_full():
+    storage = SharedMemoryStorage(slots=2, probe=2)
+    storage.hit("old", 100.0, 10.0, 10.0)
+    storage.hit("recent", 200.0, 10.0, 10.0)
+
+    assert storage.hit("new", 200.0, 10.0, 10.0)[0] is True
+    assert storage.hit("recent", 200.0, 10.0, 10.0)[0] is False
+
+
+def test_limiter_uses_window_over_limit_as_interval(monkeypatch):
+    limiter = RateLimiter(MemoryStorage())
+    monkeypatch.setattr("src.core.rate_limiter.time.time", lambda: 100.0)
+
+    assert [limiter.hit("k", 2, 60)[0] for _ in range(3)] == [True, True, False]
+    assert limiter.hit("k", 2, 60)[1] == 30.0
+
+
+def test_create_limiter_rejects_unknown_backends():
+    assert isinstance(create_limiter("memory").storage, MemoryStorage)
+    with pytest.raises(ValueError, match="Unknown rate limit storage"):
+        create_limiter("redis")
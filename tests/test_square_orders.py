@@ -0,0 +1,162 @@
+import base64
+import hashlib
+import hmac
+import json
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+
+from src.api.middleware.webhook_validation.square.square_validation_decorators import validate_square_order_webhook
+
+from src.services import orders
+from src.services.square_reconciliation import ORDER_FINGERPRINT_FIELDS, fingerprint
+
+# Split between two tenders, with tax and a tip, so no single payment matches the order
+ORDER = {
+    "id": "ORD1",
+    "customer_id": "CUST1",
+    "state": "COMPLETED",
+    "line_items": [
+        {
+            "catalog_object_id": "ITEM1",
+            "quantity": "1",
+            "base_price_money": {"amount": 10000, "currency": "GBP"},
+            "total_money": {"amount": 10000, "currency": "GBP"},
+        },
+    ],
+    "total_money": {"amount": 13200, "currency": "GBP"},
+    "total_tax_money": {"amount": 2000, "currency": "GBP"},
+    "total_tip_money": {"amount": 1200, "currency": "GBP"},
+    "net_amount_due_money": {"amount": 0, "currency": "GBP"},
+}
+
+
+def make_payment(payment_id, amount, **fields):
+    return {
+        "id": payment_id,
+        "order_id": "ORD1",
+        "customer_id": "CUST1",
+        "status": "COMPLETED",
+        "amount_money": {"amount": amount, "currency": "GBP"},
+        **fields,
+    }
+
+
+def as_stored(order_data):
+    """The order row as read back: amounts are NUMERIC(10, 2)"""
+    return {
+        field: value.quantize(Decimal("0.01")) if isinstance(value, Decimal) else value
+        for field, value in order_data.items()
+    }
+
+
+@pytest.fixture
+def square_order(monkeypatch):
+    fetched = []
+
+    def fetch_square_order(order_id):
+        fetched.append(order_id)
+        return ORDER
+
+    monkeypatch.setattr(orders, "fetch_square_order", fetch_square_order)
+    return fetched
+
+
+@pytest.mark.parametrize("payment", [
+    make_payment("PAY1", 6000),
+    make_payment("PAY2", 6000, tip_money={"amount": 1200, "currency": "GBP"}, approved_money={"amount": 7200}),
+])
+def test_webhook_order_fingerprints_as_unchanged(square_order, payment):
+    order_data, _, _, _ = orders.map_square_order(payment)
+
+    reconciled = orders.map_order_object(ORDER)
+    assert fingerprint(as_stored(order_data), ORDER_FINGERPRINT_FIELDS) == \
+        fingerprint(reconciled, ORDER_FINGERPRINT_FIELDS)
+    assert square_order == ["ORD1"]
+
+
+def test_webhook_order_uses_order_totals_and_line_items(square_order):
+    order_data, customer_data, line_items, transactions = orders.map_square_order(
+        make_payment("PAY1", 6000, customer_id=None, receipt_number="R1")
+    )
+
+    assert order_data["subtotal"] == Decimal("112")
+    assert order_data["total"] == Decimal("132")
+    assert order_data["confirmation_code"] == "R1"
+    assert customer_data["payment_system_id"] == "CUST1"
+    assert [item["external_id"] for item in line_items] == ["ITEM1"]
+    assert [transaction["amount"] for transaction in transactions] == [6000]
+
+
+def test_payment_without_order_is_its_own_order(square_order):
+    payment = make_payment("PAY1", 6000)
+    del payment["order_id"]
+
+    order_data, _, line_items, _ = orders.map_square_order(payment)
+
+    assert order_data["payment_system_order_id"] == "PAY1"
+    assert order_data["total"] == Decimal("60")
+    assert line_items == []
+    assert square_order == []
+
+
+def test_payment_without_customer_is_skipped(monkeypatch):
+    monkeypatch.setattr(orders, "fetch_square_order", lambda order_id: {**ORDER, "customer_id": None})
+    skipped = orders.SKIPPED_PAYMENTS["no_customer"]
+
+    result = orders.process_order_webhook(make_payment("PAY1", 6000, customer_id=None), "square")
+
+    assert result == (None, False)
+    assert orders.SKIPPED_PAYMENTS["no_customer"] == skipped + 1
+
+
+NOTIFICATION_URL = "https://example.test/webhooks/orders"
+
+
+def sign(key, body):
+    digest = hmac.new(key.encode(), (NOTIFICATION_URL + body).encode(), hashlib.sha256).digest()
+    return base64.b64encode(digest).decode()
+
+
+def order_webhook_client(signature_key):
+    app = Flask(__name__)
+    app.config.update(SQUARE_ORDER_SIGNATURE_KEY=signature_key, SQUARE_ORDER_NOTIFICATION_URL=NOTIFICATION_URL)
+
+    @app.post("/webhooks/orders")
+    @validate_square_order_webhook
+    def webhook():
+        return {"status": "accepted"}
+
+    return app.test_client()
+
+
+WEBHOOK_BODY = json.dumps({"data": {"object": {"payment": make_payment("PAY1", 6000)}}})
+
+
+@pytest.mark.parametrize("signature_key, signature", [
+    ("", None),
+    ("", sign("", WEBHOOK_BODY)),
+    ("key", None),
+    ("key", sign("other key", WEBHOOK_BODY)),
+])
+def test_order_webhook_refuses_unsigned_requests(signature_key, signature):
+    headers = {"x-square-hmacsha256-signature": signature} if signature else {}
+
+    response = order_webhook_client(signature_key).post(
+        "/webhooks/orders", data=WEBHOOK_BODY, content_type="application/json", headers=headers
+    )
+
+    assert response.status_code == 403
+
+
+def test_order_webhook_accepts_signed_requests():
+    response = order_webhook_client("key").post(
+        "/webhooks/orders",
+        data=WEBHOOK_BODY,
+        content_type="application/json",
+        headers={"x-square-hmacsha256-signature": sign("key", WEBHOOK_BODY)}
+    )
+
+    assert response.status_code == 200
+    assert response.get_json() == {"status": "accepted"}
@@ -0,0 +1,167 @@
+"""
+Availability query benchmark: Python filtering vs tstzrange/GiST queries.
+
+For each history size, fills a location and agent with that many
+back-to-back past appointments (plus a day of upcoming ones) and times the
+previous implementation, which loads every appointment through the
+relationship and filters in Python, against the set-based queries.
+
+Runs in its own schema, so it never touches the application's tables.
+
+    python -m tools.benchmarks.appointment_availability --sizes 1000 100000 1000000
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+from flask import Flask
+from sqlalchemy import text
+
+from src.extensions import db
+from src.models import load_models
+
+SCHEMA = "bench_availability"
+
+
+def legacy_is_available(location, start_datetime, duration_minutes):
+    end_datetime = start_datetime + timedelta(minutes=duration_minutes)
+    active = [apt for apt in location.appointments if apt.status != 'cancelled']
+    overlapping = [
+        apt for apt in active
+        if apt.start_datetime < end_datetime and apt.end_datetime > start_datetime
+    ]
+    return len(overlapping) == 0
+
+
+def legacy_upcoming(location):
+    return [
+        apt for apt in location.appointments
+        if apt.start_datetime > datetime.now(apt.start_datetime.tzinfo)
+        and apt.status != 'cancelled'
+    ]
+
+
+def legacy_for_date(location, date):
+    return [
+        apt for apt in location.appointments
+        if apt.start_datetime.date() == date and apt.status != 'cancelled'
+    ]
+
+
+def same_result(legacy, current):
+    if isinstance(legacy, list):
+        return sorted(apt.id for apt in legacy) == sorted(apt.id for apt in current)
+    return legacy == current
+
+
+def create_bench_app(database_url):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_url
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "connect_args": {"options": f"-csearch_path={SCHEMA}"}
+    }
+    db.init_app(app)
+    load_models()
+    return app
+
+
+def seed(size):
+    """Rebuild the schema with `size` past appointments and 12 upcoming ones."""
+    db.session.remove()
+    with db.engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    db.create_all()
+
+    upcoming = 12
+    total = size + upcoming
+    statements = [
+        "INSERT INTO customers (booking_system_id, first_name, last_name, email, signup_source) "
+        "VALUES (1, 'Bench', 'Mark', 'bench@example.com', 'admin')",
+        "INSERT INTO items (external_id, name, type, category, base_price, duration, source, status) "
+        "VALUES ('bench', 'Swedish Massage', 'service', 'swedish', 6000, 60, 'latepoint', 'active')",
+        "INSERT INTO locations (name, address) VALUES ('Bench Studio', '1 Benchmark Road')",
+        "INSERT INTO agents (first_name, last_name, full_name, email) "
+        "VALUES ('Bench', 'Agent', 'Bench Agent', 'agent@example.com')",
+        f"INSERT INTO orders (customer_id, data_source, booking_system_order_id, order_status, payment_status, subtotal, total) "
+        f"SELECT 1, 'latepoint', g, 'completed', 'fully_paid', 60, 60 FROM generate_series(1, {total}) g",
+        f"INSERT INTO order_line_items (order_id, item_id, quantity, price, total) "
+        f"SELECT g, 1, 1, 60, 60 FROM generate_series(1, {total}) g",
+        # Hour-long slots ending `upcoming` hours from now; every tenth is cancelled
+        f"INSERT INTO appointments (order_line_item_id, customer_id, booking_code, start_datetime, end_datetime, "
+        f"duration, agent_id, location_id, status, payment_status) "
+        f"SELECT g, 1, 'B' || g, t, t + interval '1 hour', 60, 1, 1, "
+        f"CASE WHEN g % 10 = 0 THEN 'cancelled' WHEN t < now() THEN 'completed' ELSE 'approved' END, 'fully_paid' "
+        f"FROM generate_series(1, {total}) g, "
+        f"LATERAL (SELECT date_trunc('hour', now()) + (g - {size}) * interval '1 hour' AS t) s",
+        "ANALYZE",
+    ]
+    with db.engine.begin() as conn:
+        for statement in statements:
+            conn.execute(text(statement))
+
+
+def time_ms(func, repeat):
+    best = None
+    for _ in range(repeat):
+        db.session.expire_all()
+        started = time.perf_counter()
+        func()
+        elapsed = (time.perf_counter() - started) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000],
+                        help="Historical appointments per location")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per query (best is reported)")
+    parser.add_argument("--database-url", help="Postgres URL (defaults to the app's database)")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        from config import config
+        args.database_url = config[os.getenv("FLASK_ENV", "production")].SQLALCHEMY_DATABASE_URI
+
+    app = create_bench_app(args.database_url)
+    with app.app_context():
+        from src.models import Location
+
+        print(f"{'history':>9} {'query':<24} {'python ms':>10} {'sql ms':>9} {'speedup':>8}")
+        try:
+            for size in args.sizes:
+                started = time.perf_counter()
+                seed(size)
+                print(f"# seeded {size} appointments in {time.perf_counter() - started:.1f}s")
+
+                location = db.session.get(Location, 1)
+                slot = datetime.now(timezone.utc).replace(minute=30, second=0, microsecond=0) + timedelta(hours=2)
+                today = slot.date()
+                cases = [
+                    ("is_available",
+                     lambda: legacy_is_available(location, slot, 60),
+                     lambda: location.is_available(slot, 60)),
+                    ("upcoming_appointments",
+                     lambda: legacy_upcoming(location),
+                     lambda: location.upcoming_appointments),
+                    ("get_appointments_for_date",
+                     lambda: legacy_for_date(location, today),
+                     lambda: location.get_appointments_for_date(today)),
+                ]
+                for name, legacy, current in cases:
+                    if not same_result(legacy(), current()):
+                        raise AssertionError(f"{name}: results differ at {size} appointments")
+                    # The Python version is slow at large sizes; time it fewer times
+                    python_ms = time_ms(legacy, max(1, args.repeat if size <= 100000 else 1))
+                    sql_ms = time_ms(current, args.repeat)
+                    print(f"{size:>9} {name:<24} {python_ms:>10.2f} {sql_ms:>9.2f} {python_ms / sql_ms:>7.0f}x")
+        finally:
+            db.session.remove()
+            with db.engine.begin() as conn:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Per-message latency of Campfire posts against the local stub.
+
+Compares the previous bare `requests.post` per message with the pooled
+CampfireClient, and shows how many posts batching saves. The stub charges
+--handshake-latency per new connection to stand in for TCP+TLS setup to
+the real server (localhost connects are otherwise nearly free).
+
+    python -m tools.benchmarks.campfire_client --messages 200 --handshake-latency 0.03
+"""
+import argparse
+import statistics
+import time
+import requests
+from src.core.integrations.campfire import CampfireClient
+from tools.stubs.campfire import start_campfire_stub
+
+
+def timed(send, count):
+    latencies = []
+    for i in range(count):
+        started = time.perf_counter()
+        send(f"Benchmark message {i}")
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def report(label, latencies, server, connections_before, requests_before):
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(
+        f"{label:<22} {statistics.mean(latencies):>9.2f} {quantiles[49]:>9.2f} {quantiles[98]:>9.2f} "
+        f"{server.request_count - requests_before:>8} {server.connection_count - connections_before:>12}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.002, help="Server time per request in seconds")
+    parser.add_argument("--handshake-latency", type=float, default=0.03, help="Delay per new connection in seconds")
+    parser.add_argument("--batch-window", type=float, default=0.2)
+    args = parser.parse_args()
+
+    server, base_url = start_campfire_stub(latency=args.latency, handshake_latency=args.handshake_latency)
+    url = f"{base_url}/rooms/1/token/messages"
+    print(f"{'client':<22} {'mean ms':>9} {'p50 ms':>9} {'p99 ms':>9} {'posts':>8} {'connections':>12}")
+
+    def bare(message):
+        requests.post(url, data=message.encode("utf-8"), headers={"Content-Type": "text/html"})
+
+    state = (server.connection_count, server.request_count)
+    report("requests.post", timed(bare, args.messages), server, *state)
+
+    client = CampfireClient(batch_window=0)
+    state = (server.connection_count, server.request_count)
+    report("CampfireClient", timed(lambda m: client.post(url, m), args.messages), server, *state)
+
+    batching = CampfireClient(batch_window=args.batch_window)
+    state = (server.connection_count, server.request_count)
+    latencies = timed(lambda m: batching.post(url, m, batch=True), args.messages)
+    batching.flush()
+    report(f"batched ({args.batch_window}s)", latencies, server, *state)
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Throughput of EmailService.send_bulk against the local SendLayer stub.
+
+Sends --emails rendered welcome emails sequentially and then at increasing
+concurrency. With --rate-limit the stub throttles with 429/Retry-After, and
+the run shows how many emails were retried and whether all were delivered.
+
+    python -m tools.benchmarks.email_bulk --emails 200 --latency 0.05
+    python -m tools.benchmarks.email_bulk --emails 200 --rate-limit 50
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("SENDLAYER_API_KEY", "benchmark")
+
+from src.services import email_service
+from tools.stubs.sendlayer import start_sendlayer_stub
+
+
+def build_messages(count):
+    for i in range(count):
+        yield {
+            "to_email": f"client{i}@example.com",
+            "subject": "Welcome to Rosedale Massage",
+            "template": "customers/welcome_customer",
+            "context": {"name": f"Client {i}", "newsletter_subscribed": False, "newsletter_signup_url": "#"},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.05, help="Server time per request in seconds")
+    parser.add_argument("--rate-limit", type=float, default=0, help="Stub requests per second before 429s")
+    args = parser.parse_args()
+
+    server, base_url = start_sendlayer_stub(latency=args.latency, rate_limit=args.rate_limit)
+    email_service.SENDLAYER_API_URL = f"{base_url}/v1/emails"
+    service = email_service.EmailService(dns_override=False)
+
+    print(f"{'concurrency':>11} {'seconds':>8} {'emails/s':>9} {'sent':>6} {'failed':>7} {'retried':>8} {'429s':>6}")
+    for concurrency in (1, 4, 8):
+        throttled = server.throttled_count
+        started = time.perf_counter()
+        results = service.send_bulk(build_messages(args.emails), concurrency=concurrency)
+        elapsed = time.perf_counter() - started
+
+        sent = sum(1 for r in results if r["status"] == "sent")
+        retried = sum(1 for r in results if r["attempts"] > 1)
+        print(
+            f"{concurrency:>11} {elapsed:>8.2f} {len(results) / elapsed:>9.1f} {sent:>6} "
+            f"{len(results) - sent:>7} {retried:>8} {server.throttled_count - throttled:>6}"
+        )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+p50/p99 send latency of EmailService against the local SendLayer stub.
+
+"per-send" reproduces the previous behaviour: a fresh DNS query and a new
+connection for every email. "pooled" is the shared service with its cached
+DNS and kept-alive connection. DNS answers come from a fake resolver with
+--dns-latency, and the stub charges --handshake-latency per connection.
+
+    python -m tools.benchmarks.email_send --emails 200
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault("SENDLAYER_API_KEY", "benchmark")
+
+from src.services import email_service
+from src.utils.dns_cache import DNSCache
+from tools.stubs.sendlayer import start_sendlayer_stub
+
+
+def fake_resolver(latency):
+    def resolve(hostname):
+        time.sleep(latency)
+        return ["127.0.0.1"], 300
+    return resolve
+
+
+def run(service, count, close_each):
+    for i in range(count):
+        service.send_email(f"client{i}@example.com", "Benchmark", "<p>Hello</p>")
+        if close_each:
+            service.session.close()
+    return service.get_stats()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--emails", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.005, help="Server time per request in seconds")
+    parser.add_argument("--handshake-latency", type=float, default=0.03, help="Delay per new connection in seconds")
+    parser.add_argument("--dns-latency", type=float, default=0.01, help="Delay per DNS query in seconds")
+    args = parser.parse_args()
+
+    server, base_url = start_sendlayer_stub(latency=args.latency, handshake_latency=args.handshake_latency)
+    # A hostname, so requests go through the DNS override
+    email_service.SENDLAYER_API_URL = base_url.replace("127.0.0.1", "sendlayer.stub") + "/v1/emails"
+
+    print(f"{'mode':<10} {'send p50':>9} {'send p99':>9} {'dns p50':>8} {'dns p99':>8} {'connections':>12}")
+    for label, min_ttl, max_ttl, close_each in (("per-send", 0, 0, True), ("pooled", 30, 3600, False)):
+        service = email_service.EmailService()
+        service.session.dns_cache = DNSCache(fake_resolver(args.dns_latency), min_ttl=min_ttl, max_ttl=max_ttl)
+
+        connections = server.connection_count
+        stats = run(service, args.emails, close_each)
+        print(
+            f"{label:<10} {stats['send']['p50_ms']:>9.2f} {stats['send']['p99_ms']:>9.2f} "
+            f"{stats['dns']['p50_ms']:>8.2f} {stats['dns']['p99_ms']:>8.2f} "
+            f"{server.connection_count - connections:>12}"
+        )
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Render benchmark for every email template.
+
+"cold" is the first render in a fresh process-like environment: without a
+bytecode cache it parses and compiles the template and layout; with the
+FileSystemBytecodeCache it only loads bytecode. "warm" is the steady state
+of the shared, precompiled environment.
+
+    python -m tools.benchmarks.email_templates --renders 2000
+"""
+import argparse
+import tempfile
+import time
+from jinja2 import meta
+from src.services import email_templates
+
+SKIP = (email_templates.LAYOUT_TEMPLATE,)
+
+
+def sample_context(env, path):
+    source = env.loader.get_source(env, path)[0]
+    variables = meta.find_undeclared_variables(env.parse(source))
+    return {name: f"sample {name}" for name in variables}
+
+
+def first_render_ms(env, path, context):
+    # Fragments are memoized per process; forget them so cold means cold
+    email_templates._fragments.clear()
+    started = time.perf_counter()
+    body = env.get_template(path).render(context)
+    env.get_template(email_templates.LAYOUT_TEMPLATE).render(content=body)
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--renders", type=int, default=2000, help="Warm renders per template")
+    args = parser.parse_args()
+
+    shared = email_templates.get_template_env()
+    paths = [
+        p for p in shared.list_templates(extensions=["html"])
+        if p not in SKIP and not p.startswith("partials/")
+    ]
+    contexts = {path: sample_context(shared, path) for path in paths}
+
+    cache_dir = tempfile.mkdtemp(prefix="email-bytecode-")
+    # Prime the bytecode cache, as a previous process would have
+    primer = email_templates.create_template_env(cache_dir)
+    for path in paths + ["base.html", "partials/styles.html", "partials/footer.html"]:
+        primer.get_template(path)
+
+    email_templates.precompile_templates()
+
+    print(f"{'template':<48} {'cold ms':>8} {'cold+bcc ms':>12} {'warm renders/s':>15}")
+    totals = [0.0, 0.0, 0.0]
+    for path in paths:
+        context = contexts[path]
+        cold = first_render_ms(email_templates.create_template_env(None), path, context)
+        cold_bcc = first_render_ms(email_templates.create_template_env(cache_dir), path, context)
+
+        email_templates.precompile_templates()
+        started = time.perf_counter()
+        for _ in range(args.renders):
+            email_templates.render_email(path, context, subject="Benchmark")
+        warm = args.renders / (time.perf_counter() - started)
+
+        totals[0] += cold
+        totals[1] += cold_bcc
+        totals[2] += warm
+        print(f"{path:<48} {cold:>8.2f} {cold_bcc:>12.2f} {warm:>15.0f}")
+
+    print(f"{'total / mean':<48} {totals[0]:>8.2f} {totals[1]:>12.2f} {totals[2] / len(paths):>15.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Export benchmark: a full-history export of a synthetic million-row table.
+
+Times ExportService.stream (server-side cursor, chunked encoding, optional
+gzip) against loading the whole result and then encoding it, which is what
+an export written the obvious way does. Each run is a fresh child process
+so its peak RSS is its own.
+
+Runs in its own schema, so it never touches the application's tables.
+
+    python -m tools.benchmarks.exports --rows 1000000 --datasets orders transactions
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+from flask import Flask
+from sqlalchemy import text
+
+from src.extensions import db
+from src.models import load_models
+
+SCHEMA = "bench_exports"
+MODES = ("buffered", "stream", "stream+gzip")
+
+
+def create_bench_app(database_url):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_url
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {"connect_args": {"options": f"-csearch_path={SCHEMA}"}}
+    db.init_app(app)
+    load_models()
+    return app
+
+
+def seed(rows):
+    """Rebuild the schema with `rows` customers, orders and transactions"""
+    db.session.remove()
+    with db.engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    db.create_all()
+    with db.engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO customers (payment_system_id, first_name, last_name, email, phone_number, address, "
+            "signup_source, created_at) "
+            "SELECT 'SQ' || g, 'Customer' || g, 'Bench', 'customer' || g || '@example.com', '+447700' || g, "
+            "jsonb_build_object('address_line_1', g || ' High Street', 'locality', 'Guildford'), 'square', "
+            "timestamp '2020-01-01' + g * interval '1 minute' "
+            f"FROM generate_series(1, {rows}) g"
+        ))
+        conn.execute(text(
+            "INSERT INTO orders (customer_id, data_source, payment_system_order_id, confirmation_code, "
+            "order_status, fulfillment_status, payment_status, subtotal, total, created_at) "
+            "SELECT g, 'square', 'ORD' || g, 'R' || g, 'completed', 'fulfilled', 'fully_paid', 60, 72.5, "
+            "timestamptz '2020-01-01' + g * interval '1 minute' "
+            f"FROM generate_series(1, {rows}) g"
+        ))
+        conn.execute(text(
+            "INSERT INTO transactions (id, order_id, amount, payment_method, status, card_brand, last_4, "
+            "exp_month, exp_year, receipt_url, created_at) "
+            "SELECT 'PAY' || lpad(g::text, 9, '0'), g, 7250, 'CARD', 'COMPLETED', 'VISA', '1111', 12, 2030, "
+            "'https://squareup.com/receipt/preview/PAY' || g, timestamptz '2020-01-01' + g * interval '1 minute' "
+            f"FROM generate_series(1, {rows}) g"
+        ))
+        conn.execute(text("ANALYZE"))
+
+
+def buffered_export(dataset, export_format):
+    """Fetch every row, then encode them all"""
+    from src.services.exports import ENCODERS, build_export_query, export_columns
+
+    with db.engine.connect() as connection:
+        rows = connection.execute(build_export_query(dataset, export_format)).all()
+    encode = ENCODERS[export_format]()
+    header = encode([[column.key for column in export_columns(dataset)]]) if export_format == "csv" else b""
+    yield header + encode(rows)
+
+
+def max_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_child(database_url, dataset, mode, export_format):
+    """One export, in this process; prints its numbers as JSON"""
+    from src.services.exports import ExportService, gzip_stream
+
+    app = create_bench_app(database_url)
+    with app.app_context():
+        # Connect and warm up first, so the baseline includes the pool
+        with db.engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+        baseline = max_rss_mb()
+
+        if mode == "buffered":
+            chunks = buffered_export(dataset, export_format)
+        else:
+            chunks = ExportService.stream(dataset, export_format)
+            if mode == "stream+gzip":
+                chunks = gzip_stream(chunks)
+
+        started = time.perf_counter()
+        size, first_byte = 0, None
+        for chunk in chunks:
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            size += len(chunk)
+        elapsed = time.perf_counter() - started
+
+    print(json.dumps({
+        "seconds": elapsed,
+        "first_byte": first_byte,
+        "bytes": size,
+        "baseline_mb": baseline,
+        "peak_mb": max_rss_mb(),
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows per table")
+    parser.add_argument("--datasets", nargs="+", default=["orders"], help="customers, orders and/or transactions")
+    parser.add_argument("--formats", nargs="+", default=["csv", "ndjson"])
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--database-url", help="Postgres URL (defaults to the app's database)")
+    parser.add_argument("--keep", action="store_true", help="Reuse the seeded schema and leave it in place")
+    parser.add_argument("--child", nargs=3, metavar=("DATASET", "MODE", "FORMAT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if not args.database_url:
+        from config import config
+        args.database_url = config[os.getenv("FLASK_ENV", "production")].SQLALCHEMY_DATABASE_URI
+
+    if args.child:
+        return run_child(args.database_url, *args.child)
+
+    app = create_bench_app(args.database_url)
+    with app.app_context():
+        exists = db.session.execute(text(f"SELECT to_regclass('{SCHEMA}.transactions') IS NOT NULL")).scalar()
+        if not (args.keep and exists):
+            started = time.perf_counter()
+            seed(args.rows)
+            print(f"# seeded {args.rows} rows per table in {time.perf_counter() - started:.1f}s")
+        db.session.remove()
+
+    print(f"{'dataset':<13} {'format':<7} {'mode':<12} {'rows/s':>9} {'MB/s':>6} {'MB out':>7} "
+          f"{'1st byte':>8} {'peak RSS':>9} {'growth':>7}")
+    try:
+        for dataset in args.datasets:
+            for export_format in args.formats:
+                for mode in args.modes:
+                    output = subprocess.run(
+                        [sys.executable, "-m", "tools.benchmarks.exports", "--database-url", args.database_url,
+                         "--child", dataset, mode, export_format],
+                        capture_output=True, text=True, check=True,
+                    ).stdout
+                    result = json.loads(output.strip().splitlines()[-1])
+                    print(
+                        f"{dataset:<13} {export_format:<7} {mode:<12} {args.rows / result['seconds']:>9.0f} "
+                        f"{result['bytes'] / result['seconds'] / 2 ** 20:>6.1f} {result['bytes'] / 2 ** 20:>7.1f} "
+                        f"{result['first_byte']:>7.2f}s {result['peak_mb']:>7.0f}MB "
+                        f"{result['peak_mb'] - result['baseline_mb']:>5.0f}MB"
+                    )
+    finally:
+        if not args.keep:
+            with app.app_context():
+                with db.engine.begin() as conn:
+                    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Microbenchmark for IP allowlist lookups.
+
+Compares the compiled prefix trie against the previous approach (rebuilding
+a set from the environment on every request) and a linear scan over
+ipaddress networks, for allowlists of increasing size.
+
+    python -m tools.benchmarks.ip_allowlist
+"""
+import ipaddress
+import random
+import timeit
+from src.api.validators.ip_validator import IPAllowlist
+
+LOOKUPS = 20000
+
+
+def random_ipv4():
+    return str(ipaddress.IPv4Address(random.getrandbits(32)))
+
+
+def build_entries(size):
+    entries = []
+    for _ in range(size):
+        if random.random() < 0.5:
+            entries.append(random_ipv4())
+        else:
+            prefix = random.choice([16, 20, 24, 28])
+            entries.append(str(ipaddress.ip_network(f"{random_ipv4()}/{prefix}", strict=False)))
+    entries.append("2001:db8::/32")
+    return entries
+
+
+def main():
+    random.seed(42)
+    probes = [random_ipv4() for _ in range(LOOKUPS // 2)] + ["2001:db8::1"] * (LOOKUPS // 2)
+    print(f"{'entries':>8} {'trie (us)':>10} {'set rebuild (us)':>17} {'linear scan (us)':>17}")
+
+    for size in (10, 100, 1000):
+        entries = build_entries(size)
+        allowlist = IPAllowlist(entries)
+        env_value = ",".join(entries)
+        networks = [ipaddress.ip_network(e, strict=False) for e in entries]
+
+        def trie():
+            for ip in probes:
+                allowlist.is_allowed(ip)
+
+        def set_rebuild():
+            for ip in probes:
+                ip in set(env_value.split(","))
+
+        def linear_scan():
+            for ip in probes[:1000]:
+                address = ipaddress.ip_address(ip)
+                any(address in network for network in networks)
+
+        trie_us = min(timeit.repeat(trie, number=1, repeat=3)) / len(probes) * 1e6
+        set_us = min(timeit.repeat(set_rebuild, number=1, repeat=3)) / len(probes) * 1e6
+        scan_us = min(timeit.repeat(linear_scan, number=1, repeat=3)) / 1000 * 1e6
+        print(f"{size:>8} {trie_us:>10.2f} {set_us:>17.2f} {scan_us:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
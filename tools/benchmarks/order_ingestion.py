@@ -0,0 +1,279 @@
+"""
+Order ingestion benchmark: a burst of Square payment webhooks.
+
+Replays a burst of Square payment payloads, some of them redelivered,
+through worker threads (like gunicorn threads or `flask jobs work
+--threads`). It times the previous ingestion flow against
+process_order_webhook. The previous flow looked the order up, set its
+attributes and committed after each step. It is reproduced here with the
+model's column names, and it writes line items and transactions the same way.
+
+Runs in its own schema, so it never touches the application's tables.
+
+    python -m tools.benchmarks.order_ingestion --orders 2000 --threads 1 8
+"""
+import argparse
+import os
+import queue
+import random
+import statistics
+import threading
+import time
+
+from flask import Flask
+from sqlalchemy import event, func, select, text
+
+from src.extensions import db
+from src.models import load_models
+from src.services import orders as orders_service
+
+SCHEMA = "bench_orders"
+ITEMS = 20
+CUSTOMERS = 200
+
+
+def make_payment(index, status="COMPLETED"):
+    rng = random.Random(index)
+    line_items = []
+    for _ in range(rng.randint(1, 3)):
+        quantity = rng.randint(1, 2)
+        price = rng.choice([4500, 6000, 7500])
+        line_items.append({
+            "catalog_object_id": f"ITEM{rng.randrange(ITEMS):04d}",
+            "quantity": str(quantity),
+            "base_price_money": {"amount": price, "currency": "GBP"},
+            "total_money": {"amount": price * quantity, "currency": "GBP"},
+        })
+    amount = sum(item["total_money"]["amount"] for item in line_items)
+    return {
+        "id": f"PAY{index:08d}",
+        "order_id": f"ORD{index:08d}",
+        "customer_id": f"CUST{rng.randrange(CUSTOMERS):05d}",
+        "receipt_number": f"R{index:07d}",
+        "status": status,
+        "source_type": "CARD",
+        "amount_money": {"amount": amount, "currency": "GBP"},
+        "approved_money": {"amount": amount, "currency": "GBP"},
+        "card_details": {"card": {"card_brand": "VISA", "last_4": "1111", "exp_month": 12, "exp_year": 2030}},
+        "receipt_url": f"https://squareup.com/receipt/preview/PAY{index:08d}",
+        "line_items": line_items,
+    }
+
+
+def make_order(order_id):
+    """
+    The order a payment belongs to, as the Orders API returns it. Stands in
+    for the lookup map_square_order makes, so only the database is timed.
+    """
+    payment = make_payment(int(order_id[3:]))
+    return {
+        "id": order_id,
+        "customer_id": payment["customer_id"],
+        "state": "COMPLETED",
+        "line_items": payment["line_items"],
+        "total_money": payment["amount_money"],
+        "total_tax_money": {"amount": 0, "currency": "GBP"},
+        "net_amount_due_money": {"amount": 0, "currency": "GBP"},
+    }
+
+
+def make_burst(orders, redelivered):
+    """`orders` payments plus a `redelivered` share sent twice, shuffled so duplicates can race."""
+    payloads = [make_payment(index, "APPROVED") for index in range(orders)]
+    payloads += [make_payment(index) for index in random.Random(0).sample(range(orders), int(orders * redelivered))]
+    random.Random(1).shuffle(payloads)
+    return payloads
+
+
+def legacy_ingest(data):
+    """The previous flow: look up or create, set attributes, commit after each step."""
+    from src.models import Customer, Item, Order, OrderLineItem, Transaction
+    from src.services.orders import map_square_order
+
+    order_data, customer_data, line_items, transactions = map_square_order(data)
+
+    customer = Customer.query.filter_by(payment_system_id=customer_data["payment_system_id"]).first()
+    if not customer:
+        raise ValueError("Unknown customer")
+
+    order = Order.query.filter_by(
+        payment_system_order_id=order_data["payment_system_order_id"], data_source="square"
+    ).first()
+    if order:
+        for key, value in order_data.items():
+            setattr(order, key, value)
+        db.session.commit()
+    else:
+        order = Order(customer_id=customer.id, data_source="square", **order_data)
+        db.session.add(order)
+        db.session.commit()
+        for line_item in line_items:
+            item = Item.query.filter_by(external_id=line_item["external_id"]).first()
+            db.session.add(OrderLineItem(
+                order_id=order.id, item_id=item.id, quantity=line_item["quantity"],
+                price=line_item["price"], total=line_item["total"],
+            ))
+        db.session.commit()
+
+    for data in transactions:
+        transaction = db.session.get(Transaction, data["id"])
+        if transaction:
+            for key, value in data.items():
+                setattr(transaction, key, value)
+        else:
+            db.session.add(Transaction(order_id=order.id, **data))
+        db.session.commit()
+
+
+def current_ingest(data):
+    from src.services.orders import process_order_webhook
+
+    process_order_webhook(data, "square")
+
+
+def create_bench_app(database_url, pool_size):
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = database_url
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_size": pool_size,
+        "connect_args": {"options": f"-csearch_path={SCHEMA}"},
+    }
+    db.init_app(app)
+    load_models()
+    return app
+
+
+def seed():
+    """Rebuild the schema with the catalog items and customers the payments refer to."""
+    db.session.remove()
+    with db.engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    db.create_all()
+    with db.engine.begin() as conn:
+        conn.execute(text(
+            "INSERT INTO items (external_id, name, type, category, base_price, source, status) "
+            "SELECT 'ITEM' || lpad(g::text, 4, '0'), 'Item ' || g, 'service', 'massage', 6000, 'square', 'active' "
+            f"FROM generate_series(0, {ITEMS - 1}) g"
+        ))
+        conn.execute(text(
+            "INSERT INTO customers (payment_system_id, first_name, last_name, email, signup_source) "
+            "SELECT 'CUST' || lpad(g::text, 5, '0'), 'Bench', 'Customer', 'bench' || g || '@example.com', 'square' "
+            f"FROM generate_series(0, {CUSTOMERS - 1}) g"
+        ))
+
+
+def count_statements(engine):
+    """Count statements and commits on the engine."""
+    counts = {"statements": 0, "commits": 0}
+    lock = threading.Lock()
+
+    def on_execute(*args):
+        with lock:
+            counts["statements"] += 1
+
+    def on_commit(*args):
+        with lock:
+            counts["commits"] += 1
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    event.listen(engine, "commit", on_commit)
+
+    def remove():
+        event.remove(engine, "before_cursor_execute", on_execute)
+        event.remove(engine, "commit", on_commit)
+
+    return counts, remove
+
+
+def run_burst(app, ingest, payloads, threads):
+    pending = queue.Queue()
+    for payload in payloads:
+        pending.put(payload)
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def worker():
+        with app.app_context():
+            while True:
+                try:
+                    payload = pending.get_nowait()
+                except queue.Empty:
+                    break
+                started = time.perf_counter()
+                try:
+                    ingest(payload)
+                except Exception as e:
+                    db.session.rollback()
+                    with lock:
+                        errors.append(type(e).__name__)
+                with lock:
+                    latencies.append((time.perf_counter() - started) * 1000)
+            db.session.remove()
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started, latencies, errors
+
+
+def check_tables(orders):
+    from src.models import Order, OrderLineItem, Transaction
+
+    return {
+        "orders": db.session.scalar(select(func.count()).select_from(Order)),
+        "completed": db.session.scalar(select(func.count()).where(Order.order_status == "completed")),
+        "line_items": db.session.scalar(select(func.count()).select_from(OrderLineItem)),
+        "transactions": db.session.scalar(select(func.count()).select_from(Transaction)),
+        "expected_line_items": sum(len(make_payment(index)["line_items"]) for index in range(orders)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--orders", type=int, default=2000, help="Distinct orders in the burst")
+    parser.add_argument("--redelivered", type=float, default=0.2, help="Share of payments sent twice")
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8], help="Worker thread counts to try")
+    parser.add_argument("--database-url", help="Postgres URL (defaults to the app's database)")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        from config import config
+        args.database_url = config[os.getenv("FLASK_ENV", "production")].SQLALCHEMY_DATABASE_URI
+
+    app = create_bench_app(args.database_url, pool_size=max(args.threads))
+    orders_service.fetch_square_order = make_order
+    payloads = make_burst(args.orders, args.redelivered)
+    print(f"# {len(payloads)} webhooks for {args.orders} orders")
+    print(f"{'flow':<8} {'threads':>7} {'orders/s':>9} {'p50 ms':>7} {'p99 ms':>7} "
+          f"{'stmts/req':>9} {'commits/req':>11} {'errors':>6}  tables")
+
+    with app.app_context():
+        try:
+            for threads in args.threads:
+                for name, ingest in (("legacy", legacy_ingest), ("current", current_ingest)):
+                    seed()
+                    counts, remove = count_statements(db.engine)
+                    try:
+                        elapsed, latencies, errors = run_burst(app, ingest, payloads, threads)
+                    finally:
+                        remove()
+                    latencies.sort()
+                    tables = check_tables(args.orders)
+                    print(
+                        f"{name:<8} {threads:>7} {len(payloads) / elapsed:>9.0f} "
+                        f"{statistics.median(latencies):>7.2f} {latencies[int(len(latencies) * 0.99)]:>7.2f} "
+                        f"{counts['statements'] / len(payloads):>9.1f} {counts['commits'] / len(payloads):>11.1f} "
+                        f"{len(errors):>6}  {tables}"
+                    )
+        finally:
+            db.session.remove()
+            with db.engine.begin() as conn:
+                conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
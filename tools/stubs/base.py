@@ -0,0 +1,84 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """
+    Base request handler for local API stand-ins.
+
+    Subclasses implement do_GET/do_POST and use `send_json`. The server's
+    `latency` (seconds) is applied to every request before responding.
+    """
+
+    def log_message(self, format, *args):
+        # Keep benchmark and test output clean
+        pass
+
+    def simulate_latency(self):
+        with self.server.lock:
+            self.server.request_count += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def send_json(self, payload, status=200, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class KeepAliveStubHandler(StubHandler):
+    """
+    Stub handler speaking HTTP/1.1 keep-alive. The server's
+    `handshake_latency` (seconds) is charged once per new connection, standing
+    in for TCP+TLS setup to the real service.
+    """
+
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately; don't let Nagle hold the body
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connection_count += 1
+        if self.server.handshake_latency:
+            time.sleep(self.server.handshake_latency)
+
+
+def start_stub_server(handler_class, port=0, latency=0.0, **attrs):
+    """
+    Start a stub server on a background thread.
+
+    Args:
+        handler_class: StubHandler subclass serving the requests
+        port: Port to bind on 127.0.0.1 (0 picks a free port)
+        latency: Artificial delay per request, in seconds
+        **attrs: Extra attributes made available as `self.server.<name>`
+
+    Returns:
+        tuple: (server, base_url). Call `server.shutdown()` to stop it.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler_class)
+    server.daemon_threads = True
+    server.latency = latency
+    server.request_count = 0
+    server.connection_count = 0
+    server.handshake_latency = 0.0
+    server.lock = threading.Lock()
+    for key, value in attrs.items():
+        setattr(server, key, value)
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
@@ -0,0 +1,61 @@
+"""
+Local stand-in for Campfire's bot and room message endpoints.
+
+Accepts POST /rooms/<room>/<token>/messages and records each message body.
+Unlike the other stubs it speaks HTTP/1.1 keep-alive, and can charge a
+one-off delay per new connection to stand in for the TCP+TLS handshake:
+
+    python -m tools.stubs.campfire --port 8766 --handshake-latency 0.05
+    CAMPFIRE_BASE_URL=http://127.0.0.1:8766 flask run
+"""
+import argparse
+import threading
+from tools.stubs.base import KeepAliveStubHandler, start_stub_server
+
+
+class CampfireHandler(KeepAliveStubHandler):
+    def do_POST(self):
+        self.simulate_latency()
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length).decode("utf-8")
+
+        parts = self.path.strip("/").split("/")
+        if len(parts) < 2 or parts[-1] != "messages":
+            return self.send_json({"error": "not found"}, status=404)
+
+        with self.server.lock:
+            self.server.messages.append((self.path, body))
+
+        self.send_response(201)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+def start_campfire_stub(port=0, latency=0.0, handshake_latency=0.0):
+    """Start the stub; `server.messages` collects (path, body) pairs."""
+    return start_stub_server(
+        CampfireHandler,
+        port=port,
+        latency=latency,
+        handshake_latency=handshake_latency,
+        messages=[],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.0, help="Delay per request in seconds")
+    parser.add_argument("--handshake-latency", type=float, default=0.0, help="Delay per new connection in seconds")
+    args = parser.parse_args()
+
+    server, url = start_campfire_stub(args.port, args.latency, args.handshake_latency)
+    print(f"Campfire stub listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Local stand-in for gender-api.com.
+
+Run it and point the app at it to resolve genders without network access:
+
+    python -m tools.stubs.gender_api --port 8765 --latency 0.2
+    GENDER_API_URL=http://127.0.0.1:8765 flask run
+"""
+import argparse
+import threading
+from urllib.parse import urlparse, parse_qs
+from tools.stubs.base import StubHandler, start_stub_server
+
+KNOWN_NAMES = {
+    "sarah": "female",
+    "emma": "female",
+    "rebecca": "female",
+    "emily": "female",
+    "charlotte": "female",
+    "james": "male",
+    "tom": "male",
+    "bob": "male",
+    "peter": "male",
+    "david": "male",
+}
+
+
+def lookup(name):
+    gender = KNOWN_NAMES.get(name.strip().casefold(), "unknown")
+    return {
+        "name": name,
+        "gender": gender,
+        "samples": 0 if gender == "unknown" else 1000,
+        "accuracy": 0 if gender == "unknown" else 98,
+    }
+
+
+class GenderApiHandler(StubHandler):
+    def do_GET(self):
+        self.simulate_latency()
+        url = urlparse(self.path)
+        params = parse_qs(url.query)
+
+        if url.path != "/get":
+            return self.send_json({"errno": 404, "errmsg": "not found"}, status=404)
+        if not params.get("key"):
+            return self.send_json({"errno": 30, "errmsg": "invalid key"}, status=401)
+
+        # Multiple names are separated by semicolons, as on gender-api.com
+        names = params.get("name", [""])[0].split(";")
+        if len(names) == 1:
+            return self.send_json(lookup(names[0]))
+        return self.send_json({"result": [lookup(name) for name in names]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="Delay per request in seconds")
+    args = parser.parse_args()
+
+    server, url = start_stub_server(GenderApiHandler, port=args.port, latency=args.latency)
+    print(f"gender-api stub listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
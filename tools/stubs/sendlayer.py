@@ -0,0 +1,93 @@
+"""
+Local stand-in for the SendLayer email API.
+
+Accepts POST /v1/emails and records each payload. Speaks HTTP/1.1
+keep-alive, can charge a delay per new connection, and with --rate-limit
+answers requests beyond that many per second with 429 and Retry-After:
+
+    python -m tools.stubs.sendlayer --port 8767 --latency 0.05 --rate-limit 20
+    SENDLAYER_API_URL=http://127.0.0.1:8767/v1/emails EMAIL_DNS_OVERRIDE=0 flask run
+"""
+import argparse
+import math
+import threading
+import time
+import uuid
+from tools.stubs.base import KeepAliveStubHandler, start_stub_server
+
+
+class SendLayerHandler(KeepAliveStubHandler):
+    def throttle(self):
+        """Token bucket of `rate_limit` requests per second; returns seconds to wait, or 0."""
+        rate = self.server.rate_limit
+        if not rate:
+            return 0
+        with self.server.lock:
+            now = time.monotonic()
+            tokens = min(rate, self.server.tokens + (now - self.server.tokens_at) * rate)
+            self.server.tokens_at = now
+            if tokens >= 1:
+                self.server.tokens = tokens - 1
+                return 0
+            self.server.tokens = tokens
+            self.server.throttled_count += 1
+            return (1 - tokens) / rate
+
+    def do_POST(self):
+        self.simulate_latency()
+        payload = self.read_json()
+
+        wait = self.throttle()
+        if wait:
+            return self.send_json(
+                {"Errors": [{"Message": "Too many requests"}]},
+                status=429,
+                headers={"Retry-After": str(max(1, math.ceil(wait)))}
+            )
+
+        if self.path != "/v1/emails":
+            return self.send_json({"Errors": [{"Message": "Not found"}]}, status=404)
+        if not self.headers.get("Authorization", "").startswith("Bearer "):
+            return self.send_json({"Errors": [{"Message": "Invalid API key"}]}, status=401)
+
+        with self.server.lock:
+            self.server.emails.append(payload)
+        self.send_json({"MessageID": str(uuid.uuid4())})
+
+
+def start_sendlayer_stub(port=0, latency=0.0, handshake_latency=0.0, rate_limit=0):
+    """
+    Start the stub; `server.emails` collects the posted payloads and
+    `server.throttled_count` counts 429 responses.
+    """
+    return start_stub_server(
+        SendLayerHandler,
+        port=port,
+        latency=latency,
+        handshake_latency=handshake_latency,
+        rate_limit=rate_limit,
+        tokens=rate_limit,
+        tokens_at=time.monotonic(),
+        throttled_count=0,
+        emails=[],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8767)
+    parser.add_argument("--latency", type=float, default=0.0, help="Delay per request in seconds")
+    parser.add_argument("--handshake-latency", type=float, default=0.0, help="Delay per new connection in seconds")
+    parser.add_argument("--rate-limit", type=float, default=0, help="Requests per second before 429s (0 = unlimited)")
+    args = parser.parse_args()
+
+    server, url = start_sendlayer_stub(args.port, args.latency, args.handshake_latency, args.rate_limit)
+    print(f"SendLayer stub listening on {url}/v1/emails")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Local stand-in for the Square Customers, Orders and Payments APIs.
+
+Serves, with cursor paging, over a generated customer directory and a
+history of orders and their payments:
+
+- POST /v2/customers/search (updated_at filter)
+- POST /v2/orders/search (created_at filter)
+- GET /v2/orders/<order_id>
+- GET /v2/payments (begin_time/end_time)
+
+    python -m tools.stubs.square --port 8768 --customers 5000 --orders 50000 --days 365 --latency 0.05
+    SQUARE_BASE_URL=http://127.0.0.1:8768 flask square sync-customers
+    SQUARE_BASE_URL=http://127.0.0.1:8768 flask square reconcile --since 2024-01-01 --until 2025-01-01
+"""
+import argparse
+import base64
+import bisect
+import threading
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qs, urlsplit
+from tools.stubs.base import KeepAliveStubHandler, start_stub_server
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+ITEMS = 10
+MAX_ORDER_PAGE_SIZE = 500
+MAX_PAYMENT_PAGE_SIZE = 100
+
+
+def format_time(value):
+    # Fixed-width UTC, like Square's own timestamps, so they also sort as strings
+    return value.astimezone(timezone.utc).isoformat(timespec="milliseconds").replace("+00:00", "Z")
+
+
+def make_customer(index, updated_at=None):
+    created_at = EPOCH + timedelta(minutes=index)
+    return {
+        "id": f"SQ{index:08d}",
+        "given_name": f"Customer{index}",
+        "family_name": "Square",
+        "email_address": f"customer{index}@example.com",
+        "phone_number": f"+4477{index:08d}",
+        "address": {"address_line_1": f"{index} High Street", "locality": "Guildford", "postal_code": "GU1 1AA"},
+        "created_at": format_time(created_at),
+        "updated_at": format_time(updated_at or created_at),
+    }
+
+
+def make_order(index, customers, spacing):
+    """
+    Order `index`, created `index * spacing` after EPOCH. Every 20th order is
+    cancelled and every 50th is still open; the rest are paid in full.
+    """
+    created_at = EPOCH + index * spacing
+    line_items = [
+        {
+            "uid": f"LI{index}-{n}",
+            "catalog_object_id": f"ITEM{(index + n) % ITEMS:04d}",
+            "quantity": "1",
+            "base_price_money": {"amount": 4500 + 1500 * ((index + n) % 3), "currency": "GBP"},
+            "total_money": {"amount": 4500 + 1500 * ((index + n) % 3), "currency": "GBP"},
+        }
+        for n in range(1 + index % 2)
+    ]
+    total = sum(item["total_money"]["amount"] for item in line_items)
+    state = "CANCELED" if index % 20 == 0 else "OPEN" if index % 50 == 1 else "COMPLETED"
+    return {
+        "id": f"ORD{index:08d}",
+        "location_id": "STUB",
+        "customer_id": f"SQ{index % customers:08d}" if customers else None,
+        "state": state,
+        "line_items": line_items,
+        "total_money": {"amount": total, "currency": "GBP"},
+        "total_tax_money": {"amount": 0, "currency": "GBP"},
+        "net_amount_due_money": {"amount": 0 if state == "COMPLETED" else total, "currency": "GBP"},
+        "created_at": format_time(created_at),
+        "updated_at": format_time(created_at),
+    }
+
+
+def make_payment(order):
+    """The payment for a completed order, taken a minute after it was created"""
+    index = int(order["id"][3:])
+    created_at = parse_time(order["created_at"]) + timedelta(minutes=1)
+    return {
+        "id": f"PAY{index:08d}",
+        "order_id": order["id"],
+        "customer_id": order["customer_id"],
+        "location_id": order["location_id"],
+        "status": "COMPLETED",
+        "source_type": "CARD",
+        "amount_money": order["total_money"],
+        "approved_money": order["total_money"],
+        "receipt_number": f"R{index:07d}",
+        "receipt_url": f"https://squareup.com/receipt/preview/PAY{index:08d}",
+        "card_details": {"card": {"card_brand": "VISA", "last_4": "1111", "exp_month": 12, "exp_year": 2030}},
+        "created_at": format_time(created_at),
+        "updated_at": format_time(created_at),
+    }
+
+
+def make_history(orders, customers, days):
+    """`orders` orders spread evenly over `days` days from EPOCH, and their payments"""
+    spacing = timedelta(days=days) / max(orders, 1)
+    history = [make_order(index, customers, spacing) for index in range(orders)]
+    payments = [make_payment(order) for order in history if order["state"] == "COMPLETED"]
+    payments.sort(key=lambda payment: payment["created_at"])
+    return history, payments
+
+
+def in_range(records, start_at, end_at):
+    """Records created in [start_at, end_at); `records` must be sorted by created_at"""
+    created_at = lambda record: record["created_at"]
+    # Timestamps are all formatted the same way, so they sort as strings
+    start = bisect.bisect_left(records, format_time(parse_time(start_at)), key=created_at) if start_at else 0
+    end = bisect.bisect_left(records, format_time(parse_time(end_at)), key=created_at) if end_at else len(records)
+    return records[start:end]
+
+
+def encode_cursor(offset):
+    return base64.urlsafe_b64encode(str(offset).encode()).decode()
+
+
+def decode_cursor(cursor):
+    return int(base64.urlsafe_b64decode(cursor.encode()).decode())
+
+
+def parse_time(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def paginate(records, key, limit, cursor):
+    offset = decode_cursor(cursor) if cursor else 0
+    page = records[offset:offset + limit]
+    body = {key: page} if page else {}
+    if offset + limit < len(records):
+        body["cursor"] = encode_cursor(offset + limit)
+    return body
+
+
+class SquareHandler(KeepAliveStubHandler):
+    def authorized(self):
+        if self.headers.get("Authorization", "").startswith("Bearer "):
+            return True
+        self.send_json({"errors": [{"category": "AUTHENTICATION_ERROR", "code": "UNAUTHORIZED"}]}, status=401)
+        return False
+
+    def not_found(self):
+        self.send_json({"errors": [{"category": "INVALID_REQUEST_ERROR", "code": "NOT_FOUND"}]}, status=404)
+
+    def do_GET(self):
+        self.simulate_latency()
+        if not self.authorized():
+            return
+        url = urlsplit(self.path)
+        if url.path.startswith("/v2/orders/"):
+            order_id = url.path.rsplit("/", 1)[-1]
+            order = next((order for order in self.server.orders if order["id"] == order_id), None)
+            return self.send_json({"order": order}) if order else self.not_found()
+        if url.path != "/v2/payments":
+            return self.not_found()
+
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        payments = in_range(self.server.payments, params.get("begin_time"), params.get("end_time"))
+        if params.get("sort_order") == "DESC":
+            payments = payments[::-1]
+        limit = min(int(params.get("limit", MAX_PAYMENT_PAGE_SIZE)), MAX_PAYMENT_PAGE_SIZE)
+        self.send_json(paginate(payments, "payments", limit, params.get("cursor")))
+
+    def do_POST(self):
+        self.simulate_latency()
+        payload = self.read_json()
+        if not self.authorized():
+            return
+
+        if self.path == "/v2/customers/search":
+            customers = self.server.customers
+            start_at = (((payload.get("query") or {}).get("filter") or {}).get("updated_at") or {}).get("start_at")
+            if start_at:
+                since = parse_time(start_at)
+                customers = [c for c in customers if parse_time(c["updated_at"]) >= since]
+            limit = min(int(payload.get("limit", 100)), 100)
+            return self.send_json(paginate(customers, "customers", limit, payload.get("cursor")))
+
+        if self.path == "/v2/orders/search":
+            created_at = (
+                (((payload.get("query") or {}).get("filter") or {}).get("date_time_filter") or {}).get("created_at")
+                or {}
+            )
+            orders = in_range(self.server.orders, created_at.get("start_at"), created_at.get("end_at"))
+            limit = min(int(payload.get("limit", MAX_ORDER_PAGE_SIZE)), MAX_ORDER_PAGE_SIZE)
+            return self.send_json(paginate(orders, "orders", limit, payload.get("cursor")))
+
+        self.not_found()
+
+
+def start_square_stub(port=0, latency=0.0, customers=0, orders=0, days=365):
+    """
+    Start the stub with `customers` generated customers and `orders` orders
+    spread over `days` days. `server.customers`, `server.orders` and
+    `server.payments` can be edited between requests (see make_customer,
+    make_order and make_payment); keep orders and payments sorted by
+    created_at.
+    """
+    history, payments = make_history(orders, customers, days)
+    return start_stub_server(
+        SquareHandler,
+        port=port,
+        latency=latency,
+        customers=[make_customer(index) for index in range(customers)],
+        orders=history,
+        payments=payments,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8768)
+    parser.add_argument("--latency", type=float, default=0.0, help="Delay per request in seconds")
+    parser.add_argument("--customers", type=int, default=5000, help="Customers in the directory")
+    parser.add_argument("--orders", type=int, default=0, help="Orders in the history")
+    parser.add_argument("--days", type=int, default=365, help="Days of history the orders are spread over")
+    args = parser.parse_args()
+
+    server, url = start_square_stub(args.port, args.latency, args.customers, args.orders, args.days)
+    print(f"Square stub listening on {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()